@@ -1,4 +1,14 @@
-import pandas as pd
+from collections import Counter
+
+import numpy as np
+
+
+def _column_mean(rows: list, key: str) -> float:
+    """Mean of rows[i][key], skipping missing values (NaN if there are none)."""
+    values = np.array([row.get(key) for row in rows], dtype=float)
+    valid = values[~np.isnan(values)]
+    return float(valid.sum() / len(valid)) if len(valid) else float("nan")
+
 
 class FoodAnalyzer:
     def __init__(self):
@@ -18,13 +28,11 @@ class FoodAnalyzer:
                 "message": "ไม่พบประวัติการรับประทานอาหารในช่วงนี้นะครับ แจ้งให้เริ่มบันทึกมื้อแรกได้เลย!"
             }
 
-        df = pd.DataFrame(recent_logs)
-        
         # Calculate averages
-        avg_cal = df['calories'].mean()
-        avg_pro = df['protein'].mean()
-        avg_carb = df['carbs'].mean()
-        avg_fat = df['fat'].mean()
+        avg_cal = _column_mean(recent_logs, 'calories')
+        avg_pro = _column_mean(recent_logs, 'protein')
+        avg_carb = _column_mean(recent_logs, 'carbs')
+        avg_fat = _column_mean(recent_logs, 'fat')
 
         gap_cal = user_target['target_calories'] - avg_cal
         gap_pro = user_target['target_protein'] - avg_pro
@@ -69,7 +77,7 @@ class FoodAnalyzer:
         if not detail_items:
             return []
             
-        df = pd.DataFrame(detail_items)
-        freq = df['food_name'].value_counts().head(top_n).reset_index()
-        freq.columns = ['food_name', 'count']
-        return freq.to_dict('records')
+        # Most frequent first; ties keep first-seen order (as value_counts did)
+        counts = Counter(item.get('food_name') for item in detail_items)
+        counts.pop(None, None)
+        return [{'food_name': name, 'count': n} for name, n in counts.most_common()[:top_n]]
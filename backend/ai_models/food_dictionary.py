@@ -0,0 +1,130 @@
+"""
+Process-wide, versioned food-name dictionary for the meal-text extractor.
+
+Before this, every /api/meals/estimate and /api/chat/multi request opened a
+connection, pulled up to 10k names and recompiled them. Now both
+NutritionAnalysisAgent instances (the one inside NutritionMultiAgent and
+chat.py's standalone one) share a single compiled FoodDictionary snapshot:
+
+  - built once, on first use;
+  - at most every FOOD_DICT_CHECK_SECONDS (default 30) one caller probes
+    catalog_versions.version (migrations/v30, a PK lookup bumped by
+    statement triggers on foods / food_regional_names) and rebuilds only
+    when it moved;
+  - without v30 the probe falls back to a full rebuild every
+    FOOD_DICT_MAX_AGE_SECONDS (default 300);
+  - other callers never wait: while one thread checks or rebuilds they
+    keep using the current snapshot.
+
+Usage:
+    from ai_models.food_dictionary import get_food_dictionary
+    extract_foods(text, dictionary=get_food_dictionary())
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from database import get_db_connection
+from ai_models.food_extraction import FoodDictionary
+
+logger = logging.getLogger(__name__)
+
+CHECK_SECONDS = float(os.getenv("FOOD_DICT_CHECK_SECONDS", "30"))
+MAX_AGE_SECONDS = float(os.getenv("FOOD_DICT_MAX_AGE_SECONDS", "300"))
+
+_VERSION_SQL = "SELECT version FROM catalog_versions WHERE name = 'food_names'"
+_NAMES_SQL = """
+    SELECT name
+    FROM (
+        SELECT food_name AS name
+        FROM foods
+        WHERE deleted_at IS NULL
+        UNION
+        SELECT frn.name_th AS name
+        FROM food_regional_names frn
+        JOIN foods f ON f.food_id = frn.food_id
+        WHERE frn.deleted_at IS NULL
+          AND f.deleted_at IS NULL
+    ) names
+    WHERE name IS NOT NULL AND BTRIM(name) <> ''
+    LIMIT 10000
+"""
+
+# Version of the fallback-only snapshot served while the DB is unreachable;
+# never equal to a probe result, so the next check always rebuilds.
+_UNAVAILABLE = "unavailable"
+
+_lock = threading.Lock()
+_current: Optional[FoodDictionary] = None
+_checked_at = 0.0
+
+
+def _probe_version(conn):
+    """catalog_versions counter, or None when v30 isn't applied."""
+    cur = conn.cursor()
+    try:
+        cur.execute(_VERSION_SQL)
+        row = cur.fetchone()
+        return row[0] if row else None
+    except Exception:
+        conn.rollback()
+        return None
+
+
+def _needs_rebuild(snap: Optional[FoodDictionary], version) -> bool:
+    if snap is None or snap.version == _UNAVAILABLE:
+        return True
+    if version is None:
+        return time.monotonic() - snap.built_at > MAX_AGE_SECONDS
+    return version != snap.version
+
+
+def _refresh(snap: Optional[FoodDictionary]) -> Optional[FoodDictionary]:
+    conn = get_db_connection()
+    if conn is None:
+        return snap
+    try:
+        version = _probe_version(conn)
+        if not _needs_rebuild(snap, version):
+            return snap
+        cur = conn.cursor()
+        cur.execute(_NAMES_SQL)
+        names = [r[0] for r in cur.fetchall() if r[0]]
+        fresh = FoodDictionary(names, version=version)
+        logger.info("food dictionary built: %d names (version %s)", len(fresh), version)
+        return fresh
+    except Exception as e:
+        logger.warning("food dictionary refresh failed: %s", e)
+        return snap
+    finally:
+        conn.close()
+
+
+def get_food_dictionary() -> FoodDictionary:
+    """Current snapshot; checks the catalog version at most every CHECK_SECONDS."""
+    global _current, _checked_at
+    snap = _current
+    if snap is not None and time.monotonic() - _checked_at < CHECK_SECONDS:
+        return snap
+    # First caller in does the check; everyone else keeps the old snapshot.
+    if not _lock.acquire(blocking=snap is None):
+        return snap
+    try:
+        if _current is not snap and _current is not None:
+            return _current
+        fresh = _refresh(_current)
+        _current = fresh if fresh is not None else FoodDictionary(version=_UNAVAILABLE)
+        _checked_at = time.monotonic()
+        return _current
+    finally:
+        _lock.release()
+
+
+def invalidate_food_dictionary() -> None:
+    """Force a version check on the next get_food_dictionary() call."""
+    global _checked_at
+    _checked_at = 0.0
@@ -10,19 +10,41 @@ Why this module exists:
     back to regex patterns if pythainlp isn't installed).
 
 Public API:
-    extract_foods(text, db_food_names=None, limit=5) -> list[dict]
+    extract_foods(text, db_food_names=None, limit=5, dictionary=None) -> list[dict]
         Returns [{"name": ..., "quantity": float|None, "source": "dict|regex"}]
+    FoodDictionary(names, version=None)
+        Compiled, immutable dictionary snapshot. The process-wide, versioned
+        instance lives in ai_models/food_dictionary.py.
+
+The character-level longest-match scan lives in ai_models/food_matcher.py.
 """
 from __future__ import annotations
 
-import re
+import time
+from functools import lru_cache
 from typing import Iterable, Optional
 
-try:
-    from pythainlp.tokenize import word_tokenize as _thai_tokenize
-    _HAS_PYTHAINLP = True
-except ImportError:
-    _HAS_PYTHAINLP = False
+from ai_models.food_matcher import FoodMatcher
+
+_pythainlp_parts = None
+
+
+def _pythainlp():
+    """
+    (word_tokenize, thai_words, dict_trie), or None without pythainlp.
+    Imported on first use: pythainlp is slow to import and API startup
+    doesn't need it.
+    """
+    global _pythainlp_parts
+    if _pythainlp_parts is None:
+        try:
+            from pythainlp.tokenize import word_tokenize
+            from pythainlp.corpus import thai_words
+            from pythainlp.util import dict_trie
+            _pythainlp_parts = (word_tokenize, thai_words, dict_trie)
+        except ImportError:
+            _pythainlp_parts = False
+    return _pythainlp_parts or None
 
 
 # Known Thai dishes — used when DB lookup is unavailable (e.g. during tests).
@@ -34,11 +56,53 @@ _FALLBACK_DISHES = [
     "สเต็ก", "สลัด", "แซนด์วิช", "โจ๊ก", "ข้าวหน้า",
 ]
 
-# "2 ถ้วย", "1 จาน", "ครึ่งจาน"
-_QUANTITY_RE = re.compile(
-    r"(\d+(?:\.\d+)?|ครึ่ง|หนึ่ง|สอง|สาม|สี่|ห้า)\s*(จาน|ถ้วย|ชาม|ชิ้น|แก้ว|คำ|ช้อน)"
-)
-_THAI_NUM = {"ครึ่ง": 0.5, "หนึ่ง": 1, "สอง": 2, "สาม": 3, "สี่": 4, "ห้า": 5}
+class FoodDictionary:
+    """
+    Everything extract_foods needs from a set of food names, built once:
+
+      names      — frozenset for O(1) membership
+      matcher    — Aho-Corasick automaton over the names (food_matcher.py),
+                   the character-level fallback when tokenizing misses
+      trie       — pythainlp Trie of the default Thai words + every food
+                   name, passed to word_tokenize(custom_dict=...) so newmm
+                   keeps "ข้าวผัดกะเพรา" as one token instead of splitting
+                   it into generic words (None without pythainlp)
+
+    Snapshots are immutable; a new catalog version means a new instance.
+    """
+
+    __slots__ = ("version", "names", "matcher", "trie", "built_at")
+
+    def __init__(self, names: Iterable[str] = (), version=None, with_trie: bool = True):
+        cleaned = {n.strip() for n in names if n and n.strip()}
+        cleaned.update(_FALLBACK_DISHES)
+        self.version = version
+        self.names = frozenset(cleaned)
+        self.matcher = FoodMatcher(self.names)
+        self.trie = None
+        nlp = _pythainlp() if with_trie else None
+        if nlp is not None:
+            _, thai_words, dict_trie = nlp
+            try:
+                self.trie = dict_trie(set(thai_words()) | self.names)
+            except Exception:
+                self.trie = None
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def tokenize(self, text: str) -> list[str]:
+        """newmm segmentation that respects dish names; [] without pythainlp."""
+        nlp = _pythainlp()
+        if nlp is None:
+            return []
+        word_tokenize = nlp[0]
+        if self.trie is not None:
+            tokens = word_tokenize(text, custom_dict=self.trie, engine="newmm")
+        else:
+            tokens = word_tokenize(text, engine="newmm")
+        return [t for t in tokens if t.strip()]
 
 
 def _match_ngrams(tokens: list[str], dictionary: set[str], max_n: int = 5) -> list[str]:
@@ -63,53 +127,20 @@ def _match_ngrams(tokens: list[str], dictionary: set[str], max_n: int = 5) -> li
     return matches
 
 
-def _regex_fallback(text: str, dictionary: set[str]) -> list[str]:
-    """
-    Fallback when pythainlp is missing: scan the text character-by-character
-    and greedily match the longest dictionary entry starting at each position.
-    Works for Thai (no whitespace) because we treat the text as one string.
-    """
-    # Sort by length desc so longer dishes win ("ข้าวผัดกะเพรา" over "ข้าวผัด")
-    ordered = sorted(dictionary, key=len, reverse=True)
-    found: list[str] = []
-    i = 0
-    while i < len(text):
-        hit = None
-        for term in ordered:
-            if text.startswith(term, i):
-                hit = term
-                break
-        if hit:
-            found.append(hit)
-            i += len(hit)
-        else:
-            i += 1
-    return found
-
-
-def _extract_quantity(text: str, food_name: str) -> Optional[float]:
-    """Find a quantity number near the food name, e.g. 'ข้าวผัด 2 จาน' -> 2.0"""
-    # Look for a number within 15 chars after the food name mention
-    idx = text.find(food_name)
-    if idx < 0:
-        return None
-    window = text[idx: idx + len(food_name) + 20]
-    m = _QUANTITY_RE.search(window)
-    if not m:
-        return None
-    val = m.group(1)
-    if val in _THAI_NUM:
-        return float(_THAI_NUM[val])
-    try:
-        return float(val)
-    except ValueError:
-        return None
+@lru_cache(maxsize=8)
+def _compiled(names: frozenset) -> FoodDictionary:
+    """FoodDictionary for an ad-hoc name list, built once per distinct set.
+
+    Plain lists carry no catalog version, so the set itself is the key;
+    hashing it is far cheaper than rebuilding the matcher and trie."""
+    return FoodDictionary(names)
 
 
 def extract_foods(
     text: str,
     db_food_names: Optional[Iterable[str]] = None,
     limit: int = 5,
+    dictionary: Optional[FoodDictionary] = None,
 ) -> list[dict]:
     """
     Extract food mentions from free Thai text.
@@ -119,11 +150,14 @@ def extract_foods(
     text : str
         Raw user message.
     db_food_names : iterable of str, optional
-        Canonical food names from the `foods` table. When provided, matches
-        are drawn from this set (best accuracy). When absent, a small
-        fallback dictionary is used.
+        Canonical food names from the `foods` table, compiled on first use
+        and memoized per distinct set. Ignored when `dictionary` is given.
     limit : int
         Max items to return.
+    dictionary : FoodDictionary, optional
+        Pre-built snapshot (ai_models.food_dictionary.get_food_dictionary()).
+        Request paths should pass this instead of db_food_names. With
+        neither, only the small fallback dictionary is used.
 
     Returns
     -------
@@ -134,29 +168,27 @@ def extract_foods(
     if not text:
         return []
 
-    # Build dictionary
-    dictionary: set[str] = set()
-    if db_food_names:
-        dictionary.update(n.strip() for n in db_food_names if n and n.strip())
-    dictionary.update(_FALLBACK_DISHES)
+    if not isinstance(dictionary, FoodDictionary):
+        dictionary = _compiled(frozenset(dictionary or db_food_names or ()))
 
     matches: list[str] = []
     source = "dict"
 
-    if _HAS_PYTHAINLP:
+    if _pythainlp() is not None:
         try:
-            tokens = _thai_tokenize(text, engine="newmm")
-            # Drop pure whitespace tokens
-            tokens = [t for t in tokens if t.strip()]
-            matches = _match_ngrams(tokens, dictionary, max_n=6)
+            tokens = dictionary.tokenize(text)
+            matches = _match_ngrams(tokens, dictionary.names, max_n=6)
         except Exception:
             matches = []
 
-    fallback_matches = _regex_fallback(text, dictionary)
+    # Leftmost-longest over the raw characters; also records where each
+    # name first appears, for the quantity lookup below.
+    scan = dictionary.matcher.scan(text)
+    fallback_matches = scan.names
     if matches:
         matches.extend(m for m in fallback_matches if m not in matches)
     else:
-        matches = fallback_matches
+        matches = list(fallback_matches)
         source = "regex"
 
     # De-dup, preserve order
@@ -170,6 +202,6 @@ def extract_foods(
             break
 
     return [
-        {"name": name, "quantity": _extract_quantity(text, name), "source": source}
+        {"name": name, "quantity": scan.quantity(name), "source": source}
         for name in deduped
     ]
@@ -0,0 +1,156 @@
+"""
+Aho-Corasick food-name matcher for free Thai text.
+
+Replaces the old `_regex_fallback` scan in food_extraction, which tried
+every dictionary term with `text.startswith(term, i)` at every position —
+O(len(text) × len(dictionary)), tens of millions of comparisons for a
+2,000-char message against 10k names.
+
+FoodMatcher compiles the names once (FoodDictionary builds one per catalog
+version) into a character automaton with failure and dictionary-suffix
+links. One pass over the text then yields every dictionary occurrence;
+from those we keep exactly the old greedy semantics:
+
+  - at each position take the longest name starting there, emit it and
+    jump past it; otherwise advance one character (leftmost-longest,
+    non-overlapping);
+  - quantities ("2 จาน", "ครึ่งถ้วย") are read from the window after the
+    *first* occurrence of each name anywhere in the text — the same
+    occurrence `text.find(name)` used to locate — which the pass records
+    as it goes, so no second scan is needed.
+
+Pure Python, no dependencies.
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable, Optional
+
+# "2 ถ้วย", "1 จาน", "ครึ่งจาน"
+QUANTITY_RE = re.compile(
+    r"(\d+(?:\.\d+)?|ครึ่ง|หนึ่ง|สอง|สาม|สี่|ห้า)\s*(จาน|ถ้วย|ชาม|ชิ้น|แก้ว|คำ|ช้อน)"
+)
+THAI_NUM = {"ครึ่ง": 0.5, "หนึ่ง": 1, "สอง": 2, "สาม": 3, "สี่": 4, "ห้า": 5}
+
+# Chars after the end of a name that may hold its quantity.
+_QUANTITY_WINDOW = 20
+
+
+def quantity_at(text: str, start: int, length: int) -> Optional[float]:
+    """Quantity in the window right after a name at text[start:start+length]."""
+    m = QUANTITY_RE.search(text, start, start + length + _QUANTITY_WINDOW)
+    if not m:
+        return None
+    val = m.group(1)
+    if val in THAI_NUM:
+        return float(THAI_NUM[val])
+    try:
+        return float(val)
+    except ValueError:
+        return None
+
+
+class FoodMatcher:
+    """Immutable automaton over a set of names."""
+
+    __slots__ = ("_goto", "_fail", "_out", "_dict_link", "size")
+
+    def __init__(self, names: Iterable[str]):
+        # State 0 is the root. _out[s] = length of the name ending at s (0 if
+        # none); _dict_link[s] = nearest proper suffix state with a name.
+        goto: list[dict[str, int]] = [{}]
+        out: list[int] = [0]
+        size = 0
+        for name in names:
+            if not name:
+                continue
+            s = 0
+            for ch in name:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    out.append(0)
+                s = nxt
+            if not out[s]:
+                size += 1
+            out[s] = len(name)
+
+        fail = [0] * len(goto)
+        dict_link = [0] * len(goto)
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            s = queue[head]
+            head += 1
+            for ch, t in goto[s].items():
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[t] = goto[f].get(ch, 0)
+                dict_link[t] = fail[t] if out[fail[t]] else dict_link[fail[t]]
+                queue.append(t)
+
+        self._goto, self._fail, self._out, self._dict_link = goto, fail, out, dict_link
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _occurrences(self, text: str):
+        """Yield (start, length) for every dictionary occurrence, by end position."""
+        goto, fail, out, dict_link = self._goto, self._fail, self._out, self._dict_link
+        s = 0
+        for i, ch in enumerate(text):
+            while s and ch not in goto[s]:
+                s = fail[s]
+            s = goto[s].get(ch, 0)
+            t = s if out[s] else dict_link[s]
+            while t:
+                length = out[t]
+                yield i - length + 1, length
+                t = dict_link[t]
+
+    def scan(self, text: str) -> "FoodScan":
+        """Leftmost-longest, non-overlapping matches in one automaton pass."""
+        longest: dict[int, int] = {}
+        first: dict[str, int] = {}
+        for start, length in self._occurrences(text):
+            if length > longest.get(start, 0):
+                longest[start] = length
+            name = text[start:start + length]
+            if start < first.get(name, len(text)):
+                first[name] = start
+
+        names: list[str] = []
+        i, n = 0, len(text)
+        while i < n:
+            length = longest.get(i)
+            if length:
+                names.append(text[i:i + length])
+                i += length
+            else:
+                i += 1
+        return FoodScan(text, names, first)
+
+
+class FoodScan:
+    """Result of FoodMatcher.scan().
+
+    names  — greedy matches in text order (may repeat)
+    first  — start of the first occurrence of every dictionary name found,
+             overlapping ones included; what text.find(name) would return
+    """
+
+    __slots__ = ("text", "names", "first")
+
+    def __init__(self, text: str, names: list[str], first: dict[str, int]):
+        self.text, self.names, self.first = text, names, first
+
+    def quantity(self, name: str) -> Optional[float]:
+        """Quantity after the first mention of `name`, e.g. 'ข้าวผัด 2 จาน' -> 2.0"""
+        idx = self.first.get(name)
+        if idx is None:
+            return None
+        return quantity_at(self.text, idx, len(name))
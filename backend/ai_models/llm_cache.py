@@ -0,0 +1,273 @@
+"""
+Response cache for llm_provider.generate().
+
+Food estimates ("ประมาณโภชนาการของ X 1 จาน"), free-text food extraction and
+recipe generation send the same prompts over and over; each one is a
+multi-second Ollama round trip. generate() looks the prompt up here first.
+
+Keys are sha256 over (provider, model, temperature, normalized system,
+normalized user). Normalizing means NFC plus whitespace collapsing, so
+"ข้าวผัด  1 จาน" and "ข้าวผัด 1 จาน" share an entry. The provider and model
+are part of the key, so switching LLM_PROVIDER never serves another
+model's answer.
+
+Backends (env LLM_CACHE_BACKEND):
+
+  memory    — per-process LRU capped at LLM_CACHE_MAX_BYTES (default 8 MiB)
+              of UTF-8 response text, with per-entry expiry (default)
+  postgres  — the memory LRU in front of cleangoal.llm_response_cache
+              (migrations/v32), shared by every worker and instance
+  off       — no caching
+
+TTL is chosen per call site (generate(..., cache_ttl=...)). Personalized
+replies (coach, multi-agent composer) pass cache_ttl=0 and are never stored.
+
+Counters (hits, misses, stores, evictions, seconds of generation saved)
+are exposed under `llm_cache` in GET /metrics.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "3600"))
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# (response, seconds the original generation took)
+Entry = Tuple[str, float]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def make_key(provider: str, model: str, temperature: float, system: str, user: str) -> str:
+    payload = json.dumps(
+        [provider, model, round(float(temperature), 3), _normalize(system), _normalize(user)],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_json_response(text: str) -> bool:
+    """True when the reply holds a JSON object/array (``` fences allowed)."""
+    text = (text or "").replace("```json", "").replace("```", "")
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return False
+    start = min(starts)
+    end = max(text.rfind("}"), text.rfind("]"))
+    try:
+        json.loads(text[start:end + 1])
+        return True
+    except ValueError:
+        return False
+
+
+class MemoryLRUCache:
+    """Thread-safe LRU bounded by the total UTF-8 size of stored responses."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple[str, float, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, gen_seconds, expires_at, size = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return value, gen_seconds
+
+    def set(self, key: str, value: str, ttl: float, gen_seconds: float) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[3]
+            self._data[key] = (value, gen_seconds, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._bytes -= evicted[3]
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+
+class PostgresCache:
+    """cleangoal.llm_response_cache; every error degrades to a miss."""
+
+    _GET_SQL = """
+        SELECT response, gen_ms FROM llm_response_cache
+        WHERE cache_key = %s AND expires_at > NOW()
+    """
+    _SET_SQL = """
+        INSERT INTO llm_response_cache (cache_key, response, gen_ms, expires_at)
+        VALUES (%s, %s, %s, NOW() + make_interval(secs => %s))
+        ON CONFLICT (cache_key) DO UPDATE SET
+            response = EXCLUDED.response,
+            gen_ms = EXCLUDED.gen_ms,
+            expires_at = EXCLUDED.expires_at
+    """
+    _PURGE_SQL = "DELETE FROM llm_response_cache WHERE expires_at <= NOW()"
+    # Fraction of writes that also sweep expired rows.
+    PURGE_RATE = 0.01
+
+    def _run(self, fn):
+        conn = get_db_connection()
+        if conn is None:
+            return None
+        try:
+            return fn(conn)
+        except Exception as e:
+            logger.warning("llm cache (postgres) unavailable: %s", e)
+            conn.rollback()
+            return None
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Entry]:
+        def _get(conn):
+            cur = conn.cursor()
+            cur.execute(self._GET_SQL, (key,))
+            row = cur.fetchone()
+            return (row[0], (row[1] or 0) / 1000.0) if row else None
+        return self._run(_get)
+
+    def set(self, key: str, value: str, ttl: float, gen_seconds: float) -> None:
+        def _set(conn):
+            cur = conn.cursor()
+            cur.execute(self._SET_SQL, (key, value, int(gen_seconds * 1000), ttl))
+            if random.random() < self.PURGE_RATE:
+                cur.execute(self._PURGE_SQL)
+            conn.commit()
+        self._run(_set)
+
+
+class TieredCache:
+    """Memory LRU in front of a shared backend; shared hits warm the LRU."""
+
+    def __init__(self, local: MemoryLRUCache, shared):
+        self.local, self.shared = local, shared
+
+    def get(self, key: str) -> Optional[Entry]:
+        hit = self.local.get(key)
+        if hit is None:
+            hit = self.shared.get(key)
+            if hit is not None:
+                # Remaining shared TTL is unknown here; keep it briefly.
+                self.local.set(key, hit[0], min(DEFAULT_TTL_SECONDS, 300), hit[1])
+        return hit
+
+    def set(self, key: str, value: str, ttl: float, gen_seconds: float) -> None:
+        self.local.set(key, value, ttl, gen_seconds)
+        self.shared.set(key, value, ttl, gen_seconds)
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    def stats(self) -> dict:
+        return self.local.stats()
+
+
+def _build_backend():
+    kind = (os.getenv("LLM_CACHE_BACKEND") or "memory").strip().lower()
+    if kind in ("off", "none", "0", ""):
+        return None
+    if kind == "postgres":
+        return TieredCache(MemoryLRUCache(), PostgresCache())
+    if kind != "memory":
+        logger.warning("unknown LLM_CACHE_BACKEND=%r, using memory", kind)
+    return MemoryLRUCache()
+
+
+_backend = _build_backend()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "saved_seconds": 0.0}
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(backend) -> None:
+    """Swap the backend (tests, or a custom shared store)."""
+    global _backend
+    _backend = backend
+
+
+def lookup(key: str) -> Optional[str]:
+    backend = _backend
+    if backend is None:
+        return None
+    hit = backend.get(key)
+    with _stats_lock:
+        if hit is None:
+            _stats["misses"] += 1
+            return None
+        _stats["hits"] += 1
+        _stats["saved_seconds"] += hit[1]
+    return hit[0]
+
+
+def store(key: str, value: str, ttl: float, gen_seconds: float) -> None:
+    backend = _backend
+    if backend is None or ttl <= 0 or not value:
+        return
+    backend.set(key, value, ttl, gen_seconds)
+    with _stats_lock:
+        _stats["stores"] += 1
+
+
+def llm_cache_stats() -> dict:
+    """Snapshot for /metrics."""
+    with _stats_lock:
+        out = dict(_stats)
+    out["saved_seconds"] = round(out["saved_seconds"], 3)
+    lookups = out["hits"] + out["misses"]
+    out["hit_rate"] = round(out["hits"] / lookups, 3) if lookups else None
+    backend = _backend
+    out["backend"] = type(backend).__name__ if backend is not None else "off"
+    if backend is not None and hasattr(backend, "stats"):
+        out.update(backend.stats())
+    return out
+
+
+def reset_llm_cache() -> None:
+    """Drop cached entries and zero the counters."""
+    backend = _backend
+    if backend is not None and hasattr(backend, "clear"):
+        backend.clear()
+    with _stats_lock:
+        _stats.update(hits=0, misses=0, stores=0, saved_seconds=0.0)
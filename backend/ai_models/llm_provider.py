@@ -40,41 +40,97 @@ Env vars:
   LOCAL_REPETITION_PEN  = 1.3                           (optional, ≥1.0 — small
                                                         fine-tunes tend to loop;
                                                         1.2-1.4 helps a lot)
+  LOCAL_ENGINE          = direct | batch                (direct: one generate()
+                                                        per request; batch: shared
+                                                        batching worker, see
+                                                        ai_models/local_engine.py)
+  LLM_CACHE_BACKEND     = memory | postgres | off       (response cache, see
+                                                        ai_models/llm_cache.py)
+  LLM_CACHE_TTL_SECONDS = 3600                          (default cache TTL)
+  LLM_CACHE_MAX_BYTES   = 8388608                       (in-process LRU cap)
 
-The generate() function is blocking on purpose — the chat router already
-runs it in a thread pool with a 30s timeout (see app/routers/chat.py).
+The generate() function is blocking on purpose — the chat router runs it on
+the shared AI executor (app/services/ai_executor.py), which installs a
+cancel_scope() so a timed-out call actually stops generating instead of
+holding a model slot until it finishes.
 """
 from __future__ import annotations
 
+import json
 import os
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, Iterator, Optional
 
 import requests
 
+from ai_models import llm_cache
+
 # Module-level cache for the local model so we don't reload weights per call.
 _local_cache: dict = {}
 
+DEFAULT_TEMPERATURE = 0.7
+
+
+class GenerationCancelled(RuntimeError):
+    """The caller gave up on this generation (timeout, client disconnect)."""
+
+
+_cancel_check: ContextVar[Optional[Callable[[], bool]]] = ContextVar("llm_cancel_check", default=None)
+
+
+def current_cancel_check() -> Optional[Callable[[], bool]]:
+    """The innermost cancel_scope() predicate, or None outside any scope."""
+    return _cancel_check.get()
+
+
+@contextmanager
+def cancel_scope(is_cancelled: Callable[[], bool]):
+    """
+    Make generate() calls in this context abortable. The check is a
+    ContextVar, so work started with contextvars.copy_context() (AI
+    executor jobs, agent stages) inherits it.
+
+    Inside the scope generate() drives the provider's streaming API and
+    polls is_cancelled() between chunks; once it returns True the upstream
+    stream is closed (Ollama stops generating when its client disconnects,
+    local generation stops at the next token) and GenerationCancelled is
+    raised.
+    """
+    token = _cancel_check.set(is_cancelled)
+    try:
+        yield
+    finally:
+        _cancel_check.reset(token)
+
 
 def _get_provider() -> str:
     return (os.getenv("LLM_PROVIDER") or "ollama").strip().lower()
 
 
-def _gemini_generate(system: str, user: str, model_name: Optional[str] = None) -> str:
+def _gemini_generate(system: str, user: str, model_name: Optional[str] = None,
+                     temperature: float = DEFAULT_TEMPERATURE) -> str:
     import google.generativeai as genai
 
     api_key = os.getenv("GEMINI_API_KEY", "")
     if not api_key:
         raise RuntimeError("GEMINI_API_KEY is not set")
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name or os.getenv("GEMINI_MODEL", "gemini-2.5-flash"))
-    response = model.generate_content([
-        {"role": "user", "parts": [system]},
-        {"role": "user", "parts": [user]},
-    ])
+    model = genai.GenerativeModel(_model_for("gemini", model_name))
+    response = model.generate_content(
+        [
+            {"role": "user", "parts": [system]},
+            {"role": "user", "parts": [user]},
+        ],
+        generation_config={"temperature": temperature},
+    )
     return getattr(response, "text", "") or ""
 
 
-def _deepseek_generate(system: str, user: str, model_name: Optional[str] = None) -> str:
+def _deepseek_generate(system: str, user: str, model_name: Optional[str] = None,
+                       temperature: float = DEFAULT_TEMPERATURE) -> str:
     # DeepSeek exposes an OpenAI-compatible chat/completions endpoint, so we
     # reuse the openai SDK rather than hand-rolling an HTTP client. The SDK
     # is small enough that it won't bloat the image and is already a common
@@ -96,20 +152,21 @@ def _deepseek_generate(system: str, user: str, model_name: Optional[str] = None)
         base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
     )
     resp = client.chat.completions.create(
-        model=model_name or os.getenv("DEEPSEEK_MODEL", "deepseek-chat"),
+        model=_model_for("deepseek", model_name),
         messages=[
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        temperature=0.7,
+        temperature=temperature,
         max_tokens=1024,
     )
     return resp.choices[0].message.content or ""
 
 
-def _ollama_generate(system: str, user: str, model_name: Optional[str] = None) -> str:
+def _ollama_generate(system: str, user: str, model_name: Optional[str] = None,
+                     temperature: float = DEFAULT_TEMPERATURE) -> str:
     base_url = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434").rstrip("/")
-    model = model_name or os.getenv("OLLAMA_MODEL", "deepseek-r1:1.5b")
+    model = _model_for("ollama", model_name)
     timeout = float(os.getenv("OLLAMA_TIMEOUT", "60") or 60)
     if not model:
         raise RuntimeError("OLLAMA_MODEL is not set")
@@ -124,7 +181,7 @@ def _ollama_generate(system: str, user: str, model_name: Optional[str] = None) -
                 {"role": "user", "content": user},
             ],
             "options": {
-                "temperature": 0.7,
+                "temperature": temperature,
             },
         },
         timeout=timeout,
@@ -138,12 +195,16 @@ def _ollama_generate(system: str, user: str, model_name: Optional[str] = None) -
     return str(content)
 
 
-def _local_generate(system: str, user: str, model_name: Optional[str] = None) -> str:
-    """
-    Run DeepSeek-R1-Distill (or any HF causal-LM) locally via transformers.
-    Heavy dependency; not installed by default. Use this for dev testing of
-    a fine-tuned adapter produced by notebooks/deepseek_finetune.ipynb.
-    """
+def _local_paths(model_name: Optional[str] = None) -> tuple[str, str]:
+    """(base model path, LoRA adapter path or "") the local backend loads."""
+    base_path = model_name or os.getenv(
+        "LOCAL_MODEL_PATH", "deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B"
+    )
+    return base_path, os.getenv("LOCAL_ADAPTER_PATH", "")
+
+
+def _local_load(model_name: Optional[str] = None):
+    """Load (once) and return the local (tokenizer, model)."""
     try:
         import torch  # noqa: F401
         from transformers import AutoModelForCausalLM, AutoTokenizer
@@ -153,10 +214,7 @@ def _local_generate(system: str, user: str, model_name: Optional[str] = None) ->
             "Install with `pip install torch transformers accelerate peft`."
         ) from e
 
-    base_path = model_name or os.getenv(
-        "LOCAL_MODEL_PATH", "deepseek-ai/DeepSeek-R1-Distill-Qwen-1.5B"
-    )
-    adapter_path = os.getenv("LOCAL_ADAPTER_PATH", "")
+    base_path, adapter_path = _local_paths(model_name)
 
     load_4bit = os.getenv("LOCAL_LOAD_IN_4BIT", "").strip().lower() in ("1", "true", "yes")
     cached = _local_cache.get((base_path, adapter_path, load_4bit))
@@ -181,8 +239,28 @@ def _local_generate(system: str, user: str, model_name: Optional[str] = None) ->
         model.eval()
         cached = (tokenizer, model)
         _local_cache[(base_path, adapter_path, load_4bit)] = cached
+    return cached
+
 
-    tokenizer, model = cached
+def _local_sampling(tokenizer, temperature: float) -> dict:
+    """generate() kwargs shared by the direct and batched local paths."""
+    max_new = int(os.getenv("LOCAL_MAX_NEW_TOKENS", "256") or 256)
+    rep_pen = float(os.getenv("LOCAL_REPETITION_PEN", "1.3") or 1.3)
+    # temperature 0 means greedy decoding (deterministic, cacheable).
+    sampling = {"do_sample": True, "temperature": temperature, "top_p": 0.9} if temperature > 0 \
+        else {"do_sample": False}
+    return dict(
+        max_new_tokens=max_new,
+        **sampling,
+        repetition_penalty=rep_pen,
+        pad_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+    )
+
+
+def _local_prepare(system: str, user: str, model_name: Optional[str], temperature: float):
+    """Load (once) the local model and build generate() kwargs for a prompt."""
+    tokenizer, model = _local_load(model_name)
     # Use the tokenizer's chat template — DeepSeek-R1 models need it to wrap
     # messages with the correct <|im_start|> / <think> tags.
     messages = [
@@ -192,44 +270,349 @@ def _local_generate(system: str, user: str, model_name: Optional[str] = None) ->
     prompt = tokenizer.apply_chat_template(
         messages, tokenize=False, add_generation_prompt=True
     )
-    import torch
     inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-    max_new = int(os.getenv("LOCAL_MAX_NEW_TOKENS", "256") or 256)
-    rep_pen = float(os.getenv("LOCAL_REPETITION_PEN", "1.3") or 1.3)
+    gen_kwargs = dict(**inputs, **_local_sampling(tokenizer, temperature))
+    return tokenizer, model, prompt, inputs, gen_kwargs
+
+
+def _local_batched() -> bool:
+    return os.getenv("LOCAL_ENGINE", "direct").strip().lower() == "batch"
+
+
+def _local_generate(system: str, user: str, model_name: Optional[str] = None,
+                    temperature: float = DEFAULT_TEMPERATURE) -> str:
+    """
+    Run DeepSeek-R1-Distill (or any HF causal-LM) locally via transformers.
+    Heavy dependency; not installed by default. Use this for dev testing of
+    a fine-tuned adapter produced by notebooks/deepseek_finetune.ipynb.
+    With LOCAL_ENGINE=batch the request goes to the shared batching engine
+    (ai_models/local_engine.py) instead of its own model.generate().
+    """
+    if _local_batched():
+        from ai_models.local_engine import get_engine
+        return get_engine(model_name).generate(system, user, temperature).strip()
+    tokenizer, model, _, inputs, gen_kwargs = _local_prepare(system, user, model_name, temperature)
+    import torch
     with torch.no_grad():
-        out = model.generate(
-            **inputs,
-            max_new_tokens=max_new,
-            do_sample=True,
-            temperature=0.7,
-            top_p=0.9,
-            repetition_penalty=rep_pen,
-            pad_token_id=tokenizer.eos_token_id,
-            eos_token_id=tokenizer.eos_token_id,
-        )
+        out = model.generate(**gen_kwargs)
     # Strip the prompt prefix.
     gen = out[0][inputs["input_ids"].shape[1]:]
     return tokenizer.decode(gen, skip_special_tokens=True).strip()
 
 
-def generate(system: str, user: str, model_name: Optional[str] = None) -> str:
+# ── Streaming ───────────────────────────────────────────────────────────────
+# Same providers, yielding text deltas as they arrive. Raw output: R1-style
+# <think>…</think> blocks are passed through; strip_think() removes them.
+
+def _gemini_stream(system: str, user: str, model_name: Optional[str] = None,
+                   temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+    import google.generativeai as genai
+
+    api_key = os.getenv("GEMINI_API_KEY", "")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY is not set")
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel(_model_for("gemini", model_name))
+    response = model.generate_content(
+        [
+            {"role": "user", "parts": [system]},
+            {"role": "user", "parts": [user]},
+        ],
+        generation_config={"temperature": temperature},
+        stream=True,
+    )
+    for chunk in response:
+        text = getattr(chunk, "text", "")
+        if text:
+            yield text
+
+
+def _deepseek_stream(system: str, user: str, model_name: Optional[str] = None,
+                     temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+    try:
+        from openai import OpenAI
+    except ImportError as e:
+        raise RuntimeError(
+            "openai package is required for LLM_PROVIDER=deepseek. "
+            "Add `openai>=1.0` to requirements.txt."
+        ) from e
+
+    api_key = os.getenv("DEEPSEEK_API_KEY", "")
+    if not api_key:
+        raise RuntimeError("DEEPSEEK_API_KEY is not set")
+
+    client = OpenAI(
+        api_key=api_key,
+        base_url=os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com"),
+    )
+    stream = client.chat.completions.create(
+        model=_model_for("deepseek", model_name),
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        temperature=temperature,
+        max_tokens=1024,
+        stream=True,
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+
+
+def _ollama_stream(system: str, user: str, model_name: Optional[str] = None,
+                   temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+    """Ollama /api/chat with stream=true: one JSON object per line."""
+    base_url = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434").rstrip("/")
+    model = _model_for("ollama", model_name)
+    timeout = float(os.getenv("OLLAMA_TIMEOUT", "60") or 60)
+    if not model:
+        raise RuntimeError("OLLAMA_MODEL is not set")
+
+    response = requests.post(
+        f"{base_url}/api/chat",
+        json={
+            "model": model,
+            "stream": True,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            "options": {
+                "temperature": temperature,
+            },
+        },
+        timeout=timeout,  # per read, so it bounds gaps between lines
+        stream=True,
+    )
+    try:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                continue
+            payload = json.loads(line)
+            if payload.get("error"):
+                raise RuntimeError(f"Ollama error: {payload['error']}")
+            content = (payload.get("message") or {}).get("content")
+            if content:
+                yield str(content)
+            if payload.get("done"):
+                break
+    finally:
+        response.close()
+
+
+def _local_stream(system: str, user: str, model_name: Optional[str] = None,
+                  temperature: float = DEFAULT_TEMPERATURE) -> Iterator[str]:
+    """transformers TextIteratorStreamer; generate() runs in a helper thread."""
+    if _local_batched():
+        from ai_models.local_engine import get_engine
+        yield from get_engine(model_name).stream(system, user, temperature)
+        return
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+    tokenizer, model, prompt, _, gen_kwargs = _local_prepare(system, user, model_name, temperature)
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    stop = threading.Event()
+
+    class _StopWhenClosed(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return stop.is_set()
+
+    def _run():
+        import torch
+        with torch.no_grad():
+            model.generate(**gen_kwargs, streamer=streamer,
+                           stopping_criteria=StoppingCriteriaList([_StopWhenClosed()]))
+
+    worker = threading.Thread(target=_run, name="local-llm-stream", daemon=True)
+    worker.start()
+    try:
+        # R1 chat templates end the prompt with an opened <think>; re-emit it
+        # so strip_think() sees a balanced block.
+        if prompt.rstrip().endswith("<think>"):
+            yield "<think>"
+        for text in streamer:
+            if text:
+                yield text
+    finally:
+        # Closing the generator early stops model.generate() at the next token.
+        stop.set()
+        worker.join()
+
+
+_THINK_OPEN, _THINK_CLOSE = "<think>", "</think>"
+
+
+def strip_think(chunks: Iterable[str]) -> Iterator[str]:
+    """Drop <think>…</think> reasoning from a chunk stream as it flows.
+
+    Tags may be split across chunks; a tail that could be the start of a
+    tag is held back until the next chunk decides it. Leading whitespace
+    after a closed block is dropped so the answer doesn't start with
+    blank lines.
+    """
+    buf = ""
+    inside = False
+    trim_left = False
+    for chunk in chunks:
+        buf += chunk
+        out = []
+        while buf:
+            tag = _THINK_CLOSE if inside else _THINK_OPEN
+            idx = buf.find(tag)
+            if idx >= 0:
+                if not inside:
+                    out.append(buf[:idx])
+                buf = buf[idx + len(tag):]
+                inside = not inside
+                trim_left = not inside
+                continue
+            # Keep back the longest suffix that is a prefix of the tag.
+            keep = next((k for k in range(min(len(tag) - 1, len(buf)), 0, -1)
+                         if tag.startswith(buf[-k:])), 0)
+            if not inside:
+                out.append(buf[:len(buf) - keep])
+            buf = buf[len(buf) - keep:]
+            break
+        text = "".join(out)
+        if trim_left and text:
+            text = text.lstrip()
+            trim_left = not text
+        if text:
+            yield text
+    if buf and not inside:
+        yield buf.lstrip() if trim_left else buf
+
+
+_PROVIDERS = {
+    "ollama": _ollama_generate,
+    "gemini": _gemini_generate,
+    "deepseek": _deepseek_generate,
+    "local": _local_generate,
+}
+
+_STREAM_PROVIDERS = {
+    "ollama": _ollama_stream,
+    "gemini": _gemini_stream,
+    "deepseek": _deepseek_stream,
+    "local": _local_stream,
+}
+
+
+def _model_for(provider: str, model_name: Optional[str] = None) -> str:
+    """Model the provider will actually run (part of the cache key).
+
+    For `local` this is "base|adapter" — a key only, never a load path."""
+    if provider == "local":
+        return "|".join(_local_paths(model_name))
+    if model_name:
+        return model_name
+    if provider == "ollama":
+        return os.getenv("OLLAMA_MODEL", "deepseek-r1:1.5b")
+    if provider == "gemini":
+        return os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+    if provider == "deepseek":
+        return os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+    return ""
+
+
+def generate(
+    system: str,
+    user: str,
+    model_name: Optional[str] = None,
+    *,
+    temperature: Optional[float] = None,
+    cache_ttl: Optional[float] = None,
+    cache_if: Optional[Callable[[str], bool]] = None,
+) -> str:
     """
     Generate a completion for (system, user) messages.
 
     Returns the model's text. Raises RuntimeError if the selected provider
     is misconfigured (missing key, missing deps) — callers should catch and
     surface a user-friendly error.
+
+    temperature  — defaults to 0.7; pass 0 for deterministic prompts
+                   (nutrition estimates, extraction) so repeats are cacheable.
+    cache_ttl    — seconds to keep the response in llm_cache; None uses
+                   LLM_CACHE_TTL_SECONDS, 0 opts out (personalized replies).
+    cache_if     — only store responses this accepts, so a malformed answer
+                   isn't replayed (e.g. llm_cache.is_json_response).
     """
     provider = _get_provider()
-    if provider == "ollama":
-        return _ollama_generate(system, user, model_name)
-    if provider == "gemini":
-        return _gemini_generate(system, user, model_name)
-    if provider == "deepseek":
-        return _deepseek_generate(system, user, model_name)
-    if provider == "local":
-        return _local_generate(system, user, model_name)
-    raise RuntimeError(f"Unknown LLM_PROVIDER: {provider!r}")
+    fn = _PROVIDERS.get(provider)
+    if fn is None:
+        raise RuntimeError(f"Unknown LLM_PROVIDER: {provider!r}")
+    if temperature is None:
+        temperature = DEFAULT_TEMPERATURE
+    ttl = llm_cache.DEFAULT_TTL_SECONDS if cache_ttl is None else cache_ttl
+
+    key = None
+    if ttl > 0:
+        key = llm_cache.make_key(provider, _model_for(provider, model_name), temperature, system, user)
+        cached = llm_cache.lookup(key)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
+    is_cancelled = _cancel_check.get()
+    if is_cancelled is None:
+        text = fn(system, user, model_name, temperature)
+    else:
+        text = _generate_cancellable(provider, system, user, model_name, temperature, is_cancelled)
+    if key is not None and (cache_if is None or cache_if(text)):
+        llm_cache.store(key, text, ttl, time.perf_counter() - started)
+    return text
+
+
+def _generate_cancellable(provider: str, system: str, user: str, model_name: Optional[str],
+                          temperature: float, is_cancelled: Callable[[], bool]) -> str:
+    """generate() over the streaming API, polling is_cancelled() per chunk."""
+    if is_cancelled():
+        raise GenerationCancelled("generation cancelled before start")
+    chunks = _STREAM_PROVIDERS[provider](system, user, model_name, temperature)
+    parts = []
+    try:
+        for chunk in chunks:
+            if is_cancelled():
+                raise GenerationCancelled("generation cancelled")
+            parts.append(chunk)
+    finally:
+        chunks.close()
+    text = "".join(parts)
+    # Keep the blocking providers' contract.
+    if provider == "ollama" and not text:
+        raise RuntimeError("Ollama returned an empty response")
+    return text.strip() if provider == "local" else text
+
+
+def generate_stream(
+    system: str,
+    user: str,
+    model_name: Optional[str] = None,
+    *,
+    temperature: Optional[float] = None,
+) -> Iterator[str]:
+    """
+    Streaming form of generate(): yields raw text deltas from the provider.
+
+    Not cached (used for personalized chat replies). Pipe through
+    strip_think() to hide reasoning blocks. Closing the generator closes
+    the upstream HTTP stream.
+    """
+    provider = _get_provider()
+    fn = _STREAM_PROVIDERS.get(provider)
+    if fn is None:
+        raise RuntimeError(f"Unknown LLM_PROVIDER: {provider!r}")
+    if temperature is None:
+        temperature = DEFAULT_TEMPERATURE
+    yield from fn(system, user, model_name, temperature)
 
 
 def is_configured() -> bool:
@@ -0,0 +1,451 @@
+"""
+Batching inference engine for LLM_PROVIDER=local (LOCAL_ENGINE=batch).
+
+With the direct path every request runs its own model.generate() on the
+one cached transformers model, so concurrent requests take turns, and each
+re-encodes the same long Thai system prompt (ResponseComposerAgent,
+CoachingAgent). Here one worker thread owns the model:
+
+  - requests are queued and resolved through futures; the worker takes
+    whatever is pending, waiting up to LOCAL_BATCH_WAIT_MS (default 15) for
+    more once the first arrives, up to LOCAL_BATCH_MAX (default 8)
+  - plan_batches() groups requests that can share a generate() call (same
+    sampling settings and system prompt) and splits each group by prompt
+    length so padding stays under LOCAL_BATCH_MAX_PAD (default 0.3) of
+    the batch's prompt tokens
+  - the system prompt's tokens are a shared prefix: their KV cache is
+    computed once (LRU of LOCAL_PREFIX_CACHE_SIZE, default 4, for prefixes
+    of at least LOCAL_PREFIX_MIN_TOKENS, default 32) and expanded across
+    the batch, so only the user part is prefilled. Rows are laid out
+    [prefix][pad][user] with the pads masked out. If the installed
+    transformers can't take a prefilled cache the engine logs it once and
+    prefills in full
+  - a per-row stopping hook streams each row's new text to its caller and
+    stops rows that hit EOS or whose caller cancelled
+    (llm_provider.cancel_scope), without stopping the rest of the batch
+
+Batches form between generate() calls: a request arriving mid-batch waits
+for the next one rather than joining the running decode, which HF
+generate() has no hook for.
+
+The model backend is pluggable (HFBackend is the default; tests use a fake
+or a tiny HF model on CPU). Counters — tokens/sec, batch-size histogram,
+queue latency, padding and prefix-cache hits — are under `local_engine`
+in GET /metrics.
+
+Usage:
+    from ai_models.local_engine import get_engine
+    text = get_engine().generate(system, user, temperature=0)
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import copy
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+
+from ai_models.llm_provider import (
+    GenerationCancelled, _local_load, _local_sampling, current_cancel_check,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = int(os.getenv("LOCAL_BATCH_MAX", "8"))
+WAIT_MS = float(os.getenv("LOCAL_BATCH_WAIT_MS", "15"))
+MAX_PAD = float(os.getenv("LOCAL_BATCH_MAX_PAD", "0.3"))
+PREFIX_CACHE_SIZE = int(os.getenv("LOCAL_PREFIX_CACHE_SIZE", "4"))
+PREFIX_MIN_TOKENS = int(os.getenv("LOCAL_PREFIX_MIN_TOKENS", "32"))
+
+_POLL_SEC = 0.05
+_DONE = object()
+
+
+class LocalRequest:
+    __slots__ = ("system", "user", "temperature", "prefix_ids", "suffix_ids", "opens_think",
+                 "future", "chunks", "streaming", "sent", "enqueued_at", "_cancel")
+
+    def __init__(self, system: str, user: str, temperature: float,
+                 prefix_ids: Tuple[int, ...], suffix_ids: List[int], opens_think: bool = False):
+        self.system, self.user, self.temperature = system, user, temperature
+        self.prefix_ids, self.suffix_ids = prefix_ids, suffix_ids
+        self.opens_think = opens_think
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.chunks: "queue.Queue" = queue.Queue()
+        self.streaming = False
+        self.sent = ""
+        self.enqueued_at = time.monotonic()
+        self._cancel = threading.Event()
+
+    @property
+    def group_key(self) -> tuple:
+        """Requests with equal keys can share one generate() call."""
+        return (round(self.temperature, 3), self.prefix_ids)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def publish(self, text: str) -> None:
+        """Stream the part of `text` (decoded output so far) not yet sent."""
+        if not self.streaming or text.endswith("�"):  # half a Thai glyph
+            return
+        if len(text) > len(self.sent) and text.startswith(self.sent):
+            self.chunks.put(text[len(self.sent):])
+            self.sent = text
+
+
+def plan_batches(requests: List[LocalRequest], max_batch: int = MAX_BATCH,
+                 max_pad: float = MAX_PAD) -> List[List[LocalRequest]]:
+    """
+    Split pending requests into generate() batches: one group per
+    group_key, each sorted by prompt length and cut wherever adding the
+    next (longer) prompt would pad more than max_pad of the batch.
+    """
+    groups: "OrderedDict[tuple, List[LocalRequest]]" = OrderedDict()
+    for req in requests:
+        groups.setdefault(req.group_key, []).append(req)
+
+    batches = []
+    for group in groups.values():
+        group.sort(key=lambda r: len(r.suffix_ids))
+        batch: List[LocalRequest] = []
+        for req in group:
+            if batch:
+                n, longest = len(batch) + 1, len(req.suffix_ids)
+                total = sum(len(r.suffix_ids) for r in batch) + longest
+                pad = (n * longest - total) / (n * longest) if longest else 0.0
+                if len(batch) >= max_batch or pad > max_pad:
+                    batches.append(batch)
+                    batch = []
+            batch.append(req)
+        if batch:
+            batches.append(batch)
+    return batches
+
+
+class HFBackend:
+    """transformers model behind the engine; runs on whatever device it loaded to."""
+
+    def __init__(self, tokenizer, model, prefix_cache_size: int = PREFIX_CACHE_SIZE,
+                 prefix_min_tokens: int = PREFIX_MIN_TOKENS):
+        self.tokenizer, self.model = tokenizer, model
+        self.prefix_min_tokens = prefix_min_tokens
+        self.prefix_cache_size = prefix_cache_size
+        self.prefix_enabled = prefix_cache_size > 0
+        self._prefixes: "OrderedDict[Tuple[int, ...], object]" = OrderedDict()
+        self.prefix_hits = self.prefix_misses = 0
+
+    @classmethod
+    def load(cls, model_name: Optional[str] = None) -> "HFBackend":
+        return cls(*_local_load(model_name))
+
+    def encode(self, system: str, user: str) -> Tuple[Tuple[int, ...], List[int], bool]:
+        """(shared prefix ids, per-request ids, prompt opens <think>)."""
+        tok = self.tokenizer
+        if getattr(tok, "chat_template", None):
+            prompt = tok.apply_chat_template(
+                [{"role": "system", "content": system}, {"role": "user", "content": user}],
+                tokenize=False, add_generation_prompt=True)
+            head = tok.apply_chat_template([{"role": "system", "content": system}], tokenize=False)
+        else:
+            prompt, head = f"{system}\n\n{user}\n", f"{system}\n\n"
+        ids = tok(prompt, add_special_tokens=False)["input_ids"]
+        head_ids = tok(head, add_special_tokens=False)["input_ids"]
+        # Only share the prefix if it tokenizes identically inside the prompt
+        # and there is still something left to prefill.
+        if len(head_ids) < len(ids) and ids[:len(head_ids)] == head_ids:
+            prefix, suffix = tuple(head_ids), ids[len(head_ids):]
+        else:
+            prefix, suffix = (), ids
+        return prefix, suffix, prompt.rstrip().endswith("<think>")
+
+    def run(self, batch: List[LocalRequest]) -> List[Tuple[str, int]]:
+        """Generate for every row; returns [(text, new tokens)] in batch order."""
+        import torch
+
+        tok, model = self.tokenizer, self.model
+        prefix = list(batch[0].prefix_ids)
+        width = max(len(r.suffix_ids) for r in batch)
+        pad_id = tok.pad_token_id if tok.pad_token_id is not None else tok.eos_token_id
+        rows, masks = [], []
+        for r in batch:
+            pad = width - len(r.suffix_ids)
+            rows.append(prefix + [pad_id] * pad + r.suffix_ids)
+            masks.append([1] * len(prefix) + [0] * pad + [1] * len(r.suffix_ids))
+        input_ids = torch.tensor(rows, device=model.device)
+        attention_mask = torch.tensor(masks, device=model.device)
+        prompt_len = input_ids.shape[1]
+
+        kwargs = dict(input_ids=input_ids, attention_mask=attention_mask,
+                      **_local_sampling(tok, batch[0].temperature))
+        kwargs["pad_token_id"] = pad_id
+        eos_id = kwargs["eos_token_id"]
+        kwargs["stopping_criteria"] = self._row_hook(batch, prompt_len, eos_id)
+
+        cache = self._prefix_cache(tuple(prefix)) if prefix else None
+        with torch.no_grad():
+            if cache is not None:
+                try:
+                    out = model.generate(**kwargs, past_key_values=_expand_cache(cache, len(batch)))
+                except Exception as e:
+                    logger.warning("prefilled prefix cache rejected, prefilling in full: %s", e)
+                    self.prefix_enabled = False
+                    self._prefixes.clear()
+                    out = model.generate(**kwargs)
+            else:
+                out = model.generate(**kwargs)
+
+        results = []
+        for i in range(len(batch)):
+            gen = out[i, prompt_len:].tolist()
+            if eos_id in gen:
+                gen = gen[:gen.index(eos_id)]
+            results.append((tok.decode(gen, skip_special_tokens=True), len(gen)))
+        return results
+
+    def _row_hook(self, batch: List[LocalRequest], prompt_len: int, eos_id: int):
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        tok = self.tokenizer
+        done = [False] * len(batch)
+
+        class _PerRow(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                for i, req in enumerate(batch):
+                    if done[i]:
+                        continue
+                    gen = input_ids[i, prompt_len:].tolist()
+                    if eos_id in gen:
+                        gen = gen[:gen.index(eos_id)]
+                        done[i] = True
+                    if req.streaming:
+                        req.publish(tok.decode(gen, skip_special_tokens=True))
+                    if req.cancelled:
+                        done[i] = True
+                return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+        return StoppingCriteriaList([_PerRow()])
+
+    def _prefix_cache(self, prefix: Tuple[int, ...]):
+        if not self.prefix_enabled or len(prefix) < self.prefix_min_tokens:
+            return None
+        cache = self._prefixes.get(prefix)
+        if cache is not None:
+            self._prefixes.move_to_end(prefix)
+            self.prefix_hits += 1
+            return cache
+        import torch
+
+        self.prefix_misses += 1
+        with torch.no_grad():
+            out = self.model(input_ids=torch.tensor([list(prefix)], device=self.model.device),
+                             use_cache=True)
+        self._prefixes[prefix] = out.past_key_values
+        while len(self._prefixes) > self.prefix_cache_size:
+            self._prefixes.popitem(last=False)
+        return out.past_key_values
+
+    def stats(self) -> dict:
+        return {
+            "prefix_cache_enabled": self.prefix_enabled,
+            "prefix_cache_entries": len(self._prefixes),
+            "prefix_cache_hits": self.prefix_hits,
+            "prefix_cache_misses": self.prefix_misses,
+        }
+
+
+def _expand_cache(cache, n: int):
+    """Copy of a batch-1 KV cache repeated to n rows (generate() mutates it)."""
+    cache = copy.deepcopy(cache)
+    if hasattr(cache, "batch_repeat_interleave"):
+        cache.batch_repeat_interleave(n)
+        return cache
+    return tuple(tuple(t.repeat_interleave(n, dim=0) for t in layer) for layer in cache)
+
+
+class LocalBatchEngine:
+    def __init__(self, backend, max_batch: int = MAX_BATCH, wait_ms: float = WAIT_MS,
+                 max_pad: float = MAX_PAD):
+        self.backend = backend
+        self.max_batch, self.wait_ms, self.max_pad = max(max_batch, 1), wait_ms, max_pad
+        self._queue: "queue.Queue[LocalRequest]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.requests = self.completed = self.failed = self.cancelled = 0
+            self.batches = 0
+            self.batch_sizes: dict = {}
+            self.tokens = 0
+            self.gen_seconds = 0.0
+            self.queue_ms_total = 0.0
+            self.queue_ms_max = 0.0
+            self.prompt_tokens = self.pad_tokens = 0
+
+    # ── callers ──────────────────────────────────────────────────────────
+    def submit(self, system: str, user: str, temperature: float) -> LocalRequest:
+        prefix, suffix, opens_think = self.backend.encode(system, user)
+        req = LocalRequest(system, user, temperature, prefix, suffix, opens_think)
+        with self._lock:
+            self.requests += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="local-llm-engine",
+                                                daemon=True)
+                self._thread.start()
+        self._queue.put(req)
+        return req
+
+    def generate(self, system: str, user: str, temperature: float) -> str:
+        """Blocking; honours the caller's cancel_scope()."""
+        is_cancelled = current_cancel_check()
+        req = self.submit(system, user, temperature)
+        while True:
+            try:
+                return req.future.result(timeout=_POLL_SEC)
+            except concurrent.futures.TimeoutError:
+                if is_cancelled is not None and is_cancelled():
+                    req.cancel()
+                    raise GenerationCancelled("generation cancelled")
+
+    def stream(self, system: str, user: str, temperature: float) -> Iterator[str]:
+        """Text deltas as the row decodes; closing the generator cancels the row."""
+        is_cancelled = current_cancel_check()
+        req = self.submit(system, user, temperature)
+        req.streaming = True
+        try:
+            if req.opens_think:
+                yield "<think>"
+            while True:
+                try:
+                    chunk = req.chunks.get(timeout=_POLL_SEC)
+                except queue.Empty:
+                    if is_cancelled is not None and is_cancelled():
+                        raise GenerationCancelled("generation cancelled")
+                    continue
+                if chunk is _DONE:
+                    break
+                yield chunk
+            req.future.result()  # re-raise a failed batch
+        finally:
+            req.cancel()
+
+    # ── worker ───────────────────────────────────────────────────────────
+    def _loop(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.monotonic() + self.wait_ms / 1000
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            live = []
+            for req in pending:
+                if req.cancelled:
+                    self._finish(req, error=GenerationCancelled("cancelled while queued"))
+                else:
+                    live.append(req)
+            for batch in plan_batches(live, self.max_batch, self.max_pad):
+                self._run(batch)
+
+    def _run(self, batch: List[LocalRequest]) -> None:
+        started = time.monotonic()
+        width = max(len(r.suffix_ids) for r in batch)
+        with self._lock:
+            self.batches += 1
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            self.prompt_tokens += width * len(batch)
+            self.pad_tokens += sum(width - len(r.suffix_ids) for r in batch)
+            for req in batch:
+                waited = (started - req.enqueued_at) * 1000
+                self.queue_ms_total += waited
+                self.queue_ms_max = max(self.queue_ms_max, waited)
+        try:
+            results = self.backend.run(batch)
+        except Exception as e:
+            logger.exception("local batch of %d failed", len(batch))
+            for req in batch:
+                self._finish(req, error=e)
+            return
+        with self._lock:
+            self.gen_seconds += time.monotonic() - started
+            self.tokens += sum(n for _, n in results)
+        for req, (text, _) in zip(batch, results):
+            self._finish(req, text=text)
+
+    def _finish(self, req: LocalRequest, text: str = "", error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if error is not None:
+                if isinstance(error, GenerationCancelled):
+                    self.cancelled += 1
+                else:
+                    self.failed += 1
+            elif req.cancelled:
+                self.cancelled += 1
+            else:
+                self.completed += 1
+        if error is None:
+            req.publish(text)
+            req.future.set_result(text)
+        else:
+            req.future.set_exception(error)
+        req.chunks.put(_DONE)
+
+    def stats(self) -> dict:
+        with self._lock:
+            run = self.batches
+            rows = sum(size * count for size, count in self.batch_sizes.items())
+            out = {
+                "requests": self.requests,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "queue_depth": self._queue.qsize(),
+                "batches": run,
+                "batch_size_hist": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+                "batch_size_avg": round(rows / run, 2) if run else None,
+                "tokens": self.tokens,
+                "tokens_per_sec": round(self.tokens / self.gen_seconds, 1) if self.gen_seconds else None,
+                "queue_ms_avg": round(self.queue_ms_total / rows, 1) if rows else None,
+                "queue_ms_max": round(self.queue_ms_max, 1) if rows else None,
+                "pad_ratio": round(self.pad_tokens / self.prompt_tokens, 3) if self.prompt_tokens else None,
+            }
+        backend_stats = getattr(self.backend, "stats", None)
+        if backend_stats is not None:
+            out.update(backend_stats())
+        return out
+
+
+_engines: dict = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(model_name: Optional[str] = None) -> LocalBatchEngine:
+    """The engine for a local model, loading the model on first use."""
+    key = model_name or ""
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = LocalBatchEngine(HFBackend.load(model_name))
+        return engine
+
+
+def local_engine_stats() -> dict:
+    """Snapshot for /metrics; empty until LOCAL_ENGINE=batch serves a request."""
+    with _engines_lock:
+        engines = dict(_engines)
+    return {(name or "default"): engine.stats() for name, engine in engines.items()}
@@ -15,26 +15,34 @@ Future (PoC planned):
 
 import os
 import json
+import logging
 import re
-from typing import TypedDict, Optional
-from datetime import date
+import threading
+import time
+from typing import Iterator, TypedDict, Optional
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 from database import get_db_connection
 from dotenv import load_dotenv
 
 from ai_models.food_extraction import extract_foods as _tok_extract_foods
+from ai_models.food_dictionary import get_food_dictionary
 from ai_models.llm_provider import generate as llm_generate, is_configured as llm_is_configured
+from ai_models.llm_provider import generate_stream as llm_generate_stream
+from ai_models.llm_cache import is_json_response
+from ai_models.stage_graph import StageGraph
+from ai_models.user_context import get_user_context
+from ai_models.places_cache import nearby_restaurants
 
 # Backend is selected by LLM_PROVIDER. All generation goes through
 # ai_models.llm_provider so the app can run on Ollama, legacy hosted providers,
 # or a direct local transformers model.
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 # ─── Scope Guard ─────────────────────────────────────────────────────────────
 
@@ -98,120 +106,23 @@ class DataOrchestratorAgent:
     """
 
     def fetch(self, user_id: int) -> Optional[dict]:
-        print(f"[Agent1] Fetching data for user_id={user_id}")
-        conn = get_db_connection()
+        """One round trip via the shared, cached UserContextSnapshot
+        (ai_models/user_context.py)."""
+        logger.debug("fetching context user_id=%s", user_id)
         try:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-
-            # ── Profile ───────────────────────────────────────────────────────
-            cur.execute("""
-                SELECT username, gender, birth_date, height_cm, current_weight_kg,
-                       goal_type, target_weight_kg, target_calories,
-                       COALESCE(target_protein, 0) AS target_protein,
-                       COALESCE(target_carbs, 0) AS target_carbs,
-                       COALESCE(target_fat, 0) AS target_fat,
-                       activity_level,
-                       COALESCE(current_streak, 0) AS current_streak,
-                       COALESCE(total_login_days, 0) AS total_login_days
-                FROM users WHERE user_id = %s
-            """, (user_id,))
-            profile = cur.fetchone()
-            if not profile:
-                print(f"[Agent1] No user found for user_id={user_id}")
-                return None
-            profile = dict(profile)
-
-            # ── Allergies ─────────────────────────────────────────────────────
-            cur.execute("""
-                SELECT f.name FROM user_allergy_preferences uap
-                JOIN allergy_flags f ON uap.flag_id = f.flag_id
-                WHERE uap.user_id = %s
-            """, (user_id,))
-            allergies = [r['name'] for r in cur.fetchall()]
-
-            # ── Today's intake ────────────────────────────────────────────────
-            today_str = date.today().isoformat()
-            cur.execute("""
-                SELECT COALESCE(ds.total_calories_intake, 0) AS total_calories_intake,
-                       COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS total_protein,
-                       COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS total_carbs,
-                       COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS total_fat
-                FROM daily_summaries ds
-                LEFT JOIN meals m ON m.user_id = ds.user_id AND m.created_at::date = ds.date_record
-                LEFT JOIN detail_items di ON di.meal_id = m.meal_id
-                WHERE ds.user_id = %s AND ds.date_record = %s
-                GROUP BY ds.total_calories_intake
-            """, (user_id, today_str))
-            today_row = cur.fetchone()
-            today_intake = dict(today_row) if today_row else {
-                "total_calories_intake": 0,
-                "total_protein": 0,
-                "total_carbs": 0,
-                "total_fat": 0,
-            }
-
-            # ── Weight logs (30 days) ─────────────────────────────────────────
-            cur.execute("""
-                SELECT recorded_date::text AS date, weight_kg AS weight
-                FROM weight_logs
-                WHERE user_id = %s
-                ORDER BY recorded_date DESC LIMIT 30
-            """, (user_id,))
-            weight_logs = [dict(r) for r in cur.fetchall()]
-
-            # ── Recent foods (3 days) ─────────────────────────────────────────
-            cur.execute("""
-                SELECT DISTINCT d.food_name, d.cal_per_unit, d.protein_per_unit,
-                                d.carbs_per_unit, d.fat_per_unit
-                FROM detail_items d
-                JOIN meals m ON d.meal_id = m.meal_id
-                WHERE m.user_id = %s AND m.created_at >= NOW() - INTERVAL '3 days'
-                LIMIT 20
-            """, (user_id,))
-            recent_foods = [dict(r) for r in cur.fetchall()]
-
-            return {
-                "profile": profile,
-                "allergies": allergies,
-                "today_intake": today_intake,
-                "weight_logs": weight_logs,
-                "recent_foods": recent_foods,
-            }
-
+            snapshot = get_user_context(user_id)
         except Exception as e:
-            print(f"[Agent1] Exception for user_id={user_id}: {e}")
+            logger.warning("context fetch failed user_id=%s: %s", user_id, e)
             return {"error": str(e), "profile": {}, "allergies": [],
                     "today_intake": {}, "weight_logs": [], "recent_foods": []}
-        finally:
-            if conn:
-                conn.close()
+        if snapshot is None:
+            logger.debug("no user found user_id=%s", user_id)
+            return None
+        return snapshot.as_agent_context()
 
     def fetch_nearby_restaurants(self, lat: float, lng: float) -> list:
-        """เรียก Google Places API เพื่อดึงร้านอาหารใกล้เคียง (radius 1 km)"""
-        import urllib.request as _req
-        _PLACES_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
-        url = (
-            f"https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-            f"?location={lat},{lng}&radius=1000&type=restaurant"
-            f"&language=th&key={_PLACES_KEY}"
-        )
-        try:
-            with _req.urlopen(url, timeout=6) as resp:
-                data = json.loads(resp.read())
-            results = data.get("results", [])[:5]
-            return [
-                {
-                    "name": r.get("name", ""),
-                    "vicinity": r.get("vicinity", ""),
-                    "rating": r.get("rating"),
-                    "open_now": r.get("opening_hours", {}).get("open_now"),
-                    "price_level": r.get("price_level"),
-                }
-                for r in results
-            ]
-        except Exception as e:
-            print(f"[Agent1] Places API error: {e}")
-            return []
+        """ร้านอาหารใกล้เคียง (radius 1 km) ผ่าน geohash cache ของ Places API"""
+        return nearby_restaurants(lat, lng)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -244,18 +155,90 @@ _MET_TABLE = [
     {"name": "พักผ่อน",       "met": 1.0,  "keywords": "นั่ง นอน พัก rest"},
 ]
 
+# llm_cache TTLs for the deterministic (temperature 0) prompts. Estimates
+# depend only on the dish names, so they can live for a week.
+_EXTRACT_CACHE_TTL = 24 * 3600
+_ESTIMATE_CACHE_TTL = 7 * 24 * 3600
+
+# Best catalog row for each mention, all mentions in one round trip. Per
+# mention the ranking is the old single-name lookup's: exact canonical name,
+# then exact regional alias, then any infix hit (served by the v29 trigram
+# indexes), alphabetical within a tier. Unknown mentions come back with
+# food_id NULL.
+_RESOLVE_FOODS_SQL = """
+    SELECT q.name AS query, hit.*
+    FROM unnest(%(names)s::text[]) WITH ORDINALITY AS q(name, ord)
+    LEFT JOIN LATERAL (
+        SELECT f.food_id, f.food_name, f.calories, f.protein, f.fat, f.carbs,
+               frn.name_th AS matched_regional_name
+        FROM foods f
+        LEFT JOIN food_regional_names frn
+               ON frn.food_id = f.food_id
+              AND frn.deleted_at IS NULL
+              AND frn.name_th ILIKE '%%' || q.name || '%%'
+        WHERE f.deleted_at IS NULL
+          AND (f.food_name ILIKE '%%' || q.name || '%%' OR frn.variant_id IS NOT NULL)
+        ORDER BY
+            CASE
+              WHEN f.food_name = q.name THEN 0
+              WHEN frn.name_th = q.name THEN 1
+              ELSE 2
+            END,
+            f.food_name
+        LIMIT 1
+    ) hit ON TRUE
+    ORDER BY q.ord
+"""
+
+# LLM estimates queued for admin review, one statement per message. Names
+# already in temp_food (from /foods/auto-add or an earlier estimate) are
+# skipped: the NOT EXISTS probe is an index lookup on v31's plain
+# idx_temp_food_lower_name (LOWER(food_name), every source), not a scan.
+# Concurrent estimates of the same new dish collapse on v31's partial
+# unique index uq_temp_food_ai_estimate_name.
+_QUEUE_TEMP_FOODS_SQL = """
+    INSERT INTO temp_food (food_name, calories, protein, carbs, fat, user_id, source)
+    SELECT v.food_name, v.calories, v.protein, v.carbs, v.fat, v.user_id, 'ai_estimate'
+    FROM (VALUES %s) AS v(food_name, calories, protein, carbs, fat, user_id)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM temp_food t WHERE LOWER(t.food_name) = LOWER(v.food_name)
+    )
+    ON CONFLICT (LOWER(food_name)) WHERE source = 'ai_estimate' DO NOTHING
+    RETURNING food_name
+"""
+
+
+# analyze(foods=...) default: resolve the message's foods inline.
+_NOT_RESOLVED = object()
+
 
 class NutritionAnalysisAgent:
 
     def __init__(self):
-        # TF-IDF vector index สำหรับ activity matching (PoC ของ vector search)
-        corpus = [item["keywords"] for item in _MET_TABLE]
-        self._vec = TfidfVectorizer()
-        self._matrix = self._vec.fit_transform(corpus)
+        # TF-IDF vector index สำหรับ activity matching (PoC ของ vector search).
+        # Built on first use: sklearn is slow to import and startup doesn't need it.
+        self._activity_index = None
+        self._activity_lock = threading.Lock()
+
+    def _activity_tfidf(self):
+        """(vectorizer, matrix) over _MET_TABLE keywords, fitted once."""
+        if self._activity_index is None:
+            with self._activity_lock:
+                if self._activity_index is None:
+                    from sklearn.feature_extraction.text import TfidfVectorizer
+                    vec = TfidfVectorizer()
+                    matrix = vec.fit_transform([item["keywords"] for item in _MET_TABLE])
+                    self._activity_index = (vec, matrix)
+        return self._activity_index
 
     # ── Entry point ───────────────────────────────────────────────────────────
 
-    def analyze(self, user_message: str, context: dict, user_id: int = None) -> dict:
+    def analyze(self, user_message: str, context: dict, user_id: int = None,
+                foods=_NOT_RESOLVED) -> dict:
+        """
+        foods — a resolve_foods() result computed ahead of time (the
+        pipeline runs it alongside Agent 1); resolved here when omitted.
+        """
         result = {
             "intent": self._detect_intent(user_message),
             "food_info": None,
@@ -278,11 +261,16 @@ class NutritionAnalysisAgent:
         }
 
         # Food analysis
-        food_mentions = self._extract_foods(user_message)
-        if food_mentions:
-            result["food_info"] = self._analyze_foods(
-                food_mentions, context.get("allergies", []), user_id
-            )
+        if foods is _NOT_RESOLVED:
+            foods = self.resolve_foods(user_message, user_id)
+        if foods is not None:
+            info, resolved_names = foods
+            result["food_info"] = {
+                **info,
+                "allergy_warnings": self._allergy_warnings(
+                    resolved_names, context.get("allergies", [])
+                ),
+            }
 
         # Activity analysis
         activities = self._extract_activities(user_message)
@@ -299,6 +287,18 @@ class NutritionAnalysisAgent:
 
         return result
 
+    def resolve_foods(self, user_message: str, user_id: int = None) -> Optional[tuple]:
+        """
+        The food half of analyze(): extraction, catalog lookup and LLM
+        estimates. Needs no user context, so it can run alongside Agent 1.
+        Returns (food_info without allergy warnings, resolved mention
+        names) or None when the message names no food.
+        """
+        food_mentions = self._extract_foods(user_message)
+        if not food_mentions:
+            return None
+        return self._resolve_foods(food_mentions, user_id)
+
     # ── Intent detection ──────────────────────────────────────────────────────
 
     def _detect_intent(self, text: str) -> str:
@@ -324,42 +324,15 @@ class NutritionAnalysisAgent:
         LLM provider may extract unknown foods so they can be estimated and
         queued for admin review.
         """
-        db_names = self._load_food_dictionary()
-        mentions = _tok_extract_foods(text, db_food_names=db_names, limit=5)
+        mentions = _tok_extract_foods(text, dictionary=self._load_food_dictionary(), limit=5)
         if mentions:
             return mentions
         return self._extract_foods_llm(text)
 
-    def _load_food_dictionary(self) -> list:
-        """Pull canonical and approved regional names for tokenizer matching."""
-        conn = get_db_connection()
-        if not conn:
-            return []
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT name
-                FROM (
-                    SELECT food_name AS name
-                    FROM foods
-                    WHERE deleted_at IS NULL
-                    UNION
-                    SELECT frn.name_th AS name
-                    FROM food_regional_names frn
-                    JOIN foods f ON f.food_id = frn.food_id
-                    WHERE frn.deleted_at IS NULL
-                      AND f.deleted_at IS NULL
-                ) names
-                WHERE name IS NOT NULL AND BTRIM(name) <> ''
-                LIMIT 10000
-                """
-            )
-            return [r[0] for r in cur.fetchall() if r[0]]
-        except Exception:
-            return []
-        finally:
-            conn.close()
+    def _load_food_dictionary(self):
+        """Shared, versioned snapshot of canonical + regional names
+        (ai_models/food_dictionary.py) — no DB work on most requests."""
+        return get_food_dictionary()
 
     def _extract_foods_llm(self, text: str) -> list:
         """Ask the configured LLM to extract unknown foods from free text."""
@@ -376,7 +349,8 @@ class NutritionAnalysisAgent:
                 "ตอบรูปแบบนี้เท่านั้น: "
                 "{\"items\":[{\"name\":\"ชื่ออาหาร\",\"quantity\":1}]}"
             )
-            raw = llm_generate(system, user)
+            raw = llm_generate(system, user, temperature=0, cache_ttl=_EXTRACT_CACHE_TTL,
+                               cache_if=is_json_response)
             raw = re.sub(r"```(?:json)?", "", raw).strip("`").strip()
             data = json.loads(raw)
             items = data.get("items") if isinstance(data, dict) else data
@@ -410,20 +384,44 @@ class NutritionAnalysisAgent:
         {"name", "quantity", "source"} from _extract_foods.
         Multiplies the per-serving nutrition by `quantity` when provided so
         "ข้าวผัด 2 จาน" counts as 2x.
+
+        All mentions are resolved together: one DB query for every name,
+        then one LLM call for whatever the DB didn't know.
         """
+        info, resolved_names = self._resolve_foods(food_mentions, user_id)
+        info["allergy_warnings"] = self._allergy_warnings(resolved_names, allergies)
+        return info
+
+    @staticmethod
+    def _allergy_warnings(names: list, allergies: list) -> list:
+        return [f"⚠️ {name} อาจมีส่วนผสมที่คุณแพ้"
+                for name in names if any(a in name for a in allergies)]
+
+    def _resolve_foods(self, food_mentions: list, user_id: int = None) -> tuple:
+        """_analyze_foods() minus allergy warnings; also returns the mention
+        name behind each item so warnings can be added once allergies are known."""
         foods = []
         total = {"calories": 0.0, "protein": 0.0, "carbs": 0.0, "fat": 0.0}
-        warnings = []
+        resolved_names = []
 
+        parsed = []
         for item in food_mentions:
             if isinstance(item, dict):
-                name = item.get("name", "")
-                qty = item.get("quantity") or 1.0
+                parsed.append((item.get("name", ""), item.get("quantity") or 1.0))
             else:
-                name = item
-                qty = 1.0
-
-            info = self._lookup_food_db(name) or self._estimate_food_llm(name, user_id)
+                parsed.append((item, 1.0))
+
+        names = list(dict.fromkeys(name for name, _ in parsed if name))
+        resolved = self._lookup_foods_db(names)
+        missing = [n for n in names if n not in resolved]
+        if missing:
+            # One LLM call for all of them; names the answer can't be matched
+            # to stay unresolved rather than cost more calls past the stage
+            # deadline.
+            resolved.update(self._estimate_foods_llm(missing, user_id))
+
+        for name, qty in parsed:
+            info = resolved.get(name)
             if not info:
                 continue
 
@@ -438,47 +436,31 @@ class NutritionAnalysisAgent:
             }
             for k in total:
                 total[k] += scaled.get(k, 0)
-            if any(a in name for a in allergies):
-                warnings.append(f"⚠️ {name} อาจมีส่วนผสมที่คุณแพ้")
+            resolved_names.append(name)
             foods.append(scaled)
 
         return {
             "items": foods,
             "total": {k: round(v, 1) for k, v in total.items()},
-            "allergy_warnings": warnings,
-        }
+            "allergy_warnings": [],
+        }, resolved_names
 
-    def _lookup_food_db(self, food_name: str) -> Optional[dict]:
+    def _lookup_foods_db(self, food_names: list) -> dict:
+        """{mention: nutrition} for every name the catalog knows, in one query."""
+        if not food_names:
+            return {}
         conn = get_db_connection()
+        found = {}
         try:
             cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute(
-                """
-                SELECT f.food_id, f.food_name, f.calories, f.protein, f.fat, f.carbs,
-                       frn.name_th AS matched_regional_name
-                FROM foods f
-                LEFT JOIN food_regional_names frn
-                       ON frn.food_id = f.food_id
-                      AND frn.deleted_at IS NULL
-                      AND frn.name_th ILIKE %s
-                WHERE f.deleted_at IS NULL
-                  AND (f.food_name ILIKE %s OR frn.variant_id IS NOT NULL)
-                ORDER BY
-                    CASE
-                      WHEN f.food_name = %s THEN 0
-                      WHEN frn.name_th = %s THEN 1
-                      ELSE 2
-                    END,
-                    f.food_name
-                LIMIT 1
-                """,
-                (f"%{food_name}%", f"%{food_name}%", food_name, food_name),
-            )
-            row = cur.fetchone()
-            if row:
-                return {
+            cur.execute(_RESOLVE_FOODS_SQL, {"names": list(food_names)})
+            for row in cur.fetchall():
+                if row["food_id"] is None:
+                    continue
+                query = row["query"]
+                found[query] = {
                     "name": row["food_name"],
-                    "matched_name": row.get("matched_regional_name") or food_name,
+                    "matched_name": row.get("matched_regional_name") or query,
                     "calories": float(row["calories"] or 0),
                     "protein": float(row["protein"] or 0),
                     "carbs": float(row["carbs"] or 0),
@@ -489,66 +471,103 @@ class NutritionAnalysisAgent:
             pass
         finally:
             if conn: conn.close()
-        return None
+        return found
 
-    def _estimate_food_llm(self, name: str, user_id: int = None) -> Optional[dict]:
-        """Estimate unknown food nutrition via selected LLM and queue admin review."""
-        if not llm_is_configured():
-            return None
+    def _estimate_foods_llm(self, names: list, user_id: int = None) -> dict:
+        """
+        Estimate nutrition for unknown foods with one LLM call and queue them
+        all for admin review. Returns {name: nutrition} for the names the
+        model answered.
+        """
+        if not names or not llm_is_configured():
+            return {}
         try:
             system = (
                 "คุณคือผู้เชี่ยวชาญด้านโภชนาการ ตอบเป็น JSON เท่านั้น ไม่มี markdown"
             )
             user = (
-                f'ประมาณโภชนาการของ "{name}" 1 จาน (ปริมาณปกติ) '
-                f'ตอบเป็น JSON: {{"calories":0,"protein":0,"carbs":0,"fat":0}}'
+                f"ประมาณโภชนาการของอาหารต่อไปนี้ อย่างละ 1 จาน (ปริมาณปกติ): "
+                f"{json.dumps(names, ensure_ascii=False)}\n"
+                "ตอบเป็น JSON array ตามลำดับเดิม: "
+                '[{"name":"ชื่ออาหาร","calories":0,"protein":0,"carbs":0,"fat":0}]'
             )
-            text = llm_generate(system, user)
+            text = llm_generate(system, user, temperature=0, cache_ttl=_ESTIMATE_CACHE_TTL,
+                                cache_if=is_json_response)
             text = re.sub(r"```(?:json)?", "", text).strip("`").strip()
-            d = json.loads(text)
-            result = {
-                "name": name,
-                "calories": float(d.get("calories", 0)),
-                "protein": float(d.get("protein", 0)),
-                "carbs": float(d.get("carbs", 0)),
-                "fat": float(d.get("fat", 0)),
-                "source": "llm_estimate",
-            }
+            data = json.loads(text)
+        except Exception:
+            return {}
+
+        if isinstance(data, dict):
+            data = data.get("items") if isinstance(data.get("items"), list) else [data]
+        if not isinstance(data, list):
+            return {}
+
+        entries = [(i, d, str(d.get("name") or "").strip())
+                   for i, d in enumerate(data) if isinstance(d, dict)]
+        # Trust the echoed name when it is one we asked for. Position is only
+        # a fallback when the model kept the list intact: same length and
+        # every recognised name in its own slot. A dropped or reordered entry
+        # would otherwise pin one food's estimate on another — and queue it
+        # in temp_food. Unmatched entries are dropped.
+        in_order = len(data) == len(names) and all(
+            names[i] == echoed for i, _, echoed in entries if echoed in names)
+
+        results = {}
+        for i, d, echoed in entries:
+            if echoed in names:
+                name = echoed
+            elif in_order:
+                name = names[i]
+            else:
+                continue
+            if name in results:
+                continue
+            try:
+                results[name] = {
+                    "name": name,
+                    "calories": float(d.get("calories", 0)),
+                    "protein": float(d.get("protein", 0)),
+                    "carbs": float(d.get("carbs", 0)),
+                    "fat": float(d.get("fat", 0)),
+                    "source": "llm_estimate",
+                }
+            except (TypeError, ValueError):
+                continue
 
-            # Auto-add to temp_food for admin review
-            self._auto_add_temp_food(name, result, user_id)
+        # Auto-add to temp_food for admin review
+        if results:
+            self._auto_add_temp_foods(list(results.values()), user_id)
+        return results
 
-            return result
-        except Exception:
-            return None
+    def _estimate_food_llm(self, name: str, user_id: int = None) -> Optional[dict]:
+        """Single-food form of _estimate_foods_llm."""
+        return self._estimate_foods_llm([name], user_id).get(name)
 
     # Backward-compatible alias for old tests/imports.
     _estimate_food_gemini = _estimate_food_llm
 
-    def _auto_add_temp_food(self, food_name: str, nutrition: dict, user_id: int = None):
-        """Insert estimated food into temp_food so admin can review and approve."""
+    def _auto_add_temp_foods(self, estimates: list, user_id: int = None):
+        """Queue estimated foods in temp_food for admin review — one multi-row
+        insert; names already queued (by anyone) are skipped."""
+        if user_id is None:
+            return  # temp_food.user_id is NOT NULL
+        rows = [
+            (e["name"], e.get("calories", 0), e.get("protein", 0),
+             e.get("carbs", 0), e.get("fat", 0), user_id)
+            for e in {e["name"].lower(): e for e in estimates}.values()
+        ]
         conn = get_db_connection()
         if not conn:
             return
         try:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            # Check if already submitted recently (avoid duplicates)
-            cur.execute(
-                "SELECT tf_id FROM temp_food WHERE LOWER(food_name) = LOWER(%s) LIMIT 1",
-                (food_name,)
-            )
-            if cur.fetchone():
-                return  # already exists
-            cur.execute(
-                """INSERT INTO temp_food (food_name, calories, protein, carbs, fat, user_id)
-                   VALUES (%s, %s, %s, %s, %s, %s)""",
-                (food_name, nutrition.get("calories", 0), nutrition.get("protein", 0),
-                 nutrition.get("carbs", 0), nutrition.get("fat", 0), user_id),
-            )
+            cur = conn.cursor()
+            added = execute_values(cur, _QUEUE_TEMP_FOODS_SQL, rows, fetch=True)
             conn.commit()
-            print(f"[Agent2] Auto-added '{food_name}' to temp_food for admin review")
+            for (food_name,) in added:
+                logger.debug("queued estimated food %r in temp_food for admin review", food_name)
         except Exception as e:
-            print(f"[Agent2] Failed to auto-add temp_food: {e}")
+            logger.warning("failed to queue estimated foods in temp_food: %s", e)
             conn.rollback()
         finally:
             conn.close()
@@ -570,8 +589,9 @@ class NutritionAnalysisAgent:
     def _match_activity(self, query: str):
         """TF-IDF cosine similarity — PoC ของ vector search"""
         try:
-            q_vec = self._vec.transform([query])
-            sims = cosine_similarity(q_vec, self._matrix)[0]
+            from sklearn.metrics.pairwise import cosine_similarity
+            vec, matrix = self._activity_tfidf()
+            sims = cosine_similarity(vec.transform([query]), matrix)[0]
             idx = int(np.argmax(sims))
             item = _MET_TABLE[idx]
             return item["name"], item["met"]
@@ -580,7 +600,6 @@ class NutritionAnalysisAgent:
 
     # allow Optional import inside class scope
     from typing import Optional as _Optional
-    _lookup_food_db.__annotations__["return"] = "Optional[dict]"
     _estimate_food_llm.__annotations__["return"] = "Optional[dict]"
 
 
@@ -596,6 +615,47 @@ class NutritionAnalysisAgent:
 class ResponseComposerAgent:
 
     def compose(self, state: AgentState) -> str:
+        system_prompt, user_prompt = self._build_prompt(state)
+
+        # ── LLM call (Ollama / local / legacy hosted, selected by LLM_PROVIDER)
+        if llm_is_configured():
+            try:
+                # Personalized (profile, today's intake) — never cached.
+                return llm_generate(system_prompt, user_prompt, cache_ttl=0)
+            except Exception:
+                pass  # fallthrough to rule-based
+
+        return self._rule_based_for(state)
+
+    def compose_stream(self, state: AgentState) -> Iterator[str]:
+        """compose() as raw LLM deltas (<think> blocks included).
+
+        Falls back to the rule-based text when no provider is configured or
+        the stream fails before its first chunk.
+        """
+        system_prompt, user_prompt = self._build_prompt(state)
+        if llm_is_configured():
+            started = False
+            try:
+                for chunk in llm_generate_stream(system_prompt, user_prompt):
+                    started = True
+                    yield chunk
+                return
+            except Exception:
+                if started:
+                    raise
+        yield self._rule_based_for(state)
+
+    def _rule_based_for(self, state: AgentState) -> str:
+        ctx = state.get("user_context") or {}
+        analysis = state.get("analysis") or {}
+        return self._rule_based(
+            analysis.get("calorie_balance", {}), analysis.get("food_info"),
+            analysis.get("activity_info"), ctx.get("profile", {}),
+        )
+
+    def _build_prompt(self, state: AgentState) -> tuple:
+        """(system, user) prompts for the LLM from the pipeline state."""
         ctx = state.get("user_context") or {}
         analysis = state.get("analysis") or {}
         msg = state.get("user_message", "")
@@ -654,16 +714,7 @@ class ResponseComposerAgent:
                 )
             system_parts.append("(ถ้าผู้ใช้ถามเรื่องร้านอาหาร ให้แนะนำจากรายการนี้และบอกชื่อร้านที่ตรงกับเป้าหมายของผู้ใช้)")
 
-        system_prompt = "\n".join(system_parts)
-
-        # ── LLM call (Ollama / local / legacy hosted, selected by LLM_PROVIDER)
-        if llm_is_configured():
-            try:
-                return llm_generate(system_prompt, f"คำถาม/ข้อความ: {msg}")
-            except Exception:
-                pass  # fallthrough to rule-based
-
-        return self._rule_based(balance, food_info, act_info, profile)
+        return "\n".join(system_parts), f"คำถาม/ข้อความ: {msg}"
 
     def _rule_based(self, balance, food_info, act_info, profile) -> str:
         """Fallback เมื่อไม่มี provider key หรือ LLM error"""
@@ -694,13 +745,32 @@ class ResponseComposerAgent:
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
-# Orchestrator — LangGraph-style sequential pipeline
+# Orchestrator — small DAG: independent stages run concurrently
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# Per-stage deadlines (seconds). Past them the pipeline composes without
+# that stage's output instead of waiting: no restaurant list, or no food
+# breakdown. Agent 1 has none — without a profile there is nothing to say.
+_RESTAURANTS_DEADLINE_SEC = float(os.getenv("AGENT_RESTAURANTS_DEADLINE_SEC", "3"))
+_FOODS_DEADLINE_SEC = float(os.getenv("AGENT_FOODS_DEADLINE_SEC", "15"))
+
+
+class _EarlyReply(Exception):
+    """Agent 1 found nothing to work with; the message is the reply."""
+
+
 class NutritionMultiAgent:
     """
     เชื่อมต่อ 3 agents ผ่าน state pipeline:
-      user_message → [Agent1: fetch data] → [Agent2: analyze] → [Agent3: compose] → response
+
+      user_message ─┬─ [Agent1: fetch data] ──────────┐
+                    ├─ [Agent1b: nearby restaurants] ─┤ (optional, deadline)
+                    └─ [Agent2a: resolve foods] ──────┴─ [Agent2: analyze] → [Agent3: compose]
+                                                   (optional, deadline)
+
+    Stages without an arrow between them run at the same time
+    (ai_models/stage_graph.py), so the pipeline waits for its slowest branch
+    instead of the sum of all of them.
     """
 
     def __init__(self):
@@ -709,10 +779,38 @@ class NutritionMultiAgent:
         self.composer = ResponseComposerAgent()
 
     def run(self, user_id: int, user_message: str,
-            lat: Optional[float] = None, lng: Optional[float] = None) -> str:
+            lat: Optional[float] = None, lng: Optional[float] = None,
+            timings: Optional[dict] = None) -> str:
+        """timings — optional dict filled with per-stage {"ms", "status"}."""
+        reply, state = self._prepare(user_id, user_message, lat, lng, timings)
+        if reply is not None:
+            return reply
+
+        # ── Agent 3: Response Composer ────────────────────────────────────────
+        started = time.monotonic()
+        state["final_response"] = self.composer.compose(state)
+        if timings is not None:
+            timings["compose"] = {"ms": round((time.monotonic() - started) * 1000, 1),
+                                  "status": "ok"}
+
+        return state["final_response"] or "ขออภัยครับ เกิดข้อผิดพลาดในการประมวลผล"
+
+    def run_stream(self, user_id: int, user_message: str,
+                   lat: Optional[float] = None, lng: Optional[float] = None) -> Iterator[str]:
+        """run() with the composer's reply streamed as raw LLM deltas."""
+        reply, state = self._prepare(user_id, user_message, lat, lng)
+        if reply is not None:
+            yield reply
+            return
+        yield from self.composer.compose_stream(state)
+
+    def _prepare(self, user_id: int, user_message: str,
+                 lat: Optional[float], lng: Optional[float],
+                 timings: Optional[dict] = None) -> tuple:
+        """Agents 1 and 2. Returns (early reply or None, state)."""
         # Scope guard — reject off-topic questions
         if not _is_in_scope(user_message):
-            return _REJECT_MSG
+            return _REJECT_MSG, None
 
         state: AgentState = {
             "user_id": user_id,
@@ -725,25 +823,43 @@ class NutritionMultiAgent:
             "final_response": None,
         }
 
+        graph = StageGraph()
         # ── Agent 1: Data Orchestrator ────────────────────────────────────────
-        state["user_context"] = self.data_agent.fetch(user_id)
-        ctx = state["user_context"]
-        if not ctx:
-            return f"ขออภัยครับ ไม่พบข้อมูลโปรไฟล์ user_id={user_id} ในระบบ กรุณาตรวจสอบว่า login ครบถ้วนแล้ว"
-        if "error" in ctx and not ctx.get("profile"):
-            return f"ขออภัยครับ เกิดข้อผิดพลาดในการดึงข้อมูล: {ctx['error']}"
-
+        graph.add("context", self._fetch_context, user_id)
         # ── Agent 1b: Nearby Restaurants (ถ้ามี location) ────────────────────
         if lat is not None and lng is not None:
-            state["nearby_restaurants"] = self.data_agent.fetch_nearby_restaurants(lat, lng)
-            print(f"[Agent1] Found {len(state['nearby_restaurants'])} nearby restaurants")
-
+            graph.add("restaurants", self.data_agent.fetch_nearby_restaurants, lat, lng,
+                      deadline=_RESTAURANTS_DEADLINE_SEC, optional=True, fallback=[])
+        # ── Agent 2a: food extraction + lookup/estimates (no context needed) ──
+        graph.add("foods", self.analysis_agent.resolve_foods, user_message, user_id,
+                  deadline=_FOODS_DEADLINE_SEC, optional=True, fallback=None)
         # ── Agent 2: Nutrition Analysis ───────────────────────────────────────
-        state["analysis"] = self.analysis_agent.analyze(
-            user_message, state["user_context"], user_id=user_id
-        )
+        graph.add("analysis",
+                  lambda ctx, foods: self.analysis_agent.analyze(
+                      user_message, ctx, user_id=user_id, foods=foods),
+                  after=("context", "foods"))
 
-        # ── Agent 3: Response Composer ────────────────────────────────────────
-        state["final_response"] = self.composer.compose(state)
-
-        return state["final_response"] or "ขออภัยครับ เกิดข้อผิดพลาดในการประมวลผล"
+        try:
+            results, stage_timings = graph.run()
+        except _EarlyReply as e:
+            return str(e), state
+        logger.debug("pipeline stages user_id=%s %s", user_id, stage_timings)
+        if timings is not None:
+            timings.update(stage_timings)
+
+        state["user_context"] = results["context"]
+        state["analysis"] = results["analysis"]
+        if "restaurants" in results:
+            state["nearby_restaurants"] = results["restaurants"]
+            logger.debug("nearby restaurants user_id=%s count=%d",
+                         user_id, len(state["nearby_restaurants"]))
+
+        return None, state
+
+    def _fetch_context(self, user_id: int) -> dict:
+        ctx = self.data_agent.fetch(user_id)
+        if not ctx:
+            raise _EarlyReply(f"ขออภัยครับ ไม่พบข้อมูลโปรไฟล์ user_id={user_id} ในระบบ กรุณาตรวจสอบว่า login ครบถ้วนแล้ว")
+        if "error" in ctx and not ctx.get("profile"):
+            raise _EarlyReply(f"ขออภัยครับ เกิดข้อผิดพลาดในการดึงข้อมูล: {ctx['error']}")
+        return ctx
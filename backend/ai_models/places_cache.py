@@ -0,0 +1,268 @@
+"""
+Geo-bucketed cache for the nearby-restaurant lookup.
+
+DataOrchestratorAgent.fetch_nearby_restaurants called the Places API with
+urllib on every chat message that carried a location — up to 6s, nothing
+shared between users — although most traffic comes from a few campuses
+and offices. Lookups now go through RestaurantCache:
+
+  - keyed by geohash cell (PLACES_GEOHASH_PRECISION, default 6 ≈ 1.2 x 0.6
+    km); the upstream search is made from the cell centre, so everyone in
+    the cell shares one result list (PLACES_RADIUS_M, default 1000)
+  - fresh for PLACES_CACHE_TTL_SECONDS (default 900), LRU-bounded at
+    PLACES_CACHE_MAX_CELLS (default 4096)
+  - stale-while-revalidate: for PLACES_CACHE_STALE_SECONDS (default 7200)
+    after that an expired entry is still returned at once and a background
+    refresh is started; a failed refresh keeps the stale list
+  - request coalescing: concurrent misses for a cell wait on one upstream
+    call instead of each making their own
+  - a miss never waits longer than PLACES_TIMEOUT_SEC (default 6) and
+    gives up early when the caller's cancel check flips (the pipeline's
+    restaurants deadline); the call finishes in the background and the
+    next user in the cell gets the result
+  - failures without a stale list are remembered as [] for
+    PLACES_CACHE_ERROR_TTL_SECONDS (default 60) so an outage or a missing
+    key doesn't cost every request a round trip
+
+The upstream client is any callable (lat, lng, radius_m) -> list of dicts;
+GooglePlacesClient is the default and tests pass a local fake. Counters are
+under `places_cache` in GET /metrics.
+
+Usage:
+    from ai_models.places_cache import nearby_restaurants
+    places = nearby_restaurants(13.7563, 100.5018)
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from ai_models.llm_provider import current_cancel_check
+
+logger = logging.getLogger(__name__)
+
+TTL_SECONDS = float(os.getenv("PLACES_CACHE_TTL_SECONDS", "900"))
+STALE_SECONDS = float(os.getenv("PLACES_CACHE_STALE_SECONDS", "7200"))
+ERROR_TTL_SECONDS = float(os.getenv("PLACES_CACHE_ERROR_TTL_SECONDS", "60"))
+MAX_CELLS = int(os.getenv("PLACES_CACHE_MAX_CELLS", "4096"))
+PRECISION = int(os.getenv("PLACES_GEOHASH_PRECISION", "6"))
+RADIUS_M = int(os.getenv("PLACES_RADIUS_M", "1000"))
+TIMEOUT_SEC = float(os.getenv("PLACES_TIMEOUT_SEC", "6"))
+
+PlacesClient = Callable[[float, float, int], List[dict]]
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_cell(lat: float, lng: float, precision: int = PRECISION) -> Tuple[str, float, float]:
+    """(geohash, centre lat, centre lng) of the cell containing the point."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = ch << 1 | 1, mid
+            else:
+                ch, lng_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = ch << 1 | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(chars), (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+
+
+class GooglePlacesClient:
+    """Places Nearby Search over urllib; raises on transport or API errors."""
+
+    URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+
+    def __init__(self, api_key: Optional[str] = None, timeout: float = TIMEOUT_SEC, limit: int = 5):
+        self.api_key = os.getenv("GOOGLE_MAPS_API_KEY", "") if api_key is None else api_key
+        self.timeout, self.limit = timeout, limit
+
+    def __call__(self, lat: float, lng: float, radius_m: int) -> List[dict]:
+        if not self.api_key:
+            raise RuntimeError("GOOGLE_MAPS_API_KEY is not set")
+        query = urllib.parse.urlencode({
+            "location": f"{lat},{lng}", "radius": radius_m, "type": "restaurant",
+            "language": "th", "key": self.api_key,
+        })
+        with urllib.request.urlopen(f"{self.URL}?{query}", timeout=self.timeout) as resp:
+            data = json.loads(resp.read())
+        status = data.get("status", "OK")
+        if status not in ("OK", "ZERO_RESULTS"):
+            raise RuntimeError(f"Places API {status}: {data.get('error_message', '')}")
+        return [
+            {
+                "name": r.get("name", ""),
+                "vicinity": r.get("vicinity", ""),
+                "rating": r.get("rating"),
+                "open_now": r.get("opening_hours", {}).get("open_now"),
+                "price_level": r.get("price_level"),
+            }
+            for r in data.get("results", [])[:self.limit]
+        ]
+
+
+class _Entry:
+    __slots__ = ("places", "fresh_until", "stale_until")
+
+    def __init__(self, places: List[dict], fresh_until: float, stale_until: float):
+        self.places, self.fresh_until, self.stale_until = places, fresh_until, stale_until
+
+
+class RestaurantCache:
+    def __init__(self, client: Optional[PlacesClient] = None, ttl: float = TTL_SECONDS,
+                 stale: float = STALE_SECONDS, error_ttl: float = ERROR_TTL_SECONDS,
+                 max_cells: int = MAX_CELLS, precision: int = PRECISION,
+                 radius_m: int = RADIUS_M, timeout: float = TIMEOUT_SEC, workers: int = 4):
+        self.client: PlacesClient = client or GooglePlacesClient()
+        self.ttl, self.stale, self.error_ttl = ttl, stale, error_ttl
+        self.max_cells, self.precision = max_cells, precision
+        self.radius_m, self.timeout = radius_m, timeout
+        self._data: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: dict = {}
+        self._lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="places")
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits = self.stale_hits = self.misses = self.coalesced = 0
+        self.refreshes = self.wait_timeouts = 0
+        self.upstream_calls = self.upstream_errors = 0
+        self.upstream_ms_total = 0.0
+        self.upstream_ms_max = 0.0
+
+    def lookup(self, lat: float, lng: float) -> List[dict]:
+        """Restaurants near (lat, lng); [] when unknown and upstream is slow or down."""
+        cell, clat, clng = geohash_cell(lat, lng, self.precision)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(cell)
+            if entry is not None and now < entry.stale_until:
+                self._data.move_to_end(cell)
+                if now < entry.fresh_until:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    if cell not in self._inflight:
+                        self.refreshes += 1
+                        self._start(cell, clat, clng)
+                return list(entry.places)
+            self.misses += 1
+            future = self._inflight.get(cell)
+            if future is None:
+                future = self._start(cell, clat, clng)
+            else:
+                self.coalesced += 1
+        return list(self._wait(future))
+
+    def _start(self, cell: str, lat: float, lng: float) -> concurrent.futures.Future:
+        # Caller holds the lock.
+        future = self._pool.submit(self._fetch, cell, lat, lng)
+        self._inflight[cell] = future
+        return future
+
+    def _wait(self, future: concurrent.futures.Future) -> List[dict]:
+        is_cancelled = current_cancel_check()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                return future.result(timeout=max(min(remaining, 0.1), 0))
+            except concurrent.futures.TimeoutError:
+                if remaining <= 0 or (is_cancelled is not None and is_cancelled()):
+                    with self._lock:
+                        self.wait_timeouts += 1
+                    return []
+
+    def _fetch(self, cell: str, lat: float, lng: float) -> List[dict]:
+        started = time.perf_counter()
+        try:
+            places, ok = self.client(lat, lng, self.radius_m), True
+        except Exception as e:
+            logger.warning("Places lookup for cell %s failed: %s", cell, e)
+            places, ok = None, False
+        ms = (time.perf_counter() - started) * 1000
+        now = time.monotonic()
+        with self._lock:
+            try:
+                self.upstream_calls += 1
+                self.upstream_ms_total += ms
+                self.upstream_ms_max = max(self.upstream_ms_max, ms)
+                if ok:
+                    self._store(cell, _Entry(list(places), now + self.ttl,
+                                             now + self.ttl + self.stale))
+                    return places
+                self.upstream_errors += 1
+                entry = self._data.get(cell)
+                if entry is not None and entry.places and now < entry.stale_until:
+                    return entry.places  # keep serving the stale list
+                self._store(cell, _Entry([], now + self.error_ttl, now + self.error_ttl))
+                return []
+            finally:
+                self._inflight.pop(cell, None)
+
+    def _store(self, cell: str, entry: _Entry) -> None:
+        self._data[cell] = entry
+        self._data.move_to_end(cell)
+        while len(self._data) > self.max_cells:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            calls = self.upstream_calls
+            return {
+                "cells": len(self._data),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+                "coalesced": self.coalesced,
+                "refreshes": self.refreshes,
+                "wait_timeouts": self.wait_timeouts,
+                "upstream_calls": calls,
+                "upstream_errors": self.upstream_errors,
+                "upstream_ms_avg": round(self.upstream_ms_total / calls, 1) if calls else None,
+                "upstream_ms_max": round(self.upstream_ms_max, 1) if calls else None,
+            }
+
+
+_cache = RestaurantCache()
+
+
+def nearby_restaurants(lat: float, lng: float) -> List[dict]:
+    return _cache.lookup(lat, lng)
+
+
+def set_places_client(client: PlacesClient) -> None:
+    """Swap the upstream client (e.g. a local fake) and drop cached cells."""
+    _cache.client = client
+    _cache.clear()
+
+
+def places_cache_stats() -> dict:
+    """Snapshot for /metrics."""
+    return _cache.stats()
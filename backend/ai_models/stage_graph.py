@@ -0,0 +1,142 @@
+"""
+Tiny dependency-graph runner for the multi-agent pipeline.
+
+NutritionMultiAgent used to run its stages back to back — profile queries,
+then the Places lookup (up to 6s), then food extraction/lookup/estimation —
+although only the final analysis needs the profile. StageGraph starts every
+stage as soon as the stages it depends on have finished, so independent
+stages overlap and the pipeline costs roughly its slowest branch.
+
+Each stage may have its own deadline (seconds from when it started). An
+optional stage that misses it, or raises, yields its `fallback` instead
+and the graph carries on; its cancel check flips, so an LLM call inside
+stops at the next chunk (llm_provider.cancel_scope). A required stage that
+raises aborts the whole graph with that exception.
+
+Stages run on a shared thread pool (AGENT_STAGE_WORKERS, default 16) in a
+copy of the caller's contextvars, so the Sentry scope and any outer cancel
+check (the AI executor job) carry over.
+
+Usage:
+    graph = StageGraph()
+    graph.add("profile", fetch_profile, user_id)
+    graph.add("places", fetch_places, lat, lng, deadline=3, optional=True, fallback=[])
+    graph.add("answer", build, after=("profile", "places"))
+    results, timings = graph.run()
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ai_models.llm_provider import GenerationCancelled, cancel_scope, current_cancel_check
+
+logger = logging.getLogger(__name__)
+
+_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv("AGENT_STAGE_WORKERS", "16")),
+    thread_name_prefix="agent-stage",
+)
+
+
+class _Stage:
+    __slots__ = ("name", "fn", "args", "after", "deadline", "optional", "fallback",
+                 "cancel", "started_at")
+
+    def __init__(self, name, fn, args, after, deadline, optional, fallback):
+        self.name, self.fn, self.args = name, fn, args
+        self.after, self.deadline = tuple(after), deadline
+        self.optional, self.fallback = optional, fallback
+        self.cancel = threading.Event()
+        self.started_at = 0.0
+
+
+class StageGraph:
+    def __init__(self):
+        self._stages: Dict[str, _Stage] = {}
+
+    def add(self, name: str, fn: Callable, *args, after: Tuple[str, ...] = (),
+            deadline: Optional[float] = None, optional: bool = False,
+            fallback: Any = None) -> None:
+        """Register fn(*args, *results_of_after) as stage `name`."""
+        if name in self._stages:
+            raise ValueError(f"duplicate stage {name!r}")
+        self._stages[name] = _Stage(name, fn, args, after, deadline, optional, fallback)
+
+    def run(self) -> Tuple[Dict[str, Any], Dict[str, dict]]:
+        """
+        Run every stage; returns (results, timings) where timings maps each
+        stage to {"ms": float, "status": "ok" | "timeout" | "error"}.
+        """
+        outer = current_cancel_check()
+        pending = dict(self._stages)
+        running: Dict[concurrent.futures.Future, _Stage] = {}
+        results: Dict[str, Any] = {}
+        timings: Dict[str, dict] = {}
+
+        def settle(stage: _Stage, value, status: str) -> None:
+            results[stage.name] = value
+            timings[stage.name] = {
+                "ms": round((time.monotonic() - stage.started_at) * 1000, 1),
+                "status": status,
+            }
+
+        try:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.after):
+                        del pending[name]
+                        deps = [results[dep] for dep in stage.after]
+                        running[self._start(stage, deps, outer)] = stage
+                if not running:
+                    raise ValueError(f"unsatisfiable stage dependencies: {sorted(pending)}")
+
+                now = time.monotonic()
+                due = [s.started_at + s.deadline for s in running.values() if s.deadline is not None]
+                timeout = max(min(due) - now, 0) if due else None
+                done, _ = concurrent.futures.wait(
+                    running, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        settle(stage, future.result(), "ok")
+                    except Exception as e:
+                        if not stage.optional:
+                            raise
+                        logger.warning("stage %s failed, using fallback: %s", stage.name, e)
+                        settle(stage, stage.fallback, "error")
+
+                now = time.monotonic()
+                for future, stage in list(running.items()):
+                    if stage.deadline is not None and now >= stage.started_at + stage.deadline:
+                        del running[future]
+                        stage.cancel.set()
+                        if not stage.optional:
+                            raise TimeoutError(f"stage {stage.name} exceeded {stage.deadline}s")
+                        logger.warning("stage %s missed its %.1fs deadline, using fallback",
+                                       stage.name, stage.deadline)
+                        settle(stage, stage.fallback, "timeout")
+        finally:
+            for stage in running.values():
+                stage.cancel.set()
+        return results, timings
+
+    @staticmethod
+    def _start(stage: _Stage, deps: list, outer) -> concurrent.futures.Future:
+        def is_cancelled() -> bool:
+            return stage.cancel.is_set() or (outer is not None and outer())
+
+        def call():
+            if is_cancelled():
+                raise GenerationCancelled(f"stage {stage.name} cancelled before start")
+            with cancel_scope(is_cancelled):
+                return stage.fn(*stage.args, *deps)
+
+        stage.started_at = time.monotonic()
+        return _POOL.submit(contextvars.copy_context().run, call)
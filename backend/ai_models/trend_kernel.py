@@ -0,0 +1,158 @@
+"""
+NumPy kernels for the coach's weight-trend analytics.
+
+WeightTrendAnalyzer used to build a pandas DataFrame and fit an sklearn
+LinearRegression on at most 30 points per request; the import alone cost
+more than the fit, and the per-call DataFrame/estimator overhead dominated
+the arithmetic. These kernels work on plain float arrays, 1-D for one
+series or 2-D (one row per user, NaN-padded) for many at once:
+
+  least_squares(x, y) — closed-form OLS slope/intercept; the same fit as
+                         LinearRegression (centred normal equations)
+  theil_sen(x, y)     — median of pairwise slopes; one mis-typed weigh-in
+                         doesn't swing the trend
+  ewma(x, y, h)       — time-aware exponentially weighted mean (half-life
+                         h days, pandas' adjust=True form) for smoothing
+                         noisy daily weights
+
+pad_series() stacks ragged per-user series into the 2-D layout, so a
+nightly job can fit every user in one vectorized call
+(WeightTrendAnalyzer.analyze_many). x is days since the first log.
+
+The analyzer picks the estimator from WEIGHT_TREND_METHOD (default "ols";
+"theil_sen" also measures progress from the EWMA-smoothed weight, half-life
+WEIGHT_TREND_HALFLIFE_DAYS, default 7).
+
+Usage:
+    from ai_models.trend_kernel import least_squares, pad_series
+    x, y = pad_series([(days_a, kg_a), (days_b, kg_b)])
+    slopes, intercepts = least_squares(x, y)
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Iterable, Sequence, Tuple
+
+import numpy as np
+
+
+def days_since_first(dates: Sequence) -> np.ndarray:
+    """Whole days since the earliest date (ISO strings, date or datetime), like pandas' .dt.days."""
+    stamps = [_as_datetime(d) for d in dates]
+    if not stamps:
+        return np.empty(0)
+    first = min(stamps)
+    return np.array([(s - first).days for s in stamps], dtype=float)
+
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    elif not isinstance(value, datetime):
+        if not isinstance(value, date):
+            raise TypeError(f"not a date: {value!r}")
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def pad_series(series: Iterable[Tuple[Sequence[float], Sequence[float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack (x, y) pairs of different lengths into two NaN-padded 2-D arrays."""
+    series = list(series)
+    width = max((len(x) for x, _ in series), default=0)
+    xs = np.full((len(series), width), np.nan)
+    ys = np.full((len(series), width), np.nan)
+    for i, (x, y) in enumerate(series):
+        xs[i, :len(x)] = x
+        ys[i, :len(y)] = y
+    return xs, ys
+
+
+def _rows(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    single = x.ndim == 1
+    if single:
+        x, y = x[None, :], y[None, :]
+    return x, y, ~(np.isnan(x) | np.isnan(y)), single
+
+
+def _out(single, *arrays):
+    return tuple(float(a[0]) for a in arrays) if single else arrays
+
+
+def least_squares(x, y):
+    """
+    OLS fit of y on x, ignoring NaN pairs. Returns (slope, intercept) as
+    floats for 1-D input, arrays for 2-D. A series with no spread in x
+    gets slope 0 and the mean as intercept (what lstsq's minimum-norm
+    solution gives).
+    """
+    x, y, mask, single = _rows(x, y)
+    n = mask.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(mask, x, 0.0).sum(axis=1) / n
+        y_mean = np.where(mask, y, 0.0).sum(axis=1) / n
+        xc = np.where(mask, x - x_mean[:, None], 0.0)
+        yc = np.where(mask, y - y_mean[:, None], 0.0)
+        sxx = (xc * xc).sum(axis=1)
+        slope = np.where(sxx > 0, (xc * yc).sum(axis=1) / sxx, 0.0)
+    intercept = y_mean - slope * x_mean
+    return _out(single, slope, intercept)
+
+
+def theil_sen(x, y):
+    """
+    Theil–Sen fit: the median slope over all pairs with distinct x, and the
+    median of y - slope*x as intercept. Same shapes and degenerate case as
+    least_squares(). O(n²) pairs, which is nothing at 30 weigh-ins.
+    """
+    x, y, mask, single = _rows(x, y)
+    dx = x[:, None, :] - x[:, :, None]
+    dy = y[:, None, :] - y[:, :, None]
+    width = x.shape[1]
+    upper = np.triu(np.ones((width, width), dtype=bool), k=1)
+    pairs = upper & mask[:, None, :] & mask[:, :, None] & (dx != 0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slopes = np.where(pairs, dy / np.where(dx == 0, 1.0, dx), np.nan)
+    slope = _nanmedian(slopes.reshape(len(x), -1))
+    slope = np.where(np.isnan(slope), 0.0, slope)
+    intercept = _nanmedian(np.where(mask, y - slope[:, None] * x, np.nan))
+    return _out(single, slope, intercept)
+
+
+def ewma(x, y, halflife: float):
+    """
+    Exponentially weighted mean of y at each x, with weights halving every
+    `halflife` units of x (pandas' ewm(halflife=..., times=...).mean()).
+    Expects x sorted ascending per row; NaN pairs are skipped. Returns an
+    array shaped like y.
+    """
+    x, y, mask, single = _rows(x, y)
+    age = x[:, :, None] - x[:, None, :]  # [row, at, from]
+    width = x.shape[1]
+    past = np.tril(np.ones((width, width), dtype=bool)) & mask[:, None, :]
+    with np.errstate(invalid="ignore"):
+        weights = np.where(past, np.power(0.5, np.where(past, age, 0.0) / halflife), 0.0)
+        total = weights.sum(axis=2)
+        smoothed = (weights * np.where(mask, y, 0.0)[:, None, :]).sum(axis=2) / total
+    smoothed = np.where(mask, smoothed, np.nan)
+    return smoothed[0] if single else smoothed
+
+
+def last_valid(values) -> np.ndarray:
+    """The last non-NaN value of each row (NaN for an all-NaN row)."""
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    valid = ~np.isnan(values)
+    idx = values.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    picked = values[np.arange(len(values)), idx]
+    return np.where(valid.any(axis=1), picked, np.nan)
+
+
+def _nanmedian(values: np.ndarray) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    has = ~np.isnan(values).all(axis=1)
+    if has.any():
+        out[has] = np.nanmedian(values[has], axis=1)
+    return out
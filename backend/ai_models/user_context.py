@@ -0,0 +1,326 @@
+"""
+Per-user context snapshot shared by the AI agents and /insights.
+
+DataOrchestratorAgent.fetch and CoachingAgent.fetch_user_context each ran
+five sequential queries for nearly the same data (profile, allergies,
+intake, weight logs, recent foods), and /insights/{user_id} ran a sixth
+aggregate over the same daily summaries. UserContextSnapshot is built in
+one round trip (_SNAPSHOT_SQL: the profile row plus JSON-aggregated
+sub-selects) and every consumer reads the view it needs from it:
+
+  as_agent_context()   — DataOrchestratorAgent.fetch() shape
+  as_coach_context()   — CoachingAgent.fetch_user_context() shape
+  insights_overview()  — GET /insights/{user_id} body
+
+Snapshots are cached per user for USER_CONTEXT_TTL_SECONDS (default 60) in
+a process-local LRU of USER_CONTEXT_MAX_ENTRIES (default 2048). Routes that
+write meals/detail_items, weight_logs, user_allergy_preferences or users
+call invalidate_user_context(user_id) after committing; a build that raced
+with such a write is not stored. Other workers/instances see the write when
+their copy expires, so the TTL is the staleness bound across processes.
+Caches derived from the same writes (app/services/response_cache.py)
+register with add_invalidation_listener() to be told too.
+
+Usage:
+    from ai_models.user_context import get_user_context
+    snap = get_user_context(user_id)        # None if the user doesn't exist
+    ctx = snap.as_agent_context()
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+
+from psycopg2.extras import RealDictCursor
+
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+TTL_SECONDS = float(os.getenv("USER_CONTEXT_TTL_SECONDS", "60"))
+MAX_ENTRIES = int(os.getenv("USER_CONTEXT_MAX_ENTRIES", "2048"))
+
+# Summary days kept (the /insights window; the coach reads the newest 7),
+# weight logs kept, and detail_items kept from the last 3 days.
+HISTORY_DAYS = 30
+WEIGHT_LOGS = 30
+RECENT_ITEMS = 200
+
+# One statement. `days` reads the per-day macros the summary triggers keep
+# in daily_summaries (migrations/v8, v26) — one index range, no join to
+# meals/detail_items.
+_SNAPSHOT_SQL = """
+    WITH days AS (
+        SELECT ds.date_record,
+               ds.total_calories_intake AS calories,
+               COALESCE(ds.total_protein, 0) AS protein,
+               COALESCE(ds.total_carbs, 0) AS carbs,
+               COALESCE(ds.total_fat, 0) AS fat
+        FROM daily_summaries ds
+        WHERE ds.user_id = %(user_id)s
+          AND ds.date_record >= %(today)s::date - %(history_days)s
+    )
+    SELECT u.username, u.gender, u.birth_date, u.height_cm, u.current_weight_kg,
+           u.goal_type, u.target_weight_kg, u.target_calories,
+           COALESCE(u.target_protein, 0) AS target_protein,
+           COALESCE(u.target_carbs, 0) AS target_carbs,
+           COALESCE(u.target_fat, 0) AS target_fat,
+           u.activity_level, u.region::text AS region,
+           COALESCE(u.current_streak, 0) AS current_streak,
+           COALESCE(u.total_login_days, 0) AS total_login_days,
+           (SELECT COALESCE(json_agg(f.name ORDER BY f.name), '[]'::json)
+              FROM user_allergy_preferences uap
+              JOIN allergy_flags f ON f.flag_id = uap.flag_id
+             WHERE uap.user_id = u.user_id) AS allergies,
+           (SELECT COALESCE(json_agg(d ORDER BY d.date_record DESC), '[]'::json)
+              FROM days d) AS days,
+           (SELECT COALESCE(json_agg(w), '[]'::json)
+              FROM (SELECT recorded_date::text AS date, weight_kg AS weight
+                      FROM weight_logs
+                     WHERE user_id = u.user_id
+                     ORDER BY recorded_date DESC
+                     LIMIT %(weight_logs)s) w) AS weight_logs,
+           (SELECT COALESCE(json_agg(r), '[]'::json)
+              FROM (SELECT d.food_name, d.amount, d.cal_per_unit, d.protein_per_unit,
+                           d.carbs_per_unit, d.fat_per_unit, d.created_at
+                      FROM detail_items d
+                      JOIN meals m ON m.meal_id = d.meal_id
+                     WHERE m.user_id = u.user_id
+                       AND m.created_at >= NOW() - INTERVAL '3 days'
+                     ORDER BY d.created_at DESC
+                     LIMIT %(recent_items)s) r) AS recent_items
+    FROM users u
+    WHERE u.user_id = %(user_id)s
+"""
+
+_JSON_COLUMNS = ("allergies", "days", "weight_logs", "recent_items")
+
+
+class UserContextSnapshot:
+    """Everything the agents and /insights read about one user, as of `today`."""
+
+    __slots__ = ("user_id", "today", "profile", "allergies", "days",
+                 "weight_logs", "recent_items", "built_at")
+
+    EMPTY_OVERVIEW = {"total_days_logged": 0, "avg_calories": 0, "days_on_target": 0,
+                      "avg_protein": 0, "avg_carbs": 0, "avg_fat": 0,
+                      "best_day_diff": None, "current_streak": 0}
+
+    def __init__(self, user_id: int, today: date, row: dict):
+        self.user_id = user_id
+        self.today = today
+        self.allergies: list = list(row.get("allergies") or [])
+        # Newest first: {"date_record", "calories", "protein", "carbs", "fat"}
+        self.days: list = list(row.get("days") or [])
+        # Newest first: {"date": "YYYY-MM-DD", "weight"}
+        self.weight_logs: list = list(row.get("weight_logs") or [])
+        # Newest first, last 3 days of detail_items.
+        self.recent_items: list = list(row.get("recent_items") or [])
+        self.profile: dict = {k: v for k, v in row.items() if k not in _JSON_COLUMNS}
+        self.built_at = time.monotonic()
+
+    @property
+    def today_intake(self) -> dict:
+        today = self.today.isoformat()
+        for d in self.days:
+            if d["date_record"] == today:
+                return {
+                    "total_calories_intake": d["calories"] or 0,
+                    "total_protein": d["protein"],
+                    "total_carbs": d["carbs"],
+                    "total_fat": d["fat"],
+                }
+        return {"total_calories_intake": 0, "total_protein": 0,
+                "total_carbs": 0, "total_fat": 0}
+
+    def recent_foods(self, limit: int = 20) -> list:
+        """Distinct recently eaten foods with per-unit nutrition."""
+        seen, out = set(), []
+        for it in self.recent_items:
+            key = (it["food_name"], it["cal_per_unit"], it["protein_per_unit"],
+                   it["carbs_per_unit"], it["fat_per_unit"])
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append({"food_name": key[0], "cal_per_unit": key[1], "protein_per_unit": key[2],
+                        "carbs_per_unit": key[3], "fat_per_unit": key[4]})
+            if len(out) >= limit:
+                break
+        return out
+
+    def as_agent_context(self) -> dict:
+        return {
+            "profile": dict(self.profile),
+            "allergies": list(self.allergies),
+            "today_intake": self.today_intake,
+            "weight_logs": [dict(w) for w in self.weight_logs],
+            "recent_foods": self.recent_foods(),
+        }
+
+    def as_coach_context(self) -> dict:
+        return {
+            "profile": dict(self.profile),
+            "weight_logs": [dict(w) for w in self.weight_logs],
+            "daily_summaries": [{"date": d["date_record"], "calories": d["calories"]}
+                                for d in self.days[:7]],
+            "recent_foods": [{"food_name": it["food_name"], "amount": it["amount"],
+                              "cal_per_unit": it["cal_per_unit"], "created_at": it["created_at"]}
+                             for it in self.recent_items],
+            "allergies": list(self.allergies),
+        }
+
+    def insights_overview(self) -> dict:
+        """30-day adherence summary (GET /insights/{user_id}); same numbers
+        the old SQL aggregate produced — NULL calories count as logged days
+        but are left out of the averages."""
+        if not self.days:
+            return dict(self.EMPTY_OVERVIEW)
+        target = self.profile.get("target_calories")
+        calories = [float(d["calories"]) for d in self.days if d["calories"] is not None]
+        diffs = [abs(c - float(target)) for c in calories] if target is not None else []
+        n = len(self.days)
+
+        def avg(key):
+            return round(sum(float(d[key]) for d in self.days) / n, 1)
+
+        return {
+            "total_days_logged": n,
+            "avg_calories": int(round(sum(calories) / len(calories))) if calories else None,
+            "days_on_target": sum(1 for x in diffs if target > 0 and x <= target * 0.1),
+            "avg_protein": avg("protein"),
+            "avg_carbs": avg("carbs"),
+            "avg_fat": avg("fat"),
+            "best_day_diff": int(round(min(diffs))) if diffs else None,
+            "current_streak": self.profile.get("current_streak") or 0,
+        }
+
+
+def build_user_context(user_id: int, conn=None, today: Optional[date] = None) -> Optional[UserContextSnapshot]:
+    """Uncached build; None if the user doesn't exist. DB errors propagate."""
+    today = today or date.today()
+    own = conn is None
+    if own:
+        conn = get_db_connection()
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(_SNAPSHOT_SQL, {
+            "user_id": user_id, "today": today, "history_days": HISTORY_DAYS,
+            "weight_logs": WEIGHT_LOGS, "recent_items": RECENT_ITEMS,
+        })
+        row = cur.fetchone()
+        return UserContextSnapshot(user_id, today, dict(row)) if row else None
+    finally:
+        if own:
+            conn.close()
+
+
+class _SnapshotCache:
+    def __init__(self, ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.ttl, self.max_entries = ttl, max_entries
+        self._data: "OrderedDict[int, UserContextSnapshot]" = OrderedDict()
+        # Bumped by invalidate(); a build only stores if it didn't move.
+        # Kept for the max_entries most recently invalidated users only, so
+        # it doesn't grow with every user id the process has seen.
+        self._generation: "OrderedDict[int, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.invalidations = 0
+        self.builds = 0
+        self.build_ms_total = 0.0
+        self.build_ms_max = 0.0
+
+    def get(self, user_id: int) -> Optional[UserContextSnapshot]:
+        today = date.today()
+        with self._lock:
+            snap = self._data.get(user_id)
+            if snap is not None and snap.today == today and \
+                    time.monotonic() - snap.built_at < self.ttl:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return snap
+            self.misses += 1
+            generation = self._generation.get(user_id, 0)
+
+        started = time.perf_counter()
+        snap = build_user_context(user_id, today=today)
+        ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self.builds += 1
+            self.build_ms_total += ms
+            self.build_ms_max = max(self.build_ms_max, ms)
+            if snap is not None and self._generation.get(user_id, 0) == generation:
+                self._data[user_id] = snap
+                self._data.move_to_end(user_id)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+        return snap
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+            self._generation[user_id] = self._generation.get(user_id, 0) + 1
+            self._generation.move_to_end(user_id)
+            while len(self._generation) > self.max_entries:
+                self._generation.popitem(last=False)
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._generation.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "invalidations": self.invalidations,
+                "build_ms_avg": round(self.build_ms_total / self.builds, 1) if self.builds else None,
+                "build_ms_max": round(self.build_ms_max, 1) if self.builds else None,
+            }
+
+
+_cache = _SnapshotCache()
+_listeners: list = []
+
+
+def add_invalidation_listener(listener) -> None:
+    """listener(user_id) runs after every invalidate_user_context()."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def get_user_context(user_id: int) -> Optional[UserContextSnapshot]:
+    """Cached snapshot for user_id (None if the user doesn't exist)."""
+    return _cache.get(user_id)
+
+
+def invalidate_user_context(user_id: int) -> None:
+    """Call after committing a write that changes what the snapshot holds."""
+    _cache.invalidate(user_id)
+    for listener in _listeners:
+        try:
+            listener(user_id)
+        except Exception as e:
+            logger.warning("invalidation listener %r failed for user %s: %s", listener, user_id, e)
+
+
+def user_context_stats() -> dict:
+    """Snapshot for /metrics."""
+    return _cache.stats()
+
+
+def reset_user_context_cache() -> None:
+    _cache.clear()
+    _cache.reset_stats()
@@ -1,11 +1,29 @@
-import pandas as pd
+import os
+from typing import Hashable, Mapping, Optional, Tuple
+
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from datetime import datetime, date
+
+from ai_models.trend_kernel import days_since_first, ewma, last_valid, least_squares, pad_series, theil_sen
+
+# "ols" (least squares, the original behaviour) or "theil_sen" (robust slope,
+# progress measured from the EWMA-smoothed weight). See ai_models/trend_kernel.py.
+TREND_METHOD = os.getenv("WEIGHT_TREND_METHOD", "ols").strip().lower()
+HALFLIFE_DAYS = float(os.getenv("WEIGHT_TREND_HALFLIFE_DAYS", "7"))
+# Users per vectorized fit in analyze_many; Theil–Sen holds rows × 30 × 30 pairs.
+BATCH_ROWS = 256
+
+_INSUFFICIENT = {
+    "status": "insufficient_data",
+    "message": "ข้อมูลน้ำหนักย้อนหลังไม่เพียงพอ (ต้องการอย่างน้อย 3 วัน) เพื่อพยากรณ์ได้อย่างแม่นยำ"
+}
+
 
 class WeightTrendAnalyzer:
-    def __init__(self):
-        self.model = LinearRegression()
+    def __init__(self, method: Optional[str] = None, halflife_days: Optional[float] = None):
+        self.method = (method or TREND_METHOD).lower()
+        if self.method not in ("ols", "theil_sen"):
+            raise ValueError(f"unknown trend method: {self.method}")
+        self.halflife_days = halflife_days or HALFLIFE_DAYS
 
     def analyze_trend(self, weight_logs: list, target_weight: float) -> dict:
         """
@@ -14,31 +32,56 @@ class WeightTrendAnalyzer:
         :param target_weight: น้ำหนักเป้าหมายของผู้ใช้
         :return: dict หรือข้อความอธิบายทิศทาง
         """
-        if not weight_logs or len(weight_logs) < 3:
-            return {
-                "status": "insufficient_data",
-                "message": "ข้อมูลน้ำหนักย้อนหลังไม่เพียงพอ (ต้องการอย่างน้อย 3 วัน) เพื่อพยากรณ์ได้อย่างแม่นยำ"
-            }
+        return self.analyze_many({None: (weight_logs, target_weight)})[None]
 
-        # แปลงข้อมูลเป็น DataFrame
-        df = pd.DataFrame(weight_logs)
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
+    def analyze_many(self, series: Mapping[Hashable, Tuple[list, float]]) -> dict:
+        """
+        analyze_trend() สำหรับผู้ใช้หลายคนในครั้งเดียว (งาน nightly):
+        ทุกซีรีส์ถูก fit พร้อมกันแบบ vectorized
+        :param series: { user_id: (weight_logs, target_weight) }
+        :return: { user_id: ผลลัพธ์แบบเดียวกับ analyze_trend }
+        """
+        results, keys, rows = {}, [], []
+        for key, (logs, _) in series.items():
+            prepared = self._prepare(logs)
+            if prepared is None:
+                results[key] = dict(_INSUFFICIENT)
+            else:
+                keys.append(key)
+                rows.append(prepared)
+        for start in range(0, len(rows), BATCH_ROWS):
+            chunk = slice(start, start + BATCH_ROWS)
+            self._fit_chunk(series, keys[chunk], rows[chunk], results)
+        return results
 
-        # เริ่มต้นวันที่ 0
-        min_date = df['date'].min()
-        df['days_passed'] = (df['date'] - min_date).dt.days
-        
-        X = df[['days_passed']]
-        y = df['weight']
+    def _fit_chunk(self, series, keys, rows, results) -> None:
+        x, y = pad_series(rows)
+        fit = theil_sen if self.method == "theil_sen" else least_squares
+        slopes, intercepts = fit(x, y)
+        if self.method == "theil_sen":
+            current = last_valid(ewma(x, y, self.halflife_days))
+        else:
+            current = last_valid(y)
+        last_day = last_valid(x)
+        for i, key in enumerate(keys):
+            results[key] = self._verdict(slopes[i], intercepts[i], current[i], last_day[i],
+                                         float(series[key][1]))
 
-        # Train model
-        self.model.fit(X, y)
-        
-        slope = self.model.coef_[0]
-        intercept = self.model.intercept_
-        current_weight = df['weight'].iloc[-1]
-        
+    @staticmethod
+    def _prepare(weight_logs: list):
+        """(days since first log, weights) in date order, or None if under 3 logs."""
+        if not weight_logs or len(weight_logs) < 3:
+            return None
+        logs = [log for log in weight_logs if log.get('weight') is not None]
+        if len(logs) < 3:
+            return None
+        days = days_since_first([log['date'] for log in logs])
+        order = np.argsort(days, kind="stable")
+        weights = np.array([float(log['weight']) for log in logs])
+        return days[order], weights[order]
+
+    @staticmethod
+    def _verdict(slope, intercept, current_weight, last_day, target_weight) -> dict:
         # ถ้าน้ำหนักไม่เปลี่ยนแปลงเลย
         if abs(slope) < 0.001:
             return {
@@ -53,8 +96,8 @@ class WeightTrendAnalyzer:
             # ไปถูกทางแล้ว คำนวณวันที่จะถึงเป้า
             # target = slope * x + intercept -> x = (target - intercept) / slope
             target_day_index = (target_weight - intercept) / slope
-            days_to_target = max(0, int(target_day_index - df['days_passed'].iloc[-1]))
-            
+            days_to_target = max(0, int(target_day_index - last_day))
+
             return {
                 "status": "on_track",
                 "trend": "ลดลง" if slope < 0 else "เพิ่มขึ้น",
@@ -76,3 +76,21 @@ def note_failure(where: str, exc: BaseException, **tags: Any) -> None:
         sentry_sdk.capture_exception(exc)
     except Exception:
         pass
+
+
+def record_timings(prefix: str, timings: dict) -> None:
+    """Attach per-stage durations to the current transaction as measurements.
+
+    `timings` maps stage name -> {"ms": float, "status": str} (the shape
+    ai_models.stage_graph returns); shows up as `<prefix>.<stage>` in the
+    trace so slow stages can be charted per endpoint.
+    """
+    if not _HAS_SENTRY:
+        return
+    try:
+        for stage, t in timings.items():
+            sentry_sdk.set_measurement(f"{prefix}.{stage}", t["ms"], "millisecond")
+            if t.get("status") != "ok":
+                sentry_sdk.set_tag(f"{prefix}.{stage}", t["status"])
+    except Exception:
+        pass
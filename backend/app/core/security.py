@@ -1,6 +1,73 @@
+"""
+Password hashing off the request threadpool.
+
+/login, /register and /password-reset/confirm ran passlib bcrypt inside
+sync routes, so every hash (~200-300 ms at cost 12) held a Starlette
+threadpool slot — and a DB connection — for its full duration; the 8am
+login burst (streak bumps) starved every other sync endpoint sharing the
+pool. Those routes are now async and await PasswordHasher:
+
+  - PASSWORD_HASH_EXECUTOR=process (default): PASSWORD_HASH_WORKERS
+    (default: CPU count, at most 4) spawned worker processes, so hashing
+    never competes for this process's GIL or threadpool. "thread" uses a
+    dedicated thread pool instead (bcrypt releases the GIL) where spawning
+    processes is a problem; "inline" hashes on the event loop (tests only)
+  - at most workers + PASSWORD_HASH_MAX_QUEUE (default 8 per worker, so
+    a queued login waits ~2 s at worst) hashes in flight; beyond that
+    HashingOverloaded (route: 503 + Retry-After) instead of queueing work
+    the client will have given up on
+  - rehash on login: hashes are made with PASSWORD_HASH_SCHEMES (default
+    "bcrypt"; "argon2,bcrypt" migrates to argon2 and needs argon2-cffi) at
+    PASSWORD_BCRYPT_ROUNDS (default 12). verify() also returns a
+    replacement hash when passlib's needs_update() says the stored one uses
+    an old scheme or cost, and /login writes it back with the streak update
+  - counters (in flight, queue wait, hash time, rejections, rehashes) under
+    `password_hasher` in GET /metrics
+
+get_password_hash() / verify_password() stay synchronous for scripts.
+
+Usage:
+    from app.core.security import get_hasher
+    ok, new_hash = await get_hasher().verify(password, stored_hash)
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process").strip().lower()
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or min(os.cpu_count() or 1, 4)
+MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "0")) or 8 * WORKERS
+RETRY_AFTER_SEC = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SEC", "2"))
+
+
+def build_context(schemes: Optional[str] = None, bcrypt_rounds: Optional[int] = None) -> CryptContext:
+    """CryptContext for the configured schemes; the first one is used for new hashes."""
+    names = [s.strip() for s in (schemes or os.getenv("PASSWORD_HASH_SCHEMES", "bcrypt")).split(",") if s.strip()]
+    if "argon2" in names:
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            logger.warning("PASSWORD_HASH_SCHEMES lists argon2 but argon2-cffi is not installed; "
+                           "hashing with bcrypt")
+            names.remove("argon2")
+    if "bcrypt" not in names:
+        names.append("bcrypt")  # every existing hash is bcrypt
+    rounds = bcrypt_rounds or int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    return CryptContext(schemes=names, deprecated="auto", bcrypt__rounds=rounds)
+
+
+pwd_context = build_context()
 
 
 def get_password_hash(password: str) -> str:
@@ -9,3 +76,169 @@ def get_password_hash(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+# ── worker-side functions (module-level so the process pool can pickle them;
+# a spawned worker builds its own pwd_context from the inherited env) ──────
+def _ready() -> int:
+    return os.getpid()
+
+
+def _hash_job(password: str) -> Tuple[str, float]:
+    started = time.perf_counter()
+    hashed = pwd_context.hash(password)
+    return hashed, (time.perf_counter() - started) * 1000
+
+
+def _verify_job(password: str, stored: str) -> Tuple[bool, Optional[str], float]:
+    started = time.perf_counter()
+    try:
+        ok, new_hash = pwd_context.verify_and_update(password, stored)
+    except (ValueError, TypeError):
+        # Not a hash we know (social-login placeholder, NULL): no match.
+        ok, new_hash = False, None
+    return ok, new_hash, (time.perf_counter() - started) * 1000
+
+
+class HashingOverloaded(RuntimeError):
+    """Every worker and queue slot is taken; the route answers 503."""
+
+    def __init__(self, retry_after: int = RETRY_AFTER_SEC):
+        super().__init__("password hashing saturated")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Bounded pool for hash/verify with an async API."""
+
+    def __init__(self, mode: str = EXECUTOR, workers: int = WORKERS, max_queue: int = MAX_QUEUE,
+                 retry_after: int = RETRY_AFTER_SEC):
+        if mode not in ("process", "thread", "inline"):
+            raise ValueError(f"unknown PASSWORD_HASH_EXECUTOR: {mode}")
+        self.mode = mode
+        self.workers = max(workers, 1)
+        self.max_queue = max(max_queue, 0)
+        self.retry_after = retry_after
+        self._pool: Optional[concurrent.futures.Executor] = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        self.submitted = self.completed = self.failed = self.rejected = 0
+        self.verified = self.mismatches = self.rehashed = 0
+        self.wait_count = 0
+        self.wait_total_ms = self.wait_max_ms = 0.0
+        self.hash_total_ms = self.hash_max_ms = 0.0
+
+    def _executor(self) -> concurrent.futures.Executor:
+        with self._lock:
+            if self._pool is None:
+                if self.mode == "process":
+                    # spawn: forking a process that already runs threads
+                    # (the DB pool, AI workers) is not safe.
+                    self._pool = concurrent.futures.ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._pool = concurrent.futures.ThreadPoolExecutor(
+                        self.workers, thread_name_prefix="password-hash")
+            return self._pool
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._inflight >= self.workers + self.max_queue:
+                self.rejected += 1
+                logger.warning("password hashing rejected: %d in flight", self._inflight)
+                raise HashingOverloaded(self.retry_after)
+            self._inflight += 1
+            self.submitted += 1
+        started = time.perf_counter()
+        ok = False
+        try:
+            if self.mode == "inline":
+                result = fn(*args)
+            else:
+                result = await asyncio.wrap_future(self._executor().submit(fn, *args))
+            ok = True
+            return result
+        finally:
+            total_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._inflight -= 1
+                if ok:
+                    self.completed += 1
+                    hash_ms = result[-1]
+                    waited_ms = max(total_ms - hash_ms, 0.0)
+                    self.wait_count += 1
+                    self.wait_total_ms += waited_ms
+                    self.wait_max_ms = max(self.wait_max_ms, waited_ms)
+                    self.hash_total_ms += hash_ms
+                    self.hash_max_ms = max(self.hash_max_ms, hash_ms)
+                else:
+                    self.failed += 1
+
+    async def hash(self, password: str) -> str:
+        hashed, _ = await self._run(_hash_job, password)
+        return hashed
+
+    async def verify(self, password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """(matches, replacement hash or None). The replacement is only set on a match."""
+        if not stored:
+            return False, None
+        ok, new_hash, _ = await self._run(_verify_job, password, stored)
+        with self._lock:
+            self.verified += 1
+            self.mismatches += 0 if ok else 1
+            self.rehashed += 1 if new_hash else 0
+        return ok, new_hash
+
+    def warm(self) -> None:
+        """Spawn the worker processes now so the first login doesn't pay for it."""
+        if self.mode == "process":
+            pool = self._executor()
+            for f in [pool.submit(_ready) for _ in range(self.workers)]:
+                f.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "scheme": pwd_context.default_scheme(),
+                "in_flight": self._inflight,
+                "queued": max(self._inflight - self.workers, 0),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "verified": self.verified,
+                "mismatches": self.mismatches,
+                "rehashed": self.rehashed,
+                "wait_ms_avg": round(self.wait_total_ms / self.wait_count, 1) if self.wait_count else None,
+                "wait_ms_max": round(self.wait_max_ms, 1) if self.wait_count else None,
+                "hash_ms_avg": round(self.hash_total_ms / self.wait_count, 1) if self.wait_count else None,
+                "hash_ms_max": round(self.hash_max_ms, 1) if self.wait_count else None,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._reset_counters()
+
+
+_hasher = PasswordHasher()
+
+
+def get_hasher() -> PasswordHasher:
+    return _hasher
+
+
+def password_hasher_stats() -> dict:
+    """Snapshot for /metrics."""
+    return _hasher.stats()
@@ -6,6 +6,7 @@ from psycopg2.extras import RealDictCursor
 from database import get_db_connection
 from auth.dependencies import get_current_admin
 from app.models.schemas import AdminFoodReview, RegionalNameApprove, TempFoodApprove
+from app.services.food_index import food_index
 
 router = APIRouter()
 
@@ -57,28 +58,38 @@ def admin_pending_count(current_user: dict = Depends(get_current_admin)):
             conn.close()
 
 
+# Trigram-similar (`%`) or substring matches, all served by
+# idx_foods_name_trgm; most similar first.
+_SIMILAR_FOODS_SQL = """
+    SELECT food_id, food_name, calories, protein, carbs, fat, image_url,
+           ROUND(similarity(food_name, %(name)s)::numeric, 3) AS similarity
+    FROM foods
+    WHERE food_name %% %(name)s
+       OR food_name ILIKE %(pattern)s
+       OR food_name ILIKE %(first_word)s
+    ORDER BY similarity(food_name, %(name)s) DESC, food_name
+    LIMIT 5
+"""
+
+
 @router.get("/admin/foods/similar")
 def admin_similar_foods(name: str = "", current_user: dict = Depends(get_current_admin)):
     """
     หาเมนูในตาราง foods ที่ชื่อคล้ายกับ name ที่ส่งมา.
-    ใช้ ILIKE เพื่อ detect duplicate ก่อน admin อนุมัติ.
+    ใช้ pg_trgm similarity (migrations/v29) เพื่อ detect duplicate ก่อน admin
+    อนุมัติ — จับได้แม้สะกดผิด เรียงจากคล้ายที่สุด.
     """
-    if not name.strip():
+    name = name.strip()
+    if not name:
         return []
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute(
-            """
-            SELECT food_id, food_name, calories, protein, carbs, fat, image_url
-            FROM foods
-            WHERE food_name ILIKE %s
-               OR food_name ILIKE %s
-            ORDER BY food_name
-            LIMIT 5
-            """,
-            (f"%{name.strip()}%", f"%{name.strip().split()[0]}%"),
-        )
+        cur.execute(_SIMILAR_FOODS_SQL, {
+            "name": name,
+            "pattern": f"%{name}%",
+            "first_word": f"%{name.split()[0]}%",
+        })
         return cur.fetchall()
     finally:
         if conn:
@@ -255,6 +266,8 @@ def admin_approve_temp_food(tf_id: int, req: TempFoodApprove, current_user: dict
         )
         new_food = cur.fetchone()
         conn.commit()
+        if new_food:
+            food_index.refresh_food(conn, new_food["food_id"])
         return {"message": "Approved and added to foods", "food_id": new_food["food_id"] if new_food else None}
     except HTTPException:
         raise
@@ -399,6 +412,7 @@ def admin_approve_regional_name_submission(
             (req.admin_id, submission_id),
         )
         conn.commit()
+        food_index.refresh_food(conn, submission["food_id"])
         return {
             "message": "Regional name approved",
             "variant_id": variant["variant_id"] if variant else None,
@@ -0,0 +1,100 @@
+"""
+Async twins of the hottest read/write endpoints, mounted under /async.
+
+Same auth, same SQL (imported from the sync routers), same response shape —
+the only difference is that they await psycopg 3 on the event loop instead
+of borrowing a threadpool slot. Clients can switch per endpoint by adding
+the /async prefix; backend/scripts/loadtest/async_vs_sync.js compares both.
+"""
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Depends
+from starlette.concurrency import run_in_threadpool
+
+from database_async import async_db_connection
+from ai_models.user_context import invalidate_user_context
+from auth.dependencies import get_current_user
+from app.core.dependencies import check_ownership
+from app.core.observability import track, note_failure
+from app.models.schemas import DailyLogUpdate
+from app.routers.foods import _SEARCH_FOODS_SQL, _cached_user_region, _search_params
+from app.routers.meals import (
+    _INSERT_MEAL_WITH_ITEMS_SQL, _CALORIE_NUDGE_SQL, _SUMMARY_USER_SQL, _SUMMARY_TOTAL_SQL,
+    _SUMMARY_MACROS_SQL, _SUMMARY_MENUS_SQL,
+    _meal_insert_params, _build_daily_summary,
+)
+from app.routers.notifications import _UNREAD_COUNT_SQL
+from app.services.food_index import food_index, maybe_reload_food_index
+
+router = APIRouter(prefix="/async")
+
+
+@router.post("/meals/{user_id}")
+async def add_meal(user_id: int, log: DailyLogUpdate, current_user: dict = Depends(get_current_user)):
+    check_ownership(current_user, user_id)
+    with track("meal.create", "POST /async/meals",
+               user_id=user_id, meal_type=log.meal_type, items=len(log.items)):
+        try:
+            async with async_db_connection() as conn:
+                params = _meal_insert_params(user_id, log)
+                await conn.execute(_INSERT_MEAL_WITH_ITEMS_SQL, params)
+                try:
+                    # Nested transaction() = savepoint: a failed nudge keeps the meal.
+                    async with conn.transaction():
+                        await conn.execute(_CALORIE_NUDGE_SQL, params)
+                except Exception as e:
+                    note_failure("meals.calorie_nudge", e, user_id=user_id)
+            invalidate_user_context(user_id)
+            return {"message": "Meal recorded successfully"}
+        except Exception as e:
+            note_failure("meals.add_meal", e, user_id=user_id)
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/daily_summary/{user_id}")
+async def get_daily_summary(user_id: int, date_record: date, current_user: dict = Depends(get_current_user)):
+    check_ownership(current_user, user_id)
+    try:
+        async with async_db_connection() as conn:
+            cur = await conn.execute(_SUMMARY_USER_SQL, (user_id,))
+            user_row = await cur.fetchone()
+            cur = await conn.execute(_SUMMARY_TOTAL_SQL, (user_id, date_record))
+            total_row = await cur.fetchone()
+            cur = await conn.execute(_SUMMARY_MACROS_SQL, (user_id, date_record))
+            macro = await cur.fetchone()
+            cur = await conn.execute(_SUMMARY_MENUS_SQL, (user_id, date_record))
+            menu_rows = await cur.fetchall()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return _build_daily_summary(user_row, total_row, macro, menu_rows)
+
+
+@router.get("/foods/search")
+async def search_foods(q: str = "", user_id: int | None = None, limit: int = 20):
+    """Async twin of GET /foods/search — see foods.search_foods for semantics."""
+    q = (q or "").strip()
+    if not q:
+        return []
+    maybe_reload_food_index()
+    try:
+        # A snapshot miss builds through the sync pool, off the event loop.
+        region = await run_in_threadpool(_cached_user_region, user_id) if user_id else None
+        if food_index.ready:
+            return food_index.search(q, region, limit)
+        async with async_db_connection() as conn:
+            cur = await conn.execute(_SEARCH_FOODS_SQL, _search_params(q, region, limit))
+            return await cur.fetchall()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/notifications/{user_id}/unread_count")
+async def get_unread_count(user_id: int, current_user: dict = Depends(get_current_user)):
+    check_ownership(current_user, user_id)
+    try:
+        async with async_db_connection() as conn:
+            cur = await conn.execute(_UNREAD_COUNT_SQL, (user_id,))
+            row = await cur.fetchone()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"unread_count": row["count"]}
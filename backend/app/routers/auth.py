@@ -5,13 +5,15 @@ from datetime import date, datetime, timedelta
 from random import randint
 
 from fastapi import APIRouter, HTTPException, Request, Depends
+from starlette.concurrency import run_in_threadpool
 from psycopg2.extras import RealDictCursor
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from jose import jwt
 
 from database import get_db_connection
-from app.core.security import get_password_hash, verify_password
+from ai_models.user_context import invalidate_user_context
+from app.core.security import HashingOverloaded, get_hasher
 from app.core.observability import track
 
 
@@ -116,9 +118,26 @@ def check_email(request: Request, email: str):
             conn.close()
 
 
+def _hashing_busy(e: HashingOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="ระบบมีผู้ใช้งานจำนวนมาก กรุณาลองใหม่อีกครั้ง",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+async def _hash_password(password: str) -> str:
+    # bcrypt runs in the hashing pool (app/core/security.py), never on the
+    # request threadpool; DB work around it stays short.
+    try:
+        return await get_hasher().hash(password)
+    except HashingOverloaded as e:
+        raise _hashing_busy(e)
+
+
 @router.post("/register")
 @limiter.limit("5/minute")
-def register(request: Request, user: UserRegister):
+async def register(request: Request, user: UserRegister):
     email = _normalize_email(user.email)
     if not _EMAIL_RE.match(email):
         raise HTTPException(status_code=400, detail="รูปแบบอีเมลไม่ถูกต้อง")
@@ -127,13 +146,28 @@ def register(request: Request, user: UserRegister):
         raise HTTPException(status_code=400, detail="ชื่อผู้ใช้ต้องมีอย่างน้อย 2 ตัวอักษร")
     if len(username) > 100:
         raise HTTPException(status_code=400, detail="ชื่อผู้ใช้ต้องไม่เกิน 100 ตัวอักษร")
+    if await run_in_threadpool(_email_taken, email):
+        # 409 Conflict is the correct status for duplicate resource
+        raise HTTPException(status_code=409, detail="อีเมลนี้ถูกใช้งานแล้ว")
+    hashed_pw = await _hash_password(user.password)
+    return await run_in_threadpool(_create_user, email, username, hashed_pw)
+
+
+def _email_taken(email: str) -> bool:
+    conn = get_db_connection()
+    try:
+        return _email_exists(conn.cursor(cursor_factory=RealDictCursor), email)
+    except Exception:
+        raise HTTPException(status_code=500, detail="ลงทะเบียนไม่สำเร็จ กรุณาลองใหม่ภายหลัง")
+    finally:
+        if conn:
+            conn.close()
+
+
+def _create_user(email: str, username: str, hashed_pw: str) -> dict:
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        if _email_exists(cur, email):
-            # 409 Conflict is the correct status for duplicate resource
-            raise HTTPException(status_code=409, detail="อีเมลนี้ถูกใช้งานแล้ว")
-        hashed_pw = get_password_hash(user.password)
         try:
             cur.execute("""
                 INSERT INTO users (email, password_hash, username, role_id, is_email_verified)
@@ -265,24 +299,55 @@ def resend_verification_email(req: PasswordResetRequest):
 
 @router.post("/login")
 @limiter.limit("10/minute")
-def login(request: Request, user: UserLogin):
+async def login(request: Request, user: UserLogin):
     # SLO: login success rate is one of the three dashboard panels (#14)
     with track("auth.login", "POST /login", email_domain=(user.email or "").split("@")[-1]):
-        return _login_impl(user)
+        return await _login_impl(user)
 
 
-def _login_impl(user):
-    email = _normalize_email(user.email)
-    conn = get_db_connection()
+async def _login_impl(user):
     try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("SELECT * FROM users WHERE LOWER(email) = %s", (email,))
-        db_user = cur.fetchone()
-        if not db_user or not verify_password(user.password, db_user['password_hash']):
+        db_user = await run_in_threadpool(_load_login_user, _normalize_email(user.email))
+        if not db_user:
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+        try:
+            ok, new_hash = await get_hasher().verify(user.password, db_user['password_hash'])
+        except HashingOverloaded as e:
+            raise _hashing_busy(e)
+        if not ok:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         if not db_user.get('is_email_verified'):
             raise HTTPException(status_code=403, detail="Email not verified. Please check your inbox for the verification code.")
+        # No DB connection is held while bcrypt runs.
+        return await run_in_threadpool(_complete_login, db_user, new_hash)
+    except HTTPException:
+        raise
+    except Exception:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail="Login failed. Please try again later.")
+
+
+def _load_login_user(email: str):
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("SELECT * FROM users WHERE LOWER(email) = %s", (email,))
+        return cur.fetchone()
+    finally:
+        if conn:
+            conn.close()
+
 
+def _complete_login(db_user: dict, new_hash) -> dict:
+    """Streak bookkeeping, rehash write-back and token for a verified login."""
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        if new_hash:
+            # Stored hash predates PASSWORD_HASH_SCHEMES / PASSWORD_BCRYPT_ROUNDS.
+            cur.execute("UPDATE users SET password_hash = %s WHERE user_id = %s",
+                        (new_hash, db_user['user_id']))
         today = date.today()
         last_login = db_user.get('last_login_date')
         if isinstance(last_login, datetime):
@@ -315,6 +380,7 @@ def _login_impl(user):
                     ON CONFLICT DO NOTHING
                 """, (db_user['user_id'], f"Streak {streak} วัน!", msg))
         conn.commit()
+        invalidate_user_context(db_user['user_id'])
         access_token = _issue_access_token(
             db_user['user_id'], db_user['email'], db_user['role_id']
         )
@@ -328,12 +394,9 @@ def _login_impl(user):
             "access_token": access_token,
             "token_type": "Bearer",
         }
-    except HTTPException:
-        raise
     except Exception:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail="Login failed. Please try again later.")
+        conn.rollback()
+        raise
     finally:
         if conn:
             conn.close()
@@ -371,6 +434,7 @@ def social_login(body: SocialLoginRequest):
                 (today, total_days, streak, user['user_id'])
             )
             conn.commit()
+            invalidate_user_context(user['user_id'])
             return {
                 "user_id": int(user['user_id']),
                 "email": user['email'],
@@ -465,7 +529,15 @@ def password_reset_verify(req: PasswordResetVerify):
 
 
 @router.post('/password-reset/confirm')
-def password_reset_confirm(req: PasswordResetConfirm):
+async def password_reset_confirm(req: PasswordResetConfirm):
+    user_id, code_id = await run_in_threadpool(_check_reset_code, req)
+    new_hash = await _hash_password(req.new_password)
+    await run_in_threadpool(_apply_password_reset, user_id, code_id, new_hash)
+    return {"message": "รีเซ็ตรหัสผ่านสำเร็จ"}
+
+
+def _check_reset_code(req: PasswordResetConfirm):
+    """(user_id, reset code id) if the email, birth date and code all match."""
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -485,11 +557,28 @@ def password_reset_confirm(req: PasswordResetConfirm):
         row = cur.fetchone()
         if not row or row['expires_at'] < datetime.now():
             raise HTTPException(status_code=401, detail="รหัสไม่ถูกต้องหรือหมดอายุ")
-        new_hash = get_password_hash(req.new_password)
-        cur.execute("UPDATE users SET password_hash = %s WHERE user_id = %s", (new_hash, user['user_id']))
-        cur.execute("UPDATE password_reset_codes SET used = TRUE WHERE id = %s", (row['id'],))
+        return user['user_id'], row['id']
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn:
+            conn.close()
+
+
+def _apply_password_reset(user_id: int, code_id: int, new_hash: str) -> None:
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        # The code was checked before hashing; claim it now so two
+        # concurrent confirms can't both use it.
+        cur.execute("UPDATE password_reset_codes SET used = TRUE WHERE id = %s AND used = FALSE", (code_id,))
+        if cur.rowcount == 0:
+            conn.rollback()
+            raise HTTPException(status_code=401, detail="รหัสไม่ถูกต้องหรือหมดอายุ")
+        cur.execute("UPDATE users SET password_hash = %s WHERE user_id = %s", (new_hash, user_id))
         conn.commit()
-        return {"message": "รีเซ็ตรหัสผ่านสำเร็จ"}
     except HTTPException:
         raise
     except Exception as e:
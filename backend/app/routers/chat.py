@@ -3,13 +3,17 @@ Chat endpoints for AI Coach + 3-agent nutrition pipeline.
 
 Hardening:
 - Input sanitization (trim, strip control chars, cap at 2000 chars)
-- 30s timeout so a wedged LLM call doesn't tie up a worker
+- AI work runs on the shared, bounded AI executor
+  (app/services/ai_executor.py): 503/429 + Retry-After when it is
+  saturated, and a 30s timeout that cancels the generation instead of
+  waiting it out (/stream variants: first-token + idle-gap timeouts, see
+  app/services/chat_stream.py)
 - Rate limit: 10 requests/hour per remote IP
 """
 import re
-import concurrent.futures
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -17,7 +21,10 @@ from chatbot_agent import CoachingAgent
 from ai_models.multi_agent_system import NutritionMultiAgent, NutritionAnalysisAgent
 from app.models.schemas import ChatMessage, MealEstimateRequest
 from app.core.config import AI_ENABLED
-from app.core.observability import track, note_failure
+from app.core.observability import track, note_failure, record_timings
+from app.services.ai_executor import AIOverloaded, AITimeout, get_executor
+from app.services.chat_stream import SSE_HEADERS, stream_chat
+from app.services.warmup import Lazy, register_warmup
 
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
@@ -36,9 +43,15 @@ def _require_ai_enabled() -> None:
             detail="AI temporarily unavailable",
         )
 
-coach_agent = CoachingAgent()
-_multi_agent = NutritionMultiAgent()
-_nutrition_agent = NutritionAnalysisAgent()
+# Built on first use or by the startup warm-up (app/services/warmup.py), so
+# importing this router doesn't construct the agents.
+coach_agent = Lazy("chat.coach", CoachingAgent)
+_multi_agent = Lazy("chat.multi", NutritionMultiAgent)
+_nutrition_agent = Lazy("meals.estimate", NutritionAnalysisAgent)
+
+register_warmup("chat.coach", coach_agent.get)
+register_warmup("chat.multi", lambda: _multi_agent.analysis_agent._activity_tfidf())
+register_warmup("meals.estimate", lambda: _nutrition_agent._activity_tfidf())
 
 _AI_TIMEOUT_SEC = 30
 _MAX_MSG_LEN = 2000
@@ -54,14 +67,30 @@ def _sanitize_message(msg: str) -> str:
     return s
 
 
-def _run_with_timeout(fn, *args, **kwargs):
-    """Run a blocking AI call in a thread and enforce _AI_TIMEOUT_SEC."""
-    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as ex:
-        future = ex.submit(fn, *args, **kwargs)
-        try:
-            return future.result(timeout=_AI_TIMEOUT_SEC)
-        except concurrent.futures.TimeoutError:
-            raise HTTPException(status_code=504, detail="AI ตอบช้าเกินไป กรุณาลองใหม่")
+def _overloaded(e: AIOverloaded) -> HTTPException:
+    return HTTPException(
+        status_code=e.status_code,
+        detail="AI มีผู้ใช้งานจำนวนมาก กรุณาลองใหม่อีกครั้ง",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def _run_ai(endpoint: str, fn, *args, **kwargs):
+    """Run a blocking AI call on the shared executor under _AI_TIMEOUT_SEC."""
+    try:
+        return get_executor().run(endpoint, fn, *args, timeout=_AI_TIMEOUT_SEC, **kwargs)
+    except AIOverloaded as e:
+        raise _overloaded(e)
+    except AITimeout:
+        raise HTTPException(status_code=504, detail="AI ตอบช้าเกินไป กรุณาลองใหม่")
+
+
+def _open_stream(produce, *, where: str, budget: str, user_id) -> StreamingResponse:
+    try:
+        body = stream_chat(produce, where=where, budget=budget, user_id=user_id)
+    except AIOverloaded as e:
+        raise _overloaded(e)
+    return StreamingResponse(body, media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @router.post("/api/chat/coach")
@@ -75,8 +104,8 @@ def chat_with_coach(request: Request, payload: ChatMessage):
     with track("chat.coach", "POST /api/chat/coach",
                user_id=payload.user_id, msg_len=len(msg)):
         try:
-            response_text = _run_with_timeout(
-                coach_agent.generate_response, payload.user_id, msg
+            response_text = _run_ai(
+                "chat.coach", coach_agent.generate_response, payload.user_id, msg
             )
             return {"response": response_text}
         except HTTPException:
@@ -86,6 +115,22 @@ def chat_with_coach(request: Request, payload: ChatMessage):
             raise HTTPException(status_code=500, detail=f"AI Coach Error: {str(e)}")
 
 
+@router.post("/api/chat/coach/stream")
+@limiter.limit("10/hour")
+def chat_with_coach_stream(request: Request, payload: ChatMessage):
+    """/api/chat/coach as Server-Sent Events (token / done / error)."""
+    _require_ai_enabled()
+    msg = _sanitize_message(payload.message)
+    if not msg:
+        raise HTTPException(status_code=400, detail="ข้อความว่างเปล่า")
+    with track("chat.coach.stream", "POST /api/chat/coach/stream",
+               user_id=payload.user_id, msg_len=len(msg)):
+        return _open_stream(
+            lambda: coach_agent.generate_response_stream(payload.user_id, msg),
+            where="chat.coach.stream", budget="chat.coach", user_id=payload.user_id,
+        )
+
+
 @router.post("/api/meals/estimate")
 @limiter.limit("30/hour")
 def estimate_meal_from_text(request: Request, payload: MealEstimateRequest):
@@ -96,7 +141,7 @@ def estimate_meal_from_text(request: Request, payload: MealEstimateRequest):
     Food extraction uses pythainlp word segmentation + DB-backed dictionary,
     falling back to regex if pythainlp is unavailable. Unknown foods that
     LLM estimates get auto-inserted into temp_food for admin review
-    (see NutritionAnalysisAgent._auto_add_temp_food).
+    (see NutritionAnalysisAgent._auto_add_temp_foods).
 
     The client typically follows this with POST /meals/{user_id} to persist.
     """
@@ -115,7 +160,7 @@ def estimate_meal_from_text(request: Request, payload: MealEstimateRequest):
             info["meal_type"] = payload.meal_type
             info["extracted"] = mentions
             return info
-        return _run_with_timeout(_do)
+        return _run_ai("meals.estimate", _do)
     except HTTPException:
         raise
     except Exception as e:
@@ -136,14 +181,33 @@ def chat_multi_agent(request: Request, payload: ChatMessage):
     with track("chat.multi", "POST /api/chat/multi",
                user_id=payload.user_id, msg_len=len(msg)):
         try:
-            response_text = _run_with_timeout(
-                _multi_agent.run,
+            timings: dict = {}
+            response_text = _run_ai(
+                "chat.multi", _multi_agent.run,
                 payload.user_id, msg,
-                lat=payload.lat, lng=payload.lng,
+                lat=payload.lat, lng=payload.lng, timings=timings,
             )
+            record_timings("chat.multi", timings)
             return {"response": response_text, "agent": "multi_3"}
         except HTTPException:
             raise
         except Exception as e:
             note_failure("chat.multi", e, user_id=payload.user_id)
             raise HTTPException(status_code=500, detail=f"Multi-Agent Error: {str(e)}")
+
+
+@router.post("/api/chat/multi/stream")
+@limiter.limit("10/hour")
+def chat_multi_agent_stream(request: Request, payload: ChatMessage):
+    """/api/chat/multi as Server-Sent Events (token / done / error)."""
+    _require_ai_enabled()
+    msg = _sanitize_message(payload.message)
+    if not msg:
+        raise HTTPException(status_code=400, detail="ข้อความว่างเปล่า")
+    with track("chat.multi.stream", "POST /api/chat/multi/stream",
+               user_id=payload.user_id, msg_len=len(msg)):
+        return _open_stream(
+            lambda: _multi_agent.run_stream(payload.user_id, msg,
+                                            lat=payload.lat, lng=payload.lng),
+            where="chat.multi.stream", budget="chat.multi", user_id=payload.user_id,
+        )
@@ -7,12 +7,18 @@ from psycopg2.extras import RealDictCursor, Json
 from database import get_db_connection
 from auth.dependencies import get_current_admin
 from app.models.schemas import FoodCreate, FoodAutoAdd, RegionalNameSubmission
+from app.services.food_index import food_index, maybe_reload_food_index
 from ai_models import llm_provider
+from ai_models.user_context import get_user_context
+from ai_models.llm_cache import is_json_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+# A food whose recipe INSERT failed (or raced) reuses the generated JSON.
+_RECIPE_CACHE_TTL = 24 * 3600
+
 _RECIPE_SYSTEM_PROMPT = (
     "คุณเป็นเชฟไทยที่ให้คำตอบเป็น JSON เท่านั้น ห้ามมีข้อความอื่นนอกจาก JSON. "
     "เมื่อได้ชื่ออาหารไทย ให้สร้างสูตรอาหารจริงจากครัวไทยมาตรฐาน ตอบด้วยรูปแบบ: "
@@ -90,6 +96,7 @@ def create_food(food: FoodCreate):
         """, (food.food_name, food.calories, food.protein, food.carbs, food.fat, food.image_url))
         new_id = cur.fetchone()['food_id']
         conn.commit()
+        food_index.refresh_food(conn, new_id)
         return {"message": "Food added", "food_id": new_id}
     except Exception as e:
         conn.rollback()
@@ -161,65 +168,107 @@ def get_recommended_food(user_id: int | None = None):
             conn.close()
 
 
+_USER_REGION_SQL = (
+    "SELECT region::text AS region FROM users "
+    "WHERE user_id = %s AND deleted_at IS NULL"
+)
+
+# DB-side search, shared with the async twin in app/routers/async_api.py.
+# Serves /foods/search when FOOD_SEARCH_BACKEND=db (multi-node deployments
+# that don't want per-worker indexes) and before the in-process index loads.
+# Substring OR trigram-similar (`%`, pg_trgm.similarity_threshold) matches
+# on canonical names and aliases, both on GIN trigram indexes (migrations/
+# v29), so misspellings still hit. Ranked: user-region alias match, then
+# substring before fuzzy, then similarity, then name.
+# Params: _search_params()
+_SEARCH_FOODS_SQL = """
+    WITH matches AS (
+        SELECT f.food_id, NULL::thai_region AS region,
+               f.food_name ILIKE %(pattern)s AS substring_hit,
+               similarity(f.food_name, %(q)s) AS score
+        FROM foods f
+        WHERE f.deleted_at IS NULL
+          AND (f.food_name ILIKE %(pattern)s OR f.food_name %% %(q)s)
+        UNION ALL
+        SELECT frn.food_id, frn.region,
+               frn.name_th ILIKE %(pattern)s,
+               similarity(frn.name_th, %(q)s)
+        FROM food_regional_names frn
+        WHERE frn.deleted_at IS NULL
+          AND (frn.name_th ILIKE %(pattern)s OR frn.name_th %% %(q)s)
+    ),
+    best AS (
+        SELECT food_id,
+               BOOL_OR(region = %(region)s::thai_region) AS user_region_hit,
+               BOOL_OR(substring_hit) AS substring_hit,
+               MAX(score) AS score
+        FROM matches
+        GROUP BY food_id
+    )
+    SELECT f.*,
+           COALESCE(frn_user.name_th, f.food_name) AS display_name,
+           frn_user.name_th AS regional_name,
+           CASE WHEN b.user_region_hit THEN 1 ELSE 0 END AS match_user_region
+    FROM best b
+    JOIN foods f ON f.food_id = b.food_id AND f.deleted_at IS NULL
+    LEFT JOIN food_regional_names frn_user
+           ON frn_user.food_id = f.food_id
+          AND frn_user.region = %(region)s::thai_region
+          AND frn_user.is_primary
+          AND frn_user.deleted_at IS NULL
+    ORDER BY match_user_region DESC, b.substring_hit DESC, b.score DESC, f.food_name ASC
+    LIMIT %(limit)s
+"""
+
+
+def _search_params(q: str, region: str | None, limit: int) -> dict:
+    return {"q": q, "pattern": f"%{q}%", "region": region, "limit": limit}
+
+
 def _resolve_user_region(cur, user_id: int) -> str | None:
     """Look up users.region; return None if user has no preference set."""
-    cur.execute(
-        "SELECT region::text AS region FROM users "
-        "WHERE user_id = %s AND deleted_at IS NULL",
-        (user_id,),
-    )
+    cur.execute(_USER_REGION_SQL, (user_id,))
     row = cur.fetchone()
     return row["region"] if row else None
 
 
+def _cached_user_region(user_id: int) -> str | None:
+    """users.region from the cached user-context snapshot, so search-as-you-type
+    doesn't query it on every keystroke. PUT /users/{id}/region invalidates it."""
+    snapshot = get_user_context(user_id)
+    return snapshot.profile.get("region") if snapshot else None
+
+
 @router.get("/foods/search")
 def search_foods(q: str = "", user_id: int | None = None, limit: int = 20):
     """Search foods by canonical name OR by any regional alias.
 
     Behaviour:
-      - Matches `foods.food_name` (ILIKE) OR
-        `food_regional_names.name_th` (ILIKE) — so Isan users typing
-        "ข้าวปุ้น" hit the canonical "ขนมจีนน้ำยา" row.
+      - Matches `foods.food_name` OR `food_regional_names.name_th`
+        (case-insensitive substring) — so Isan users typing "ข้าวปุ้น" hit
+        the canonical "ขนมจีนน้ำยา" row.
       - Returns each food with `display_name` set to the caller's
         regional primary alias when available, else the canonical name.
-      - Boosts results that match the user's region to the top.
+      - Boosts results that match the user's region to the top. The
+        region comes from the cached user-context snapshot, so typing
+        doesn't re-read users on every keystroke.
+
+    Answered from the in-process food index (app/services/food_index.py)
+    once it is loaded; otherwise by _SEARCH_FOODS_SQL, which also
+    tolerates typos via pg_trgm similarity.
     """
     q = (q or "").strip()
     if not q:
         return []
-    pattern = f"%{q}%"
-    conn = get_db_connection()
+    maybe_reload_food_index()
+    conn = None
     try:
+        region = _cached_user_region(user_id) if user_id else None
+        if food_index.ready:
+            return food_index.search(q, region, limit)
+        conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        region = _resolve_user_region(cur, user_id) if user_id else None
-        cur.execute(
-            """
-            SELECT f.*,
-                   COALESCE(frn_user.name_th, f.food_name) AS display_name,
-                   frn_user.name_th  AS regional_name,
-                   CASE WHEN frn_match.region = %s::thai_region THEN 1 ELSE 0 END
-                       AS match_user_region
-            FROM foods f
-            LEFT JOIN food_regional_names frn_user
-                   ON frn_user.food_id = f.food_id
-                  AND frn_user.region = %s::thai_region
-                  AND frn_user.is_primary
-                  AND frn_user.deleted_at IS NULL
-            LEFT JOIN food_regional_names frn_match
-                   ON frn_match.food_id = f.food_id
-                  AND frn_match.deleted_at IS NULL
-                  AND frn_match.name_th ILIKE %s
-            WHERE f.deleted_at IS NULL
-              AND (
-                    f.food_name ILIKE %s
-                 OR frn_match.variant_id IS NOT NULL
-              )
-            GROUP BY f.food_id, frn_user.name_th, frn_match.region
-            ORDER BY match_user_region DESC, f.food_name ASC
-            LIMIT %s
-            """,
-            (region, region, pattern, pattern, limit),
-        )
+        cur.execute(_SEARCH_FOODS_SQL, _search_params(q, region, limit))
         return cur.fetchall()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -357,6 +406,8 @@ def get_recipe(food_id: int, user_id: int | None = None):
             raw = llm_provider.generate(
                 _RECIPE_SYSTEM_PROMPT,
                 f"ชื่อเมนู: {food['food_name']}",
+                cache_ttl=_RECIPE_CACHE_TTL,
+                cache_if=is_json_response,
             )
             ai = _parse_ai_recipe(raw)
         except Exception as e:
@@ -433,6 +484,7 @@ def update_food(food_id: int, food: FoodCreate):
             WHERE food_id = %s
         """, (food.food_name, food.calories, food.protein, food.carbs, food.fat, food.image_url, food_id))
         conn.commit()
+        food_index.refresh_food(conn, food_id)
         return {"message": "Food updated successfully"}
     except Exception as e:
         conn.rollback()
@@ -460,6 +512,7 @@ def patch_food(food_id: int, data: dict, current_user: dict = Depends(get_curren
         if not cur.fetchone():
             raise HTTPException(status_code=404, detail="ไม่พบเมนูนี้")
         conn.commit()
+        food_index.refresh_food(conn, food_id)
         return {"message": "อัปเดตสำเร็จ", "food_id": food_id}
     except HTTPException:
         raise
@@ -481,6 +534,7 @@ def delete_food(food_id: int, current_user: dict = Depends(get_current_admin)):
         if not cur.fetchone():
             raise HTTPException(status_code=404, detail="ไม่พบเมนูนี้")
         conn.commit()
+        food_index.remove_food(food_id)
         return {"message": "ลบเมนูเรียบร้อย", "food_id": food_id}
     except HTTPException:
         raise
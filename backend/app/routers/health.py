@@ -5,7 +5,18 @@ from psycopg2.extras import RealDictCursor
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from database import get_db_connection
+from database import get_db_connection, pool_stats
+from database_async import async_pool_stats
+from ai_models.llm_cache import llm_cache_stats
+from ai_models.user_context import user_context_stats
+from ai_models.places_cache import places_cache_stats
+from ai_models.local_engine import local_engine_stats
+from app.services.ai_executor import ai_executor_stats
+from app.services.chat_stream import chat_stream_stats
+from app.services.response_cache import response_cache_stats
+from app.services.warmup import warmup_stats
+from app.core.security import password_hasher_stats
+from auth.dependencies import auth_token_stats
 from supabase_storage import upload_to_supabase
 from app.core.config import ALLOWED_MIME_TYPES, MAX_UPLOAD_SIZE, API_VERSION
 
@@ -29,6 +40,25 @@ def health():
     return {"status": "ok", "api_version": API_VERSION}
 
 
+@router.get("/metrics")
+def metrics():
+    """In-process counters for ops (DB pool, ...). See docs/MONITORING.md."""
+    return {
+        "db_pool": pool_stats(),
+        "db_pool_async": async_pool_stats(),
+        "llm_cache": llm_cache_stats(),
+        "chat_stream": chat_stream_stats(),
+        "ai_executor": ai_executor_stats(),
+        "user_context": user_context_stats(),
+        "places_cache": places_cache_stats(),
+        "local_engine": local_engine_stats(),
+        "password_hasher": password_hasher_stats(),
+        "auth_tokens": auth_token_stats(),
+        "response_cache": response_cache_stats(),
+        "warmup": warmup_stats(),
+    }
+
+
 @router.get("/debug-auth")
 def debug_auth(request: Request):
     """Debug endpoint — shows whether Authorization header is received. Remove after fix."""
@@ -1,73 +1,128 @@
-from fastapi import APIRouter, HTTPException, Depends
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, Depends, Request
 from psycopg2.extras import RealDictCursor
 
 from database import get_db_connection
+from ai_models.user_context import UserContextSnapshot, get_user_context
 from auth.dependencies import get_current_user
 from app.core.dependencies import check_ownership
+from app.services.response_cache import cached_json
 
 router = APIRouter()
 
 
+# Insights read the per-day totals the summary triggers keep in
+# daily_summaries (migrations/v8, v26) and the weekly/monthly rollups built
+# from them (migrations/v33), never meals/detail_items: every query is one
+# (user_id, date) index range, O(days) or O(periods) regardless of how many
+# items were logged.
+
+# Days with at least one logged item; a day whose items were all removed
+# keeps a zero row in daily_summaries.
+_MACRO_BALANCE_SQL = """
+    WITH macro_daily AS (
+        SELECT date_record AS day,
+               COALESCE(total_protein, 0) AS protein,
+               COALESCE(total_carbs, 0) AS carbs,
+               COALESCE(total_fat, 0) AS fat,
+               COALESCE(total_calories_intake, 0) AS total_cal
+        FROM daily_summaries
+        WHERE user_id = %s
+          -- today and the 6 days before it: a 7-day window
+          AND date_record >= (NOW() AT TIME ZONE 'Asia/Bangkok')::date - 6
+          AND (total_calories_intake > 0 OR total_protein > 0
+               OR total_carbs > 0 OR total_fat > 0)
+    )
+    SELECT
+        ROUND(AVG(protein)::numeric, 1) AS avg_protein_g,
+        ROUND(AVG(carbs)::numeric, 1) AS avg_carbs_g,
+        ROUND(AVG(fat)::numeric, 1) AS avg_fat_g,
+        ROUND(AVG(total_cal)::numeric, 0) AS avg_calories,
+        CASE WHEN AVG(total_cal) > 0
+             THEN ROUND((AVG(protein) * 4 / AVG(total_cal) * 100)::numeric, 1)
+             ELSE 0 END AS protein_pct,
+        CASE WHEN AVG(total_cal) > 0
+             THEN ROUND((AVG(carbs) * 4 / AVG(total_cal) * 100)::numeric, 1)
+             ELSE 0 END AS carbs_pct,
+        CASE WHEN AVG(total_cal) > 0
+             THEN ROUND((AVG(fat) * 9 / AVG(total_cal) * 100)::numeric, 1)
+             ELSE 0 END AS fat_pct,
+        JSON_AGG(
+            JSON_BUILD_OBJECT(
+                'day', day,
+                'protein', ROUND(protein::numeric, 1),
+                'carbs', ROUND(carbs::numeric, 1),
+                'fat', ROUND(fat::numeric, 1),
+                'calories', ROUND(total_cal::numeric, 0)
+            ) ORDER BY day
+        ) AS daily_breakdown
+    FROM macro_daily
+    HAVING COUNT(*) > 0
+"""
+
+# The target is an uncorrelated sub-select (one users lookup per query),
+# not a CROSS JOIN. "Today" is the Bangkok date, as in _MACRO_BALANCE_SQL,
+# whatever the session time zone.
+_CALORIE_TREND_SQL = """
+    WITH daily_data AS (
+        SELECT ds.date_record, ds.total_calories_intake AS calories,
+               (SELECT target_calories FROM users WHERE user_id = %s) AS target_calories
+        FROM daily_summaries ds
+        WHERE ds.user_id = %s
+          AND ds.date_record >= (NOW() AT TIME ZONE 'Asia/Bangkok')::date - %s::int
+    ),
+    moving_avg AS (
+        SELECT date_record, calories, target_calories,
+            ROUND(AVG(calories) OVER (
+                ORDER BY date_record ROWS BETWEEN 6 PRECEDING AND CURRENT ROW
+            )::numeric, 0) AS moving_avg_7d,
+            CASE WHEN target_calories > 0
+                      AND ABS(calories - target_calories) <= target_calories * 0.1
+                 THEN true ELSE false END AS on_target
+        FROM daily_data
+    )
+    SELECT * FROM moving_avg ORDER BY date_record
+"""
+
+# Newest `limit` periods, returned oldest first. %s: user_id, limit.
+_PERIOD_SUMMARIES_SQL = {
+    "week": """
+        SELECT start_date, days_logged_count, avg_daily_calories,
+               total_calories, total_protein, total_carbs, total_fat
+        FROM weekly_summaries
+        WHERE user_id = %s AND days_logged_count > 0
+        ORDER BY start_date DESC LIMIT %s
+    """,
+    "month": """
+        SELECT make_date(year, month, 1) AS start_date, days_logged_count, avg_daily_calories,
+               total_calories, total_protein, total_carbs, total_fat
+        FROM monthly_summaries
+        WHERE user_id = %s AND days_logged_count > 0
+        ORDER BY year DESC, month DESC LIMIT %s
+    """,
+}
+MAX_PERIODS = 120
+
+
 @router.get("/insights/{user_id}")
-def get_insights_overview(user_id: int, current_user: dict = Depends(get_current_user)):
+def get_insights_overview(request: Request, user_id: int, current_user: dict = Depends(get_current_user)):
+    """30-day adherence summary, computed from the cached per-user context
+    snapshot the AI agents share (ai_models/user_context.py)."""
     check_ownership(current_user, user_id)
-    conn = get_db_connection()
+    # The 30-day window moves at midnight even without a write.
+    return cached_json(request, "insights", user_id, {"today": date.today()},
+                       lambda: _load_insights_overview(user_id))
+
+
+def _load_insights_overview(user_id: int) -> dict:
     try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            WITH recent_daily AS (
-                SELECT
-                    ds.date_record,
-                    ds.total_calories_intake AS calories,
-                    COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS protein,
-                    COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS carbs,
-                    COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS fat,
-                    u.target_calories, u.target_protein, u.target_carbs,
-                    u.target_fat, u.current_streak
-                FROM daily_summaries ds
-                LEFT JOIN meals m ON m.user_id = ds.user_id AND DATE(m.meal_time) = ds.date_record
-                LEFT JOIN detail_items di ON di.meal_id = m.meal_id
-                CROSS JOIN (
-                    SELECT target_calories, target_protein, target_carbs,
-                           target_fat, current_streak
-                    FROM users WHERE user_id = %s
-                ) u
-                WHERE ds.user_id = %s
-                  AND ds.date_record >= CURRENT_DATE - INTERVAL '30 days'
-                GROUP BY ds.date_record, ds.total_calories_intake,
-                         u.target_calories, u.target_protein, u.target_carbs,
-                         u.target_fat, u.current_streak
-            ),
-            goal_flags AS (
-                SELECT *,
-                    ABS(calories - target_calories) AS cal_diff,
-                    CASE WHEN target_calories > 0
-                              AND ABS(calories - target_calories) <= target_calories * 0.1
-                         THEN 1 ELSE 0 END AS on_target
-                FROM recent_daily
-            )
-            SELECT
-                COUNT(*) AS total_days_logged,
-                ROUND(AVG(calories)::numeric, 0) AS avg_calories,
-                SUM(on_target) AS days_on_target,
-                ROUND(AVG(protein)::numeric, 1) AS avg_protein,
-                ROUND(AVG(carbs)::numeric, 1) AS avg_carbs,
-                ROUND(AVG(fat)::numeric, 1) AS avg_fat,
-                ROUND(MIN(cal_diff)::numeric, 0) AS best_day_diff,
-                MAX(current_streak) AS current_streak
-            FROM goal_flags
-        """, (user_id, user_id))
-        row = cur.fetchone()
-        if not row or row["total_days_logged"] == 0:
-            return {"total_days_logged": 0, "avg_calories": 0, "days_on_target": 0,
-                    "avg_protein": 0, "avg_carbs": 0, "avg_fat": 0,
-                    "best_day_diff": None, "current_streak": 0}
-        return dict(row)
+        snapshot = get_user_context(user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
+    if snapshot is None:
+        return dict(UserContextSnapshot.EMPTY_OVERVIEW)
+    return snapshot.insights_overview()
 
 
 @router.get("/insights/{user_id}/top_foods")
@@ -106,26 +161,7 @@ def get_calorie_trend(user_id: int, current_user: dict = Depends(get_current_use
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            WITH daily_data AS (
-                SELECT ds.date_record, ds.total_calories_intake AS calories, u.target_calories
-                FROM daily_summaries ds
-                CROSS JOIN (SELECT target_calories FROM users WHERE user_id = %s) u
-                WHERE ds.user_id = %s
-                  AND ds.date_record >= CURRENT_DATE - (%s || ' days')::INTERVAL
-            ),
-            moving_avg AS (
-                SELECT date_record, calories, target_calories,
-                    ROUND(AVG(calories) OVER (
-                        ORDER BY date_record ROWS BETWEEN 6 PRECEDING AND CURRENT ROW
-                    )::numeric, 0) AS moving_avg_7d,
-                    CASE WHEN target_calories > 0
-                              AND ABS(calories - target_calories) <= target_calories * 0.1
-                         THEN true ELSE false END AS on_target
-                FROM daily_data
-            )
-            SELECT * FROM moving_avg ORDER BY date_record
-        """, (user_id, user_id, days))
+        cur.execute(_CALORIE_TREND_SQL, (user_id, user_id, days))
         rows = cur.fetchall()
         return [
             {
@@ -150,50 +186,7 @@ def get_macro_balance(user_id: int, current_user: dict = Depends(get_current_use
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            WITH macro_daily AS (
-                SELECT
-                    DATE(m.meal_time) AS day,
-                    COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS protein,
-                    COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS carbs,
-                    COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS fat,
-                    COALESCE(SUM(di.amount * di.cal_per_unit), 0) AS total_cal
-                FROM meals m
-                JOIN detail_items di ON di.meal_id = m.meal_id
-                WHERE m.user_id = %s AND m.meal_time >= NOW() - INTERVAL '7 days'
-                GROUP BY DATE(m.meal_time)
-            ),
-            macro_avg AS (
-                SELECT
-                    ROUND(AVG(protein)::numeric, 1) AS avg_protein_g,
-                    ROUND(AVG(carbs)::numeric, 1) AS avg_carbs_g,
-                    ROUND(AVG(fat)::numeric, 1) AS avg_fat_g,
-                    ROUND(AVG(total_cal)::numeric, 0) AS avg_calories,
-                    CASE WHEN AVG(total_cal) > 0
-                         THEN ROUND((AVG(protein) * 4 / AVG(total_cal) * 100)::numeric, 1)
-                         ELSE 0 END AS protein_pct,
-                    CASE WHEN AVG(total_cal) > 0
-                         THEN ROUND((AVG(carbs) * 4 / AVG(total_cal) * 100)::numeric, 1)
-                         ELSE 0 END AS carbs_pct,
-                    CASE WHEN AVG(total_cal) > 0
-                         THEN ROUND((AVG(fat) * 9 / AVG(total_cal) * 100)::numeric, 1)
-                         ELSE 0 END AS fat_pct
-                FROM macro_daily
-            )
-            SELECT ma.*,
-                JSON_AGG(
-                    JSON_BUILD_OBJECT(
-                        'day', md.day,
-                        'protein', ROUND(md.protein::numeric, 1),
-                        'carbs', ROUND(md.carbs::numeric, 1),
-                        'fat', ROUND(md.fat::numeric, 1),
-                        'calories', ROUND(md.total_cal::numeric, 0)
-                    ) ORDER BY md.day
-                ) AS daily_breakdown
-            FROM macro_avg ma, macro_daily md
-            GROUP BY ma.avg_protein_g, ma.avg_carbs_g, ma.avg_fat_g,
-                     ma.avg_calories, ma.protein_pct, ma.carbs_pct, ma.fat_pct
-        """, (user_id,))
+        cur.execute(_MACRO_BALANCE_SQL, (user_id,))
         row = cur.fetchone()
         if not row:
             return {"avg_protein_g": 0, "avg_carbs_g": 0, "avg_fat_g": 0,
@@ -205,3 +198,37 @@ def get_macro_balance(user_id: int, current_user: dict = Depends(get_current_use
     finally:
         if conn:
             conn.close()
+
+
+@router.get("/insights/{user_id}/summaries")
+def get_period_summaries(user_id: int, current_user: dict = Depends(get_current_user),
+                         period: str = "week", limit: int = 12):
+    """Weekly (Monday start) or monthly totals and daily averages from the
+    rollup tables — 2 years of history is 24 monthly rows, not 730 days."""
+    check_ownership(current_user, user_id)
+    if period not in _PERIOD_SUMMARIES_SQL:
+        raise HTTPException(status_code=400, detail="period must be 'week' or 'month'")
+    limit = max(1, min(limit, MAX_PERIODS))
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(_PERIOD_SUMMARIES_SQL[period], (user_id, limit))
+        rows = cur.fetchall()
+        out = []
+        for r in reversed(rows):
+            n = int(r["days_logged_count"])
+            out.append({
+                "start_date": r["start_date"].isoformat(),
+                "days_logged": n,
+                "avg_calories": int(r["avg_daily_calories"] or 0),
+                "avg_protein": round(float(r["total_protein"]) / n, 1),
+                "avg_carbs": round(float(r["total_carbs"]) / n, 1),
+                "avg_fat": round(float(r["total_fat"]) / n, 1),
+                "total_calories": int(round(float(r["total_calories"]))),
+            })
+        return out
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if conn:
+            conn.close()
@@ -1,14 +1,16 @@
 from datetime import date, datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from psycopg2.extras import RealDictCursor
 
 from database import get_db_connection
+from ai_models.user_context import invalidate_user_context
 from auth.dependencies import get_current_user
 from app.core.dependencies import check_ownership
 from app.core.observability import track, note_failure
 from app.models.schemas import DailyLogUpdate
+from app.services.response_cache import cached_json
 from app.services.nutrition_service import (
     _compute_target_calories, _meal_type_to_enum,
 )
@@ -16,6 +18,240 @@ from app.services.nutrition_service import (
 router = APIRouter()
 
 
+# ── Shared SQL for the sync routes here and the async twins in async_api ─────
+# "Save meal" is one round trip for the meal and all its detail_items
+# (unnest()ed item arrays); the statement-level summary trigger
+# (migrations/v26) then applies the day's delta once instead of once per
+# item.
+# Params: _meal_insert_params()
+_INSERT_MEAL_WITH_ITEMS_SQL = """
+    WITH new_meal AS (
+        INSERT INTO meals (user_id, meal_type, meal_time, total_amount)
+        VALUES (%(user_id)s, %(meal_type)s, %(meal_time)s, %(total_amount)s)
+        RETURNING meal_id
+    )
+    INSERT INTO detail_items (meal_id, food_id, food_name, amount, unit_id,
+        cal_per_unit, protein_per_unit, carbs_per_unit, fat_per_unit)
+    SELECT new_meal.meal_id, i.food_id, i.food_name, i.amount, i.unit_id,
+           i.cal_per_unit, i.protein_per_unit, i.carbs_per_unit, i.fat_per_unit
+    FROM new_meal
+    CROSS JOIN unnest(
+        %(food_ids)s::bigint[], %(food_names)s::varchar[], %(amounts)s::numeric[],
+        %(unit_ids)s::int[], %(cals)s::numeric[], %(proteins)s::numeric[],
+        %(carbs)s::numeric[], %(fats)s::numeric[]
+    ) AS i(food_id, food_name, amount, unit_id,
+           cal_per_unit, protein_per_unit, carbs_per_unit, fat_per_unit)
+"""
+
+# The calorie nudge, run after the insert above inside a savepoint so it
+# stays best-effort: a failure here (e.g. v27 not applied) must not lose
+# the meal. It reads the logged day's stored total, which the trigger has
+# already updated, and inserts at most one warning / tip per user per
+# logged day. Dedup rides on the unique partial index
+# uq_notifications_daily_nudge (migrations/v27) instead of a NOT EXISTS
+# scan over DATE(created_at).
+# Params: _meal_insert_params()
+_CALORIE_NUDGE_SQL = """
+    WITH intake AS (
+        SELECT COALESCE((SELECT ds.total_calories_intake FROM daily_summaries ds
+                         WHERE ds.user_id = u.user_id AND ds.date_record = %(log_date)s), 0) AS total,
+               COALESCE(NULLIF(u.target_calories, 0), 2000) AS target
+        FROM users u
+        WHERE u.user_id = %(user_id)s
+    ),
+    nudge AS (
+        SELECT CASE WHEN total > target THEN 'warning' ELSE 'tip' END AS type, total, target
+        FROM intake
+        WHERE target > 0 AND total >= target * 0.9
+    )
+    INSERT INTO notifications (user_id, title, message, type, notified_on)
+    SELECT %(user_id)s,
+           CASE n.type WHEN 'warning' THEN %(warning_title)s ELSE %(tip_title)s END,
+           CASE n.type
+               WHEN 'warning' THEN format(%(warning_message)s, trunc(n.total)::bigint,
+                                          trunc(n.total - n.target)::bigint)
+               ELSE format(%(tip_message)s, trunc(n.total)::bigint)
+           END,
+           n.type, %(log_date)s
+    FROM nudge n
+    ON CONFLICT (user_id, type, notified_on) WHERE notified_on IS NOT NULL DO NOTHING
+"""
+
+# Passed as parameters and filled by SQL format() with the computed totals.
+_WARNING_TITLE = 'แคลอรี่เกินเป้าหมายแล้ว!'
+_WARNING_MESSAGE = 'วันนี้คุณรับแคลอรี่ไปแล้ว %s kcal เกินเป้าหมายมา %s kcal'
+_TIP_TITLE = 'ใกล้ถึงเป้าหมายแล้ว'
+_TIP_MESSAGE = 'วันนี้คุณรับแคลอรี่ %s kcal ใกล้ถึงเป้าแล้ว มื้อหน้าเลือกเบาๆ นะ'
+
+_SUMMARY_USER_SQL = "SELECT * FROM users WHERE user_id = %s"
+
+_SUMMARY_TOTAL_SQL = """
+    SELECT total_calories_intake FROM daily_summaries
+    WHERE user_id = %s AND date_record = %s
+"""
+
+_SUMMARY_MACROS_SQL = """
+    SELECT COALESCE(SUM(di.amount * di.cal_per_unit), 0) AS total_cal,
+           COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS total_protein,
+           COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS total_carbs,
+           COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS total_fat
+    FROM meals m
+    JOIN detail_items di ON di.meal_id = m.meal_id
+    WHERE m.user_id = %s AND m.meal_date = %s
+"""
+
+_SUMMARY_MENUS_SQL = """
+    SELECT m.meal_type, STRING_AGG(di.food_name, ', ') AS menu_names
+    FROM meals m
+    JOIN detail_items di ON di.meal_id = m.meal_id
+    WHERE m.user_id = %s AND m.meal_date = %s
+    GROUP BY m.meal_type
+"""
+
+# Day filters go through meals.meal_date (migrations/v28), the stored
+# Asia/Bangkok day, so they can use idx_meals_user_meal_date. Never wrap the
+# column side in DATE()/EXTRACT()/::date — that forces a scan of the user's
+# whole history. tests/integration/test_query_plans.py EXPLAINs these.
+_MEAL_DETAIL_SQL = """
+    SELECT
+        di.meal_id, di.food_name, di.amount,
+        COALESCE(di.cal_per_unit, 0) AS cal_per_unit,
+        COALESCE(di.protein_per_unit, 0) AS protein_per_unit,
+        COALESCE(di.carbs_per_unit, 0) AS carbs_per_unit,
+        COALESCE(di.fat_per_unit, 0) AS fat_per_unit,
+        ROUND((COALESCE(di.amount,1) * COALESCE(di.cal_per_unit,0))::numeric, 1) AS total_cal,
+        ROUND((COALESCE(di.amount,1) * COALESCE(di.protein_per_unit,0))::numeric, 1) AS total_protein,
+        ROUND((COALESCE(di.amount,1) * COALESCE(di.carbs_per_unit,0))::numeric, 1) AS total_carbs,
+        ROUND((COALESCE(di.amount,1) * COALESCE(di.fat_per_unit,0))::numeric, 1) AS total_fat,
+        COALESCE(f.image_url,
+            (SELECT image_url FROM foods WHERE LOWER(food_name) = LOWER(di.food_name) LIMIT 1),
+            '') AS image_url
+    FROM meals m
+    JOIN detail_items di ON di.meal_id = m.meal_id
+    LEFT JOIN foods f ON f.food_id = di.food_id
+    WHERE m.user_id = %s AND m.meal_date = %s AND m.meal_type::text = %s
+    ORDER BY di.meal_id
+"""
+
+# The dashboard's whole [from, to) window in one statement: per-day stored
+# totals (daily_summaries, macros maintained by the v26 triggers), water,
+# weight and the per-meal-type menu names. Every table is reached through
+# its (user_id, day) index over the half-open range — never EXTRACT() on
+# the column side. The calendar and weekly routes are views over this.
+_RANGE_SQL = """
+    WITH menus AS (
+        SELECT m.meal_date,
+               STRING_AGG(di.food_name, ', ' ORDER BY di.item_id)
+                   FILTER (WHERE m.meal_type = 'breakfast') AS breakfast,
+               STRING_AGG(di.food_name, ', ' ORDER BY di.item_id)
+                   FILTER (WHERE m.meal_type = 'lunch') AS lunch,
+               STRING_AGG(di.food_name, ', ' ORDER BY di.item_id)
+                   FILTER (WHERE m.meal_type = 'dinner') AS dinner,
+               STRING_AGG(di.food_name, ', ' ORDER BY di.item_id)
+                   FILTER (WHERE m.meal_type = 'snack') AS snack
+        FROM meals m
+        JOIN detail_items di ON di.meal_id = m.meal_id
+        WHERE m.user_id = %(user_id)s
+          AND m.meal_date >= %(start)s AND m.meal_date < %(end)s
+        GROUP BY m.meal_date
+    )
+    SELECT d::date AS day,
+           ds.total_calories_intake AS calories, ds.total_protein AS protein,
+           ds.total_carbs AS carbs, ds.total_fat AS fat,
+           w.amount_ml AS water_ml, wl.weight_kg,
+           mn.breakfast, mn.lunch, mn.dinner, mn.snack
+    FROM generate_series(%(start)s::date, %(end)s::date - 1, INTERVAL '1 day') AS d
+    LEFT JOIN daily_summaries ds
+           ON ds.user_id = %(user_id)s AND ds.date_record = d::date
+    LEFT JOIN water_logs w
+           ON w.user_id = %(user_id)s AND w.date_record = d::date
+    LEFT JOIN weight_logs wl
+           ON wl.user_id = %(user_id)s AND wl.recorded_date = d::date
+    LEFT JOIN menus mn ON mn.meal_date = d::date
+    ORDER BY d
+"""
+
+MAX_RANGE_DAYS = 93
+RANGE_MEAL_TYPES = ("breakfast", "lunch", "dinner", "snack")
+
+_DAILY_LOG_ITEMS_SQL = """
+    SELECT m.meal_type, di.food_id, di.food_name, di.amount, di.unit_id,
+           u.name AS unit_name,
+           di.cal_per_unit, di.protein_per_unit, di.carbs_per_unit, di.fat_per_unit
+    FROM meals m
+    JOIN detail_items di ON di.meal_id = m.meal_id
+    LEFT JOIN units u ON u.unit_id = di.unit_id
+    WHERE m.user_id = %s AND m.meal_date = %s
+    ORDER BY m.meal_type, di.item_id
+"""
+
+_CLEAR_MEAL_TYPE_SQL = """
+    DELETE FROM meals
+    WHERE user_id = %s AND meal_date = %s AND meal_type = %s
+"""
+
+
+def _meal_insert_params(user_id: int, log: DailyLogUpdate) -> dict:
+    items = log.items
+    return {
+        "user_id": user_id,
+        "meal_type": _meal_type_to_enum(log.meal_type),
+        "meal_time": datetime.combine(log.date, datetime.min.time().replace(hour=12, minute=0, second=0)),
+        "total_amount": sum(item.cal_per_unit * item.amount for item in items),
+        "food_ids": [i.food_id for i in items],
+        "food_names": [i.food_name for i in items],
+        "amounts": [i.amount for i in items],
+        "unit_ids": [i.unit_id for i in items],
+        "cals": [i.cal_per_unit for i in items],
+        "proteins": [i.protein_per_unit for i in items],
+        "carbs": [i.carbs_per_unit for i in items],
+        "fats": [i.fat_per_unit for i in items],
+        "log_date": log.date,
+        "warning_title": _WARNING_TITLE,
+        "warning_message": _WARNING_MESSAGE,
+        "tip_title": _TIP_TITLE,
+        "tip_message": _TIP_MESSAGE,
+    }
+
+
+def _apply_calorie_nudge(cur, params: dict) -> None:
+    """Insert the day's calorie nudge; on failure roll back to before it and
+    keep the meal.
+
+    Best-effort by design: the savepoint costs two extra round trips after
+    the meal INSERT (three when the nudge fails) in exchange for never
+    failing POST /meals over a notification.
+    """
+    cur.execute("SAVEPOINT calorie_nudge")
+    try:
+        cur.execute(_CALORIE_NUDGE_SQL, params)
+    except Exception as e:
+        cur.execute("ROLLBACK TO SAVEPOINT calorie_nudge")
+        note_failure("meals.calorie_nudge", e, user_id=params["user_id"])
+
+
+def _build_daily_summary(user_row, total_row, macro, menu_rows) -> dict:
+    if user_row and user_row.get('target_calories') is not None:
+        target_cal = int(user_row['target_calories'])
+    else:
+        target_cal = _compute_target_calories(dict(user_row)) if user_row else 2000
+
+    total_cal_val = int(total_row['total_calories_intake']) if total_row and total_row['total_calories_intake'] else 0
+    computed_cal = float(macro['total_cal']) if macro else 0
+    if computed_cal > 0 or total_cal_val == 0:
+        total_cal_val = int(computed_cal)
+
+    summary = {
+        "total_calories_intake": total_cal_val,
+        "total_protein": float(macro['total_protein']) if macro else 0,
+        "total_carbs": float(macro['total_carbs']) if macro else 0,
+        "total_fat": float(macro['total_fat']) if macro else 0,
+        "target_calories": target_cal,
+    }
+    summary['meals'] = {row['meal_type']: (row['menu_names'] or '') for row in menu_rows}
+    return summary
+
+
 @router.post("/meals/{user_id}")
 def add_meal(user_id: int, log: DailyLogUpdate, current_user: dict = Depends(get_current_user)):
     check_ownership(current_user, user_id)
@@ -29,71 +265,11 @@ def _add_meal_impl(user_id: int, log: DailyLogUpdate):
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        meal_type_db = _meal_type_to_enum(log.meal_type)
-        total_cal = sum(item.cal_per_unit * item.amount for item in log.items)
-        meal_ts = datetime.combine(log.date, datetime.min.time().replace(hour=12, minute=0, second=0))
-
-        cur.execute("""
-            INSERT INTO meals (user_id, meal_type, meal_time, total_amount)
-            VALUES (%s, %s, %s, %s)
-            RETURNING meal_id
-        """, (user_id, meal_type_db, meal_ts, total_cal))
-        meal_id = cur.fetchone()['meal_id']
-
-        for item in log.items:
-            cur.execute("""
-                INSERT INTO detail_items (meal_id, food_id, food_name, amount, unit_id,
-                    cal_per_unit, protein_per_unit, carbs_per_unit, fat_per_unit)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (meal_id, item.food_id, item.food_name, item.amount, item.unit_id,
-                  item.cal_per_unit, item.protein_per_unit, item.carbs_per_unit, item.fat_per_unit))
-
+        params = _meal_insert_params(user_id, log)
+        cur.execute(_INSERT_MEAL_WITH_ITEMS_SQL, params)
+        _apply_calorie_nudge(cur, params)
         conn.commit()
-
-        # Push calorie warning notification
-        try:
-            cur2 = conn.cursor(cursor_factory=RealDictCursor)
-            cur2.execute("""
-                SELECT ds.total_calories_intake, u.target_calories
-                FROM daily_summaries ds
-                JOIN users u ON u.user_id = ds.user_id
-                WHERE ds.user_id = %s AND ds.date_record = %s
-            """, (user_id, log.date))
-            row = cur2.fetchone()
-            if row:
-                total_intake = float(row['total_calories_intake'] or 0)
-                target = float(row['target_calories'] or 2000)
-                if target > 0 and total_intake > target:
-                    over = int(total_intake - target)
-                    cur2.execute("""
-                        INSERT INTO notifications (user_id, title, message, type)
-                        SELECT %s, %s, %s, 'warning'
-                        WHERE NOT EXISTS (
-                            SELECT 1 FROM notifications
-                            WHERE user_id = %s AND type = 'warning'
-                              AND DATE(created_at) = CURRENT_DATE
-                        )
-                    """, (user_id,
-                          'แคลอรี่เกินเป้าหมายแล้ว!',
-                          f'วันนี้คุณรับแคลอรี่ไปแล้ว {int(total_intake)} kcal เกินเป้าหมายมา {over} kcal',
-                          user_id))
-                elif target > 0 and total_intake >= target * 0.9:
-                    cur2.execute("""
-                        INSERT INTO notifications (user_id, title, message, type)
-                        SELECT %s, %s, %s, 'tip'
-                        WHERE NOT EXISTS (
-                            SELECT 1 FROM notifications
-                            WHERE user_id = %s AND type = 'tip'
-                              AND DATE(created_at) = CURRENT_DATE
-                        )
-                    """, (user_id,
-                          'ใกล้ถึงเป้าหมายแล้ว',
-                          f'วันนี้คุณรับแคลอรี่ {int(total_intake)} kcal ใกล้ถึงเป้าแล้ว มื้อหน้าเลือกเบาๆ นะ',
-                          user_id))
-            conn.commit()
-        except Exception:
-            pass
-
+        invalidate_user_context(user_id)
         return {"message": "Meal recorded successfully"}
     except Exception as e:
         conn.rollback()
@@ -105,58 +281,25 @@ def _add_meal_impl(user_id: int, log: DailyLogUpdate):
 
 
 @router.get("/daily_summary/{user_id}")
-def get_daily_summary(user_id: int, date_record: date, current_user: dict = Depends(get_current_user)):
+def get_daily_summary(request: Request, user_id: int, date_record: date,
+                      current_user: dict = Depends(get_current_user)):
     check_ownership(current_user, user_id)
+    return cached_json(request, "daily_summary", user_id, {"date": date_record},
+                       lambda: _load_daily_summary(user_id, date_record))
+
+
+def _load_daily_summary(user_id: int, date_record: date) -> dict:
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("SELECT * FROM users WHERE user_id = %s", (user_id,))
+        cur.execute(_SUMMARY_USER_SQL, (user_id,))
         user_row = cur.fetchone()
-        if user_row and user_row.get('target_calories') is not None:
-            target_cal = int(user_row['target_calories'])
-        else:
-            target_cal = _compute_target_calories(dict(user_row)) if user_row else 2000
-
-        cur.execute("""
-            SELECT total_calories_intake FROM daily_summaries
-            WHERE user_id = %s AND date_record = %s
-        """, (user_id, date_record))
-        row = cur.fetchone()
-        total_cal_val = int(row['total_calories_intake']) if row and row['total_calories_intake'] else 0
-
-        cur.execute("""
-            SELECT COALESCE(SUM(di.amount * di.cal_per_unit), 0) AS total_cal,
-                   COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS total_protein,
-                   COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS total_carbs,
-                   COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS total_fat
-            FROM meals m
-            JOIN detail_items di ON di.meal_id = m.meal_id
-            WHERE m.user_id = %s AND DATE(m.meal_time) = %s
-        """, (user_id, date_record))
+        cur.execute(_SUMMARY_TOTAL_SQL, (user_id, date_record))
+        total_row = cur.fetchone()
+        cur.execute(_SUMMARY_MACROS_SQL, (user_id, date_record))
         macro = cur.fetchone()
-        computed_cal = float(macro['total_cal']) if macro else 0
-        if computed_cal > 0 or total_cal_val == 0:
-            total_cal_val = int(computed_cal)
-        total_prot = float(macro['total_protein']) if macro else 0
-        total_carb = float(macro['total_carbs']) if macro else 0
-        total_fat = float(macro['total_fat']) if macro else 0
-
-        summary = {
-            "total_calories_intake": total_cal_val, "total_protein": total_prot,
-            "total_carbs": total_carb, "total_fat": total_fat,
-            "target_calories": target_cal,
-        }
-
-        cur.execute("""
-            SELECT m.meal_type, STRING_AGG(di.food_name, ', ') AS menu_names
-            FROM meals m
-            JOIN detail_items di ON di.meal_id = m.meal_id
-            WHERE m.user_id = %s AND DATE(m.meal_time) = %s
-            GROUP BY m.meal_type
-        """, (user_id, date_record))
-        menu_rows = cur.fetchall()
-        summary['meals'] = {row['meal_type']: (row['menu_names'] or '') for row in menu_rows}
-        return summary
+        cur.execute(_SUMMARY_MENUS_SQL, (user_id, date_record))
+        return _build_daily_summary(user_row, total_row, macro, cur.fetchall())
     finally:
         if conn:
             conn.close()
@@ -168,26 +311,7 @@ def get_meal_detail(user_id: int, date_record: date, meal_type: str, current_use
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT
-                di.meal_id, di.food_name, di.amount,
-                COALESCE(di.cal_per_unit, 0) AS cal_per_unit,
-                COALESCE(di.protein_per_unit, 0) AS protein_per_unit,
-                COALESCE(di.carbs_per_unit, 0) AS carbs_per_unit,
-                COALESCE(di.fat_per_unit, 0) AS fat_per_unit,
-                ROUND((COALESCE(di.amount,1) * COALESCE(di.cal_per_unit,0))::numeric, 1) AS total_cal,
-                ROUND((COALESCE(di.amount,1) * COALESCE(di.protein_per_unit,0))::numeric, 1) AS total_protein,
-                ROUND((COALESCE(di.amount,1) * COALESCE(di.carbs_per_unit,0))::numeric, 1) AS total_carbs,
-                ROUND((COALESCE(di.amount,1) * COALESCE(di.fat_per_unit,0))::numeric, 1) AS total_fat,
-                COALESCE(f.image_url,
-                    (SELECT image_url FROM foods WHERE LOWER(food_name) = LOWER(di.food_name) LIMIT 1),
-                    '') AS image_url
-            FROM meals m
-            JOIN detail_items di ON di.meal_id = m.meal_id
-            LEFT JOIN foods f ON f.food_id = di.food_id
-            WHERE m.user_id = %s AND DATE(m.meal_time) = %s AND m.meal_type::text = %s
-            ORDER BY di.meal_id
-        """, (user_id, date_record, meal_type))
+        cur.execute(_MEAL_DETAIL_SQL, (user_id, date_record, meal_type))
         items = [dict(r) for r in cur.fetchall()]
 
         total_cal = sum(float(i['total_cal'] or 0) for i in items)
@@ -208,72 +332,84 @@ def get_meal_detail(user_id: int, date_record: date, meal_type: str, current_use
             conn.close()
 
 
-@router.get("/daily_logs/{user_id}/calendar")
-def get_calendar_logs(user_id: int, month: int, year: int, current_user: dict = Depends(get_current_user)):
-    check_ownership(current_user, user_id)
+def _num(value, ndigits: int = 1):
+    return None if value is None else round(float(value), ndigits)
+
+
+def _load_range(user_id: int, start: date, end: date) -> dict:
+    """Columnar [start, end] (both inclusive): one array per field, index i
+    is day start + i. null means nothing was logged for that field that day."""
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT date_record as date, total_calories_intake as calories
-            FROM daily_summaries
-            WHERE user_id = %s
-              AND EXTRACT(MONTH FROM date_record) = %s
-              AND EXTRACT(YEAR FROM date_record) = %s
-        """, (user_id, month, year))
-        return cur.fetchall()
+        cur.execute(_RANGE_SQL, {"user_id": user_id, "start": start,
+                                 "end": end + timedelta(days=1)})
+        rows = cur.fetchall()
     finally:
         if conn:
             conn.close()
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "dates": [r["day"].isoformat() for r in rows],
+        "calories": [None if r["calories"] is None else int(r["calories"]) for r in rows],
+        "protein": [_num(r["protein"]) for r in rows],
+        "carbs": [_num(r["carbs"]) for r in rows],
+        "fat": [_num(r["fat"]) for r in rows],
+        "water_ml": [None if r["water_ml"] is None else int(r["water_ml"]) for r in rows],
+        "weight_kg": [_num(r["weight_kg"], 2) for r in rows],
+        "menus": {t: [r[t] for r in rows] for t in RANGE_MEAL_TYPES},
+    }
+
+
+@router.get("/daily_logs/{user_id}/range")
+def get_daily_logs_range(request: Request, user_id: int,
+                         start: date = Query(..., alias="from"),
+                         end: date = Query(..., alias="to"),
+                         current_user: dict = Depends(get_current_user)):
+    """Calories, macros, water, weight and menu names for every day of
+    [from, to] in one query — what the progress screen used to fan out over
+    calendar, weekly and one daily call per tapped day."""
+    check_ownership(current_user, user_id)
+    if end < start:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"range is limited to {MAX_RANGE_DAYS} days")
+    return cached_json(request, "daily_logs_range", user_id, {"from": start, "to": end},
+                       lambda: _load_range(user_id, start, end))
+
+
+@router.get("/daily_logs/{user_id}/calendar")
+def get_calendar_logs(user_id: int, month: int, year: int, current_user: dict = Depends(get_current_user)):
+    check_ownership(current_user, user_id)
+    if not (1 <= month <= 12 and 1 <= year < 9999):
+        return []
+    first = date(year, month, 1)
+    next_first = date(year + month // 12, month % 12 + 1, 1)
+    days = _load_range(user_id, first, next_first - timedelta(days=1))
+    return [{"date": d, "calories": c}
+            for d, c in zip(days["dates"], days["calories"]) if c is not None]
 
 
 @router.get("/daily_logs/{user_id}/weekly")
 def get_weekly_logs(user_id: int, current_user: dict = Depends(get_current_user), week_start: Optional[str] = None):
     check_ownership(current_user, user_id)
-    conn = get_db_connection()
-    try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        if week_start:
-            try:
-                monday = datetime.strptime(week_start, "%Y-%m-%d").date()
-            except ValueError:
-                monday = date.today()
-                while monday.weekday() != 0:
-                    monday -= timedelta(days=1)
-        else:
-            monday = date.today()
-            while monday.weekday() != 0:
-                monday -= timedelta(days=1)
-        sunday = monday + timedelta(days=6)
-
-        cur.execute("""
-            SELECT DATE(m.meal_time) AS d,
-                   COALESCE(SUM(di.amount * di.cal_per_unit), 0) AS total_cal,
-                   COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS total_protein,
-                   COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS total_carbs,
-                   COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS total_fat
-            FROM meals m
-            JOIN detail_items di ON di.meal_id = m.meal_id
-            WHERE m.user_id = %s AND DATE(m.meal_time) >= %s AND DATE(m.meal_time) <= %s
-            GROUP BY DATE(m.meal_time)
-        """, (user_id, monday, sunday))
-        macro_rows = {row["d"]: row for row in cur.fetchall()}
-
-        result = []
-        for i in range(7):
-            d = monday + timedelta(days=i)
-            macro = macro_rows.get(d)
-            result.append({
-                "date": d.isoformat(),
-                "calories": int(macro["total_cal"]) if macro else 0,
-                "protein": float(macro["total_protein"]) if macro else 0,
-                "carbs": float(macro["total_carbs"]) if macro else 0,
-                "fat": float(macro["total_fat"]) if macro else 0,
-            })
-        return result
-    finally:
-        if conn:
-            conn.close()
+    monday = None
+    if week_start:
+        try:
+            monday = datetime.strptime(week_start, "%Y-%m-%d").date()
+        except ValueError:
+            pass
+    if monday is None:
+        today = date.today()
+        monday = today - timedelta(days=today.weekday())
+
+    days = _load_range(user_id, monday, monday + timedelta(days=6))
+    return [
+        {"date": d, "calories": days["calories"][i] or 0, "protein": days["protein"][i] or 0,
+         "carbs": days["carbs"][i] or 0, "fat": days["fat"][i] or 0}
+        for i, d in enumerate(days["dates"])
+    ]
 
 
 @router.get("/daily_logs/{user_id}")
@@ -282,28 +418,11 @@ def get_daily_log_by_date(user_id: int, date_query: date, current_user: dict = D
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT COALESCE(SUM(di.amount * di.cal_per_unit), 0) AS total_cal,
-                   COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS total_protein,
-                   COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS total_carbs,
-                   COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS total_fat
-            FROM meals m
-            JOIN detail_items di ON di.meal_id = m.meal_id
-            WHERE m.user_id = %s AND DATE(m.meal_time) = %s
-        """, (user_id, date_query))
+        cur.execute(_SUMMARY_MACROS_SQL, (user_id, date_query))
         macro = cur.fetchone()
         total_cal = int(macro['total_cal']) if macro else 0
 
-        cur.execute("""
-            SELECT m.meal_type, di.food_id, di.food_name, di.amount, di.unit_id,
-                   u.name AS unit_name,
-                   di.cal_per_unit, di.protein_per_unit, di.carbs_per_unit, di.fat_per_unit
-            FROM meals m
-            JOIN detail_items di ON di.meal_id = m.meal_id
-            LEFT JOIN units u ON u.unit_id = di.unit_id
-            WHERE m.user_id = %s AND DATE(m.meal_time) = %s
-            ORDER BY m.meal_type, di.item_id
-        """, (user_id, date_query))
+        cur.execute(_DAILY_LOG_ITEMS_SQL, (user_id, date_query))
         items = cur.fetchall()
         meals_map = {"breakfast": [], "lunch": [], "dinner": [], "snack": []}
         for item in items:
@@ -339,28 +458,11 @@ def clear_meal_type(user_id: int, date_record: date, meal_type: str, current_use
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         meal_type_db = _meal_type_to_enum(meal_type)
-        cur.execute("""
-            DELETE FROM meals
-            WHERE user_id = %s AND DATE(meal_time) = %s AND meal_type = %s
-        """, (user_id, date_record, meal_type_db))
-
-        cur.execute("""
-            SELECT COALESCE(SUM(di.amount * di.cal_per_unit), 0) AS total_cal
-            FROM meals m
-            JOIN detail_items di ON di.meal_id = m.meal_id
-            WHERE m.user_id = %s AND DATE(m.meal_time) = %s
-        """, (user_id, date_record))
-        row = cur.fetchone()
-        new_cal = float(row['total_cal']) if row else 0
-
-        cur.execute("""
-            UPDATE daily_summaries SET total_calories_intake = %s
-            WHERE user_id = %s AND date_record = %s
-        """, (new_cal, user_id, date_record))
-        if cur.rowcount == 0 and new_cal == 0:
-            cur.execute("DELETE FROM daily_summaries WHERE user_id = %s AND date_record = %s", (user_id, date_record))
-
+        # trg_daily_summary_meals_del (migrations/v26) recomputes the day's
+        # summary, macros included, once for the whole statement.
+        cur.execute(_CLEAR_MEAL_TYPE_SQL, (user_id, date_record, meal_type_db))
         conn.commit()
+        invalidate_user_context(user_id)
         return {"message": f"Cleared {meal_type} successfully"}
     except Exception as e:
         conn.rollback()
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from psycopg2.extras import RealDictCursor
 
 from database import get_db_connection
 from auth.dependencies import get_current_user
 from app.core.dependencies import check_ownership
+from app.services.response_cache import bump_user, cached_json
 
 router = APIRouter()
 
+_UNREAD_COUNT_SQL = "SELECT COUNT(*) FROM notifications WHERE user_id = %s AND is_read = FALSE"
+
 
 @router.get("/notifications/{user_id}")
 def get_notifications(user_id: int, current_user: dict = Depends(get_current_user), limit: int = 50):
@@ -35,12 +38,16 @@ def get_notifications(user_id: int, current_user: dict = Depends(get_current_use
 
 
 @router.get("/notifications/{user_id}/unread_count")
-def get_unread_count(user_id: int, current_user: dict = Depends(get_current_user)):
+def get_unread_count(request: Request, user_id: int, current_user: dict = Depends(get_current_user)):
     check_ownership(current_user, user_id)
+    return cached_json(request, "unread_count", user_id, {}, lambda: _load_unread_count(user_id))
+
+
+def _load_unread_count(user_id: int) -> dict:
     conn = get_db_connection()
     try:
         cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM notifications WHERE user_id = %s AND is_read = FALSE", (user_id,))
+        cur.execute(_UNREAD_COUNT_SQL, (user_id,))
         return {"unread_count": cur.fetchone()[0]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -57,6 +64,7 @@ def mark_all_read(user_id: int, current_user: dict = Depends(get_current_user)):
         cur = conn.cursor()
         cur.execute("UPDATE notifications SET is_read = TRUE WHERE user_id = %s AND is_read = FALSE", (user_id,))
         conn.commit()
+        bump_user(user_id)
         return {"message": "All notifications marked as read"}
     except Exception as e:
         conn.rollback()
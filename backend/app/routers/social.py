@@ -4,6 +4,7 @@ from fastapi import APIRouter, HTTPException, Depends
 from psycopg2.extras import RealDictCursor
 
 from database import get_db_connection
+from ai_models.user_context import invalidate_user_context
 from auth.dependencies import get_current_user
 from app.core.dependencies import check_ownership
 from app.models.schemas import RecipeReview, AllergyUpdate
@@ -223,6 +224,7 @@ def set_user_allergies(user_id: int, body: AllergyUpdate, current_user: dict = D
                 VALUES (%s, %s, 'allergy') ON CONFLICT (user_id, flag_id) DO NOTHING
             """, (user_id, flag_id))
         conn.commit()
+        invalidate_user_context(user_id)
         return {"message": "Allergies saved", "flag_ids": body.flag_ids}
     except Exception as e:
         conn.rollback()
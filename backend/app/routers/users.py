@@ -6,6 +6,7 @@ from fastapi.responses import Response
 from psycopg2.extras import RealDictCursor
 
 from database import get_db_connection
+from ai_models.user_context import invalidate_user_context
 from auth.dependencies import get_current_user
 from app.core.dependencies import check_ownership
 from app.models.schemas import UserRegionUpdate, UserUpdate
@@ -111,6 +112,7 @@ def update_user(user_id: int, user_update: UserUpdate, current_user: dict = Depe
             """, (user_id, user_update.current_weight_kg))
 
         conn.commit()
+        invalidate_user_context(user_id)
         return {"message": "Update successful"}
     except Exception as e:
         conn.rollback()
@@ -136,12 +138,14 @@ def get_user_profile(user_id: int, current_user: dict = Depends(get_current_user
             target_cal = _compute_target_calories(dict(user))
             cur.execute("UPDATE users SET target_calories = %s WHERE user_id = %s", (target_cal, user_id))
             conn.commit()
+            invalidate_user_context(user_id)
             user = {**user, 'target_calories': target_cal}
 
         if user.get('target_protein') is None or user.get('target_carbs') is None or user.get('target_fat') is None:
             tp, tc, tf = _compute_target_macros(dict(user))
             cur.execute("UPDATE users SET target_protein = %s, target_carbs = %s, target_fat = %s WHERE user_id = %s", (tp, tc, tf, user_id))
             conn.commit()
+            invalidate_user_context(user_id)
             user = {**user, 'target_protein': tp, 'target_carbs': tc, 'target_fat': tf}
 
         out = dict(user)
@@ -215,6 +219,7 @@ def update_user_region(
         if not row:
             raise HTTPException(status_code=404, detail="User not found")
         conn.commit()
+        invalidate_user_context(user_id)
         return row
     except HTTPException:
         raise
@@ -252,6 +257,7 @@ def delete_user(user_id: int, current_user: dict = Depends(get_current_user)):
             conn.rollback()
             raise HTTPException(status_code=404, detail="User not found or already deleted")
         conn.commit()
+        invalidate_user_context(user_id)
         return {"message": "Account scheduled for deletion", "retention_days": 30}
     except HTTPException:
         raise
@@ -452,6 +458,7 @@ def recalc_tdee(user_id: int, current_user: dict = Depends(get_current_user)):
             RETURNING target_calories
         """, (new_target, today, user_id))
         conn.commit()
+        invalidate_user_context(user_id)
         saved = cur.fetchone()
         return {
             "user_id": user_id,
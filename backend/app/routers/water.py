@@ -1,21 +1,28 @@
 from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from psycopg2.extras import RealDictCursor
 
 from database import get_db_connection
 from auth.dependencies import get_current_user
 from app.core.dependencies import check_ownership
 from app.models.schemas import WaterLogUpdate
+from app.services.response_cache import bump_user, cached_json
 
 router = APIRouter()
 
 
 @router.get("/water_logs/{user_id}")
-def get_water_log(user_id: int, current_user: dict = Depends(get_current_user), date_record: Optional[str] = None):
+def get_water_log(request: Request, user_id: int, current_user: dict = Depends(get_current_user),
+                  date_record: Optional[str] = None):
     check_ownership(current_user, user_id)
     target_date = date.fromisoformat(date_record) if date_record else date.today()
+    return cached_json(request, "water_logs", user_id, {"date": target_date},
+                       lambda: _load_water_log(user_id, target_date))
+
+
+def _load_water_log(user_id: int, target_date: date) -> dict:
     conn = get_db_connection()
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -52,6 +59,7 @@ def upsert_water_log(user_id: int, entry: WaterLogUpdate, current_user: dict = D
         """, (user_id, entry.amount_ml, glasses))
         saved = cur.fetchone()["amount_ml"]
         conn.commit()
+        bump_user(user_id)
         return {"date_record": date.today().isoformat(), "amount_ml": saved}
     except HTTPException:
         raise
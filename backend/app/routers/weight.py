@@ -1,13 +1,15 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from psycopg2.extras import RealDictCursor
 
 from database import get_db_connection
+from ai_models.user_context import invalidate_user_context
 from auth.dependencies import get_current_user
 from app.core.dependencies import check_ownership
 from app.models.schemas import WeightLogEntry
-from app.services.nutrition_service import _check_1700_calorie_warning
+from app.services.nutrition_service import CALORIE_WARNING_HOUR, _check_1700_calorie_warning
+from app.services.response_cache import bump_user, cached_json
 
 router = APIRouter()
 
@@ -28,6 +30,7 @@ def add_weight_log(user_id: int, entry: WeightLogEntry, current_user: dict = Dep
             UPDATE users SET current_weight_kg = %s, updated_at = NOW() WHERE user_id = %s
         """, (entry.weight_kg, user_id))
         conn.commit()
+        invalidate_user_context(user_id)
         return {"message": "บันทึกน้ำหนักสำเร็จ"}
     except Exception as e:
         conn.rollback()
@@ -55,11 +58,23 @@ def get_weight_logs(user_id: int, current_user: dict = Depends(get_current_user)
 
 
 @router.get("/users/{user_id}/goal_progress")
-def get_goal_progress(user_id: int, current_user: dict = Depends(get_current_user)):
+def get_goal_progress(request: Request, user_id: int, current_user: dict = Depends(get_current_user)):
     check_ownership(current_user, user_id)
+    # weekly_intake covers the current week. `evening` makes the first call
+    # after CALORIE_WARNING_HOUR a miss, so _load_goal_progress runs the
+    # warning check; after that only a write (which bumps the generation) can
+    # change its outcome, and cache hits never touch the DB.
+    evening = datetime.now().hour >= CALORIE_WARNING_HOUR
+    return cached_json(request, "goal_progress", user_id,
+                       {"today": date.today(), "evening": evening},
+                       lambda: _load_goal_progress(user_id))
+
+
+def _load_goal_progress(user_id: int) -> dict:
     conn = get_db_connection()
     try:
-        _check_1700_calorie_warning(user_id, conn)
+        if _check_1700_calorie_warning(user_id, conn):
+            bump_user(user_id)  # new notification: unread_count changed
         cur = conn.cursor(cursor_factory=RealDictCursor)
         cur.execute("""
             SELECT current_weight_kg, target_weight_kg, goal_type,
@@ -171,7 +186,8 @@ def get_progress_summary(user_id: int, current_user: dict = Depends(get_current_
     check_ownership(current_user, user_id)
     conn = get_db_connection()
     try:
-        _check_1700_calorie_warning(user_id, conn)
+        if _check_1700_calorie_warning(user_id, conn):
+            bump_user(user_id)
         cur = conn.cursor(cursor_factory=RealDictCursor)
         cur.execute("""
             SELECT current_weight_kg, target_weight_kg, goal_type, goal_start_date
@@ -0,0 +1,268 @@
+"""
+Process-wide executor for blocking AI work (agent pipelines and the LLM
+calls inside them).
+
+The chat routes used to wrap every call in a fresh
+ThreadPoolExecutor(max_workers=1). Leaving its `with` block joins the thread,
+so a request that hit the 30s timeout still held its worker until the model
+finished, and nothing capped how many generations hit Ollama at once — a
+burst of /api/meals/estimate could queue in front of every chat reply. This
+module keeps one bounded pool instead:
+
+  - AI_MAX_CONCURRENCY worker threads (default 4) — match it to what the
+    model backend can serve in parallel (OLLAMA_NUM_PARALLEL, GPU count)
+  - a wait queue of at most AI_MAX_QUEUE jobs (default 8); once workers and
+    queue are full, submit() raises AIOverloaded at once (route: 503 +
+    Retry-After) instead of piling up requests that will time out anyway
+  - per-endpoint budgets, AI_ENDPOINT_BUDGETS (default
+    "chat.coach=3,chat.multi=3,meals.estimate=2"), capping running+queued
+    jobs per endpoint so one endpoint can't take every slot (route: 429)
+  - run() cancels a job that outlives its timeout: a queued job is dropped
+    before it starts; a running one sees llm_provider.cancel_scope() flip,
+    which closes the upstream stream so the model stops generating
+  - counters (queue depth, running, wait time, rejections, timeouts) under
+    `ai_executor` in GET /metrics
+
+Usage:
+    from app.services.ai_executor import get_executor
+    result = get_executor().run("chat.coach", fn, arg, timeout=30)
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from ai_models.llm_provider import cancel_scope
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "8"))
+RETRY_AFTER_SEC = int(os.getenv("AI_RETRY_AFTER_SEC", "5"))
+_DEFAULT_BUDGETS = "chat.coach=3,chat.multi=3,meals.estimate=2"
+
+
+def parse_budgets(spec: str) -> Dict[str, int]:
+    """"chat.coach=3, meals.estimate=2" -> {"chat.coach": 3, "meals.estimate": 2}."""
+    budgets: Dict[str, int] = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            budgets[name.strip()] = max(int(value), 1)
+        except ValueError:
+            logger.warning("ignoring bad AI_ENDPOINT_BUDGETS entry %r", part)
+    return budgets
+
+
+class AIOverloaded(RuntimeError):
+    """No capacity for another job: `reason` is "budget" or "queue_full"."""
+
+    def __init__(self, endpoint: str, reason: str, retry_after: int = RETRY_AFTER_SEC):
+        super().__init__(f"AI executor saturated for {endpoint} ({reason})")
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def status_code(self) -> int:
+        # An endpoint over its own budget is "slow down"; a full pool is
+        # "service busy".
+        return 429 if self.reason == "budget" else 503
+
+
+class AITimeout(TimeoutError):
+    """The job did not finish in time and has been cancelled."""
+
+
+class AIJob:
+    __slots__ = ("endpoint", "fn", "args", "kwargs", "context", "future", "submitted_at", "_cancel")
+
+    def __init__(self, endpoint: str, fn: Callable, args: tuple, kwargs: dict):
+        self.endpoint = endpoint
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        # The submitter's contextvars (Sentry scope, cancel checks) travel
+        # with the job onto the worker thread.
+        self.context = contextvars.copy_context()
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.submitted_at = time.monotonic()
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def result(self, timeout: Optional[float] = None):
+        return self.future.result(timeout=timeout)
+
+
+class AIExecutor:
+    """Bounded worker pool with a bounded queue and per-endpoint budgets."""
+
+    def __init__(self, max_workers: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 budgets: Optional[Dict[str, int]] = None,
+                 retry_after: int = RETRY_AFTER_SEC):
+        self.max_workers = max(max_workers, 1)
+        self.max_queue = max(max_queue, 0)
+        self.budgets = dict(budgets or {})
+        self.retry_after = retry_after
+        self._cond = threading.Condition()
+        self._queue: "deque[AIJob]" = deque()
+        self._running = 0
+        self._inflight: Dict[str, int] = {}
+        self._threads: list = []
+        self._reset_counters()
+
+    @classmethod
+    def from_env(cls) -> "AIExecutor":
+        return cls(budgets=parse_budgets(os.getenv("AI_ENDPOINT_BUDGETS", _DEFAULT_BUDGETS)))
+
+    def _reset_counters(self) -> None:
+        self.submitted = self.completed = self.failed = 0
+        self.timeouts = self.cancelled = 0
+        self.rejected: Dict[str, int] = {"budget": 0, "queue_full": 0}
+        self.rejected_by_endpoint: Dict[str, int] = {}
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    # ── submission ───────────────────────────────────────────────────────
+    def submit(self, endpoint: str, fn: Callable, *args, **kwargs) -> AIJob:
+        """Queue fn(*args, **kwargs); raises AIOverloaded instead of waiting."""
+        with self._cond:
+            budget = self.budgets.get(endpoint)
+            if budget is not None and self._inflight.get(endpoint, 0) >= budget:
+                raise self._reject(endpoint, "budget")
+            if self._running + len(self._queue) >= self.max_workers + self.max_queue:
+                raise self._reject(endpoint, "queue_full")
+            job = AIJob(endpoint, fn, args, kwargs)
+            self._queue.append(job)
+            self._inflight[endpoint] = self._inflight.get(endpoint, 0) + 1
+            self.submitted += 1
+            self._start_workers()
+            self._cond.notify()
+        return job
+
+    def run(self, endpoint: str, fn: Callable, *args, timeout: float, **kwargs):
+        """submit() and wait; on timeout the job is cancelled and AITimeout raised."""
+        job = self.submit(endpoint, fn, *args, **kwargs)
+        try:
+            return job.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            self.cancel(job)
+            with self._cond:
+                self.timeouts += 1
+            raise AITimeout(f"{endpoint} exceeded {timeout}s") from None
+
+    def cancel(self, job: AIJob) -> None:
+        """Drop a queued job, or ask a running one to stop at its next chunk."""
+        with self._cond:
+            job._cancel.set()
+            if job.future.cancel():
+                # Still pending, so still in the queue (workers dequeue and
+                # mark running under this same lock).
+                self._queue.remove(job)
+                self._release(job)
+                self.cancelled += 1
+
+    def _reject(self, endpoint: str, reason: str) -> AIOverloaded:
+        self.rejected[reason] += 1
+        self.rejected_by_endpoint[endpoint] = self.rejected_by_endpoint.get(endpoint, 0) + 1
+        logger.warning("AI executor rejected %s (%s): running=%d queued=%d",
+                       endpoint, reason, self._running, len(self._queue))
+        return AIOverloaded(endpoint, reason, self.retry_after)
+
+    def _release(self, job: AIJob) -> None:
+        left = self._inflight.get(job.endpoint, 1) - 1
+        if left:
+            self._inflight[job.endpoint] = left
+        else:
+            self._inflight.pop(job.endpoint, None)
+
+    # ── workers ──────────────────────────────────────────────────────────
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.max_workers:
+            t = threading.Thread(target=self._work, name=f"ai-worker-{len(self._threads)}",
+                                 daemon=True)
+            self._threads.append(t)
+            t.start()
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._queue.popleft()
+                job.future.set_running_or_notify_cancel()
+                self._running += 1
+                waited_ms = (time.monotonic() - job.submitted_at) * 1000
+                self.wait_count += 1
+                self.wait_total_ms += waited_ms
+                self.wait_max_ms = max(self.wait_max_ms, waited_ms)
+            ok = False
+            try:
+                result = job.context.run(self._call, job)
+                ok = True
+            except BaseException as e:  # delivered to the waiter, never lost
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._release(job)
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+    @staticmethod
+    def _call(job: AIJob):
+        with cancel_scope(job._cancel.is_set):
+            return job.fn(*job.args, **job.kwargs)
+
+    # ── introspection ────────────────────────────────────────────────────
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queue_depth": len(self._queue),
+                "inflight": dict(self._inflight),
+                "budgets": dict(self.budgets),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "cancelled_queued": self.cancelled,
+                "rejected": sum(self.rejected.values()),
+                "rejected_budget": self.rejected["budget"],
+                "rejected_queue_full": self.rejected["queue_full"],
+                "rejected_by_endpoint": dict(self.rejected_by_endpoint),
+                "wait_ms_avg": round(self.wait_total_ms / self.wait_count, 1) if self.wait_count else None,
+                "wait_ms_max": round(self.wait_max_ms, 1) if self.wait_count else None,
+            }
+
+    def reset_stats(self) -> None:
+        with self._cond:
+            self._reset_counters()
+
+
+_executor = AIExecutor.from_env()
+
+
+def get_executor() -> AIExecutor:
+    return _executor
+
+
+def ai_executor_stats() -> dict:
+    """Snapshot for /metrics."""
+    return _executor.stats()
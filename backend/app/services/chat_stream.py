@@ -0,0 +1,207 @@
+"""
+Server-Sent Events plumbing for the streaming chat routes.
+
+The blocking chat routes wait for the whole completion under one 30s
+wall-clock cap; DeepSeek-R1 spends most of that inside <think>, so long
+answers time out even while the model is still producing. The /stream
+variants instead:
+
+  - run the agent's raw chunk generator on the shared AI executor
+    (app/services/ai_executor.py) and relay it through a queue; admission
+    happens before the response starts, so a saturated executor is a
+    plain 503/429 rather than an SSE error;
+  - strip <think>…</think> on the fly (llm_provider.strip_think) so only
+    the answer reaches the client;
+  - enforce a first-chunk timeout (AI_STREAM_FIRST_TOKEN_SEC, default 30:
+    DB context + analysis + model load) and an idle-gap timeout between
+    chunks (AI_STREAM_IDLE_SEC, default 15), with AI_STREAM_MAX_SEC
+    (default 180) as a backstop against a model that never stops;
+  - report time-to-first-token in the final `done` event and aggregate it
+    under `chat_stream` in GET /metrics.
+
+Events (data is JSON):
+    event: token   data: {"text": "..."}
+    event: done    data: {"ttft_ms": ..., "first_chunk_ms": ..., "total_ms": ..., "chars": ...}
+    event: error   data: {"detail": "...", "reason": "first_token_timeout|idle_timeout|max_duration|error"}
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+from ai_models.llm_provider import strip_think
+from app.core.observability import note_failure
+from app.services.ai_executor import AIJob, get_executor
+
+logger = logging.getLogger(__name__)
+
+FIRST_TOKEN_SEC = float(os.getenv("AI_STREAM_FIRST_TOKEN_SEC", "30"))
+IDLE_SEC = float(os.getenv("AI_STREAM_IDLE_SEC", "15"))
+MAX_SEC = float(os.getenv("AI_STREAM_MAX_SEC", "180"))
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # nginx / Railway proxies: don't buffer
+}
+
+_TIMEOUT_DETAIL = "AI ตอบช้าเกินไป กรุณาลองใหม่"
+
+
+class _StreamTimeout(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.streams = self.completed = self.cancelled = self.errors = 0
+        self.timeouts = {"first_token_timeout": 0, "idle_timeout": 0, "max_duration": 0}
+        self.ttft_count = 0
+        self.ttft_total_ms = 0.0
+        self.ttft_max_ms = 0.0
+
+    def record(self, outcome: str, ttft_ms) -> None:
+        with self._lock:
+            self.streams += 1
+            if outcome == "done":
+                self.completed += 1
+            elif outcome == "cancelled":
+                self.cancelled += 1
+            elif outcome in self.timeouts:
+                self.timeouts[outcome] += 1
+            else:
+                self.errors += 1
+            if ttft_ms is not None:
+                self.ttft_count += 1
+                self.ttft_total_ms += ttft_ms
+                self.ttft_max_ms = max(self.ttft_max_ms, ttft_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "streams": self.streams,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "errors": self.errors,
+                **self.timeouts,
+                "ttft_ms_avg": round(self.ttft_total_ms / self.ttft_count, 1) if self.ttft_count else None,
+                "ttft_ms_max": round(self.ttft_max_ms, 1) if self.ttft_count else None,
+            }
+
+
+_stats = _Stats()
+
+
+def chat_stream_stats() -> dict:
+    """Snapshot for /metrics."""
+    return _stats.snapshot()
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _pump(produce: Callable[[], Iterable[str]], out: queue.Queue, stop: threading.Event) -> None:
+    chunks = None
+    try:
+        chunks = produce()
+        for chunk in chunks:
+            if stop.is_set():
+                break
+            out.put(("chunk", chunk))
+        out.put(("end", None))
+    except Exception as e:
+        out.put(("error", e))
+    finally:
+        close = getattr(chunks, "close", None) if chunks is not None else None
+        if close:
+            close()  # closes the upstream HTTP stream on early stop
+
+
+def stream_chat(produce: Callable[[], Iterable[str]], *, where: str, user_id=None,
+                budget: str | None = None) -> Iterator[str]:
+    """
+    SSE body for a StreamingResponse. `produce` returns the agent's raw
+    chunk iterator; it runs on the AI executor under `budget` (defaults to
+    `where`). Raises AIOverloaded here, before any byte is sent.
+    """
+    out: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    executor = get_executor()
+    job = executor.submit(budget or where, _pump, produce, out, stop)
+    return _relay(job, out, stop, where=where, user_id=user_id)
+
+
+def _relay(job: AIJob, out: queue.Queue, stop: threading.Event, *, where: str,
+           user_id=None) -> Iterator[str]:
+    started = time.monotonic()
+    first_chunk_at = None
+    deadline = started + MAX_SEC
+
+    def raw() -> Iterator[str]:
+        nonlocal first_chunk_at
+        while True:
+            now = time.monotonic()
+            if first_chunk_at is None:
+                wait, reason = started + FIRST_TOKEN_SEC - now, "first_token_timeout"
+            else:
+                wait, reason = IDLE_SEC, "idle_timeout"
+            if deadline - now < wait:
+                wait, reason = deadline - now, "max_duration"
+            try:
+                kind, value = out.get(timeout=max(wait, 0))
+            except queue.Empty:
+                raise _StreamTimeout(reason)
+            if kind == "end":
+                return
+            if kind == "error":
+                raise value
+            if first_chunk_at is None:
+                first_chunk_at = time.monotonic()
+            yield value
+
+    ttft_ms = None
+    chars = 0
+    outcome = "error"
+    try:
+        for text in strip_think(raw()):
+            if ttft_ms is None:
+                ttft_ms = (time.monotonic() - started) * 1000
+            chars += len(text)
+            yield sse_event("token", {"text": text})
+        outcome = "done"
+        total_ms = (time.monotonic() - started) * 1000
+        first_ms = (first_chunk_at - started) * 1000 if first_chunk_at else None
+        done = {
+            "ttft_ms": None if ttft_ms is None else round(ttft_ms, 1),
+            "first_chunk_ms": None if first_ms is None else round(first_ms, 1),
+            "total_ms": round(total_ms, 1),
+            "chars": chars,
+        }
+        logger.info("%s stream done: %s", where, done)
+        yield sse_event("done", done)
+    except GeneratorExit:
+        outcome = "cancelled"  # client went away
+        raise
+    except _StreamTimeout as e:
+        outcome = e.reason
+        logger.warning("%s stream %s after %.0fms", where, e.reason,
+                       (time.monotonic() - started) * 1000)
+        yield sse_event("error", {"detail": _TIMEOUT_DETAIL, "reason": e.reason})
+    except Exception as e:
+        note_failure(where, e, user_id=user_id)
+        yield sse_event("error", {"detail": f"AI Error: {str(e)}", "reason": "error"})
+    finally:
+        stop.set()
+        get_executor().cancel(job)  # no-op once finished; frees a queued slot
+        _stats.record(outcome, ttft_ms)
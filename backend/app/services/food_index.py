@@ -0,0 +1,261 @@
+"""
+Process-local food catalog index for GET /foods/search.
+
+The SQL search (foods._SEARCH_FOODS_SQL) costs a database round trip and
+a trigram scan over foods + aliases per keystroke. The catalog is small
+(a few thousand foods + regional aliases), so each worker keeps it in
+memory and answers search without touching Postgres:
+
+  - every canonical name and every approved alias is lower-cased and
+    posted under its character unigrams and bigrams;
+  - a query intersects the postings of its grams, then confirms the
+    substring (infix) match on the surviving names;
+  - ranking mirrors the SQL — rows whose matching alias belongs to the
+    caller's region first — then prefix matches before infix, then name.
+
+Freshness:
+  - load() at startup (main.py), full snapshot;
+  - refresh_food() / remove_food() after the routers that mutate foods or
+    food_regional_names commit (this worker only);
+  - other workers pick the change up on their next full reload, at most
+    FOOD_INDEX_TTL_SECONDS later (default 300).
+
+Until the first load succeeds `ready` is False and callers fall back to SQL.
+FOOD_SEARCH_BACKEND=db skips the index entirely (multi-node deployments
+that prefer the pg_trgm search in foods._SEARCH_FOODS_SQL).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+_CATALOG_FOODS_SQL = "SELECT * FROM foods WHERE deleted_at IS NULL"
+_CATALOG_ALIASES_SQL = """
+    SELECT food_id, region::text AS region, name_th, is_primary
+    FROM food_regional_names
+    WHERE deleted_at IS NULL
+"""
+_FOOD_SQL = "SELECT * FROM foods WHERE food_id = %s AND deleted_at IS NULL"
+_FOOD_ALIASES_SQL = """
+    SELECT food_id, region::text AS region, name_th, is_primary
+    FROM food_regional_names
+    WHERE food_id = %s AND deleted_at IS NULL
+"""
+
+
+def _norm(text: str | None) -> str:
+    return (text or "").strip().lower()
+
+
+def _grams(text: str) -> set[str]:
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class FoodIndex:
+    """In-memory name/alias index. Reads are lock-free; writers hold _lock."""
+
+    def __init__(self, ttl_seconds: float | None = None):
+        self.ttl_seconds = (
+            float(os.getenv("FOOD_INDEX_TTL_SECONDS", "300"))
+            if ttl_seconds is None else ttl_seconds
+        )
+        self._lock = threading.Lock()
+        self._foods: dict[int, dict] = {}
+        # entry id -> (normalized name, food_id, alias region or None)
+        self._entries: dict[int, tuple[str, int, str | None]] = {}
+        self._postings: dict[str, set[int]] = {}
+        self._by_food: dict[int, list[int]] = {}
+        # (food_id, region) -> primary alias
+        self._primary: dict[tuple[int, str], str] = {}
+        self._next_entry = 0
+        self.loaded_at: float | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loaded_at is not None
+
+    @property
+    def stale(self) -> bool:
+        return self.ready and time.monotonic() - self.loaded_at > self.ttl_seconds
+
+    def __len__(self) -> int:
+        return len(self._foods)
+
+    # ── building ─────────────────────────────────────────────────────────────
+    def build(self, foods, aliases) -> None:
+        """Replace the whole index from food rows and alias rows."""
+        fresh = FoodIndex(self.ttl_seconds)
+        grouped: dict[int, list[dict]] = {}
+        for a in aliases:
+            grouped.setdefault(a["food_id"], []).append(a)
+        for f in foods:
+            fresh._add(dict(f), grouped.get(f["food_id"], []))
+        with self._lock:
+            self._foods, self._entries = fresh._foods, fresh._entries
+            self._postings, self._by_food = fresh._postings, fresh._by_food
+            self._primary, self._next_entry = fresh._primary, fresh._next_entry
+            self.loaded_at = time.monotonic()
+
+    def load(self, conn) -> None:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(_CATALOG_FOODS_SQL)
+        foods = cur.fetchall()
+        cur.execute(_CATALOG_ALIASES_SQL)
+        self.build(foods, cur.fetchall())
+        logger.info("food index loaded: %d foods", len(self._foods))
+
+    def refresh_food(self, conn, food_id: int) -> None:
+        """Re-read one food and its aliases after a committed write.
+
+        Never raises: a failed refresh leaves the entry stale until the
+        next full reload rather than failing the admin request.
+        """
+        if not self.ready:
+            return
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(_FOOD_SQL, (food_id,))
+            food = cur.fetchone()
+            cur.execute(_FOOD_ALIASES_SQL, (food_id,))
+            aliases = cur.fetchall()
+        except Exception as e:
+            logger.warning("food index refresh failed for food_id=%s: %s", food_id, e)
+            return
+        with self._lock:
+            self._remove(food_id)
+            if food:
+                self._add(dict(food), aliases)
+
+    def remove_food(self, food_id: int) -> None:
+        with self._lock:
+            self._remove(food_id)
+
+    def _add(self, food: dict, aliases) -> None:
+        food_id = food["food_id"]
+        self._foods[food_id] = food
+        names = [(food.get("food_name"), None)]
+        for a in aliases:
+            names.append((a["name_th"], a["region"]))
+            if a.get("is_primary"):
+                self._primary[(food_id, a["region"])] = a["name_th"]
+        ids = []
+        for name, region in names:
+            norm = _norm(name)
+            if not norm:
+                continue
+            eid = self._next_entry
+            self._next_entry += 1
+            self._entries[eid] = (norm, food_id, region)
+            for g in _grams(norm):
+                self._postings.setdefault(g, set()).add(eid)
+            ids.append(eid)
+        self._by_food[food_id] = ids
+
+    def _remove(self, food_id: int) -> None:
+        self._foods.pop(food_id, None)
+        for eid in self._by_food.pop(food_id, []):
+            norm, _, _ = self._entries.pop(eid)
+            for g in _grams(norm):
+                bucket = self._postings.get(g)
+                if bucket is not None:
+                    bucket.discard(eid)
+                    if not bucket:
+                        del self._postings[g]
+        for key in [k for k in self._primary if k[0] == food_id]:
+            del self._primary[key]
+
+    # ── querying ─────────────────────────────────────────────────────────────
+    def search(self, q: str, region: str | None = None, limit: int = 20) -> list[dict]:
+        """Rows shaped like _SEARCH_FOODS_SQL: food columns + display_name,
+        regional_name, match_user_region."""
+        needle = _norm(q)
+        if not needle or limit <= 0:
+            return []
+        postings, entries = self._postings, self._entries
+        grams = {needle} if len(needle) == 1 else {needle[i:i + 2] for i in range(len(needle) - 1)}
+        # Rarest gram first keeps the intersection small.
+        grams = sorted(grams, key=lambda g: len(postings.get(g, ())))
+        candidates = set(postings.get(grams[0], ()))
+        for g in grams[1:]:
+            if not candidates:
+                break
+            candidates &= postings.get(g, set())
+
+        # food_id -> (match_user_region, prefix)
+        hits: dict[int, tuple[int, int]] = {}
+        for eid in candidates:
+            entry = entries.get(eid)
+            if entry is None:
+                continue
+            norm, food_id, alias_region = entry
+            pos = norm.find(needle)
+            if pos < 0:
+                continue
+            score = (int(region is not None and alias_region == region), int(pos == 0))
+            if score > hits.get(food_id, (-1, -1)):
+                hits[food_id] = score
+
+        foods = self._foods
+        ranked = sorted(
+            (fid for fid in hits if fid in foods),
+            key=lambda fid: (-hits[fid][0], -hits[fid][1], foods[fid].get("food_name") or ""),
+        )
+        out = []
+        for fid in ranked[:limit]:
+            row = dict(foods[fid])
+            alias = self._primary.get((fid, region)) if region else None
+            row["display_name"] = alias or row.get("food_name")
+            row["regional_name"] = alias
+            row["match_user_region"] = hits[fid][0]
+            out.append(row)
+        return out
+
+
+food_index = FoodIndex()
+_reload_lock = threading.Lock()
+
+
+def load_food_index() -> bool:
+    """(Re)load the shared index from the pool; False if the DB is unavailable."""
+    if os.getenv("FOOD_SEARCH_BACKEND", "index").strip().lower() == "db":
+        return False
+    from database import get_db_connection
+    conn = get_db_connection()
+    if conn is None:
+        return False
+    try:
+        food_index.load(conn)
+        return True
+    except Exception as e:
+        logger.warning("food index load failed: %s", e)
+        return False
+    finally:
+        conn.close()
+
+
+def maybe_reload_food_index() -> None:
+    """Kick off a background full reload once the snapshot is older than the TTL.
+
+    Requests keep serving the current snapshot meanwhile; at most one reload
+    runs per worker.
+    """
+    if not food_index.stale or not _reload_lock.acquire(blocking=False):
+        return
+
+    def _run():
+        try:
+            if not load_food_index():
+                # Keep serving the old snapshot; retry after another TTL.
+                food_index.loaded_at = time.monotonic()
+        finally:
+            _reload_lock.release()
+
+    threading.Thread(target=_run, name="food-index-reload", daemon=True).start()
@@ -88,20 +88,25 @@ def _compute_target_calories(user: dict) -> int:
     return target_cal
 
 
-def _check_1700_calorie_warning(user_id: int, conn):
+# Hour (server local time) from which a low intake so far triggers the warning.
+CALORIE_WARNING_HOUR = 17
+
+
+def _check_1700_calorie_warning(user_id: int, conn) -> bool:
+    """True if a warning notification was inserted (and committed)."""
     now = datetime.now()
-    if now.hour < 17:
-        return
+    if now.hour < CALORIE_WARNING_HOUR:
+        return False
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         today_str = now.strftime('%Y-%m-%d')
-        cur.execute("SELECT notification_id FROM notifications WHERE user_id = %s AND type = 'warning' AND DATE(created_at) = %s AND title = 'เตือน: แคลอรีวันนี้ยังต่ำเกินไป!'", (user_id, today_str))
+        cur.execute("SELECT notification_id FROM notifications WHERE user_id = %s AND type = 'warning' AND created_at >= %s::date AND created_at < %s::date + 1 AND title = 'เตือน: แคลอรีวันนี้ยังต่ำเกินไป!'", (user_id, today_str, today_str))
         if cur.fetchone():
-            return
+            return False
         cur.execute("SELECT current_weight_kg, height_cm, birth_date, gender FROM users WHERE user_id = %s", (user_id,))
         user_row = cur.fetchone()
         if not user_row:
-            return
+            return False
         w = float(user_row.get('current_weight_kg') or 0)
         h = float(user_row.get('height_cm') or 0)
         birth = user_row.get('birth_date')
@@ -121,9 +126,11 @@ def _check_1700_calorie_warning(user_id: int, conn):
                 VALUES (%s, 'เตือน: แคลอรีวันนี้ยังต่ำเกินไป!', %s, 'warning')
             """, (user_id, msg))
             conn.commit()
+            return True
     except Exception as e:
         print(f"Warning Check Error: {e}")
         conn.rollback()
+    return False
 
 
 def normalize_calories(values: List[float]) -> float:
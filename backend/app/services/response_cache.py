@@ -0,0 +1,365 @@
+"""
+Read-through response cache for the home-screen endpoints.
+
+The Flutter home screen calls GET /daily_summary/{id},
+/users/{id}/goal_progress, /notifications/{id}/unread_count,
+/water_logs/{id} and /insights/{id} on every resume, and each recomputed
+from raw tables although nothing had changed since the last resume. Those
+routes now answer through cached_json():
+
+  - entries are keyed on (endpoint, user_id, params, generation). Every
+    write that changes what they show bumps the user's generation, so old
+    entries are simply never read again. This includes meals, weight,
+    water, notifications, profile and login streaks. Writes that already
+    call invalidate_user_context() bump it through a listener, and the rest
+    call bump_user() directly
+  - a value computed while a write bumped the generation is not stored
+  - bodies carry a strong ETag and `Cache-Control: private, no-cache`, so
+    the app revalidates each time and gets `304 Not Modified` with no body
+    when the screen is unchanged (whether or not the entry was cached)
+
+Backends (env RESPONSE_CACHE_BACKEND; default redis when
+RESPONSE_CACHE_REDIS_URL is set, else off):
+
+  redis   — entries and generations in Redis (RESPONSE_CACHE_REDIS_URL,
+            else REDIS_URL). This is shared by every worker, so a write is
+            visible at once. It needs the `redis` package; without it or
+            without a URL the cache is off. Any Redis error counts as a miss
+  memory  — per-process LRU of at most RESPONSE_CACHE_MAX_BYTES (default
+            16 MiB) of bodies, with generations for the
+            RESPONSE_CACHE_MAX_USERS (default 10000) most recently written
+            users. Generations are per process, so only use it with a
+            single worker: another worker would serve a stale body until
+            its copy expires after RESPONSE_CACHE_TTL_SECONDS (default 120)
+  off     — compute every time (ETags and 304s still apply)
+
+Counters (hit rate, 304s, bytes saved, stores skipped after a racing
+write) are under `response_cache` in GET /metrics.
+
+Usage:
+    from app.services.response_cache import bump_user, cached_json
+    return cached_json(request, "water_logs", user_id, {"date": d}, lambda: _load(user_id, d))
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from ai_models.user_context import add_invalidation_listener
+
+logger = logging.getLogger(__name__)
+
+TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "120"))
+MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+MAX_USERS = int(os.getenv("RESPONSE_CACHE_MAX_USERS", "10000"))
+# Generation keys outlive every entry, so a counter that expires can't
+# bring an old entry back.
+_GENERATION_TTL_SECONDS = 86400
+
+# (body, etag)
+Entry = Tuple[bytes, str]
+
+
+def _owner(key: str) -> str:
+    """The user_id part of a cached_json key (endpoint:user_id:params:generation)."""
+    parts = key.split(":", 2)
+    return parts[1] if len(parts) > 1 else ""
+
+
+class MemoryResponseCache:
+    """Thread-safe LRU bounded by total body bytes, with in-process generations.
+
+    Generations are kept for the MAX_USERS most recently bumped users. A
+    bump drops the user's entries (they can't be read again anyway), and a
+    user whose generation is evicted loses their entries with it, so the
+    generation falling back to 0 can't bring an old entry back."""
+
+    def __init__(self, max_bytes: int = MAX_BYTES, max_users: int = MAX_USERS):
+        self.max_bytes, self.max_users = max_bytes, max_users
+        # key -> (body, etag, expires_at, owner); owner is _owner(key)
+        self._data: "OrderedDict[str, Tuple[bytes, str, float, str]]" = OrderedDict()
+        self._user_keys: dict = {}
+        self._generations: "OrderedDict[int, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def generation(self, user_id: int) -> int:
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def bump(self, user_id: int) -> None:
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self._generations.move_to_end(user_id)
+            self._drop_user(user_id)
+            while len(self._generations) > self.max_users:
+                old, _ = self._generations.popitem(last=False)
+                self._drop_user(old)
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            body, etag, expires_at, _ = item
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                return None
+            self._data.move_to_end(key)
+            return body, etag
+
+    def set(self, key: str, body: bytes, etag: str, ttl: float) -> None:
+        if len(body) > self.max_bytes:
+            return
+        owner = _owner(key)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (body, etag, time.monotonic() + ttl, owner)
+            self._user_keys.setdefault(owner, set()).add(key)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        body, _, _, owner = self._data.pop(key)
+        self._bytes -= len(body)
+        keys = self._user_keys.get(owner)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[owner]
+
+    def _drop_user(self, user_id: int) -> None:
+        for key in list(self._user_keys.get(str(user_id), ())):
+            self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._user_keys.clear()
+            self._generations.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": "memory", "entries": len(self._data), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes, "users_tracked": len(self._generations),
+                    "evictions": self.evictions}
+
+
+class RedisResponseCache:
+    """Entries and generations in Redis; `client` is a redis.Redis (or fakeredis) instance."""
+
+    def __init__(self, client, prefix: str = "cg:resp"):
+        self.client = client
+        self.prefix = prefix
+
+    def _gen_key(self, user_id: int) -> str:
+        return f"{self.prefix}:gen:{user_id}"
+
+    def generation(self, user_id: int) -> int:
+        return int(self.client.get(self._gen_key(user_id)) or 0)
+
+    def bump(self, user_id: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.incr(self._gen_key(user_id))
+        pipe.expire(self._gen_key(user_id), _GENERATION_TTL_SECONDS)
+        pipe.execute()
+
+    def get(self, key: str) -> Optional[Entry]:
+        raw = self.client.get(f"{self.prefix}:{key}")
+        if raw is None:
+            return None
+        etag, _, body = raw.partition(b"\n")
+        return body, etag.decode()
+
+    def set(self, key: str, body: bytes, etag: str, ttl: float) -> None:
+        self.client.set(f"{self.prefix}:{key}", etag.encode() + b"\n" + body,
+                        ex=max(int(math.ceil(ttl)), 1))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class NullResponseCache:
+    def generation(self, user_id: int) -> int:
+        return 0
+
+    def bump(self, user_id: int) -> None:
+        pass
+
+    def get(self, key: str) -> Optional[Entry]:
+        return None
+
+    def set(self, key: str, body: bytes, etag: str, ttl: float) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "off"}
+
+
+def _build_backend():
+    """Off unless a cache every worker shares is configured: with per-process
+    generations a write on one gunicorn worker leaves the others serving the
+    old body for up to the TTL. `memory` is opt-in for single-worker runs."""
+    url = os.getenv("RESPONSE_CACHE_REDIS_URL") or os.getenv("REDIS_URL")
+    default = "redis" if os.getenv("RESPONSE_CACHE_REDIS_URL") else "off"
+    kind = os.getenv("RESPONSE_CACHE_BACKEND", default).strip().lower()
+    if kind == "memory":
+        return MemoryResponseCache()
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            logger.warning("RESPONSE_CACHE_BACKEND=redis but the redis package is not installed; "
+                           "response cache disabled")
+            return NullResponseCache()
+        if url:
+            return RedisResponseCache(redis.Redis.from_url(url, socket_timeout=0.2))
+        logger.warning("RESPONSE_CACHE_BACKEND=redis needs RESPONSE_CACHE_REDIS_URL or REDIS_URL; "
+                       "response cache disabled")
+    return NullResponseCache()
+
+
+_backend = _build_backend()
+_lock = threading.Lock()
+
+
+def _new_counters() -> dict:
+    return {"hits": 0, "misses": 0, "not_modified": 0, "bytes_saved": 0,
+            "bytes_from_cache": 0, "stores": 0, "stale_skipped": 0, "bumps": 0,
+            "errors": 0, "by_endpoint": {}}
+
+
+_counters = _new_counters()
+
+
+def _count(endpoint: Optional[str] = None, **deltas) -> None:
+    with _lock:
+        for name, delta in deltas.items():
+            _counters[name] += delta
+        if endpoint is not None:
+            per = _counters["by_endpoint"].setdefault(endpoint, {"hits": 0, "misses": 0})
+            for name in ("hits", "misses"):
+                per[name] += deltas.get(name, 0)
+
+
+def get_backend():
+    return _backend
+
+
+def set_backend(backend) -> None:
+    """Swap the backend (tests, or a Redis client built elsewhere)."""
+    global _backend
+    _backend = backend
+
+
+def bump_user(user_id: int) -> None:
+    """Call after committing a write that changes what a cached endpoint shows."""
+    try:
+        _backend.bump(user_id)
+        _count(bumps=1)
+    except Exception as e:
+        logger.warning("response cache bump failed for user %s: %s", user_id, e)
+        _count(errors=1)
+
+
+add_invalidation_listener(bump_user)
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+def _render(value: Any) -> bytes:
+    # Byte-for-byte what FastAPI's JSONResponse would have sent.
+    return json.dumps(jsonable_encoder(value), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def cached_json(request: Request, endpoint: str, user_id: int, params: dict,
+                compute: Callable[[], Any], ttl: float = TTL_SECONDS) -> Response:
+    """
+    The JSON response for compute(), served from the cache when this user
+    hasn't written since it was stored, and as a 304 when it matches the
+    client's If-None-Match. Ownership must be checked before calling.
+    """
+    key = f"{endpoint}:{user_id}:{json.dumps(params, sort_keys=True, default=str)}"
+    entry, generation = None, None
+    try:
+        generation = _backend.generation(user_id)
+        entry = _backend.get(f"{key}:{generation}")
+    except Exception as e:
+        logger.warning("response cache read failed for %s: %s", endpoint, e)
+        _count(errors=1)
+
+    if entry is not None:
+        body, etag = entry
+        _count(endpoint, hits=1, bytes_from_cache=len(body))
+    else:
+        body = _render(compute())
+        etag = _etag(body)
+        _count(endpoint, misses=1)
+        if generation is not None:
+            try:
+                if _backend.generation(user_id) == generation:
+                    _backend.set(f"{key}:{generation}", body, etag, ttl)
+                    _count(stores=1)
+                else:
+                    _count(stale_skipped=1)
+            except Exception as e:
+                logger.warning("response cache write failed for %s: %s", endpoint, e)
+                _count(errors=1)
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        _count(not_modified=1, bytes_saved=len(body))
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def response_cache_stats() -> dict:
+    """Snapshot for /metrics."""
+    with _lock:
+        counters = {**_counters, "by_endpoint": {k: dict(v) for k, v in _counters["by_endpoint"].items()}}
+    lookups = counters["hits"] + counters["misses"]
+    counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else None
+    try:
+        counters.update(_backend.stats())
+    except Exception as e:
+        counters["backend_error"] = str(e)[:200]
+    return counters
+
+
+def reset_response_cache() -> None:
+    global _counters
+    _backend.clear()
+    with _lock:
+        _counters = _new_counters()
@@ -0,0 +1,124 @@
+"""
+Deferred initialization, so the API accepts traffic before the AI stack is warm.
+
+Importing main.py used to construct the chat agents (pulling in pandas,
+sklearn and pythainlp), run helper-table DDL against the database and load
+the food search index before the first request could be served; on Railway
+every cold start and rolling deploy paid for it. Now:
+
+  - heavy objects are Lazy: built on first use (double-checked, thread-safe)
+  - modules register warm-up steps; the startup hook only starts a daemon
+    thread that runs them in order once the server is up, so a request
+    that arrives first builds what it needs itself and the rest is warm by
+    the time real traffic shows up
+  - the DDL lives in migrations/v13_b_startup_helper_tables.sql
+
+STARTUP_WARMUP=0 skips the background pass (everything stays lazy). Step
+timings and failures are under `warmup` in GET /metrics;
+scripts/import_time_report.py tracks what `import main` costs.
+
+Usage:
+    from app.services.warmup import Lazy, register_warmup
+    coach = Lazy("chat.coach", CoachingAgent)
+    register_warmup("chat.coach", coach.get)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_steps: List[Tuple[str, Callable[[], object]]] = []
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+_state = {"state": "idle", "started_at": None, "total_ms": None, "steps": {}}
+
+
+class Lazy(Generic[T]):
+    """
+    Builds `factory()` once, on first get() or attribute access. Attributes
+    set on the wrapper itself (tests' monkeypatch.setattr) shadow the
+    instance's.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._build_lock = threading.Lock()
+
+    def get(self) -> T:
+        if self._instance is None:
+            with self._build_lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = self._factory()
+                    logger.info("built %s in %.0f ms", self._name,
+                                (time.perf_counter() - started) * 1000)
+        return self._instance
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, attr):
+        if attr.startswith("__"):  # copy/pickle probes before __init__ ran
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+
+def register_warmup(name: str, fn: Callable[[], object]) -> None:
+    """Add a step to the background warm-up (runs in registration order)."""
+    with _lock:
+        _steps.append((name, fn))
+
+
+def run_warmup() -> dict:
+    """Run every registered step now; a failing step is logged and skipped."""
+    with _lock:
+        steps = list(_steps)
+        _state.update(state="running", started_at=time.time(), steps={})
+    started = time.perf_counter()
+    for name, fn in steps:
+        t0 = time.perf_counter()
+        try:
+            fn()
+            result = {"ms": round((time.perf_counter() - t0) * 1000, 1), "ok": True}
+        except Exception as e:
+            logger.warning("warm-up step %s failed: %s", name, e)
+            result = {"ms": round((time.perf_counter() - t0) * 1000, 1), "ok": False,
+                      "error": str(e)[:200]}
+        with _lock:
+            _state["steps"][name] = result
+    with _lock:
+        _state.update(state="done", total_ms=round((time.perf_counter() - started) * 1000, 1))
+        return _stats_locked()
+
+
+def start_warmup() -> bool:
+    """Start the background pass once per process; False if disabled or already started."""
+    global _thread
+    if os.getenv("STARTUP_WARMUP", "1").strip().lower() in ("0", "false", "no"):
+        return False
+    with _lock:
+        if _thread is not None:
+            return False
+        _thread = threading.Thread(target=run_warmup, name="startup-warmup", daemon=True)
+        _thread.start()
+    return True
+
+
+def _stats_locked() -> dict:
+    return {**_state, "steps": dict(_state["steps"]), "registered": [n for n, _ in _steps]}
+
+
+def warmup_stats() -> dict:
+    """Snapshot for /metrics."""
+    with _lock:
+        return _stats_locked()
@@ -4,9 +4,24 @@ Supabase Auth dependencies for FastAPI.
 Provides:
   - get_current_user: verify Supabase JWT → return user dict with user_id, email, role_id
   - get_current_admin: same but requires role_id == 1
+  - get_optional_user: same as get_current_user, None without a token
+
+All three go through _decode_token(). Every authenticated request used to
+re-verify the HS256 signature and print the token prefix and claims to
+stdout twice; now verified claims are kept in a bounded LRU keyed by the
+SHA-256 of the token (AUTH_TOKEN_CACHE_SIZE, default 4096; 0 disables) for
+at most AUTH_TOKEN_CACHE_TTL_SECONDS (default 300) and never past the
+token's `exp`. Cached claims are shared between requests: read them, don't
+mutate them. Rejected tokens are logged at INFO, verified ones only at
+DEBUG (never the token itself). Counters under `auth_tokens` in GET /metrics.
 """
 
+import hashlib
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
@@ -18,26 +33,136 @@ from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '..', '.env'))
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+logger = logging.getLogger(__name__)
+
 _JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
 _JWT_ALGO = "HS256"
 
+CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "4096"))
+CACHE_TTL_SECONDS = float(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "300"))
+
 _bearer_scheme = HTTPBearer(auto_error=False)
 
 
+class _TokenCache:
+    """LRU of verified claims by token digest; an entry dies at min(exp, TTL)."""
+
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.expired = self.evictions = self.rejected = 0
+        self.verify_total_ms = self.verify_max_ms = 0.0
+
+    def get(self, key: bytes) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, dies_at = entry
+                if now < dies_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, claims: dict, verify_ms: float) -> None:
+        dies_at = time.time() + self.ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            dies_at = min(dies_at, exp)
+        with self._lock:
+            self.verify_total_ms += verify_ms
+            self.verify_max_ms = max(self.verify_max_ms, verify_ms)
+            if self.max_entries <= 0:
+                return
+            self._entries[key] = (claims, dies_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def note_rejected(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "rejected": self.rejected,
+                "verify_ms_avg": round(self.verify_total_ms / self.misses, 3) if self.misses else None,
+                "verify_ms_max": round(self.verify_max_ms, 3) if self.misses else None,
+            }
+
+
+_token_cache = _TokenCache()
+
+
+def auth_token_stats() -> dict:
+    """Snapshot for /metrics."""
+    return _token_cache.stats()
+
+
 def _decode_token(token: str) -> dict:
-    """Verify backend-issued HS256 JWT signed with SUPABASE_JWT_SECRET."""
-    print(f"AUTH: token received len={len(token)} prefix={token[:20]}")
+    """Verify backend-issued HS256 JWT signed with SUPABASE_JWT_SECRET (cached)."""
+    key = hashlib.sha256(token.encode()).digest()
+    claims = _token_cache.get(key)
+    if claims is not None:
+        return claims
+    started = time.perf_counter()
     try:
-        payload = jwt.decode(token, _JWT_SECRET, algorithms=[_JWT_ALGO])
-        print(f"AUTH: verified sub={payload.get('sub')} email={payload.get('email')}")
-        return payload
+        claims = jwt.decode(token, _JWT_SECRET, algorithms=[_JWT_ALGO])
     except JWTError as e:
-        print(f"AUTH: JWTError: {e}")
+        _token_cache.note_rejected()
+        logger.info("rejected bearer token: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    _token_cache.put(key, claims, (time.perf_counter() - started) * 1000)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("verified token sub=%s", claims.get("sub"))
+    return claims
+
+
+def _claims(credentials: Optional[HTTPAuthorizationCredentials]) -> dict:
+    """Verified claims for the Bearer credentials; 401 if there are none."""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _decode_token(credentials.credentials)
+
+
+def _user_from_claims(payload: dict) -> dict:
+    return {
+        "sub": payload.get("sub"),
+        "email": payload.get("email"),
+        "user_id": _get_user_id_from_payload(payload),
+        "role": payload.get("role", "authenticated"),
+    }
 
 
 def _get_user_id_from_payload(payload: dict) -> Optional[int]:
@@ -78,24 +203,7 @@ async def get_current_user(
 
     Raises 401 if no token or invalid token.
     """
-    if credentials is None:
-        print("AUTH: get_current_user → no Authorization header → 401")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication required",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    payload = _decode_token(credentials.credentials)
-
-    user_id = _get_user_id_from_payload(payload)
-
-    return {
-        "sub": payload.get("sub"),
-        "email": payload.get("email"),
-        "user_id": user_id,
-        "role": payload.get("role", "authenticated"),
-    }
+    return _user_from_claims(_claims(credentials))
 
 
 async def get_current_admin(
@@ -107,14 +215,7 @@ async def get_current_admin(
     Verifies the JWT and checks app_metadata.role_id == 1.
     Raises 401 if no/invalid token, 403 if not an admin.
     """
-    if credentials is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication required",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    payload = _decode_token(credentials.credentials)
+    payload = _claims(credentials)
     app_meta = payload.get("app_metadata") or {}
     role_id = app_meta.get("role_id")
     if role_id != 1:
@@ -131,7 +232,7 @@ async def get_current_admin(
     }
 
 
-def get_optional_user(
+async def get_optional_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer_scheme),
 ) -> Optional[dict]:
     """
@@ -141,13 +242,4 @@ def get_optional_user(
     """
     if credentials is None:
         return None
-
-    payload = _decode_token(credentials.credentials)
-    user_id = _get_user_id_from_payload(payload)
-
-    return {
-        "sub": payload.get("sub"),
-        "email": payload.get("email"),
-        "user_id": user_id,
-        "role": payload.get("role", "authenticated"),
-    }
+    return _user_from_claims(_decode_token(credentials.credentials))
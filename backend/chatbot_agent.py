@@ -1,10 +1,11 @@
 import os
 import json  # noqa: F401 — kept for downstream consumers
-from psycopg2.extras import RealDictCursor
-from database import get_db_connection
+from typing import Iterator
+from ai_models.user_context import get_user_context
 from ai_models.weight_trend_model import WeightTrendAnalyzer
 from ai_models.food_analyzer import FoodAnalyzer
 from ai_models.llm_provider import generate as llm_generate, is_configured as llm_is_configured
+from ai_models.llm_provider import generate_stream as llm_generate_stream
 from dotenv import load_dotenv
 
 # The actual LLM backend (DeepSeek / local / legacy Gemini) is selected by the
@@ -47,68 +48,11 @@ class CoachingAgent:
         self.food_analyzer = FoodAnalyzer()
 
     def fetch_user_context(self, user_id: int):
-        conn = get_db_connection()
-        if not conn:
-            return None
-        try:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Fetch User Profile
-            cur.execute("""
-                SELECT username, gender, birth_date, height_cm, current_weight_kg, 
-                       goal_type, target_weight_kg, target_calories, target_protein, target_carbs, target_fat, activity_level
-                FROM users WHERE user_id = %s
-            """, (user_id,))
-            user_profile = cur.fetchone()
-            if not user_profile:
-                return None
-                
-            # Fetch Weight Logs (last 30 days)
-            cur.execute("""
-                SELECT recorded_date as date, weight_kg as weight 
-                FROM weight_logs 
-                WHERE user_id = %s 
-                ORDER BY recorded_date DESC LIMIT 30
-            """, (user_id,))
-            weight_logs = cur.fetchall()
-
-            # Fetch Daily Summaries (last 7 days)
-            cur.execute("""
-                SELECT date_record as date, total_calories_intake as calories
-                FROM daily_summaries 
-                WHERE user_id = %s 
-                ORDER BY date_record DESC LIMIT 7
-            """, (user_id,))
-            daily_summaries = cur.fetchall()
-
-            # For exact macros, we would sum detail_items, but for simplicity we mock macro stats assuming it's available or we calculate
-            # We will fetch meals details for the last 3 days
-            cur.execute("""
-                SELECT d.food_name, d.amount, d.cal_per_unit, d.created_at
-                FROM detail_items d
-                JOIN meals m ON d.meal_id = m.meal_id
-                WHERE m.user_id = %s AND m.created_at >= NOW() - INTERVAL '3 days'
-            """, (user_id,))
-            recent_foods = cur.fetchall()
-
-            # Fetch Allergies
-            cur.execute("""
-                SELECT f.name FROM user_allergy_preferences uap
-                JOIN allergy_flags f ON uap.flag_id = f.flag_id
-                WHERE uap.user_id = %s
-            """, (user_id,))
-            allergies = [r['name'] for r in cur.fetchall()]
-
-            return {
-                "profile": dict(user_profile),
-                "weight_logs": [dict(w) for w in weight_logs],
-                "daily_summaries": [dict(d) for d in daily_summaries],
-                "recent_foods": [dict(f) for f in recent_foods],
-                "allergies": allergies
-            }
-        finally:
-            if conn: conn.close()
-            
+        # Shared with the multi-agent pipeline and /insights: one query,
+        # cached per user (ai_models/user_context.py).
+        snapshot = get_user_context(user_id)
+        return snapshot.as_coach_context() if snapshot else None
+
     def _calculate_recent_macros(self, recent_foods):
         # Dummy structure for nutrition gap: sum up calories and mock macros based on simple math if the DB doesn't store aggregate macros in daily_summaries
         logs = []
@@ -122,14 +66,40 @@ class CoachingAgent:
         return logs
 
     def generate_response(self, user_id: int, user_message: str) -> str:
+        reply, system_prompt, user_prompt = self._prepare(user_id, user_message)
+        if reply is not None:
+            return reply
+        try:
+            return llm_generate(system_prompt, user_prompt, cache_ttl=0)
+        except Exception as e:
+            return f"ระบบ AI ขัดข้องชั่วคราว: {str(e)}"
+
+    def generate_response_stream(self, user_id: int, user_message: str) -> Iterator[str]:
+        """generate_response() as raw LLM deltas (<think> blocks included)."""
+        reply, system_prompt, user_prompt = self._prepare(user_id, user_message)
+        if reply is not None:
+            yield reply
+            return
+        started = False
+        try:
+            for chunk in llm_generate_stream(system_prompt, user_prompt):
+                started = True
+                yield chunk
+        except Exception as e:
+            if started:
+                raise
+            yield f"ระบบ AI ขัดข้องชั่วคราว: {str(e)}"
+
+    def _prepare(self, user_id: int, user_message: str):
+        """(fixed reply, None, None) or (None, system prompt, user prompt)."""
         # 0. Scope guard — reject off-topic questions
         if not _is_in_scope(user_message):
-            return _REJECT_MSG
+            return _REJECT_MSG, None, None
 
         # 1. Fetch Context
         context = self.fetch_user_context(user_id)
         if not context:
-            return "ขออภัยครับ ไม่พบข้อมูลโปรไฟล์ของคุณในระบบ"
+            return "ขออภัยครับ ไม่พบข้อมูลโปรไฟล์ของคุณในระบบ", None, None
 
         # 2. Run ML Analysis
         profile = context['profile']
@@ -183,9 +153,7 @@ class CoachingAgent:
                 f"[System: LLM provider '{provider}' not configured. Mock Response]\n"
                 f"จากข้อมูลของคุณ แนวโน้มตอนนี้น้ำหนัก {trend_val} ครับ! "
                 f"เมนูแนะนำวันนี้ควรเพิ่มโปรตีนนะครับ"
-            )
+            ), None, None
 
-        try:
-            return llm_generate(system_prompt, f"ผู้ใช้ถามว่า: {user_message}")
-        except Exception as e:
-            return f"ระบบ AI ขัดข้องชั่วคราว: {str(e)}"
+        # Personalized — never cached.
+        return None, system_prompt, f"ผู้ใช้ถามว่า: {user_message}"
@@ -1,25 +1,469 @@
+"""
+PostgreSQL access for the API and the AI agents.
+
+Every router and agent used to call `psycopg2.connect()` per request, which
+paid a full TCP+TLS handshake to Supabase plus a `SET search_path` round
+trip on every call. This module keeps a bounded, thread-safe pool of
+physical connections instead:
+
+  - min/max size plus a small overflow allowance for bursts
+  - idle timeout and max lifetime so Supabase/pgbouncer never sees stale
+    sockets
+  - a liveness ping on checkout when a connection sat idle for a while
+  - `search_path` set once per physical connection, not per checkout
+  - counters (checkouts, waits, wait time, overflow) for /metrics
+
+Usage:
+    # preferred in new code
+    from database import db_connection
+    with db_connection() as conn:
+        cur = conn.cursor()
+        ...
+
+    # legacy call sites keep working unchanged — close() hands the
+    # connection back to the pool instead of tearing it down
+    conn = get_db_connection()
+    try: ...
+    finally: conn.close()
+
+Env knobs (all optional):
+  DB_POOL_MIN_SIZE      = 1     connections kept warm
+  DB_POOL_MAX_SIZE      = 10    steady-state cap
+  DB_POOL_MAX_OVERFLOW  = 5     extra connections opened under burst and
+                                closed on release
+  DB_POOL_TIMEOUT       = 10    seconds a checkout waits before giving up
+  DB_POOL_IDLE_TIMEOUT  = 300   seconds before an idle connection is closed
+  DB_POOL_MAX_LIFETIME  = 1800  seconds before a connection is recycled
+  DB_POOL_PING_AFTER    = 30    idle seconds after which checkout runs SELECT 1
+"""
+from __future__ import annotations
+
+import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import extensions as _ext
+from psycopg2.extras import RealDictCursor  # noqa: F401 — re-exported for callers
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+_SEARCH_PATH_SQL = "SET search_path TO cleangoal, public"
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection became available within the checkout timeout."""
+
+
+class _Slot:
+    """Bookkeeping for one physical connection."""
+
+    __slots__ = ("conn", "created_at", "last_used", "overflow")
+
+    def __init__(self, conn, overflow: bool = False):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+        self.overflow = overflow
+
+
+class PooledConnection:
+    """Proxy handed to callers; `close()` returns the connection to the pool.
+
+    Everything else (cursor, commit, rollback, autocommit, ...) is forwarded
+    to the underlying psycopg2 connection, so existing router code does not
+    need to know it is pooled.
+
+    As a context manager it keeps psycopg2's `with conn:` semantics — commit
+    when the block exits cleanly, roll back when it raises — and then also
+    returns the connection to the pool.
+    """
+
+    def __init__(self, pool: "ConnectionPool", slot: _Slot):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_slot", slot)
+
+    def __getattr__(self, name):
+        slot = object.__getattribute__(self, "_slot")
+        if slot is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(slot.conn, name)
+
+    def __setattr__(self, name, value):
+        slot = object.__getattribute__(self, "_slot")
+        if slot is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        setattr(slot.conn, name, value)
+
+    @property
+    def closed(self) -> int:
+        slot = object.__getattribute__(self, "_slot")
+        return 1 if slot is None else slot.conn.closed
+
+    def close(self) -> None:
+        slot = object.__getattribute__(self, "_slot")
+        if slot is None:
+            return  # double close is a no-op, like psycopg2
+        object.__setattr__(self, "_slot", None)
+        object.__getattribute__(self, "_pool")._release(slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+        return False
+
+
+class ConnectionPool:
+    """Bounded thread-safe pool of psycopg2 connections.
+
+    `connect` is a zero-arg factory returning a new DB-API connection; tests
+    pass a fake so the pool can be exercised without Postgres.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        min_size: int = 1,
+        max_size: int = 10,
+        max_overflow: int = 5,
+        timeout: float = 10.0,
+        idle_timeout: float = 300.0,
+        max_lifetime: float = 1800.0,
+        ping_after: float = 30.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.max_overflow = max(0, max_overflow)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle: list[_Slot] = []   # LIFO: hot connections stay hot
+        self._size = 0                 # physical connections open (incl. overflow)
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._overflow_opened = 0
+        self._created = 0
+        self._discarded = 0
+        self._max_in_use = 0
+
+    # ── Physical connection lifecycle ─────────────────────────────────────
+
+    def _open(self, overflow: bool) -> _Slot:
+        conn = self._connect()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(_SEARCH_PATH_SQL)
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        return _Slot(conn, overflow=overflow)
+
+    def _discard(self, slot: _Slot) -> None:
+        try:
+            slot.conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, slot: _Slot, now: float) -> bool:
+        if self.max_lifetime and now - slot.created_at > self.max_lifetime:
+            return True
+        if self.idle_timeout and now - slot.last_used > self.idle_timeout:
+            return True
+        return False
+
+    def _healthy(self, slot: _Slot, now: float) -> bool:
+        conn = slot.conn
+        if conn.closed:
+            return False
+        if now - slot.last_used < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # ── Checkout / release ────────────────────────────────────────────────
+
+    def getconn(self) -> PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        wait_started = 0.0
+        while True:
+            stale: list[_Slot] = []
+            slot = None
+            open_overflow = None
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                now = time.monotonic()
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._expired(candidate, now):
+                        self._size -= 1
+                        self._discarded += 1
+                        stale.append(candidate)
+                        continue
+                    slot = candidate
+                    break
+                if slot is None:
+                    if self._size < self.max_size:
+                        self._size += 1
+                        open_overflow = False
+                    elif self._size < self.max_size + self.max_overflow:
+                        self._size += 1
+                        self._overflow_opened += 1
+                        open_overflow = True
+                    else:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            if waited:
+                                self._wait_time += now - wait_started
+                            raise PoolTimeout(
+                                f"no DB connection available within {self.timeout:.1f}s "
+                                f"(size={self._size}, max={self.max_size}+{self.max_overflow})"
+                            )
+                        if not waited:
+                            waited = True
+                            wait_started = now
+                            self._waits += 1
+                        self._cond.wait(remaining)
+                        continue
+            for s in stale:
+                self._discard(s)
+
+            if slot is None:
+                try:
+                    slot = self._open(overflow=bool(open_overflow))
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._created += 1
+            elif not self._healthy(slot, time.monotonic()):
+                self._discard(slot)
+                with self._cond:
+                    self._size -= 1
+                    self._discarded += 1
+                continue
+
+            with self._cond:
+                self._checkouts += 1
+                if waited:
+                    self._wait_time += time.monotonic() - wait_started
+                in_use = self._size - len(self._idle)
+                if in_use > self._max_in_use:
+                    self._max_in_use = in_use
+            slot.last_used = time.monotonic()
+            return PooledConnection(self, slot)
+
+    def _release(self, slot: _Slot) -> None:
+        conn = slot.conn
+        reusable = not conn.closed
+        if reusable:
+            try:
+                # Never hand the next caller someone else's open transaction.
+                if conn.get_transaction_status() != _ext.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except Exception:
+                reusable = False
+
+        now = time.monotonic()
+        with self._cond:
+            keep = (
+                reusable
+                and not self._closed
+                and not slot.overflow
+                and not (self.max_lifetime and now - slot.created_at > self.max_lifetime)
+            )
+            if keep:
+                slot.last_used = now
+                self._idle.append(slot)
+            else:
+                self._size -= 1
+                self._discarded += 1
+            self._cond.notify()
+        if not keep:
+            self._discard(slot)
+
+    # ── Maintenance ───────────────────────────────────────────────────────
+
+    def prefill(self) -> None:
+        """Open connections up to min_size. Errors are logged, not raised."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                slot = self._open(overflow=False)
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                logger.warning("DB pool prefill failed: %s", e)
+                return
+            with self._cond:
+                self._created += 1
+                self._idle.insert(0, slot)
+                self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for slot in idle:
+            self._discard(slot)
+
+    def stats(self) -> dict:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "max_in_use": self._max_in_use,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "max_overflow": self.max_overflow,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time_ms": round(self._wait_time * 1000, 1),
+                "timeouts": self._timeouts,
+                "overflow": self._overflow_opened,
+                "created": self._created,
+                "discarded": self._discarded,
+            }
+
+
+# ── Process-wide pool ─────────────────────────────────────────────────────────
+
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _database_url() -> str:
+    return os.getenv("DIRECT_DATABASE_URL") or os.getenv("DATABASE_URL") or ""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def get_pool() -> Optional[ConnectionPool]:
+    """Return the process-wide pool, creating it on first use.
+
+    Returns None when no database URL is configured. A forked worker gets
+    its own pool — psycopg2 connections must not cross process boundaries.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == pid:
+            return _pool
+        database_url = _database_url()
+        if not database_url:
+            return None
+        _pool = ConnectionPool(
+            connect=lambda: psycopg2.connect(database_url),
+            min_size=_env_int("DB_POOL_MIN_SIZE", 1),
+            max_size=_env_int("DB_POOL_MAX_SIZE", 10),
+            max_overflow=_env_int("DB_POOL_MAX_OVERFLOW", 5),
+            timeout=float(_env_int("DB_POOL_TIMEOUT", 10)),
+            idle_timeout=float(_env_int("DB_POOL_IDLE_TIMEOUT", 300)),
+            max_lifetime=float(_env_int("DB_POOL_MAX_LIFETIME", 1800)),
+            ping_after=float(_env_int("DB_POOL_PING_AFTER", 30)),
+        )
+        _pool_pid = pid
+        return _pool
+
+
+def close_pool() -> None:
+    """Close every idle connection; called from the app shutdown hook."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool, _pool, _pool_pid = _pool, None, None
+    if pool is not None:
+        pool.close()
+
+
+def pool_stats() -> dict:
+    """Snapshot of pool counters for /metrics. Empty dict when DB is unset."""
+    pool = _pool if _pool_pid == os.getpid() else None
+    return pool.stats() if pool is not None else {}
+
+
+@contextmanager
+def db_connection() -> Iterator[PooledConnection]:
+    """Borrow a pooled connection for the duration of a `with` block.
+
+    Raises RuntimeError if DATABASE_URL is unset, PoolTimeout if the pool
+    is saturated, or the underlying psycopg2 error if connecting fails.
+    Any transaction left open when the block exits is rolled back on
+    release, so callers must commit explicitly.
+    """
+    pool = get_pool()
+    if pool is None:
+        raise RuntimeError("DATABASE_URL or DIRECT_DATABASE_URL not set")
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
 def get_db_connection():
-    """Return PostgreSQL connection using DATABASE_URL or DIRECT_DATABASE_URL."""
-    database_url = os.getenv("DIRECT_DATABASE_URL") or os.getenv("DATABASE_URL")
-    
-    if not database_url:
-        print("[DB] ❌ DATABASE_URL or DIRECT_DATABASE_URL not set")
+    """Return a pooled PostgreSQL connection, or None if unavailable.
+
+    Legacy shim: callers `close()` the result as before, which now returns
+    it to the pool. Prefer `db_connection()` in new code.
+    """
+    pool = get_pool()
+    if pool is None:
+        logger.error("[DB] DATABASE_URL or DIRECT_DATABASE_URL not set")
         return None
-    
     try:
-        conn = psycopg2.connect(database_url)
-        with conn.cursor() as cur:
-            cur.execute("SET search_path TO cleangoal, public")
-        conn.commit()
-        print("[DB] ✅ Connected to database successfully")
-        return conn
+        return pool.getconn()
     except Exception as e:
-        print(f"[DB] ❌ Connection failed: {e}")
+        logger.error("[DB] Connection failed: %s", e)
         return None
@@ -0,0 +1,115 @@
+"""
+Async PostgreSQL access (psycopg 3 + psycopg_pool) for `async def` routes.
+
+The sync routers run blocking psycopg2 calls on Starlette's threadpool,
+which caps in-flight requests at ~40 per worker however idle Postgres is.
+Routes in app/routers/async_api.py await this pool instead, so a single
+worker can keep hundreds of requests in flight while they wait on the DB.
+
+psycopg 3 keeps the `%s` placeholder style, so the async routes share SQL
+constants with their sync counterparts verbatim.
+
+Usage:
+    from database_async import async_db_connection
+    async with async_db_connection() as conn:
+        cur = await conn.execute("SELECT ...", (x,))
+        row = await cur.fetchone()      # dict rows, like RealDictCursor
+
+Env knobs (all optional):
+  DB_ASYNC_POOL_MIN_SIZE = 2
+  DB_ASYNC_POOL_MAX_SIZE = 20
+  DB_POOL_TIMEOUT / DB_POOL_IDLE_TIMEOUT / DB_POOL_MAX_LIFETIME are shared
+  with the sync pool in database.py.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from dotenv import load_dotenv
+
+from database import _database_url, _env_int, _SEARCH_PATH_SQL
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+try:
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:  # psycopg 3 not installed — async routes answer 500
+    dict_row = None
+    AsyncConnectionPool = None
+
+_pool: Optional["AsyncConnectionPool"] = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+async def _configure(conn) -> None:
+    # Once per physical connection, same as the sync pool.
+    await conn.execute(_SEARCH_PATH_SQL)
+    await conn.commit()
+
+
+async def get_async_pool() -> "AsyncConnectionPool":
+    """Return the async pool bound to the running event loop, opening it lazily."""
+    global _pool, _pool_loop, _pool_lock
+    if AsyncConnectionPool is None:
+        raise RuntimeError("psycopg 3 is not installed (pip install 'psycopg[binary]' psycopg-pool)")
+    loop = asyncio.get_running_loop()
+    if _pool is not None and _pool_loop is loop:
+        return _pool
+    if _pool_lock is None or _pool_loop is not loop:
+        _pool_lock = asyncio.Lock()
+        _pool_loop = loop
+        _pool = None
+    async with _pool_lock:
+        if _pool is not None:
+            return _pool
+        database_url = _database_url()
+        if not database_url:
+            raise RuntimeError("DATABASE_URL or DIRECT_DATABASE_URL not set")
+        pool = AsyncConnectionPool(
+            database_url,
+            min_size=_env_int("DB_ASYNC_POOL_MIN_SIZE", 2),
+            max_size=_env_int("DB_ASYNC_POOL_MAX_SIZE", 20),
+            timeout=float(_env_int("DB_POOL_TIMEOUT", 10)),
+            max_idle=float(_env_int("DB_POOL_IDLE_TIMEOUT", 300)),
+            max_lifetime=float(_env_int("DB_POOL_MAX_LIFETIME", 1800)),
+            # prepare_threshold=None keeps us safe behind pgbouncer in
+            # transaction mode (Supabase pooler port 6543).
+            kwargs={"row_factory": dict_row, "prepare_threshold": None},
+            configure=_configure,
+            open=False,
+        )
+        await pool.open()
+        _pool = pool
+        return _pool
+
+
+async def close_async_pool() -> None:
+    """Close the async pool; called from the app shutdown hook."""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+
+def async_pool_stats() -> dict:
+    """psycopg_pool counters for /metrics. Empty dict before first use."""
+    return dict(_pool.get_stats()) if _pool is not None else {}
+
+
+@asynccontextmanager
+async def async_db_connection() -> AsyncIterator:
+    """Borrow an async connection for an `async with` block.
+
+    psycopg 3 semantics: the transaction commits when the block exits
+    cleanly and rolls back if it raises.
+    """
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        yield conn
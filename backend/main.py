@@ -18,8 +18,11 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from database import get_db_connection
-from psycopg2.extras import RealDictCursor
+from database import close_pool
+from database_async import close_async_pool
+from app.services.food_index import load_food_index
+from app.services.warmup import register_warmup, start_warmup
+from app.core.security import get_hasher
 from app.core.config import ALLOWED_ORIGINS, IMAGEDIR, API_VERSION
 
 # ── Sentry (optional: only if SENTRY_DSN is set) ──────────────────────────────
@@ -76,81 +79,33 @@ if not os.path.exists(IMAGEDIR):
     os.makedirs(IMAGEDIR)
 app.mount("/images", StaticFiles(directory=IMAGEDIR), name="images")
 
-# ── Startup: ensure helper tables exist ──────────────────────────────────────
-def _init_missing_tables():
-    """Create tables missing from original schema."""
-    conn = get_db_connection()
-    if not conn:
-        return
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS recipe_reviews (
-                review_id BIGSERIAL PRIMARY KEY,
-                food_id   BIGINT NOT NULL REFERENCES foods(food_id) ON DELETE CASCADE,
-                user_id   BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                rating    SMALLINT NOT NULL CHECK (rating BETWEEN 1 AND 5),
-                comment   TEXT,
-                created_at TIMESTAMP DEFAULT NOW(),
-                UNIQUE (food_id, user_id)
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS user_favorites (
-                id         BIGSERIAL PRIMARY KEY,
-                user_id    BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                food_id    BIGINT NOT NULL REFERENCES foods(food_id) ON DELETE CASCADE,
-                created_at TIMESTAMP DEFAULT NOW(),
-                UNIQUE (user_id, food_id)
-            )
-        """)
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS water_logs (
-                log_id      BIGSERIAL PRIMARY KEY,
-                user_id     BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                date_record DATE NOT NULL DEFAULT CURRENT_DATE,
-                amount_ml   INT  NOT NULL DEFAULT 0 CHECK (amount_ml >= 0),
-                glasses     INT  NOT NULL DEFAULT 0,
-                updated_at  TIMESTAMP DEFAULT NOW(),
-                UNIQUE (user_id, date_record)
-            )
-        """)
-        cur.execute("ALTER TABLE water_logs ADD COLUMN IF NOT EXISTS amount_ml INT NOT NULL DEFAULT 0")
-        cur.execute("ALTER TABLE water_logs ADD COLUMN IF NOT EXISTS glasses INT NOT NULL DEFAULT 0")
-        cur.execute("ALTER TABLE water_logs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW()")
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS notifications (
-                notification_id BIGSERIAL PRIMARY KEY,
-                user_id         BIGINT NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                title           VARCHAR(255),
-                message         TEXT,
-                type            VARCHAR(50) DEFAULT 'info',
-                is_read         BOOLEAN DEFAULT FALSE,
-                created_at      TIMESTAMP DEFAULT NOW()
-            )
-        """)
-        # Add macro columns to detail_items if missing
-        for col in ('protein_per_unit', 'carbs_per_unit', 'fat_per_unit'):
-            cur.execute(f"""
-                DO $$ BEGIN
-                    ALTER TABLE detail_items ADD COLUMN {col} DOUBLE PRECISION DEFAULT 0;
-                EXCEPTION WHEN duplicate_column THEN NULL;
-                END $$;
-            """)
-        conn.commit()
-    except Exception as e:
-        print(f"[init] Could not ensure helper tables: {e}")
-    finally:
-        conn.close()
-
-
-_init_missing_tables()
+# ── Startup: warm up in the background ──────────────────────────────────────
+# Helper-table DDL lives in migrations/v13_b_startup_helper_tables.sql. The food
+# index, chat agents and AI libraries load on a background thread once the
+# server is accepting traffic (app/services/warmup.py); until then
+# /foods/search falls back to SQL and agents build on first use.
+register_warmup("food_index", load_food_index)
+register_warmup("password_hasher", get_hasher().warm)
+
+
+@app.on_event("startup")
+async def _start_warmup():
+    start_warmup()
+
+
+# ── Shutdown: release pooled DB connections and hashing workers ──────────────
+@app.on_event("shutdown")
+async def _close_db_pools():
+    close_pool()
+    await close_async_pool()
+    get_hasher().shutdown()
 
 # ── Register routers ─────────────────────────────────────────────────────────
 from app.routers import (
     health, auth, users, foods, admin,
     meals, weight, water,
     insights, social, chat, notifications,
+    async_api,
 )
 
 app.include_router(health.router)
@@ -165,3 +120,4 @@ app.include_router(insights.router)
 app.include_router(social.router)
 app.include_router(chat.router)
 app.include_router(notifications.router)
+app.include_router(async_api.router)
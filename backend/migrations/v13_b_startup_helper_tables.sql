@@ -0,0 +1,49 @@
+-- ============================================================
+-- Migration v13_b: helper tables that main.py used to create at startup
+--
+--   _init_missing_tables() ran this DDL on every worker boot, before the
+--   API could serve its first request. It now lives here, applied once by
+--   run_migrations.py. Ordered before v14 because v14_b and v17 alter
+--   recipe_reviews / user_favorites, which only this DDL ever created.
+--
+--   Every statement is idempotent: on databases where the app already
+--   ran it (or later migrations reshaped the tables) this is a no-op.
+--   recipe_reviews keeps its original food_id shape; v17 moves it to
+--   recipe_id. The detail_items macro columns it also added come from v12.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS cleangoal.recipe_reviews (
+    review_id  BIGSERIAL PRIMARY KEY,
+    food_id    BIGINT NOT NULL REFERENCES cleangoal.foods(food_id) ON DELETE CASCADE,
+    user_id    BIGINT NOT NULL REFERENCES cleangoal.users(user_id) ON DELETE CASCADE,
+    rating     SMALLINT NOT NULL CHECK (rating BETWEEN 1 AND 5),
+    comment    TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (food_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS cleangoal.user_favorites (
+    id         BIGSERIAL PRIMARY KEY,
+    user_id    BIGINT NOT NULL REFERENCES cleangoal.users(user_id) ON DELETE CASCADE,
+    food_id    BIGINT NOT NULL REFERENCES cleangoal.foods(food_id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (user_id, food_id)
+);
+
+-- water_logs comes from v9; the app also tracks millilitres.
+ALTER TABLE cleangoal.water_logs ADD COLUMN IF NOT EXISTS amount_ml  INT NOT NULL DEFAULT 0;
+ALTER TABLE cleangoal.water_logs ADD COLUMN IF NOT EXISTS glasses    INT NOT NULL DEFAULT 0;
+ALTER TABLE cleangoal.water_logs ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT NOW();
+
+CREATE TABLE IF NOT EXISTS cleangoal.notifications (
+    notification_id BIGSERIAL PRIMARY KEY,
+    user_id         BIGINT NOT NULL REFERENCES cleangoal.users(user_id) ON DELETE CASCADE,
+    title           VARCHAR(255),
+    message         TEXT,
+    type            VARCHAR(50) DEFAULT 'info',
+    is_read         BOOLEAN DEFAULT FALSE,
+    created_at      TIMESTAMP DEFAULT NOW()
+);
+
+-- ROLLBACK: none — these tables hold user data and later migrations
+-- depend on them.
@@ -0,0 +1,113 @@
+-- v25: Statement-level daily_summaries maintenance.
+--
+-- v8's trg_sync_daily_summary is FOR EACH ROW: a 6-item meal fires it six
+-- times and re-aggregates the whole day six times. POST /meals now writes
+-- the meal and all of its detail_items in a single statement, so a
+-- statement-level trigger with transition tables can recompute each
+-- touched (user, day) exactly once per meal.
+--
+-- Postgres rejects transition tables on multi-event triggers, hence three
+-- triggers (INSERT / UPDATE / DELETE) sharing one function. Aggregation
+-- semantics (DATE(meal_time), COALESCE on macros, is_goal_met vs
+-- users.target_calories) are unchanged from v8.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION cleangoal.fn_sync_daily_summary_stmt()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+DECLARE
+  v_meal_ids BIGINT[];
+BEGIN
+  -- Only the transition tables declared for this TG_OP exist; plpgsql
+  -- plans each branch lazily so the others are never referenced.
+  IF TG_OP = 'INSERT' THEN
+    SELECT array_agg(DISTINCT meal_id) INTO v_meal_ids
+    FROM new_rows WHERE meal_id IS NOT NULL;
+  ELSIF TG_OP = 'UPDATE' THEN
+    SELECT array_agg(DISTINCT meal_id) INTO v_meal_ids
+    FROM (SELECT meal_id FROM new_rows UNION SELECT meal_id FROM old_rows) t
+    WHERE meal_id IS NOT NULL;
+  ELSE
+    SELECT array_agg(DISTINCT meal_id) INTO v_meal_ids
+    FROM old_rows WHERE meal_id IS NOT NULL;
+  END IF;
+
+  IF v_meal_ids IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO cleangoal.daily_summaries
+    (user_id, date_record, total_calories_intake, total_protein, total_carbs, total_fat, is_goal_met)
+  SELECT
+    d.user_id,
+    d.date_record,
+    COALESCE(SUM(di.amount * di.cal_per_unit), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.protein_per_unit, 0)), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.carbs_per_unit,   0)), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.fat_per_unit,     0)), 0),
+    FALSE
+  FROM (
+    SELECT DISTINCT user_id, DATE(meal_time) AS date_record
+    FROM cleangoal.meals
+    WHERE meal_id = ANY(v_meal_ids)
+  ) d
+  LEFT JOIN cleangoal.meals m
+         ON m.user_id = d.user_id AND DATE(m.meal_time) = d.date_record
+  LEFT JOIN cleangoal.detail_items di ON di.meal_id = m.meal_id
+  GROUP BY d.user_id, d.date_record
+  ON CONFLICT (user_id, date_record) DO UPDATE SET
+    total_calories_intake = EXCLUDED.total_calories_intake,
+    total_protein         = EXCLUDED.total_protein,
+    total_carbs           = EXCLUDED.total_carbs,
+    total_fat             = EXCLUDED.total_fat,
+    is_goal_met           = (
+      EXCLUDED.total_calories_intake <= COALESCE(
+        (SELECT target_calories FROM cleangoal.users WHERE user_id = EXCLUDED.user_id),
+        9999
+      )
+    );
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_sync_daily_summary ON cleangoal.detail_items;
+
+DROP TRIGGER IF EXISTS trg_sync_daily_summary_ins ON cleangoal.detail_items;
+CREATE TRIGGER trg_sync_daily_summary_ins
+  AFTER INSERT ON cleangoal.detail_items
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_sync_daily_summary_stmt();
+
+DROP TRIGGER IF EXISTS trg_sync_daily_summary_upd ON cleangoal.detail_items;
+CREATE TRIGGER trg_sync_daily_summary_upd
+  AFTER UPDATE ON cleangoal.detail_items
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_sync_daily_summary_stmt();
+
+DROP TRIGGER IF EXISTS trg_sync_daily_summary_del ON cleangoal.detail_items;
+CREATE TRIGGER trg_sync_daily_summary_del
+  AFTER DELETE ON cleangoal.detail_items
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_sync_daily_summary_stmt();
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v25_statement_level_daily_summary')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK:
+-- BEGIN;
+-- DROP TRIGGER IF EXISTS trg_sync_daily_summary_ins ON cleangoal.detail_items;
+-- DROP TRIGGER IF EXISTS trg_sync_daily_summary_upd ON cleangoal.detail_items;
+-- DROP TRIGGER IF EXISTS trg_sync_daily_summary_del ON cleangoal.detail_items;
+-- DROP FUNCTION IF EXISTS cleangoal.fn_sync_daily_summary_stmt();
+-- CREATE TRIGGER trg_sync_daily_summary
+--   AFTER INSERT OR UPDATE OR DELETE ON cleangoal.detail_items
+--   FOR EACH ROW EXECUTE FUNCTION cleangoal.fn_sync_daily_summary();
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v25_statement_level_daily_summary';
+-- COMMIT;
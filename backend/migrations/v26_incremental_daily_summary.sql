@@ -0,0 +1,255 @@
+-- v26: Incremental (delta-based) daily_summaries maintenance.
+--
+-- v8/v25 recompute SUM over every detail_item of the (user, day) on every
+-- write: O(items-per-day) per meal, which heavy loggers feel. This switches
+-- the detail_items triggers to apply +/- deltas straight from the
+-- transition tables: NEW rows add, OLD rows subtract, grouped per
+-- (user, day), one upsert per statement. Cost is O(rows written).
+--
+-- What deltas can't see, full recompute covers:
+--   - Meal rows deleted (DELETE /meals/clear, user hard-delete): the FK
+--     cascade removes detail_items after the meal row is gone, so the
+--     delta trigger can't resolve (user, day). trg_daily_summary_meals_del
+--     recomputes those days once per statement instead.
+--   - Meal rows moved to another user/day (meal_time/user_id UPDATE):
+--     trg_daily_summary_meals_upd recomputes the old and new days.
+--   - Anything that bypasses triggers (session_replication_role=replica,
+--     manual fixes): backend/scripts/reconcile_daily_summaries.py finds
+--     and repairs drift against the full aggregate.
+--
+-- Sums are NUMERIC, so +/- deltas are exact — no floating-point creep.
+-- That needs unconstrained NUMERIC columns: total_calories_intake was
+-- numeric(10,2) (databaseV4.sql), which rounded the running total on every
+-- delta upsert while item calories (amount * cal_per_unit) carry any
+-- scale, so the rounding accumulated into reconcile-visible drift. It is
+-- widened below; the macro columns are NUMERIC since v8.
+-- fn_recompute_daily_summary() keeps the v8 aggregation semantics and is
+-- the reference the reconciliation job and tests compare against.
+
+BEGIN;
+
+ALTER TABLE cleangoal.daily_summaries
+  ALTER COLUMN total_calories_intake TYPE NUMERIC;
+
+-- ------------------------------------------------------------------------
+-- 1. Full recompute of one (user, day) — reference semantics from v8
+-- ------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION cleangoal.fn_recompute_daily_summary(p_user_id BIGINT, p_date DATE)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+  INSERT INTO cleangoal.daily_summaries
+    (user_id, date_record, total_calories_intake, total_protein, total_carbs, total_fat, is_goal_met)
+  SELECT
+    p_user_id,
+    p_date,
+    COALESCE(SUM(di.amount * di.cal_per_unit), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.protein_per_unit, 0)), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.carbs_per_unit,   0)), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.fat_per_unit,     0)), 0),
+    -- Same rule as the delta path's INSERT and both ON CONFLICT branches.
+    COALESCE(SUM(di.amount * di.cal_per_unit), 0) <= COALESCE(
+      (SELECT target_calories FROM cleangoal.users WHERE user_id = p_user_id),
+      9999
+    )
+  FROM cleangoal.detail_items di
+  JOIN cleangoal.meals m ON m.meal_id = di.meal_id
+  WHERE m.user_id = p_user_id
+    AND DATE(m.meal_time) = p_date
+  -- Skip users being deleted in this statement (users → meals cascade),
+  -- otherwise we'd re-insert a summary row that violates the FK.
+  HAVING EXISTS (SELECT 1 FROM cleangoal.users WHERE user_id = p_user_id)
+  ON CONFLICT (user_id, date_record) DO UPDATE SET
+    total_calories_intake = EXCLUDED.total_calories_intake,
+    total_protein         = EXCLUDED.total_protein,
+    total_carbs           = EXCLUDED.total_carbs,
+    total_fat             = EXCLUDED.total_fat,
+    is_goal_met           = (
+      EXCLUDED.total_calories_intake <= COALESCE(
+        (SELECT target_calories FROM cleangoal.users WHERE user_id = p_user_id),
+        9999
+      )
+    );
+$$;
+
+-- ------------------------------------------------------------------------
+-- 2. Delta trigger on detail_items (replaces v25's full-day recompute)
+-- ------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION cleangoal.fn_apply_daily_summary_delta()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+DECLARE
+  v_meal    BIGINT[]  := '{}';
+  v_cal     NUMERIC[] := '{}';
+  v_protein NUMERIC[] := '{}';
+  v_carbs   NUMERIC[] := '{}';
+  v_fat     NUMERIC[] := '{}';
+BEGIN
+  -- Collect signed per-item contributions. Only the transition tables
+  -- declared for TG_OP exist; plpgsql plans each branch lazily.
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    SELECT v_meal    || COALESCE(array_agg(meal_id), '{}'),
+           v_cal     || COALESCE(array_agg(COALESCE(amount * cal_per_unit, 0)), '{}'),
+           v_protein || COALESCE(array_agg(amount * COALESCE(protein_per_unit, 0)), '{}'),
+           v_carbs   || COALESCE(array_agg(amount * COALESCE(carbs_per_unit,   0)), '{}'),
+           v_fat     || COALESCE(array_agg(amount * COALESCE(fat_per_unit,     0)), '{}')
+      INTO v_meal, v_cal, v_protein, v_carbs, v_fat
+    FROM new_rows WHERE meal_id IS NOT NULL;
+  END IF;
+  IF TG_OP IN ('DELETE', 'UPDATE') THEN
+    SELECT v_meal    || COALESCE(array_agg(meal_id), '{}'),
+           v_cal     || COALESCE(array_agg(-COALESCE(amount * cal_per_unit, 0)), '{}'),
+           v_protein || COALESCE(array_agg(-(amount * COALESCE(protein_per_unit, 0))), '{}'),
+           v_carbs   || COALESCE(array_agg(-(amount * COALESCE(carbs_per_unit,   0))), '{}'),
+           v_fat     || COALESCE(array_agg(-(amount * COALESCE(fat_per_unit,     0))), '{}')
+      INTO v_meal, v_cal, v_protein, v_carbs, v_fat
+    FROM old_rows WHERE meal_id IS NOT NULL;
+  END IF;
+
+  IF cardinality(v_meal) = 0 THEN
+    RETURN NULL;
+  END IF;
+
+  -- Items whose meal is already gone (FK cascade) resolve to nothing here;
+  -- the meals-level trigger below recomputes those days.
+  INSERT INTO cleangoal.daily_summaries AS ds
+    (user_id, date_record, total_calories_intake, total_protein, total_carbs, total_fat, is_goal_met)
+  SELECT d.user_id, d.date_record, d.cal, d.protein, d.carbs, d.fat,
+         d.cal <= COALESCE(u.target_calories, 9999)
+  FROM (
+    SELECT m.user_id, DATE(m.meal_time) AS date_record,
+           COALESCE(SUM(r.cal), 0)     AS cal,
+           COALESCE(SUM(r.protein), 0) AS protein,
+           COALESCE(SUM(r.carbs), 0)   AS carbs,
+           COALESCE(SUM(r.fat), 0)     AS fat
+    FROM unnest(v_meal, v_cal, v_protein, v_carbs, v_fat) AS r(meal_id, cal, protein, carbs, fat)
+    JOIN cleangoal.meals m ON m.meal_id = r.meal_id
+    GROUP BY m.user_id, DATE(m.meal_time)
+  ) d
+  LEFT JOIN cleangoal.users u ON u.user_id = d.user_id
+  ON CONFLICT (user_id, date_record) DO UPDATE SET
+    total_calories_intake = COALESCE(ds.total_calories_intake, 0) + EXCLUDED.total_calories_intake,
+    total_protein         = COALESCE(ds.total_protein, 0) + EXCLUDED.total_protein,
+    total_carbs           = COALESCE(ds.total_carbs,   0) + EXCLUDED.total_carbs,
+    total_fat             = COALESCE(ds.total_fat,     0) + EXCLUDED.total_fat,
+    -- One users PK lookup per touched day, not a re-aggregate.
+    is_goal_met           = (
+      COALESCE(ds.total_calories_intake, 0) + EXCLUDED.total_calories_intake <= COALESCE(
+        (SELECT target_calories FROM cleangoal.users WHERE user_id = ds.user_id),
+        9999
+      )
+    );
+
+  RETURN NULL;
+END;
+$$;
+
+-- ------------------------------------------------------------------------
+-- 3. Meal-level recompute for deletes / moves the delta path can't see
+-- ------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION cleangoal.fn_recompute_daily_summary_for_meals()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+DECLARE
+  r RECORD;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    FOR r IN SELECT DISTINCT user_id, DATE(meal_time) AS d FROM old_rows LOOP
+      PERFORM cleangoal.fn_recompute_daily_summary(r.user_id, r.d);
+    END LOOP;
+  ELSE
+    FOR r IN
+      SELECT o.user_id, DATE(o.meal_time) AS d
+      FROM old_rows o JOIN new_rows n ON n.meal_id = o.meal_id
+      WHERE (o.user_id, DATE(o.meal_time)) IS DISTINCT FROM (n.user_id, DATE(n.meal_time))
+      UNION
+      SELECT n.user_id, DATE(n.meal_time)
+      FROM old_rows o JOIN new_rows n ON n.meal_id = o.meal_id
+      WHERE (o.user_id, DATE(o.meal_time)) IS DISTINCT FROM (n.user_id, DATE(n.meal_time))
+    LOOP
+      PERFORM cleangoal.fn_recompute_daily_summary(r.user_id, r.d);
+    END LOOP;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- ------------------------------------------------------------------------
+-- 4. Swap triggers
+-- ------------------------------------------------------------------------
+DROP TRIGGER IF EXISTS trg_sync_daily_summary     ON cleangoal.detail_items;
+DROP TRIGGER IF EXISTS trg_sync_daily_summary_ins ON cleangoal.detail_items;
+DROP TRIGGER IF EXISTS trg_sync_daily_summary_upd ON cleangoal.detail_items;
+DROP TRIGGER IF EXISTS trg_sync_daily_summary_del ON cleangoal.detail_items;
+
+CREATE TRIGGER trg_sync_daily_summary_ins
+  AFTER INSERT ON cleangoal.detail_items
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_apply_daily_summary_delta();
+
+CREATE TRIGGER trg_sync_daily_summary_upd
+  AFTER UPDATE ON cleangoal.detail_items
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_apply_daily_summary_delta();
+
+CREATE TRIGGER trg_sync_daily_summary_del
+  AFTER DELETE ON cleangoal.detail_items
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_apply_daily_summary_delta();
+
+DROP TRIGGER IF EXISTS trg_daily_summary_meals_del ON cleangoal.meals;
+CREATE TRIGGER trg_daily_summary_meals_del
+  AFTER DELETE ON cleangoal.meals
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_recompute_daily_summary_for_meals();
+
+DROP TRIGGER IF EXISTS trg_daily_summary_meals_upd ON cleangoal.meals;
+CREATE TRIGGER trg_daily_summary_meals_upd
+  AFTER UPDATE ON cleangoal.meals
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_recompute_daily_summary_for_meals();
+
+-- ------------------------------------------------------------------------
+-- 5. One-off resync so deltas start from exact totals
+-- ------------------------------------------------------------------------
+DO $$
+DECLARE
+  r RECORD;
+BEGIN
+  FOR r IN
+    SELECT user_id, date_record FROM cleangoal.daily_summaries
+    UNION
+    SELECT DISTINCT user_id, DATE(meal_time) FROM cleangoal.meals
+  LOOP
+    PERFORM cleangoal.fn_recompute_daily_summary(r.user_id, r.date_record);
+  END LOOP;
+END $$;
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v26_incremental_daily_summary')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK (back to v25 statement-level full recompute):
+-- BEGIN;
+-- DROP TRIGGER IF EXISTS trg_daily_summary_meals_del ON cleangoal.meals;
+-- DROP TRIGGER IF EXISTS trg_daily_summary_meals_upd ON cleangoal.meals;
+-- DROP TRIGGER IF EXISTS trg_sync_daily_summary_ins ON cleangoal.detail_items;
+-- DROP TRIGGER IF EXISTS trg_sync_daily_summary_upd ON cleangoal.detail_items;
+-- DROP TRIGGER IF EXISTS trg_sync_daily_summary_del ON cleangoal.detail_items;
+-- -- then re-run the CREATE TRIGGER block of v25_statement_level_daily_summary.sql
+-- DROP FUNCTION IF EXISTS cleangoal.fn_recompute_daily_summary_for_meals();
+-- DROP FUNCTION IF EXISTS cleangoal.fn_apply_daily_summary_delta();
+-- DROP FUNCTION IF EXISTS cleangoal.fn_recompute_daily_summary(BIGINT, DATE);
+-- -- total_calories_intake stays NUMERIC; narrowing back to (10,2) would only
+-- -- reintroduce the rounding.
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v26_incremental_daily_summary';
+-- COMMIT;
@@ -0,0 +1,51 @@
+-- v27: One calorie warning / tip per user per day, enforced by an index.
+--
+-- POST /meals used to commit the meal, re-read daily_summaries JOIN users,
+-- then guard the nudge insert with
+--     NOT EXISTS (... type = 'warning' AND DATE(created_at) = CURRENT_DATE)
+-- which can't use an index, and commit a second time. The nudge is now a
+-- separate statement in the meal's transaction (app/routers/meals.py
+-- _CALORIE_NUDGE_SQL, wrapped in SAVEPOINT / ROLLBACK TO SAVEPOINT so a
+-- failing nudge never loses the meal) and deduplicated with ON CONFLICT
+-- DO NOTHING against the unique partial index below.
+--
+-- Only the daily meal nudges set notified_on; every other notification
+-- (streaks, low-calorie warning, ...) leaves it NULL and is unaffected.
+
+BEGIN;
+
+ALTER TABLE cleangoal.notifications
+    ADD COLUMN IF NOT EXISTS notified_on DATE;
+
+COMMENT ON COLUMN cleangoal.notifications.notified_on IS
+    'Day a once-per-day nudge belongs to (meal calorie warning/tip); NULL for all other notifications';
+
+-- Backfill the existing meal nudges, keeping only the earliest per day so
+-- the unique index can be built over historical duplicates.
+UPDATE cleangoal.notifications n
+SET notified_on = DATE(n.created_at)
+FROM (
+    SELECT DISTINCT ON (user_id, type, DATE(created_at)) notification_id
+    FROM cleangoal.notifications
+    WHERE (type = 'warning' AND title = 'แคลอรี่เกินเป้าหมายแล้ว!')
+       OR (type = 'tip'     AND title = 'ใกล้ถึงเป้าหมายแล้ว')
+    ORDER BY user_id, type, DATE(created_at), created_at
+) first_per_day
+WHERE n.notification_id = first_per_day.notification_id
+  AND n.notified_on IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_notifications_daily_nudge
+    ON cleangoal.notifications (user_id, type, notified_on)
+    WHERE notified_on IS NOT NULL;
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v27_notification_daily_nudge_dedupe')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK:
+-- BEGIN;
+-- DROP INDEX IF EXISTS cleangoal.uq_notifications_daily_nudge;
+-- ALTER TABLE cleangoal.notifications DROP COLUMN IF EXISTS notified_on;
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v27_notification_daily_nudge_dedupe';
+-- COMMIT;
@@ -0,0 +1,206 @@
+-- v28: Stored meal_date column + sargable day predicates.
+--
+-- Routers, agents and the summary triggers filtered meals with
+-- DATE(m.meal_time) = %s (STABLE, session-TimeZone dependent) or
+-- m.created_at::date, neither of which can use the v14_e expression
+-- indexes on (meal_time AT TIME ZONE 'Asia/Bangkok')::date. Every day
+-- lookup was a scan of the user's whole meal history, or worse.
+--
+-- meal_date is a STORED generated column with the same Bangkok-day
+-- expression as those indexes, so queries say `m.meal_date = %s` and hit
+-- idx_meals_user_meal_date. The day boundary is now always Asia/Bangkok,
+-- regardless of session TimeZone — matching the v14_e index intent.
+--
+-- Adding a STORED generated column rewrites cleangoal.meals once.
+
+BEGIN;
+
+ALTER TABLE cleangoal.meals
+    ADD COLUMN IF NOT EXISTS meal_date DATE
+    GENERATED ALWAYS AS ((meal_time AT TIME ZONE 'Asia/Bangkok')::date) STORED;
+
+COMMENT ON COLUMN cleangoal.meals.meal_date IS
+    'Asia/Bangkok calendar day of meal_time; use this, not DATE(meal_time), in predicates';
+
+-- One composite index serves equality, ranges and the meal_type filter.
+DROP INDEX IF EXISTS cleangoal.idx_meals_user_date_type;
+DROP INDEX IF EXISTS cleangoal.idx_meals_user_date;
+CREATE INDEX IF NOT EXISTS idx_meals_user_meal_date
+    ON cleangoal.meals (user_id, meal_date, meal_type);
+
+-- Low-calorie warning dedup + GET /notifications ordering.
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created
+    ON cleangoal.notifications (user_id, created_at DESC);
+
+-- ------------------------------------------------------------------------
+-- Summary maintenance (v26) on meal_date instead of DATE(meal_time)
+-- ------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION cleangoal.fn_recompute_daily_summary(p_user_id BIGINT, p_date DATE)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+  INSERT INTO cleangoal.daily_summaries
+    (user_id, date_record, total_calories_intake, total_protein, total_carbs, total_fat, is_goal_met)
+  SELECT
+    p_user_id,
+    p_date,
+    COALESCE(SUM(di.amount * di.cal_per_unit), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.protein_per_unit, 0)), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.carbs_per_unit,   0)), 0),
+    COALESCE(SUM(di.amount * COALESCE(di.fat_per_unit,     0)), 0),
+    -- Same rule as the delta path's INSERT and both ON CONFLICT branches.
+    COALESCE(SUM(di.amount * di.cal_per_unit), 0) <= COALESCE(
+      (SELECT target_calories FROM cleangoal.users WHERE user_id = p_user_id),
+      9999
+    )
+  FROM cleangoal.detail_items di
+  JOIN cleangoal.meals m ON m.meal_id = di.meal_id
+  WHERE m.user_id = p_user_id
+    AND m.meal_date = p_date
+  -- Skip users being deleted in this statement (users → meals cascade),
+  -- otherwise we'd re-insert a summary row that violates the FK.
+  HAVING EXISTS (SELECT 1 FROM cleangoal.users WHERE user_id = p_user_id)
+  ON CONFLICT (user_id, date_record) DO UPDATE SET
+    total_calories_intake = EXCLUDED.total_calories_intake,
+    total_protein         = EXCLUDED.total_protein,
+    total_carbs           = EXCLUDED.total_carbs,
+    total_fat             = EXCLUDED.total_fat,
+    is_goal_met           = (
+      EXCLUDED.total_calories_intake <= COALESCE(
+        (SELECT target_calories FROM cleangoal.users WHERE user_id = p_user_id),
+        9999
+      )
+    );
+$$;
+
+CREATE OR REPLACE FUNCTION cleangoal.fn_apply_daily_summary_delta()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+DECLARE
+  v_meal    BIGINT[]  := '{}';
+  v_cal     NUMERIC[] := '{}';
+  v_protein NUMERIC[] := '{}';
+  v_carbs   NUMERIC[] := '{}';
+  v_fat     NUMERIC[] := '{}';
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    SELECT v_meal    || COALESCE(array_agg(meal_id), '{}'),
+           v_cal     || COALESCE(array_agg(COALESCE(amount * cal_per_unit, 0)), '{}'),
+           v_protein || COALESCE(array_agg(amount * COALESCE(protein_per_unit, 0)), '{}'),
+           v_carbs   || COALESCE(array_agg(amount * COALESCE(carbs_per_unit,   0)), '{}'),
+           v_fat     || COALESCE(array_agg(amount * COALESCE(fat_per_unit,     0)), '{}')
+      INTO v_meal, v_cal, v_protein, v_carbs, v_fat
+    FROM new_rows WHERE meal_id IS NOT NULL;
+  END IF;
+  IF TG_OP IN ('DELETE', 'UPDATE') THEN
+    SELECT v_meal    || COALESCE(array_agg(meal_id), '{}'),
+           v_cal     || COALESCE(array_agg(-COALESCE(amount * cal_per_unit, 0)), '{}'),
+           v_protein || COALESCE(array_agg(-(amount * COALESCE(protein_per_unit, 0))), '{}'),
+           v_carbs   || COALESCE(array_agg(-(amount * COALESCE(carbs_per_unit,   0))), '{}'),
+           v_fat     || COALESCE(array_agg(-(amount * COALESCE(fat_per_unit,     0))), '{}')
+      INTO v_meal, v_cal, v_protein, v_carbs, v_fat
+    FROM old_rows WHERE meal_id IS NOT NULL;
+  END IF;
+
+  IF cardinality(v_meal) = 0 THEN
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO cleangoal.daily_summaries AS ds
+    (user_id, date_record, total_calories_intake, total_protein, total_carbs, total_fat, is_goal_met)
+  SELECT d.user_id, d.date_record, d.cal, d.protein, d.carbs, d.fat,
+         d.cal <= COALESCE(u.target_calories, 9999)
+  FROM (
+    SELECT m.user_id, m.meal_date AS date_record,
+           COALESCE(SUM(r.cal), 0)     AS cal,
+           COALESCE(SUM(r.protein), 0) AS protein,
+           COALESCE(SUM(r.carbs), 0)   AS carbs,
+           COALESCE(SUM(r.fat), 0)     AS fat
+    FROM unnest(v_meal, v_cal, v_protein, v_carbs, v_fat) AS r(meal_id, cal, protein, carbs, fat)
+    JOIN cleangoal.meals m ON m.meal_id = r.meal_id
+    GROUP BY m.user_id, m.meal_date
+  ) d
+  LEFT JOIN cleangoal.users u ON u.user_id = d.user_id
+  ON CONFLICT (user_id, date_record) DO UPDATE SET
+    total_calories_intake = COALESCE(ds.total_calories_intake, 0) + EXCLUDED.total_calories_intake,
+    total_protein         = COALESCE(ds.total_protein, 0) + EXCLUDED.total_protein,
+    total_carbs           = COALESCE(ds.total_carbs,   0) + EXCLUDED.total_carbs,
+    total_fat             = COALESCE(ds.total_fat,     0) + EXCLUDED.total_fat,
+    is_goal_met           = (
+      COALESCE(ds.total_calories_intake, 0) + EXCLUDED.total_calories_intake <= COALESCE(
+        (SELECT target_calories FROM cleangoal.users WHERE user_id = ds.user_id),
+        9999
+      )
+    );
+
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION cleangoal.fn_recompute_daily_summary_for_meals()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+DECLARE
+  r RECORD;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    FOR r IN SELECT DISTINCT user_id, meal_date AS d FROM old_rows LOOP
+      PERFORM cleangoal.fn_recompute_daily_summary(r.user_id, r.d);
+    END LOOP;
+  ELSE
+    FOR r IN
+      SELECT o.user_id, o.meal_date AS d
+      FROM old_rows o JOIN new_rows n ON n.meal_id = o.meal_id
+      WHERE (o.user_id, o.meal_date) IS DISTINCT FROM (n.user_id, n.meal_date)
+      UNION
+      SELECT n.user_id, n.meal_date
+      FROM old_rows o JOIN new_rows n ON n.meal_id = o.meal_id
+      WHERE (o.user_id, o.meal_date) IS DISTINCT FROM (n.user_id, n.meal_date)
+    LOOP
+      PERFORM cleangoal.fn_recompute_daily_summary(r.user_id, r.d);
+    END LOOP;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Meals logged between 00:00 and 07:00 Bangkok time used to land on the
+-- previous UTC day; resync every (user, day) under the new boundary.
+DO $$
+DECLARE
+  r RECORD;
+BEGIN
+  FOR r IN
+    SELECT user_id, date_record FROM cleangoal.daily_summaries
+    UNION
+    SELECT DISTINCT user_id, meal_date FROM cleangoal.meals
+  LOOP
+    PERFORM cleangoal.fn_recompute_daily_summary(r.user_id, r.date_record);
+  END LOOP;
+END $$;
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v28_meal_date_column')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK:
+-- BEGIN;
+-- Re-run the function definitions from v26_incremental_daily_summary.sql, then:
+-- DROP INDEX IF EXISTS cleangoal.idx_notifications_user_created;
+-- DROP INDEX IF EXISTS cleangoal.idx_meals_user_meal_date;
+-- CREATE INDEX idx_meals_user_date_type
+--     ON cleangoal.meals (user_id, ((meal_time AT TIME ZONE 'Asia/Bangkok')::date), meal_type);
+-- CREATE INDEX idx_meals_user_date
+--     ON cleangoal.meals (user_id, ((meal_time AT TIME ZONE 'Asia/Bangkok')::date) DESC);
+-- ALTER TABLE cleangoal.meals DROP COLUMN IF EXISTS meal_date;
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v28_meal_date_column';
+-- COMMIT;
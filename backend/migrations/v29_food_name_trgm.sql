@@ -0,0 +1,55 @@
+-- v29: Trigram GIN indexes for fuzzy food search.
+--
+-- /foods/search and /admin/foods/similar filter with ILIKE '%q%', which the
+-- btree idx_foods_name cannot serve, and rank alphabetically, so a typo in
+-- a Thai dish name ("ข้าวผัดกระเพา" for "ข้าวผัดกะเพรา") finds nothing.
+--
+-- gin_trgm_ops serves both `ILIKE '%q%'` and the similarity operator `%`,
+-- and similarity() gives the ranking. Used by foods._SEARCH_FOODS_SQL (the
+-- DB-side search, FOOD_SEARCH_BACKEND=db or before the in-process index has
+-- loaded) and admin_similar_foods.
+--
+-- pg_trgm must be on the app's search_path (cleangoal, public). Supabase
+-- installs extensions into `extensions`, so an existing install elsewhere
+-- is moved to public.
+--
+-- Thai note: pg_trgm only keeps characters the database locale calls
+-- alphanumeric. Under a UTF-8 locale Thai consonants qualify; combining
+-- vowels / tone marks do not and act as word breaks, which still leaves
+-- enough trigrams for useful similarity on dish names.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+
+DO $$
+DECLARE
+  v_schema TEXT;
+BEGIN
+  SELECT n.nspname INTO v_schema
+  FROM pg_extension e JOIN pg_namespace n ON n.oid = e.extnamespace
+  WHERE e.extname = 'pg_trgm';
+  IF v_schema NOT IN ('public', 'cleangoal') THEN
+    ALTER EXTENSION pg_trgm SET SCHEMA public;
+  END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_foods_name_trgm
+    ON cleangoal.foods USING gin (food_name public.gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_food_regional_names_name_trgm
+    ON cleangoal.food_regional_names USING gin (name_th public.gin_trgm_ops)
+    WHERE deleted_at IS NULL;
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v29_food_name_trgm')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK:
+-- BEGIN;
+-- DROP INDEX IF EXISTS cleangoal.idx_food_regional_names_name_trgm;
+-- DROP INDEX IF EXISTS cleangoal.idx_foods_name_trgm;
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v29_food_name_trgm';
+-- COMMIT;
+-- (pg_trgm is left installed; DROP EXTENSION pg_trgm only if nothing else uses it.)
@@ -0,0 +1,60 @@
+-- v30: Change counter for the food-name catalog.
+--
+-- The meal-text extractor (ai_models/food_dictionary.py) keeps one compiled
+-- dictionary of canonical names + regional aliases per process. To know
+-- when to rebuild it, it needs a probe that is cheaper than re-reading
+-- 10k names. foods.updated_at is not maintained by any trigger and hard
+-- deletes leave no trace, so max(updated_at) can't be trusted.
+--
+-- catalog_versions holds one counter per catalog; statement-level triggers
+-- on foods and food_regional_names bump 'food_names' once per writing
+-- statement (bulk seeds included). The probe is a primary-key lookup.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS cleangoal.catalog_versions (
+    name       TEXT PRIMARY KEY,
+    version    BIGINT      NOT NULL DEFAULT 0,
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO cleangoal.catalog_versions (name) VALUES ('food_names')
+    ON CONFLICT (name) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION cleangoal.fn_bump_food_names_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+BEGIN
+  UPDATE cleangoal.catalog_versions
+  SET version = version + 1, changed_at = NOW()
+  WHERE name = 'food_names';
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_foods_bump_names_version ON cleangoal.foods;
+CREATE TRIGGER trg_foods_bump_names_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cleangoal.foods
+    FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_bump_food_names_version();
+
+DROP TRIGGER IF EXISTS trg_food_regional_names_bump_names_version ON cleangoal.food_regional_names;
+CREATE TRIGGER trg_food_regional_names_bump_names_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON cleangoal.food_regional_names
+    FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_bump_food_names_version();
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v30_food_catalog_version')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK:
+-- BEGIN;
+-- DROP TRIGGER IF EXISTS trg_food_regional_names_bump_names_version ON cleangoal.food_regional_names;
+-- DROP TRIGGER IF EXISTS trg_foods_bump_names_version ON cleangoal.foods;
+-- DROP FUNCTION IF EXISTS cleangoal.fn_bump_food_names_version();
+-- DROP TABLE IF EXISTS cleangoal.catalog_versions;
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v30_food_catalog_version';
+-- COMMIT;
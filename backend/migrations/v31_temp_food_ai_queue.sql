@@ -0,0 +1,43 @@
+-- v31: Conflict target for AI-estimated temp_food rows.
+--
+-- NutritionAnalysisAgent queues every food the LLM had to estimate into
+-- temp_food for admin review. It used to do that one row at a time with a
+-- SELECT-then-INSERT per food (racy: two chats naming the same new dish
+-- both insert it). It now writes all of a message's estimates in one
+-- multi-row INSERT ... ON CONFLICT DO NOTHING, which needs a unique index
+-- to arbitrate on.
+--
+-- temp_food can't be unique on the name as a whole: /foods/auto-add lets
+-- different users queue the same dish, and existing data already has
+-- duplicates. So rows get a `source` ('user' for everything that exists
+-- today) and uniqueness is only enforced for source = 'ai_estimate'.
+--
+-- The agent still skips names already queued by a user; the plain
+-- LOWER(food_name) index serves that NOT EXISTS probe.
+
+BEGIN;
+
+ALTER TABLE cleangoal.temp_food
+    ADD COLUMN IF NOT EXISTS source VARCHAR(20) NOT NULL DEFAULT 'user';
+
+COMMENT ON COLUMN cleangoal.temp_food.source IS 'ที่มาของรายการ: user (เพิ่มเอง) หรือ ai_estimate (AI ประเมินอัตโนมัติ)';
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_temp_food_ai_estimate_name
+    ON cleangoal.temp_food (LOWER(food_name))
+    WHERE source = 'ai_estimate';
+
+CREATE INDEX IF NOT EXISTS idx_temp_food_lower_name
+    ON cleangoal.temp_food (LOWER(food_name));
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v31_temp_food_ai_queue')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK:
+-- BEGIN;
+-- DROP INDEX IF EXISTS cleangoal.idx_temp_food_lower_name;
+-- DROP INDEX IF EXISTS cleangoal.uq_temp_food_ai_estimate_name;
+-- ALTER TABLE cleangoal.temp_food DROP COLUMN IF EXISTS source;
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v31_temp_food_ai_queue';
+-- COMMIT;
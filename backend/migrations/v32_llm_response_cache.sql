@@ -0,0 +1,37 @@
+-- v32: Shared LLM response cache.
+--
+-- ai_models/llm_cache.py caches llm_provider.generate() responses keyed
+-- by sha256(provider, model, temperature, normalized prompt). The default
+-- backend is a per-process LRU; with LLM_CACHE_BACKEND=postgres the LRU
+-- sits in front of this table so every worker and instance shares
+-- nutrition estimates and recipe drafts instead of each re-asking Ollama.
+--
+-- Rows expire by expires_at (checked on read). Writers sweep expired rows
+-- on ~1% of inserts, so no cron job is needed.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS cleangoal.llm_response_cache (
+    cache_key  TEXT PRIMARY KEY,
+    response   TEXT        NOT NULL,
+    gen_ms     INTEGER     NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+COMMENT ON TABLE  cleangoal.llm_response_cache        IS 'แคชคำตอบ LLM ที่ไม่ขึ้นกับผู้ใช้ (ประมาณโภชนาการ, สูตรอาหาร)';
+COMMENT ON COLUMN cleangoal.llm_response_cache.gen_ms IS 'เวลาที่ใช้สร้างคำตอบครั้งแรก (ms) — ใช้คำนวณเวลาที่ประหยัดได้';
+
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires_at
+    ON cleangoal.llm_response_cache (expires_at);
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v32_llm_response_cache')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK:
+-- BEGIN;
+-- DROP TABLE IF EXISTS cleangoal.llm_response_cache;
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v32_llm_response_cache';
+-- COMMIT;
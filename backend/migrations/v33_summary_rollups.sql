@@ -0,0 +1,289 @@
+-- v33: Weekly / monthly rollups of daily_summaries.
+--
+-- /insights/{id}, /insights/{id}/macro_balance and the user-context
+-- snapshot summed protein/carbs/fat by joining meals to detail_items for
+-- every day in the window, although daily_summaries has carried the same
+-- per-day macros since v8 (kept exact by the v26/v28 delta triggers).
+-- Those reads now use daily_summaries alone: one (user_id, date_record)
+-- index range, O(days).
+--
+-- Longer horizons read rollups instead of days:
+--   weekly_summaries   — one row per user per ISO week (start_date = Monday).
+--                        Dropped in v14_f as unused; recreated here with totals
+--   monthly_summaries  — one row per user per calendar month (existing table,
+--                        totals added; the weight columns are untouched)
+-- Each carries days_logged_count (daily_summaries rows), total_calories /
+-- total_protein / total_carbs / total_fat and avg_daily_calories.
+--
+-- Maintenance is incremental, like v26: statement-level triggers on
+-- daily_summaries apply +/- deltas from the transition tables (new rows
+-- add, old rows subtract, one upsert per touched week and month). Rollups
+-- left at zero days are deleted. fn_rebuild_summary_rollups(user_id)
+-- recomputes from daily_summaries. It backfills below, and
+-- backend/scripts/backfill_summary_rollups.py runs it after anything that
+-- bypassed the triggers.
+
+BEGIN;
+
+-- ------------------------------------------------------------------------
+-- 1. Tables
+-- ------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS cleangoal.weekly_summaries (
+    weekly_id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT NOT NULL REFERENCES cleangoal.users(user_id) ON DELETE CASCADE,
+    start_date DATE NOT NULL,
+    avg_daily_calories INT,
+    days_logged_count INT,
+    UNIQUE (user_id, start_date)
+);
+
+CREATE TABLE IF NOT EXISTS cleangoal.monthly_summaries (
+    monthly_id BIGSERIAL PRIMARY KEY,
+    user_id BIGINT REFERENCES cleangoal.users(user_id) ON DELETE CASCADE,
+    month INT NOT NULL,
+    year INT NOT NULL,
+    avg_daily_calories INT,
+    start_weight DECIMAL(5,2),
+    end_weight DECIMAL(5,2),
+    weight_change DECIMAL(5,2),
+    compliance_score INT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    UNIQUE (user_id, month, year)
+);
+
+ALTER TABLE cleangoal.weekly_summaries
+    ADD COLUMN IF NOT EXISTS total_calories NUMERIC NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_protein  NUMERIC NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_carbs    NUMERIC NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_fat      NUMERIC NOT NULL DEFAULT 0;
+
+ALTER TABLE cleangoal.monthly_summaries
+    ADD COLUMN IF NOT EXISTS days_logged_count INT,
+    ADD COLUMN IF NOT EXISTS total_calories NUMERIC NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_protein  NUMERIC NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_carbs    NUMERIC NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS total_fat      NUMERIC NOT NULL DEFAULT 0;
+
+COMMENT ON TABLE cleangoal.weekly_summaries  IS 'ผลรวมรายสัปดาห์ (เริ่มวันจันทร์) จาก daily_summaries — ดูแลโดย trigger';
+COMMENT ON TABLE cleangoal.monthly_summaries IS 'ผลรวมรายเดือนจาก daily_summaries — ดูแลโดย trigger';
+
+-- GET /insights/{id}/summaries?period=month reads newest months first.
+CREATE INDEX IF NOT EXISTS idx_monthly_summaries_user_period
+    ON cleangoal.monthly_summaries (user_id, year DESC, month DESC);
+
+-- Deny-by-default like v15_c's infra tables; the backend role bypasses RLS.
+ALTER TABLE cleangoal.weekly_summaries ENABLE ROW LEVEL SECURITY;
+ALTER TABLE cleangoal.monthly_summaries ENABLE ROW LEVEL SECURITY;
+
+-- ------------------------------------------------------------------------
+-- 2. Full rebuild (backfill / repair). NULL = every user.
+-- ------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION cleangoal.fn_rebuild_summary_rollups(p_user_id BIGINT)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+  DELETE FROM cleangoal.weekly_summaries
+   WHERE p_user_id IS NULL OR user_id = p_user_id;
+
+  INSERT INTO cleangoal.weekly_summaries
+    (user_id, start_date, days_logged_count, total_calories, total_protein,
+     total_carbs, total_fat, avg_daily_calories)
+  SELECT user_id, date_trunc('week', date_record)::date,
+         COUNT(*),
+         SUM(COALESCE(total_calories_intake, 0)),
+         SUM(COALESCE(total_protein, 0)),
+         SUM(COALESCE(total_carbs, 0)),
+         SUM(COALESCE(total_fat, 0)),
+         ROUND(SUM(COALESCE(total_calories_intake, 0)) / COUNT(*))
+  FROM cleangoal.daily_summaries
+  WHERE p_user_id IS NULL OR user_id = p_user_id
+  GROUP BY 1, 2;
+
+  UPDATE cleangoal.monthly_summaries
+     SET days_logged_count = 0, total_calories = 0, total_protein = 0,
+         total_carbs = 0, total_fat = 0, avg_daily_calories = NULL
+   WHERE p_user_id IS NULL OR user_id = p_user_id;
+
+  INSERT INTO cleangoal.monthly_summaries AS ms
+    (user_id, year, month, days_logged_count, total_calories, total_protein,
+     total_carbs, total_fat, avg_daily_calories)
+  SELECT user_id, EXTRACT(YEAR FROM date_record)::int, EXTRACT(MONTH FROM date_record)::int,
+         COUNT(*),
+         SUM(COALESCE(total_calories_intake, 0)),
+         SUM(COALESCE(total_protein, 0)),
+         SUM(COALESCE(total_carbs, 0)),
+         SUM(COALESCE(total_fat, 0)),
+         ROUND(SUM(COALESCE(total_calories_intake, 0)) / COUNT(*))
+  FROM cleangoal.daily_summaries
+  WHERE p_user_id IS NULL OR user_id = p_user_id
+  GROUP BY 1, 2, 3
+  ON CONFLICT (user_id, month, year) DO UPDATE SET
+    days_logged_count  = EXCLUDED.days_logged_count,
+    total_calories     = EXCLUDED.total_calories,
+    total_protein      = EXCLUDED.total_protein,
+    total_carbs        = EXCLUDED.total_carbs,
+    total_fat          = EXCLUDED.total_fat,
+    avg_daily_calories = EXCLUDED.avg_daily_calories;
+
+  -- Monthly rows may hold weight data, so only drop the ones with neither.
+  DELETE FROM cleangoal.monthly_summaries
+   WHERE (p_user_id IS NULL OR user_id = p_user_id)
+     AND days_logged_count = 0 AND start_weight IS NULL AND end_weight IS NULL;
+$$;
+
+-- ------------------------------------------------------------------------
+-- 3. Delta trigger on daily_summaries
+-- ------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION cleangoal.fn_apply_summary_rollup_delta()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = cleangoal, pg_catalog
+AS $$
+DECLARE
+  v_user    BIGINT[]  := '{}';
+  v_day     DATE[]    := '{}';
+  v_days    INT[]     := '{}';
+  v_cal     NUMERIC[] := '{}';
+  v_protein NUMERIC[] := '{}';
+  v_carbs   NUMERIC[] := '{}';
+  v_fat     NUMERIC[] := '{}';
+BEGIN
+  -- Signed per-day contributions; a row is one logged day. Only the
+  -- transition tables declared for TG_OP exist, as in v26.
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    SELECT v_user    || COALESCE(array_agg(user_id), '{}'),
+           v_day     || COALESCE(array_agg(date_record), '{}'),
+           v_days    || COALESCE(array_agg(1), '{}'),
+           v_cal     || COALESCE(array_agg(COALESCE(total_calories_intake, 0)::numeric), '{}'),
+           v_protein || COALESCE(array_agg(COALESCE(total_protein, 0)), '{}'),
+           v_carbs   || COALESCE(array_agg(COALESCE(total_carbs,   0)), '{}'),
+           v_fat     || COALESCE(array_agg(COALESCE(total_fat,     0)), '{}')
+      INTO v_user, v_day, v_days, v_cal, v_protein, v_carbs, v_fat
+    FROM new_rows;
+  END IF;
+  IF TG_OP IN ('DELETE', 'UPDATE') THEN
+    SELECT v_user    || COALESCE(array_agg(user_id), '{}'),
+           v_day     || COALESCE(array_agg(date_record), '{}'),
+           v_days    || COALESCE(array_agg(-1), '{}'),
+           v_cal     || COALESCE(array_agg(-COALESCE(total_calories_intake, 0)::numeric), '{}'),
+           v_protein || COALESCE(array_agg(-COALESCE(total_protein, 0)), '{}'),
+           v_carbs   || COALESCE(array_agg(-COALESCE(total_carbs,   0)), '{}'),
+           v_fat     || COALESCE(array_agg(-COALESCE(total_fat,     0)), '{}')
+      INTO v_user, v_day, v_days, v_cal, v_protein, v_carbs, v_fat
+    FROM old_rows;
+  END IF;
+
+  IF cardinality(v_user) = 0 THEN
+    RETURN NULL;
+  END IF;
+
+  -- Users deleted in this statement (users → daily_summaries cascade) are
+  -- skipped; their rollups go with the same cascade.
+  INSERT INTO cleangoal.weekly_summaries AS ws
+    (user_id, start_date, days_logged_count, total_calories, total_protein,
+     total_carbs, total_fat, avg_daily_calories)
+  SELECT d.user_id, d.start_date, d.days, d.cal, d.protein, d.carbs, d.fat,
+         CASE WHEN d.days > 0 THEN ROUND(d.cal / d.days) END
+  FROM (
+    SELECT r.user_id, date_trunc('week', r.day)::date AS start_date,
+           SUM(r.days) AS days, SUM(r.cal) AS cal, SUM(r.protein) AS protein,
+           SUM(r.carbs) AS carbs, SUM(r.fat) AS fat
+    FROM unnest(v_user, v_day, v_days, v_cal, v_protein, v_carbs, v_fat)
+         AS r(user_id, day, days, cal, protein, carbs, fat)
+    WHERE EXISTS (SELECT 1 FROM cleangoal.users u WHERE u.user_id = r.user_id)
+    GROUP BY 1, 2
+  ) d
+  ON CONFLICT (user_id, start_date) DO UPDATE SET
+    days_logged_count  = COALESCE(ws.days_logged_count, 0) + EXCLUDED.days_logged_count,
+    total_calories     = ws.total_calories + EXCLUDED.total_calories,
+    total_protein      = ws.total_protein + EXCLUDED.total_protein,
+    total_carbs        = ws.total_carbs + EXCLUDED.total_carbs,
+    total_fat          = ws.total_fat + EXCLUDED.total_fat,
+    avg_daily_calories = CASE
+      WHEN COALESCE(ws.days_logged_count, 0) + EXCLUDED.days_logged_count > 0
+      THEN ROUND((ws.total_calories + EXCLUDED.total_calories)
+                 / (COALESCE(ws.days_logged_count, 0) + EXCLUDED.days_logged_count))
+    END;
+
+  INSERT INTO cleangoal.monthly_summaries AS ms
+    (user_id, year, month, days_logged_count, total_calories, total_protein,
+     total_carbs, total_fat, avg_daily_calories)
+  SELECT d.user_id, d.year, d.month, d.days, d.cal, d.protein, d.carbs, d.fat,
+         CASE WHEN d.days > 0 THEN ROUND(d.cal / d.days) END
+  FROM (
+    SELECT r.user_id, EXTRACT(YEAR FROM r.day)::int AS year, EXTRACT(MONTH FROM r.day)::int AS month,
+           SUM(r.days) AS days, SUM(r.cal) AS cal, SUM(r.protein) AS protein,
+           SUM(r.carbs) AS carbs, SUM(r.fat) AS fat
+    FROM unnest(v_user, v_day, v_days, v_cal, v_protein, v_carbs, v_fat)
+         AS r(user_id, day, days, cal, protein, carbs, fat)
+    WHERE EXISTS (SELECT 1 FROM cleangoal.users u WHERE u.user_id = r.user_id)
+    GROUP BY 1, 2, 3
+  ) d
+  ON CONFLICT (user_id, month, year) DO UPDATE SET
+    days_logged_count  = COALESCE(ms.days_logged_count, 0) + EXCLUDED.days_logged_count,
+    total_calories     = ms.total_calories + EXCLUDED.total_calories,
+    total_protein      = ms.total_protein + EXCLUDED.total_protein,
+    total_carbs        = ms.total_carbs + EXCLUDED.total_carbs,
+    total_fat          = ms.total_fat + EXCLUDED.total_fat,
+    avg_daily_calories = CASE
+      WHEN COALESCE(ms.days_logged_count, 0) + EXCLUDED.days_logged_count > 0
+      THEN ROUND((ms.total_calories + EXCLUDED.total_calories)
+                 / (COALESCE(ms.days_logged_count, 0) + EXCLUDED.days_logged_count))
+    END;
+
+  DELETE FROM cleangoal.weekly_summaries
+   WHERE user_id = ANY(v_user) AND days_logged_count <= 0;
+  DELETE FROM cleangoal.monthly_summaries
+   WHERE user_id = ANY(v_user) AND days_logged_count <= 0
+     AND start_weight IS NULL AND end_weight IS NULL;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_summary_rollups_ins ON cleangoal.daily_summaries;
+DROP TRIGGER IF EXISTS trg_summary_rollups_upd ON cleangoal.daily_summaries;
+DROP TRIGGER IF EXISTS trg_summary_rollups_del ON cleangoal.daily_summaries;
+
+CREATE TRIGGER trg_summary_rollups_ins
+  AFTER INSERT ON cleangoal.daily_summaries
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_apply_summary_rollup_delta();
+
+CREATE TRIGGER trg_summary_rollups_upd
+  AFTER UPDATE ON cleangoal.daily_summaries
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_apply_summary_rollup_delta();
+
+CREATE TRIGGER trg_summary_rollups_del
+  AFTER DELETE ON cleangoal.daily_summaries
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION cleangoal.fn_apply_summary_rollup_delta();
+
+-- ------------------------------------------------------------------------
+-- 4. Backfill
+-- ------------------------------------------------------------------------
+SELECT cleangoal.fn_rebuild_summary_rollups(NULL);
+
+INSERT INTO cleangoal.schema_migrations(version) VALUES ('v33_summary_rollups')
+    ON CONFLICT (version) DO NOTHING;
+
+COMMIT;
+
+-- ROLLBACK:
+-- BEGIN;
+-- DROP TRIGGER IF EXISTS trg_summary_rollups_ins ON cleangoal.daily_summaries;
+-- DROP TRIGGER IF EXISTS trg_summary_rollups_upd ON cleangoal.daily_summaries;
+-- DROP TRIGGER IF EXISTS trg_summary_rollups_del ON cleangoal.daily_summaries;
+-- DROP FUNCTION IF EXISTS cleangoal.fn_apply_summary_rollup_delta();
+-- DROP FUNCTION IF EXISTS cleangoal.fn_rebuild_summary_rollups(BIGINT);
+-- DROP TABLE IF EXISTS cleangoal.weekly_summaries;
+-- ALTER TABLE cleangoal.monthly_summaries
+--     DROP COLUMN IF EXISTS days_logged_count, DROP COLUMN IF EXISTS total_calories,
+--     DROP COLUMN IF EXISTS total_protein, DROP COLUMN IF EXISTS total_carbs,
+--     DROP COLUMN IF EXISTS total_fat;
+-- DELETE FROM cleangoal.schema_migrations WHERE version = 'v33_summary_rollups';
+-- COMMIT;
@@ -46,6 +46,7 @@ TARGET_MIGRATIONS = [
     "v11_add_performance_indexes.sql",
     "v12_add_consent_and_detail_macros.sql",
     "v13_create_temp_and_verified_food.sql",
+    "v13_b_startup_helper_tables.sql",   # เดิม main.py สร้างตอน startup
     "add_target_macros_to_users.sql",
 ]
 
@@ -126,6 +127,8 @@ def run_migrations():
                 conn.rollback()
                 print(f"        FAILED: {e}")
                 failed += 1
+                if not sys.stdin.isatty():
+                    break  # deploy hooks / CI: stop at the first failure
                 answer = input("        Continue with next migration? (y/n): ").strip().lower()
                 if answer != "y":
                     break
@@ -139,6 +142,9 @@ def run_migrations():
         cur.close()
         conn.close()
 
+    if failed:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     run_migrations()
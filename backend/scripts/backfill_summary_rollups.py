@@ -0,0 +1,179 @@
+"""
+Weekly/monthly rollup backfill and drift check.
+
+Since migrations/v33, weekly_summaries and monthly_summaries are kept in
+step with daily_summaries by delta triggers, and the migration backfills
+them once. Anything that writes daily_summaries behind the triggers' back
+leaves them stale: `session_replication_role = replica` restores, a
+trigger disabled during a bulk load, or a manual fix. This job compares the
+stored rollups with a fresh aggregate over daily_summaries. With --repair
+(or --rebuild, which skips the comparison) it rewrites them via
+cleangoal.fn_rebuild_summary_rollups().
+
+Run manually:
+    python -m backend.scripts.backfill_summary_rollups                 # report only
+    python -m backend.scripts.backfill_summary_rollups --repair
+    python -m backend.scripts.backfill_summary_rollups --rebuild       # every user, no check
+    python -m backend.scripts.backfill_summary_rollups --user 42 --rebuild
+
+Run via cron after reconcile_daily_summaries (which repairs the days these
+roll up):
+    45 21 * * *    python -m backend.scripts.backfill_summary_rollups --repair
+
+Exit code is 1 when drift was found and not repaired, as in
+reconcile_daily_summaries.py.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+# Allow `python backend/scripts/backfill_summary_rollups.py` from repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection  # noqa: E402
+
+TOLERANCE = 0.005
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+log = logging.getLogger("backfill_summary_rollups")
+
+# Users whose stored weekly or monthly rollups differ from the aggregate
+# over daily_summaries. %(user_id)s NULL = every user.
+_DRIFT_SQL = """
+    WITH days AS (
+        SELECT user_id, date_record,
+               COALESCE(total_calories_intake, 0) AS cal,
+               COALESCE(total_protein, 0) AS protein,
+               COALESCE(total_carbs, 0) AS carbs,
+               COALESCE(total_fat, 0) AS fat
+        FROM daily_summaries
+        WHERE %(user_id)s::bigint IS NULL OR user_id = %(user_id)s
+    ),
+    weekly_actual AS (
+        SELECT user_id, date_trunc('week', date_record)::date AS period,
+               COUNT(*) AS n, SUM(cal) AS cal, SUM(protein) AS protein,
+               SUM(carbs) AS carbs, SUM(fat) AS fat
+        FROM days GROUP BY 1, 2
+    ),
+    weekly_stored AS (
+        SELECT user_id, start_date AS period, days_logged_count AS n,
+               total_calories AS cal, total_protein AS protein,
+               total_carbs AS carbs, total_fat AS fat
+        FROM weekly_summaries
+        WHERE (%(user_id)s::bigint IS NULL OR user_id = %(user_id)s) AND days_logged_count <> 0
+    ),
+    monthly_actual AS (
+        SELECT user_id, make_date(EXTRACT(YEAR FROM date_record)::int,
+                                  EXTRACT(MONTH FROM date_record)::int, 1) AS period,
+               COUNT(*) AS n, SUM(cal) AS cal, SUM(protein) AS protein,
+               SUM(carbs) AS carbs, SUM(fat) AS fat
+        FROM days GROUP BY 1, 2
+    ),
+    monthly_stored AS (
+        SELECT user_id, make_date(year, month, 1) AS period, days_logged_count AS n,
+               total_calories AS cal, total_protein AS protein,
+               total_carbs AS carbs, total_fat AS fat
+        FROM monthly_summaries
+        WHERE (%(user_id)s::bigint IS NULL OR user_id = %(user_id)s)
+          AND COALESCE(days_logged_count, 0) <> 0
+    ),
+    drift AS (
+        SELECT 'week' AS kind, COALESCE(a.user_id, s.user_id) AS user_id,
+               COALESCE(a.period, s.period) AS period, s.n AS stored_days, a.n AS actual_days
+        FROM weekly_actual a
+        FULL JOIN weekly_stored s ON s.user_id = a.user_id AND s.period = a.period
+        WHERE a.n IS DISTINCT FROM s.n
+           OR ABS(COALESCE(a.cal, 0) - COALESCE(s.cal, 0)) > %(tol)s
+           OR ABS(COALESCE(a.protein, 0) - COALESCE(s.protein, 0)) > %(tol)s
+           OR ABS(COALESCE(a.carbs, 0) - COALESCE(s.carbs, 0)) > %(tol)s
+           OR ABS(COALESCE(a.fat, 0) - COALESCE(s.fat, 0)) > %(tol)s
+        UNION ALL
+        SELECT 'month', COALESCE(a.user_id, s.user_id), COALESCE(a.period, s.period), s.n, a.n
+        FROM monthly_actual a
+        FULL JOIN monthly_stored s ON s.user_id = a.user_id AND s.period = a.period
+        WHERE a.n IS DISTINCT FROM s.n
+           OR ABS(COALESCE(a.cal, 0) - COALESCE(s.cal, 0)) > %(tol)s
+           OR ABS(COALESCE(a.protein, 0) - COALESCE(s.protein, 0)) > %(tol)s
+           OR ABS(COALESCE(a.carbs, 0) - COALESCE(s.carbs, 0)) > %(tol)s
+           OR ABS(COALESCE(a.fat, 0) - COALESCE(s.fat, 0)) > %(tol)s
+    )
+    SELECT kind, user_id, period, stored_days, actual_days FROM drift ORDER BY user_id, kind, period
+"""
+
+
+def find_drift(cur, user_id: Optional[int] = None) -> list[tuple]:
+    """Return (kind, user_id, period_start, stored_days, actual_days) for drifted rollups."""
+    cur.execute(_DRIFT_SQL, {"user_id": user_id, "tol": TOLERANCE})
+    return cur.fetchall()
+
+
+def rebuild(cur, user_ids) -> None:
+    """Rewrite the rollups of each user in user_ids (None = everyone, one statement)."""
+    if user_ids is None:
+        cur.execute("SELECT cleangoal.fn_rebuild_summary_rollups(NULL)")
+        return
+    for uid in user_ids:
+        cur.execute("SELECT cleangoal.fn_rebuild_summary_rollups(%s)", (uid,))
+
+
+def backfill(user_id: Optional[int], do_repair: bool, force: bool) -> int:
+    conn = get_db_connection()
+    if conn is None:
+        log.error("DB unavailable; aborting rollup backfill")
+        return -1
+    try:
+        cur = conn.cursor()
+        if force:
+            rebuild(cur, None if user_id is None else [user_id])
+            conn.commit()
+            log.info("rebuilt rollups for %s", "every user" if user_id is None else f"user_id={user_id}")
+            return 0
+        drift = find_drift(cur, user_id)
+        for kind, uid, period, stored, actual in drift[:50]:
+            log.warning("drift %s user_id=%s period=%s stored_days=%s actual_days=%s",
+                        kind, uid, period, stored, actual)
+        if len(drift) > 50:
+            log.warning("... and %d more drifted rollups", len(drift) - 50)
+        if drift and do_repair:
+            users = sorted({row[1] for row in drift})
+            rebuild(cur, users)
+            conn.commit()
+            log.info("rebuilt rollups for %d users", len(users))
+        else:
+            conn.rollback()
+        return len(drift)
+    except Exception:
+        conn.rollback()
+        log.exception("rollup backfill failed")
+        raise
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user", type=int, default=None, help="only this user_id")
+    parser.add_argument("--repair", action="store_true",
+                        help="rebuild the rollups of users that drifted")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="rebuild without comparing first (initial backfill)")
+    args = parser.parse_args()
+
+    start = datetime.now(timezone.utc)
+    drifted = backfill(args.user, args.repair, args.rebuild)
+    elapsed = (datetime.now(timezone.utc) - start).total_seconds()
+    log.info("rollup backfill done: %d drifted rollups in %.2fs", max(drifted, 0), elapsed)
+    if drifted < 0 or (drifted and not args.repair):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
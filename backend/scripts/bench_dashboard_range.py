@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Progress screen month view: calendar/weekly/daily fan-out vs one range query.
+
+Seeds a throwaway user with BENCH_DAYS (default 120) days of meals — 3
+meals x 3 detail_items a day — plus a water and a weight log per day,
+through the normal triggers. Then it times what the progress screen needs
+to draw one month:
+
+    legacy: /daily_logs/{id}/calendar (month of daily_summaries)
+            + /daily_logs/{id}/weekly (7 days of meals JOIN detail_items)
+            + BENCH_TAPS x /daily_logs/{id}?date_query (macros + items)
+            — one pooled connection checkout per call
+    now:    /daily_logs/{id}/range for the month: meals._RANGE_SQL, one
+            checkout, and it also carries water, weight and menu names
+
+The seed is uncommitted, so every statement runs on the seeding
+connection; the per-call checkout cost is measured separately on another
+pooled connection and added once per HTTP call. Everything is rolled
+back. Point it at staging or a local copy, never prod.
+
+Run:
+    python backend/scripts/bench_dashboard_range.py
+    BENCH_TAPS=10 BENCH_ROUNDS=50 python backend/scripts/bench_dashboard_range.py
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection  # noqa: E402
+from app.routers import meals  # noqa: E402
+
+DAYS = int(os.getenv("BENCH_DAYS", "120"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "30"))
+TAPS = int(os.getenv("BENCH_TAPS", "5"))
+
+# What the calendar and weekly routes ran before they became range views.
+_LEGACY_CALENDAR_SQL = """
+    SELECT date_record as date, total_calories_intake as calories
+    FROM daily_summaries
+    WHERE user_id = %s AND date_record >= %s AND date_record < %s
+"""
+
+_LEGACY_WEEKLY_MACROS_SQL = """
+    SELECT m.meal_date AS d,
+           COALESCE(SUM(di.amount * di.cal_per_unit), 0) AS total_cal,
+           COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS total_protein,
+           COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS total_carbs,
+           COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS total_fat
+    FROM meals m
+    JOIN detail_items di ON di.meal_id = m.meal_id
+    WHERE m.user_id = %s AND m.meal_date BETWEEN %s AND %s
+    GROUP BY m.meal_date
+"""
+
+_SEED_MEALS_SQL = """
+    INSERT INTO meals (user_id, meal_type, meal_time, total_amount)
+    SELECT %s, t.meal_type::meal_type, d::date + t.at, 3
+    FROM generate_series(CURRENT_DATE - %s, CURRENT_DATE - 1, INTERVAL '1 day') AS d,
+         (VALUES ('breakfast', TIME '08:00'), ('lunch', TIME '12:30'), ('dinner', TIME '19:00'))
+             AS t(meal_type, at)
+"""
+
+_SEED_ITEMS_SQL = """
+    INSERT INTO detail_items (meal_id, food_name, amount, unit_id,
+        cal_per_unit, protein_per_unit, carbs_per_unit, fat_per_unit)
+    SELECT m.meal_id, 'bench-' || i, 1, %s,
+           150 + (m.meal_id %% 200), 8, 20, 5
+    FROM meals m, generate_series(1, 3) AS i
+    WHERE m.user_id = %s
+"""
+
+_SEED_WATER_WEIGHT_SQL = """
+    WITH d AS (
+        SELECT d::date AS day
+        FROM generate_series(CURRENT_DATE - %(days)s, CURRENT_DATE - 1, INTERVAL '1 day') AS d
+    ),
+    water AS (
+        INSERT INTO water_logs (user_id, date_record, amount_ml, glasses)
+        SELECT %(user_id)s, day, 2000, 8 FROM d
+    )
+    INSERT INTO weight_logs (user_id, weight_kg, recorded_date)
+    SELECT %(user_id)s, 70 + (EXTRACT(DAY FROM day) / 10.0), day FROM d
+"""
+
+
+def _seed(cur) -> int:
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    cur.execute("""
+        INSERT INTO users (username, email, password_hash, role_id, target_calories)
+        VALUES (%s, %s, 'x', 2, 2000) RETURNING user_id
+    """, (name, f"{name}@bench.local"))
+    user_id = cur.fetchone()[0]
+    cur.execute("SELECT unit_id FROM units ORDER BY unit_id LIMIT 1")
+    unit_id = cur.fetchone()[0]
+    cur.execute(_SEED_MEALS_SQL, (user_id, DAYS))
+    cur.execute(_SEED_ITEMS_SQL, (unit_id, user_id))
+    cur.execute(_SEED_WATER_WEIGHT_SQL, {"user_id": user_id, "days": DAYS})
+    cur.execute("ANALYZE meals; ANALYZE detail_items; ANALYZE daily_summaries; "
+                "ANALYZE water_logs; ANALYZE weight_logs")
+    return user_id
+
+
+def _checkout_ms() -> float:
+    """Median cost of one get_db_connection() + close() round through the pool."""
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        conn = get_db_connection()
+        conn.cursor().execute("SELECT 1")
+        conn.close()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def _legacy(cur, uid, first, next_first, monday, taps):
+    cur.execute(_LEGACY_CALENDAR_SQL, (uid, first, next_first))
+    cur.fetchall()
+    cur.execute(_LEGACY_WEEKLY_MACROS_SQL, (uid, monday, monday + timedelta(days=6)))
+    cur.fetchall()
+    for day in taps:
+        cur.execute(meals._SUMMARY_MACROS_SQL, (uid, day))
+        cur.fetchone()
+        cur.execute(meals._DAILY_LOG_ITEMS_SQL, (uid, day))
+        cur.fetchall()
+
+
+def _range(cur, uid, first, next_first):
+    cur.execute(meals._RANGE_SQL, {"user_id": uid, "start": first, "end": next_first})
+    cur.fetchall()
+
+
+def _time(fn) -> list[float]:
+    fn()  # warm-up: plan cache, buffers
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return sorted(samples)
+
+
+def main() -> int:
+    conn = get_db_connection()
+    if conn is None:
+        print("DB unavailable", file=sys.stderr)
+        return 1
+    try:
+        cur = conn.cursor()
+        t0 = time.perf_counter()
+        uid = _seed(cur)
+        print(f"seeded {DAYS} days x 3 meals x 3 items + water/weight in "
+              f"{time.perf_counter() - t0:.1f}s; rounds: {ROUNDS}, taps: {TAPS}")
+
+        last_month = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        next_first = (last_month + timedelta(days=32)).replace(day=1)
+        monday = last_month - timedelta(days=last_month.weekday())
+        taps = [last_month + timedelta(days=i) for i in range(TAPS)]
+
+        checkout = _checkout_ms()
+        legacy_calls, now_calls = 2 + TAPS, 1
+        legacy = _time(lambda: _legacy(cur, uid, last_month, next_first, monday, taps))
+        now = _time(lambda: _range(cur, uid, last_month, next_first))
+        p95 = lambda xs: xs[min(len(xs) - 1, int(len(xs) * 0.95))]  # noqa: E731
+
+        print(f"month {last_month:%Y-%m}; pool checkout {checkout:.2f}ms per call")
+        print(f"{'view':>8} | {'calls':>5} {'stmts':>5} | {'sql p50':>8} {'p95':>8} | {'total p50':>9}")
+        for label, calls, stmts, xs in (("legacy", legacy_calls, 2 + 2 * TAPS, legacy),
+                                        ("range", now_calls, 1, now)):
+            total = statistics.median(xs) + calls * checkout
+            print(f"{label:>8} | {calls:>5} {stmts:>5} | {statistics.median(xs):>6.2f}ms "
+                  f"{p95(xs):>6.2f}ms | {total:>7.2f}ms")
+        l_total = statistics.median(legacy) + legacy_calls * checkout
+        n_total = statistics.median(now) + now_calls * checkout
+        print(f"speedup {l_total / n_total:.1f}x (range also returns water, weight and "
+              f"menus for every day of the month)")
+    finally:
+        conn.rollback()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Food search latency: foods._SEARCH_FOODS_SQL vs the in-process FoodIndex.
+
+Loads the catalog once into app.services.food_index.FoodIndex, then times
+each query in QUERIES both ways:
+
+    sql    — the DB-side search (pg_trgm, migrations/v29), one round
+             trip per keystroke
+    index  — FoodIndex.search(), no database access
+
+and reports whether both return the same set of food_ids (the SQL path
+also returns typo-tolerant trigram matches, so it may return more).
+Short prefixes (one or two Thai characters) are what the Flutter search
+box sends first, so they are in the list on purpose. Read-only; safe
+against staging.
+
+Run:
+    python backend/scripts/bench_food_search.py
+    BENCH_ROUNDS=200 BENCH_REGION=northeastern python backend/scripts/bench_food_search.py
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2.extras import RealDictCursor  # noqa: E402
+
+from database import get_db_connection  # noqa: E402
+from app.routers.foods import _SEARCH_FOODS_SQL, _search_params  # noqa: E402
+from app.services.food_index import FoodIndex  # noqa: E402
+
+QUERIES = ("ข", "ข้า", "ข้าว", "ข้าวผัด", "ต้มยำ", "ไก่", "ปุ้น", "ส้มตำ", "pad", "zzz")
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "50"))
+REGION = os.getenv("BENCH_REGION") or None
+LIMIT = 20
+
+
+def _time(fn) -> list[float]:
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return sorted(samples)
+
+
+def main() -> int:
+    conn = get_db_connection()
+    if conn is None:
+        print("DB unavailable", file=sys.stderr)
+        return 1
+    try:
+        index = FoodIndex()
+        t0 = time.perf_counter()
+        index.load(conn)
+        print(f"index: {len(index)} foods loaded in {(time.perf_counter() - t0) * 1000:.0f}ms"
+              f"   rounds: {ROUNDS}   region: {REGION}")
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+
+        def sql(q):
+            cur.execute(_SEARCH_FOODS_SQL, _search_params(q, REGION, LIMIT))
+            return cur.fetchall()
+
+        print(f"{'query':<10} | {'sql p50':>8} {'p95':>8} | {'index p50':>9} {'p95':>8} | speedup | same")
+        for q in QUERIES:
+            sql(q)  # warm-up: plan cache, buffers
+            s = _time(lambda: sql(q))
+            i = _time(lambda: index.search(q, REGION, LIMIT))
+            p95 = lambda xs: xs[min(len(xs) - 1, int(len(xs) * 0.95))]  # noqa: E731
+            s50, i50 = statistics.median(s), statistics.median(i)
+            same = ({r["food_id"] for r in sql(q)} == {r["food_id"] for r in index.search(q, REGION, LIMIT)})
+            print(f"{q:<10} | {s50:>6.2f}ms {p95(s):>6.2f}ms | {i50:>7.3f}ms {p95(i):>6.3f}ms | "
+                  f"{s50 / max(i50, 1e-6):>6.0f}x | {'yes' if same else 'differs'}")
+        conn.rollback()
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
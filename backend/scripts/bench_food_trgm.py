@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""pg_trgm food search latency at 10k / 100k / 1M rows.
+
+Builds a TEMP table shaped like cleangoal.foods from the seeded Thai food
+CSV (each dish name crossed with common order modifiers and a serial, so
+names stay realistic but distinct), then for each size times three query
+kinds under two plans:
+
+    seq    — ILIKE '%q%' with index scans disabled (what the btree
+             idx_foods_name left us with)
+    trgm   — the same predicate plus the `%` similarity operator, ranked
+             by similarity(), on a GIN gin_trgm_ops index (migrations/v29)
+
+Queries: an exact dish substring, a misspelling of it (seq has no way to
+match the typo, so it reports 0 hits), and a short two-character prefix.
+
+Everything lives in a temp table inside a transaction that is rolled
+back; cleangoal.foods is never touched. Needs pg_trgm installed (v29).
+
+Run:
+    python backend/scripts/bench_food_trgm.py
+    python backend/scripts/bench_food_trgm.py --csv backend/scripts/data/thai_foods_v2.csv --sizes 10000,100000
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection  # noqa: E402
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "thai_foods_v2.sample.csv")
+MODIFIERS = ["", "พิเศษ", "ไข่ดาว", "ไม่เผ็ด", "เผ็ดน้อย", "ใส่ไข่", "จานใหญ่", "ไม่ใส่ผัก"]
+QUERIES = {
+    "substring": "ผัดไทย",
+    "typo": "ข้าวผัดกระเพา",       # for ข้าวผัดกะเพรา
+    "short": "ต้ม",
+}
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "20"))
+
+_SEQ_SQL = """
+    SELECT food_id, food_name FROM bench_foods
+    WHERE food_name ILIKE %(pattern)s
+    ORDER BY food_name LIMIT 20
+"""
+_TRGM_SQL = """
+    SELECT food_id, food_name FROM bench_foods
+    WHERE food_name ILIKE %(pattern)s OR food_name %% %(q)s
+    ORDER BY food_name ILIKE %(pattern)s DESC, similarity(food_name, %(q)s) DESC, food_name
+    LIMIT 20
+"""
+
+
+def _names(path: str) -> list[str]:
+    with open(path, encoding="utf-8") as fh:
+        return [r["food_name"].strip() for r in csv.DictReader(fh) if r.get("food_name")]
+
+
+def _fill(cur, names: list[str], size: int) -> None:
+    cur.execute("TRUNCATE bench_foods")
+    cur.execute("DROP INDEX IF EXISTS bench_foods_trgm")
+    cur.execute("""
+        INSERT INTO bench_foods (food_name)
+        SELECT concat_ws(' ', n.names[1 + g %% cardinality(n.names)],
+                         NULLIF(n.mods[1 + (g / cardinality(n.names)) %% cardinality(n.mods)], ''),
+                         '#' || g)
+        FROM generate_series(0, %(size)s - 1) g,
+             (SELECT %(names)s::text[] AS names, %(mods)s::text[] AS mods) n
+    """, {"size": size, "names": names, "mods": MODIFIERS})
+    t0 = time.perf_counter()
+    cur.execute("CREATE INDEX bench_foods_trgm ON bench_foods USING gin (food_name gin_trgm_ops)")
+    build_ms = (time.perf_counter() - t0) * 1000
+    cur.execute("ANALYZE bench_foods")
+    print(f"\n{size:>9,} rows   GIN build {build_ms:,.0f}ms")
+
+
+def _time(cur, sql: str, q: str) -> tuple[float, int]:
+    params = {"q": q, "pattern": f"%{q}%"}
+    cur.execute(sql, params)  # warm-up
+    hits = len(cur.fetchall())
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), hits
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--csv", default=DEFAULT_CSV)
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    args = ap.parse_args()
+    names = _names(args.csv)
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    conn = get_db_connection()
+    if conn is None:
+        print("DB unavailable", file=sys.stderr)
+        return 1
+    try:
+        cur = conn.cursor()
+        cur.execute("CREATE TEMP TABLE bench_foods (food_id BIGSERIAL PRIMARY KEY, food_name TEXT NOT NULL)")
+        print(f"{len(names)} seed names from {args.csv}   rounds: {ROUNDS}")
+        for size in sizes:
+            _fill(cur, names, size)
+            print(f"{'query':<10} | {'seq p50':>10} {'hits':>5} | {'trgm p50':>10} {'hits':>5} | speedup")
+            for kind, q in QUERIES.items():
+                cur.execute("SET LOCAL enable_indexscan = off")
+                cur.execute("SET LOCAL enable_bitmapscan = off")
+                seq, seq_hits = _time(cur, _SEQ_SQL, q)
+                cur.execute("SET LOCAL enable_indexscan = on")
+                cur.execute("SET LOCAL enable_bitmapscan = on")
+                trgm, trgm_hits = _time(cur, _TRGM_SQL, q)
+                print(f"{kind:<10} | {seq:>8.2f}ms {seq_hits:>5} | {trgm:>8.2f}ms {trgm_hits:>5} | "
+                      f"{seq / max(trgm, 1e-6):>6.1f}x")
+    finally:
+        conn.rollback()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Insights reads for a user with 2 years of history: raw items vs summaries.
+
+Seeds a throwaway user with BENCH_DAYS (default 730) days of meals — 3
+meals x 3 detail_items a day — through the normal triggers, so
+daily_summaries and the migrations/v33 rollups are maintained exactly as
+in production. Then it times each insights read both ways:
+
+    macro_balance   legacy: 7 days of meals JOIN detail_items, cross join + GROUP BY
+                    now:    insights._MACRO_BALANCE_SQL (daily_summaries)
+    snapshot_days   legacy: 30 days of daily_summaries LEFT JOIN meals/detail_items
+                    now:    the `days` CTE of user_context._SNAPSHOT_SQL
+    calorie_trend   legacy: CROSS JOIN users, timestamp-typed date predicate
+                    now:    insights._CALORIE_TREND_SQL
+    monthly_2y      legacy: 24 monthly averages aggregated from raw items
+                    now:    insights._PERIOD_SUMMARIES_SQL["month"]
+
+Everything runs in one transaction that is rolled back. Needs v33 applied.
+Point it at staging or a local copy, never prod.
+
+Run:
+    python backend/scripts/bench_insights_history.py
+    BENCH_DAYS=365 BENCH_ROUNDS=50 python backend/scripts/bench_insights_history.py
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection  # noqa: E402
+from app.routers import insights  # noqa: E402
+
+DAYS = int(os.getenv("BENCH_DAYS", "730"))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "30"))
+
+_LEGACY_MACRO_BALANCE_SQL = """
+    WITH macro_daily AS (
+        SELECT m.meal_date AS day,
+            COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS protein,
+            COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS carbs,
+            COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS fat,
+            COALESCE(SUM(di.amount * di.cal_per_unit), 0) AS total_cal
+        FROM meals m
+        JOIN detail_items di ON di.meal_id = m.meal_id
+        WHERE m.user_id = %s
+          AND m.meal_date >= (NOW() AT TIME ZONE 'Asia/Bangkok')::date - 6
+        GROUP BY m.meal_date
+    ),
+    macro_avg AS (
+        SELECT ROUND(AVG(protein)::numeric, 1) AS avg_protein_g,
+               ROUND(AVG(carbs)::numeric, 1) AS avg_carbs_g,
+               ROUND(AVG(fat)::numeric, 1) AS avg_fat_g,
+               ROUND(AVG(total_cal)::numeric, 0) AS avg_calories
+        FROM macro_daily
+    )
+    SELECT ma.*, JSON_AGG(JSON_BUILD_OBJECT('day', md.day, 'calories', md.total_cal)
+                          ORDER BY md.day) AS daily_breakdown
+    FROM macro_avg ma, macro_daily md
+    GROUP BY ma.avg_protein_g, ma.avg_carbs_g, ma.avg_fat_g, ma.avg_calories
+"""
+
+_LEGACY_SNAPSHOT_DAYS_SQL = """
+    SELECT ds.date_record, ds.total_calories_intake AS calories,
+           COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS protein,
+           COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS carbs,
+           COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS fat
+    FROM daily_summaries ds
+    LEFT JOIN meals m ON m.user_id = ds.user_id AND m.meal_date = ds.date_record
+    LEFT JOIN detail_items di ON di.meal_id = m.meal_id
+    WHERE ds.user_id = %s AND ds.date_record >= CURRENT_DATE - 30
+    GROUP BY ds.date_record, ds.total_calories_intake
+"""
+
+_SNAPSHOT_DAYS_SQL = """
+    SELECT ds.date_record, ds.total_calories_intake AS calories,
+           COALESCE(ds.total_protein, 0) AS protein,
+           COALESCE(ds.total_carbs, 0) AS carbs,
+           COALESCE(ds.total_fat, 0) AS fat
+    FROM daily_summaries ds
+    WHERE ds.user_id = %s AND ds.date_record >= CURRENT_DATE - 30
+"""
+
+_LEGACY_CALORIE_TREND_SQL = """
+    WITH daily_data AS (
+        SELECT ds.date_record, ds.total_calories_intake AS calories, u.target_calories
+        FROM daily_summaries ds
+        CROSS JOIN (SELECT target_calories FROM users WHERE user_id = %s) u
+        WHERE ds.user_id = %s
+          AND ds.date_record >= CURRENT_DATE - (%s || ' days')::INTERVAL
+    )
+    SELECT date_record, calories, target_calories,
+           ROUND(AVG(calories) OVER (ORDER BY date_record
+                 ROWS BETWEEN 6 PRECEDING AND CURRENT ROW)::numeric, 0) AS moving_avg_7d
+    FROM daily_data ORDER BY date_record
+"""
+
+_LEGACY_MONTHLY_SQL = """
+    SELECT date_trunc('month', m.meal_date)::date AS month,
+           COUNT(DISTINCT m.meal_date) AS days_logged,
+           SUM(di.amount * di.cal_per_unit) / COUNT(DISTINCT m.meal_date) AS avg_calories
+    FROM meals m
+    JOIN detail_items di ON di.meal_id = m.meal_id
+    WHERE m.user_id = %s AND m.meal_date >= CURRENT_DATE - 730
+    GROUP BY 1 ORDER BY 1 DESC LIMIT 24
+"""
+
+_SEED_MEALS_SQL = """
+    INSERT INTO meals (user_id, meal_type, meal_time, total_amount)
+    SELECT %s, t.meal_type::meal_type, d::date + t.at, 3
+    FROM generate_series(CURRENT_DATE - %s, CURRENT_DATE - 1, INTERVAL '1 day') AS d,
+         (VALUES ('breakfast', TIME '08:00'), ('lunch', TIME '12:30'), ('dinner', TIME '19:00'))
+             AS t(meal_type, at)
+"""
+
+_SEED_ITEMS_SQL = """
+    INSERT INTO detail_items (meal_id, food_name, amount, unit_id,
+        cal_per_unit, protein_per_unit, carbs_per_unit, fat_per_unit)
+    SELECT m.meal_id, 'bench-' || i, 1, %s,
+           150 + (m.meal_id %% 200), 8, 20, 5
+    FROM meals m, generate_series(1, 3) AS i
+    WHERE m.user_id = %s
+"""
+
+
+def _seed(cur) -> int:
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    cur.execute("""
+        INSERT INTO users (username, email, password_hash, role_id, target_calories)
+        VALUES (%s, %s, 'x', 2, 2000) RETURNING user_id
+    """, (name, f"{name}@bench.local"))
+    user_id = cur.fetchone()[0]
+    cur.execute("SELECT unit_id FROM units ORDER BY unit_id LIMIT 1")
+    unit_id = cur.fetchone()[0]
+    cur.execute(_SEED_MEALS_SQL, (user_id, DAYS))
+    cur.execute(_SEED_ITEMS_SQL, (unit_id, user_id))
+    cur.execute("ANALYZE meals; ANALYZE detail_items; ANALYZE daily_summaries; "
+                "ANALYZE weekly_summaries; ANALYZE monthly_summaries")
+    return user_id
+
+
+def _time(cur, sql, params) -> list[float]:
+    cur.execute(sql, params)  # warm-up: plan cache, buffers
+    cur.fetchall()
+    samples = []
+    for _ in range(ROUNDS):
+        t0 = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return sorted(samples)
+
+
+def main() -> int:
+    conn = get_db_connection()
+    if conn is None:
+        print("DB unavailable", file=sys.stderr)
+        return 1
+    try:
+        cur = conn.cursor()
+        t0 = time.perf_counter()
+        uid = _seed(cur)
+        print(f"seeded {DAYS} days x 3 meals x 3 items in {time.perf_counter() - t0:.1f}s; "
+              f"rounds: {ROUNDS}")
+        cases = [
+            ("macro_balance", _LEGACY_MACRO_BALANCE_SQL, (uid,), insights._MACRO_BALANCE_SQL, (uid,)),
+            ("snapshot_days", _LEGACY_SNAPSHOT_DAYS_SQL, (uid,), _SNAPSHOT_DAYS_SQL, (uid,)),
+            ("calorie_trend", _LEGACY_CALORIE_TREND_SQL, (uid, uid, 30),
+             insights._CALORIE_TREND_SQL, (uid, uid, 30)),
+            ("monthly_2y", _LEGACY_MONTHLY_SQL, (uid,), insights._PERIOD_SUMMARIES_SQL["month"], (uid, 24)),
+        ]
+        print(f"{'read':>14} | {'legacy p50':>10} {'p95':>8} | {'now p50':>8} {'p95':>8} | speedup")
+        p95 = lambda xs: xs[min(len(xs) - 1, int(len(xs) * 0.95))]  # noqa: E731
+        for label, legacy_sql, legacy_params, sql, params in cases:
+            legacy = _time(cur, legacy_sql, legacy_params)
+            now = _time(cur, sql, params)
+            l50, n50 = statistics.median(legacy), statistics.median(now)
+            print(f"{label:>14} | {l50:>8.2f}ms {p95(legacy):>6.2f}ms | "
+                  f"{n50:>6.2f}ms {p95(now):>6.2f}ms | {l50 / n50:>5.1f}x")
+    finally:
+        conn.rollback()
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Login storm: bcrypt on the request threadpool vs the hashing pool.
+
+Drives an in-process ASGI app (httpx.ASGITransport, no network, no DB)
+with two route shapes:
+
+    legacy — sync route calling passlib verify, as /login did before
+             app/core/security.PasswordHasher
+    pool   — async route awaiting get_hasher().verify()
+
+Each run fires STORM_CONCURRENCY concurrent logins for STORM_SECONDS
+while a probe hits a sync "other endpoint" (a 2 ms blocking call, like a
+small DB query on the same Starlette threadpool) back to back. Prints
+logins/s, 503s (pool full) and the probe's p50/p95/p99 — the tail
+latency every other sync endpoint sees during an 8am login burst.
+
+Run:
+    python backend/scripts/bench_login_storm.py
+    STORM_CONCURRENCY=128 PASSWORD_HASH_WORKERS=4 python backend/scripts/bench_login_storm.py
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.core.security import HashingOverloaded, PasswordHasher, get_password_hash, verify_password  # noqa: E402
+
+CONCURRENCY = int(os.getenv("STORM_CONCURRENCY", "64"))
+SECONDS = float(os.getenv("STORM_SECONDS", "5"))
+PASSWORD = "storm-password"
+
+
+def build_app(hasher: PasswordHasher, stored: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/legacy")
+    def legacy_login():
+        return {"ok": verify_password(PASSWORD, stored)}
+
+    @app.post("/pool")
+    async def pool_login():
+        try:
+            ok, _ = await hasher.verify(PASSWORD, stored)
+        except HashingOverloaded:  # /login answers 503 + Retry-After
+            return JSONResponse({"ok": False}, status_code=503)
+        return {"ok": ok}
+
+    @app.get("/other")
+    def other():
+        time.sleep(0.002)
+        return {"ok": True}
+
+    return app
+
+
+async def storm(app: FastAPI, path: str) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        deadline = time.perf_counter() + SECONDS
+        logins, rejected, probes = [0], [0], []
+
+        async def login_loop():
+            while time.perf_counter() < deadline:
+                r = await client.post(path)
+                if time.perf_counter() > deadline:
+                    break  # finished after the window; don't count it
+                logins[0] += r.status_code == 200
+                if r.status_code == 503:
+                    rejected[0] += 1
+                    await asyncio.sleep(0.05)  # a client backing off
+
+        async def probe_loop():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                await client.get("/other")
+                probes.append((time.perf_counter() - t0) * 1000)
+
+        await asyncio.gather(probe_loop(), *(login_loop() for _ in range(CONCURRENCY)))
+    q = statistics.quantiles(probes, n=100) if len(probes) > 1 else [probes[0]] * 99
+    return {"logins_per_s": round(logins[0] / SECONDS, 1), "rejected_503": rejected[0],
+            "probe_n": len(probes),
+            "probe_p50_ms": round(q[49], 1), "probe_p95_ms": round(q[94], 1),
+            "probe_p99_ms": round(q[98], 1)}
+
+
+def main() -> None:
+    logging.getLogger("app.core.security").setLevel(logging.ERROR)  # one line per 503
+    hasher = PasswordHasher()
+    hasher.warm()
+    stored = get_password_hash(PASSWORD)
+    app = build_app(hasher, stored)
+    print(f"concurrency={CONCURRENCY} seconds={SECONDS} hasher={hasher.mode}x{hasher.workers} "
+          f"max_queue={hasher.max_queue}")
+    for path in ("/legacy", "/pool"):
+        print(path.strip("/").ljust(7), asyncio.run(storm(app, path)))
+    print("hasher", {k: v for k, v in hasher.stats().items() if k in ("wait_ms_avg", "hash_ms_avg")})
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Meal-insert latency vs item count: per-item INSERTs vs one batched statement.
+
+Times the full write that POST /meals performs (meal row + N detail_items
++ the daily_summaries trigger + COMMIT cost minus the network hop to the
+client), for N in ITEM_COUNTS, two ways:
+
+    legacy   — INSERT meal, then one INSERT per item (pre-v25 router code)
+    batched  — meals._INSERT_MEAL_WITH_ITEMS_SQL, one round trip, plus the
+               savepoint-wrapped calorie nudge (legacy left the nudge out)
+
+Every iteration runs inside a transaction that is rolled back, so the
+benchmark leaves no rows behind. Point it at staging or a local copy,
+never prod.
+
+Before/after for the trigger itself: run once before applying
+migrations/v25 (row-level trigger) and once after (statement-level);
+the header line prints which trigger mode is installed.
+
+Run:
+    BENCH_USER_ID=1 python backend/scripts/bench_meal_insert.py
+    BENCH_USER_ID=1 BENCH_ROUNDS=50 python backend/scripts/bench_meal_insert.py
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import time
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection  # noqa: E402
+from app.routers.meals import (  # noqa: E402
+    _INSERT_MEAL_WITH_ITEMS_SQL, _apply_calorie_nudge, _meal_insert_params,
+)
+
+ITEM_COUNTS = (1, 2, 4, 6, 10, 20)
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "20"))
+USER_ID = int(os.getenv("BENCH_USER_ID", "0"))
+
+_LEGACY_MEAL_SQL = """
+    INSERT INTO meals (user_id, meal_type, meal_time, total_amount)
+    VALUES (%s, %s, %s, %s) RETURNING meal_id
+"""
+_LEGACY_ITEM_SQL = """
+    INSERT INTO detail_items (meal_id, food_id, food_name, amount, unit_id,
+        cal_per_unit, protein_per_unit, carbs_per_unit, fat_per_unit)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _log(n: int) -> SimpleNamespace:
+    items = [
+        SimpleNamespace(food_id=None, food_name=f"bench-{i}", amount=1.0, unit_id=None,
+                        cal_per_unit=120.0, protein_per_unit=6.0,
+                        carbs_per_unit=15.0, fat_per_unit=3.0)
+        for i in range(n)
+    ]
+    return SimpleNamespace(date=date.today(), meal_type="lunch", items=items)
+
+
+def _legacy(cur, log) -> None:
+    p = _meal_insert_params(USER_ID, log)
+    cur.execute(_LEGACY_MEAL_SQL, (p["user_id"], p["meal_type"], p["meal_time"], p["total_amount"]))
+    meal_id = cur.fetchone()[0]
+    for i in log.items:
+        cur.execute(_LEGACY_ITEM_SQL, (meal_id, i.food_id, i.food_name, i.amount, i.unit_id,
+                                       i.cal_per_unit, i.protein_per_unit,
+                                       i.carbs_per_unit, i.fat_per_unit))
+
+
+def _batched(cur, log) -> None:
+    params = _meal_insert_params(USER_ID, log)
+    cur.execute(_INSERT_MEAL_WITH_ITEMS_SQL, params)
+    _apply_calorie_nudge(cur, params)
+
+
+def _time(conn, fn, log) -> list[float]:
+    samples = []
+    for _ in range(ROUNDS):
+        cur = conn.cursor()
+        t0 = time.perf_counter()
+        fn(cur, log)
+        # Deferred/after-statement triggers have fired by now; rollback
+        # instead of commit keeps the benchmark side-effect free.
+        samples.append((time.perf_counter() - t0) * 1000)
+        conn.rollback()
+    return samples
+
+
+def _trigger_mode(conn) -> str:
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT string_agg(tgname, ',' ORDER BY tgname)
+        FROM pg_trigger
+        WHERE tgrelid = 'cleangoal.detail_items'::regclass
+          AND tgname LIKE 'trg_sync_daily_summary%%'
+    """)
+    names = cur.fetchone()[0] or "none"
+    conn.rollback()
+    return names
+
+
+def main() -> int:
+    if not USER_ID:
+        print("set BENCH_USER_ID to an existing cleangoal.users.user_id", file=sys.stderr)
+        return 2
+    conn = get_db_connection()
+    if conn is None:
+        print("DB unavailable", file=sys.stderr)
+        return 1
+    try:
+        print(f"triggers: {_trigger_mode(conn)}   rounds: {ROUNDS}")
+        print(f"{'items':>5} | {'legacy p50':>10} {'p95':>8} | {'batched p50':>11} {'p95':>8} | speedup")
+        for n in ITEM_COUNTS:
+            log = _log(n)
+            _time(conn, _batched, log)  # warm-up: plan cache, buffers
+            legacy = sorted(_time(conn, _legacy, log))
+            batched = sorted(_time(conn, _batched, log))
+            p95 = lambda xs: xs[min(len(xs) - 1, int(len(xs) * 0.95))]  # noqa: E731
+            l50, b50 = statistics.median(legacy), statistics.median(batched)
+            print(f"{n:>5} | {l50:>8.2f}ms {p95(legacy):>6.2f}ms | "
+                  f"{b50:>9.2f}ms {p95(batched):>6.2f}ms | {l50 / b50:>5.1f}x")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
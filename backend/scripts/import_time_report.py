@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""What `import main` costs, from `python -X importtime`.
+
+Runs the import in a fresh interpreter (DB unreachable on purpose, so only
+import work is measured), then prints the total and the slowest of the
+modules main imports directly, by cumulative time. Also lists any module
+from HEAVY that got imported — those are meant to load lazily
+(app/services/warmup.py).
+
+Exit status is 1 when the total exceeds --budget-ms or a HEAVY module was
+imported, so CI can catch startup regressions:
+
+    python backend/scripts/import_time_report.py
+    python backend/scripts/import_time_report.py --budget-ms 1500 --top 30
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must not be imported by `import main`.
+HEAVY = ("pandas", "sklearn", "scipy", "pythainlp", "torch", "transformers")
+
+
+def measure(module: str = "main") -> tuple[list[tuple[str, int, int]], list[str]]:
+    """([(module, self_us, cumulative_us)], heavy modules loaded) for a cold import."""
+    code = (
+        f"import sys, {module}\n"
+        f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    env = dict(os.environ, DB_HOST="127.0.0.1", DB_PORT="1", DB_MODE="local",
+               STARTUP_WARMUP="0", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND,
+                          env=env, capture_output=True, text=True, timeout=300)
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        rows.append((parts[2][1:].rstrip(), int(parts[0]), int(parts[1])))
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return rows, heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    rows, heavy = measure(args.module)
+    depth = lambda name: (len(name) - len(name.lstrip())) // 2  # noqa: E731
+    total_ms = sum(r[2] for r in rows if depth(r[0]) == 0) / 1000
+    # What `import main` pulls in directly (its routers, database, ...).
+    direct = [r for r in rows if depth(r[0]) == 1]
+    print(f"import {args.module}: {total_ms:.0f} ms cumulative")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cum_us in sorted(direct, key=lambda r: -r[2])[:args.top]:
+        print(f"{cum_us / 1000:14.1f} {self_us / 1000:9.1f}  {name.strip()}")
+
+    failed = False
+    if heavy:
+        print(f"\nFAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        failed = True
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nFAIL: {total_ms:.0f} ms over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
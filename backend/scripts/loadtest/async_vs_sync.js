@@ -0,0 +1,112 @@
+// Sync vs async route throughput, side by side (k6).
+//
+// Runs the same mix against the threadpool-backed routes and their
+// /async twins (app/routers/async_api.py), one after the other, so both
+// see the same DB and the same warm cache:
+//
+//   sync  : 0s   → 2m   GET /daily_summary, /foods/search, /notifications/unread_count
+//                       + POST /meals (1 in 10 iterations)
+//   async : 2m10s → 4m10s  same mix under /async/...
+//
+// Uses ramping-arrival-rate rather than constant VUs: we want to see where
+// each path stops keeping up with offered load, not how fast a fixed pool
+// of VUs can go. The sync path should plateau around the threadpool size
+// (40 in-flight per worker); the async path should keep climbing until
+// Postgres or DB_ASYNC_POOL_MAX_SIZE is the limit.
+//
+// Compare `iterations{path:sync}` vs `iterations{path:async}` and the
+// per-path p95 in the end-of-run summary.
+//
+// Writes are cleaned up the same way as meals.js.
+
+import http from 'k6/http';
+import { check } from 'k6';
+
+const BASE_URL = __ENV.BASE_URL || 'http://localhost:8000';
+const TOKEN = __ENV.TEST_USER_TOKEN || '';
+const USER_ID = parseInt(__ENV.TEST_USER_ID || '1', 10);
+const PEAK_RPS = parseInt(__ENV.PEAK_RPS || '400', 10);
+const TODAY = new Date().toISOString().slice(0, 10);
+
+const QUERIES = ['ข้าว', 'ผัด', 'ต้ม', 'แกง', 'ส้มตำ', 'ไก่', 'หมู'];
+
+const ramp = (startTime, path) => ({
+  executor: 'ramping-arrival-rate',
+  startTime,
+  startRate: 20,
+  timeUnit: '1s',
+  preAllocatedVUs: 100,
+  maxVUs: 600,
+  stages: [
+    { target: PEAK_RPS / 4, duration: '30s' },
+    { target: PEAK_RPS / 2, duration: '30s' },
+    { target: PEAK_RPS, duration: '60s' },
+  ],
+  env: { ROUTE_PREFIX: path === 'async' ? '/async' : '' },
+  tags: { path },
+});
+
+export const options = {
+  scenarios: {
+    sync: ramp('0s', 'sync'),
+    async: ramp('2m10s', 'async'),
+  },
+  thresholds: {
+    // Tagged thresholds make k6 print per-path numbers in the summary.
+    'http_req_duration{path:sync}': ['p(95)<2000'],
+    'http_req_duration{path:async}': ['p(95)<2000'],
+    'http_req_failed{path:sync}': ['rate<0.05'],
+    'http_req_failed{path:async}': ['rate<0.05'],
+    'iterations{path:sync}': ['count>0'],
+    'iterations{path:async}': ['count>0'],
+  },
+  summaryTrendStats: ['avg', 'p(50)', 'p(95)', 'p(99)', 'max'],
+};
+
+const headers = () => ({
+  'Content-Type': 'application/json',
+  'Accept': 'application/json',
+  ...(TOKEN ? { 'Authorization': `Bearer ${TOKEN}` } : {}),
+});
+
+export default function () {
+  const prefix = __ENV.ROUTE_PREFIX;
+  const opts = (endpoint) => ({ headers: headers(), tags: { endpoint } });
+
+  const summary = http.get(
+    `${BASE_URL}${prefix}/daily_summary/${USER_ID}?date_record=${TODAY}`,
+    opts('daily_summary'),
+  );
+  check(summary, { 'summary 200': (r) => r.status === 200 });
+
+  const q = QUERIES[__ITER % QUERIES.length];
+  const search = http.get(
+    `${BASE_URL}${prefix}/foods/search?q=${encodeURIComponent(q)}&user_id=${USER_ID}`,
+    opts('food_search'),
+  );
+  check(search, { 'search 200': (r) => r.status === 200 });
+
+  const unread = http.get(
+    `${BASE_URL}${prefix}/notifications/${USER_ID}/unread_count`,
+    opts('unread_count'),
+  );
+  check(unread, { 'unread 200': (r) => r.status === 200 });
+
+  if (__ITER % 10 === 0) {
+    const body = JSON.stringify({
+      date: TODAY,
+      meal_type: 'snack',
+      items: [{
+        food_id: null, food_name: 'loadtest-apple', amount: 1, unit_id: null,
+        cal_per_unit: 52, protein_per_unit: 0.3, carbs_per_unit: 14, fat_per_unit: 0.2,
+      }],
+    });
+    const created = http.post(`${BASE_URL}${prefix}/meals/${USER_ID}`, body, opts('meal_create'));
+    check(created, { 'meal created': (r) => r.status === 200 });
+    http.del(
+      `${BASE_URL}/meals/clear/${USER_ID}?date_record=${TODAY}&meal_type=snack`,
+      null,
+      opts('meal_clear'),
+    );
+  }
+}
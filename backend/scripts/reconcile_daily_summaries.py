@@ -0,0 +1,140 @@
+"""
+Daily-summary drift check and repair.
+
+Since migrations/v26, daily_summaries is maintained incrementally: each
+detail_items write applies a +/- delta instead of re-aggregating the day.
+Deltas are exact (NUMERIC), but anything that bypasses the triggers —
+`session_replication_role = replica` restores, manual SQL fixes, a trigger
+disabled during a bulk load — leaves drift. This job compares stored
+totals against the full aggregate over detail_items and, with --repair,
+rewrites drifted days via cleangoal.fn_recompute_daily_summary().
+
+Run manually:
+    python -m backend.scripts.reconcile_daily_summaries            # report only
+    python -m backend.scripts.reconcile_daily_summaries --repair
+    python -m backend.scripts.reconcile_daily_summaries --days 0   # whole history
+
+Run via cron (Railway scheduled task, 04:30 Asia/Bangkok daily, after cleanup):
+    30 21 * * *    python -m backend.scripts.reconcile_daily_summaries --repair
+
+Exit code is 1 when drift was found and not repaired, so a report-only
+cron run pages on failure like synthetic_check.py does.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import logging
+from datetime import datetime, timezone
+
+# Allow `python backend/scripts/reconcile_daily_summaries.py` from repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection  # noqa: E402
+
+# Stored totals and the aggregate are both unconstrained NUMERIC (v26), so
+# the +/- deltas are exact: any difference at all is drift.
+TOLERANCE = 0
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+log = logging.getLogger("reconcile_daily_summaries")
+
+# Stored vs. full aggregate for every (user, day) in the window, in either
+# table. %(days)s = 0 means no window. Aggregation mirrors
+# fn_recompute_daily_summary().
+_DRIFT_SQL = """
+    WITH actual AS (
+        SELECT m.user_id, m.meal_date AS date_record,
+               COALESCE(SUM(di.amount * di.cal_per_unit), 0)                    AS cal,
+               COALESCE(SUM(di.amount * COALESCE(di.protein_per_unit, 0)), 0)   AS protein,
+               COALESCE(SUM(di.amount * COALESCE(di.carbs_per_unit,   0)), 0)   AS carbs,
+               COALESCE(SUM(di.amount * COALESCE(di.fat_per_unit,     0)), 0)   AS fat
+        FROM meals m
+        JOIN detail_items di ON di.meal_id = m.meal_id
+        WHERE %(days)s = 0 OR m.meal_date >= CURRENT_DATE - %(days)s
+        GROUP BY m.user_id, m.meal_date
+    ),
+    stored AS (
+        SELECT user_id, date_record,
+               COALESCE(total_calories_intake, 0) AS cal,
+               COALESCE(total_protein, 0)         AS protein,
+               COALESCE(total_carbs, 0)           AS carbs,
+               COALESCE(total_fat, 0)             AS fat
+        FROM daily_summaries
+        WHERE %(days)s = 0 OR date_record >= CURRENT_DATE - %(days)s
+    )
+    SELECT COALESCE(a.user_id, s.user_id)         AS user_id,
+           COALESCE(a.date_record, s.date_record) AS date_record,
+           s.cal AS stored_cal, COALESCE(a.cal, 0) AS actual_cal
+    FROM actual a
+    FULL JOIN stored s ON s.user_id = a.user_id AND s.date_record = a.date_record
+    WHERE ABS(COALESCE(s.cal, 0)     - COALESCE(a.cal, 0))     > %(tol)s
+       OR ABS(COALESCE(s.protein, 0) - COALESCE(a.protein, 0)) > %(tol)s
+       OR ABS(COALESCE(s.carbs, 0)   - COALESCE(a.carbs, 0))   > %(tol)s
+       OR ABS(COALESCE(s.fat, 0)     - COALESCE(a.fat, 0))     > %(tol)s
+    ORDER BY 2, 1
+"""
+
+
+def find_drift(cur, days: int) -> list[tuple]:
+    """Return (user_id, date_record, stored_cal, actual_cal) for drifted days."""
+    cur.execute(_DRIFT_SQL, {"days": days, "tol": TOLERANCE})
+    return cur.fetchall()
+
+
+def repair(cur, rows: list[tuple]) -> int:
+    for user_id, date_record, *_ in rows:
+        cur.execute("SELECT cleangoal.fn_recompute_daily_summary(%s, %s)", (user_id, date_record))
+    return len(rows)
+
+
+def reconcile(days: int, do_repair: bool) -> int:
+    conn = get_db_connection()
+    if conn is None:
+        log.error("DB unavailable; aborting reconciliation")
+        return -1
+    try:
+        cur = conn.cursor()
+        drift = find_drift(cur, days)
+        for user_id, date_record, stored, actual in drift[:50]:
+            log.warning("drift user_id=%s date=%s stored_cal=%s actual_cal=%s",
+                        user_id, date_record, stored, actual)
+        if len(drift) > 50:
+            log.warning("... and %d more drifted days", len(drift) - 50)
+        if drift and do_repair:
+            repair(cur, drift)
+            conn.commit()
+            log.info("repaired %d days", len(drift))
+        else:
+            conn.rollback()
+        return len(drift)
+    except Exception:
+        conn.rollback()
+        log.exception("reconciliation failed")
+        raise
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=35,
+                        help="look back this many days (0 = whole history)")
+    parser.add_argument("--repair", action="store_true",
+                        help="rewrite drifted days from the full aggregate")
+    args = parser.parse_args()
+
+    start = datetime.now(timezone.utc)
+    drifted = reconcile(args.days, args.repair)
+    elapsed = (datetime.now(timezone.utc) - start).total_seconds()
+    log.info("reconciliation done: %d drifted days in %.2fs", max(drifted, 0), elapsed)
+    if drifted < 0 or (drifted and not args.repair):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,10 @@ os.environ.setdefault("ALLOWED_ORIGINS", "*")
 os.environ.setdefault("SUPABASE_JWT_SECRET", "test-secret")
 os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
 os.environ.setdefault("SUPABASE_ANON_KEY", "test-key")
+# Route tests hash on threads; tests/test_password_hasher.py covers the process pool
+os.environ.setdefault("PASSWORD_HASH_EXECUTOR", "thread")
+# Route tests re-mock the DB between calls; tests/test_response_cache.py turns the cache on
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "off")
 
 
 @pytest.fixture
@@ -47,7 +51,7 @@ def app_client(mock_db):
     """
     from fastapi.testclient import TestClient
 
-    # Stub _init_missing_tables so it doesn't try to hit a real DB on import
+    # Make sure nothing imported with main reaches a real DB
     import database
     _orig = database.get_db_connection
     database.get_db_connection = lambda: None
@@ -0,0 +1,143 @@
+"""
+Incremental daily_summaries maintenance (migrations/v26) vs full recompute.
+
+Runs seeded random sequences of detail_items INSERT / UPDATE / DELETE,
+meal moves and meal deletes for a throwaway user, and after every step
+asserts that the delta-maintained daily_summaries equal the full
+aggregate over detail_items. Also checks that the reconciliation job
+finds and repairs drift injected behind the triggers' back.
+
+Skipped by default; run with `pytest -m integration`.
+"""
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from scripts.reconcile_daily_summaries import find_drift, repair
+
+pytestmark = pytest.mark.integration
+
+DAYS = [date(2026, 3, 1) + timedelta(days=i) for i in range(3)]
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+
+
+@pytest.fixture(autouse=True)
+def _require_v26(live_db):
+    cur = live_db.cursor()
+    cur.execute("SELECT to_regprocedure('cleangoal.fn_apply_daily_summary_delta()') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        pytest.skip("migrations/v26_incremental_daily_summary.sql not applied")
+
+
+def _stored(cur, uid):
+    cur.execute("""
+        SELECT date_record, total_calories_intake, total_protein, total_carbs, total_fat
+        FROM daily_summaries WHERE user_id = %s
+    """, (uid,))
+    return {r[0]: tuple(Decimal(v or 0) for v in r[1:]) for r in cur.fetchall()}
+
+
+def _full(cur, uid):
+    cur.execute("""
+        SELECT m.meal_date,
+               COALESCE(SUM(di.amount * di.cal_per_unit), 0),
+               COALESCE(SUM(di.amount * COALESCE(di.protein_per_unit, 0)), 0),
+               COALESCE(SUM(di.amount * COALESCE(di.carbs_per_unit,   0)), 0),
+               COALESCE(SUM(di.amount * COALESCE(di.fat_per_unit,     0)), 0)
+        FROM meals m JOIN detail_items di ON di.meal_id = m.meal_id
+        WHERE m.user_id = %s
+        GROUP BY m.meal_date
+    """, (uid,))
+    return {r[0]: tuple(Decimal(v) for v in r[1:]) for r in cur.fetchall()}
+
+
+def _assert_consistent(cur, uid, step):
+    stored, full = _stored(cur, uid), _full(cur, uid)
+    zero = (Decimal(0),) * 4
+    for d in set(stored) | set(full):
+        s, f = stored.get(d, zero), full.get(d, zero)
+        assert s == f, f"step {step}: {d} stored={s} full={f}"
+
+
+def _new_meal(cur, uid, rng):
+    ts = datetime.combine(rng.choice(DAYS), datetime.min.time()).replace(hour=12)
+    cur.execute(
+        "INSERT INTO meals (user_id, meal_type, meal_time, total_amount) "
+        "VALUES (%s, %s, %s, 0) RETURNING meal_id",
+        (uid, rng.choice(MEAL_TYPES), ts),
+    )
+    return cur.fetchone()[0]
+
+
+def _rand_item(rng):
+    return (round(rng.uniform(0.5, 3), 2), round(rng.uniform(10, 600), 2),
+            round(rng.uniform(0, 40), 2), round(rng.uniform(0, 80), 2),
+            rng.choice([None, round(rng.uniform(0, 30), 2)]))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_sequences_match_full_recompute(live_db, test_user_id, test_unit_id, seed):
+    rng = random.Random(seed)
+    cur = live_db.cursor()
+    uid = test_user_id
+    meals = [_new_meal(cur, uid, rng) for _ in range(3)]
+
+    for step in range(60):
+        cur.execute("SELECT item_id FROM detail_items di JOIN meals m USING (meal_id) "
+                    "WHERE m.user_id = %s", (uid,))
+        items = [r[0] for r in cur.fetchall()]
+        op = rng.choice(["insert", "insert", "update", "move", "delete",
+                         "delete_many", "new_meal", "move_meal", "delete_meal"])
+
+        if op == "insert" or not items:
+            rows = [(rng.choice(meals), f"item-{step}-{i}", test_unit_id, *_rand_item(rng))
+                    for i in range(rng.randint(1, 5))]
+            cur.executemany(
+                "INSERT INTO detail_items (meal_id, food_name, unit_id, amount, cal_per_unit, "
+                "protein_per_unit, carbs_per_unit, fat_per_unit) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", rows)
+        elif op == "update":
+            amount, cal, p, c, f = _rand_item(rng)
+            cur.execute("UPDATE detail_items SET amount = %s, cal_per_unit = %s, "
+                        "protein_per_unit = %s, fat_per_unit = %s WHERE item_id = %s",
+                        (amount, cal, p, f, rng.choice(items)))
+        elif op == "move":
+            cur.execute("UPDATE detail_items SET meal_id = %s WHERE item_id = %s",
+                        (rng.choice(meals), rng.choice(items)))
+        elif op == "delete":
+            cur.execute("DELETE FROM detail_items WHERE item_id = %s", (rng.choice(items),))
+        elif op == "delete_many":
+            cur.execute("DELETE FROM detail_items WHERE item_id = ANY(%s)",
+                        (rng.sample(items, min(len(items), 3)),))
+        elif op == "new_meal":
+            meals.append(_new_meal(cur, uid, rng))
+        elif op == "move_meal":
+            ts = datetime.combine(rng.choice(DAYS), datetime.min.time()).replace(hour=12)
+            cur.execute("UPDATE meals SET meal_time = %s WHERE meal_id = %s",
+                        (ts, rng.choice(meals)))
+        elif op == "delete_meal" and len(meals) > 1:
+            victim = meals.pop(rng.randrange(len(meals)))
+            cur.execute("DELETE FROM meals WHERE meal_id = %s", (victim,))
+
+        _assert_consistent(cur, uid, f"{seed}/{step}/{op}")
+
+
+def test_reconciliation_repairs_injected_drift(live_db, test_user_id, test_unit_id):
+    cur = live_db.cursor()
+    uid = test_user_id
+    meal_id = _new_meal(cur, uid, random.Random(0))
+    cur.execute(
+        "INSERT INTO detail_items (meal_id, food_name, unit_id, amount, cal_per_unit) "
+        "VALUES (%s, 'x', %s, 1, 300)", (meal_id, test_unit_id))
+    _assert_consistent(cur, uid, "seed")
+
+    cur.execute("UPDATE daily_summaries SET total_calories_intake = total_calories_intake + 123 "
+                "WHERE user_id = %s", (uid,))
+    drift = [r for r in find_drift(cur, 0) if r[0] == uid]
+    assert len(drift) == 1
+
+    repair(cur, drift)
+    assert not [r for r in find_drift(cur, 0) if r[0] == uid]
+    _assert_consistent(cur, uid, "repaired")
@@ -105,3 +105,23 @@ def test_meal_create_summary_delete_roundtrip(client_as_user, test_unit_id):
     assert r.status_code == 200
     body = r.json()
     assert float(body.get("total_calories_intake") or 0) == pytest.approx(0.0)
+
+
+def test_over_target_meals_create_one_warning_per_day(client_as_user, test_unit_id, live_db):
+    client, uid = client_as_user
+    today = date.today().isoformat()
+    item = {
+        "food_id": None, "food_name": "บุฟเฟ่ต์", "amount": 1, "unit_id": test_unit_id,
+        "cal_per_unit": 1500, "protein_per_unit": 50, "carbs_per_unit": 150, "fat_per_unit": 70,
+    }
+    # target_calories is 2000 for the fixture user: 1500 → nothing,
+    # 3000 → warning, 4500 → still just the one warning.
+    for _ in range(3):
+        r = client.post(f"/meals/{uid}", json={"date": today, "meal_type": "lunch", "items": [item]})
+        assert r.status_code == 200, r.text
+
+    cur = live_db.cursor()
+    cur.execute("SELECT type, message FROM notifications WHERE user_id = %s AND notified_on IS NOT NULL", (uid,))
+    rows = cur.fetchall()
+    assert [t for t, _ in rows] == ["warning"]
+    assert "3000 kcal" in rows[0][1] and "1000 kcal" in rows[0][1]
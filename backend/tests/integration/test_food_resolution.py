@@ -0,0 +1,58 @@
+"""
+Batched food resolution for NutritionAnalysisAgent (migrations/v31).
+
+Runs the agent's two statements against a real catalog inside the test
+transaction: one lookup for every mention, one multi-row temp_food queue.
+
+Skipped by default; run with `pytest -m integration`.
+"""
+import uuid
+
+import pytest
+from psycopg2.extras import RealDictCursor, execute_values
+
+from ai_models.multi_agent_system import _QUEUE_TEMP_FOODS_SQL, _RESOLVE_FOODS_SQL
+
+pytestmark = pytest.mark.integration
+
+
+def _food(cur, name):
+    cur.execute(
+        "INSERT INTO foods (food_name, calories, protein, carbs, fat) "
+        "VALUES (%s, 100, 1, 1, 1) RETURNING food_id", (name,))
+    return cur.fetchone()["food_id"]
+
+
+def test_one_query_keeps_per_name_ranking(live_db):
+    tag = uuid.uuid4().hex[:6]
+    cur = live_db.cursor(cursor_factory=RealDictCursor)
+    exact = _food(cur, f"ข้าวทดสอบ{tag}")
+    longer = _food(cur, f"ข้าวทดสอบ{tag}พิเศษ")
+    aliased = _food(cur, f"ขนมทดสอบ{tag}")
+    cur.execute(
+        "INSERT INTO food_regional_names (food_id, region, name_th, is_primary) "
+        "VALUES (%s, 'northern', %s, TRUE)", (aliased, f"เส้นทดสอบ{tag}"))
+
+    names = [f"ข้าวทดสอบ{tag}", f"ทดสอบ{tag}พิเศษ", f"เส้นทดสอบ{tag}", f"ไม่มี{tag}"]
+    cur.execute(_RESOLVE_FOODS_SQL, {"names": names})
+    rows = cur.fetchall()
+
+    assert [r["query"] for r in rows] == names
+    assert [r["food_id"] for r in rows] == [exact, longer, aliased, None]
+    assert rows[2]["matched_regional_name"] == f"เส้นทดสอบ{tag}"
+
+
+def test_queue_skips_known_names_and_collapses_duplicates(live_db, test_user_id):
+    tag = uuid.uuid4().hex[:6]
+    cur = live_db.cursor()
+    cur.execute(
+        "INSERT INTO temp_food (food_name, user_id) VALUES (%s, %s)",
+        (f"เมนูผู้ใช้{tag}", test_user_id))
+
+    rows = [(f"เมนูใหม่{tag}", 420, 12, 55, 16, test_user_id),
+            (f"เมนูผู้ใช้{tag}", 300, 5, 40, 10, test_user_id)]
+    added = execute_values(cur, _QUEUE_TEMP_FOODS_SQL, rows, fetch=True)
+    again = execute_values(cur, _QUEUE_TEMP_FOODS_SQL, rows[:1], fetch=True)
+
+    assert added == [(f"เมนูใหม่{tag}",)]
+    assert again == []
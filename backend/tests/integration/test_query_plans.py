@@ -0,0 +1,101 @@
+"""
+Day-filter queries must stay index-driven (migrations/v28).
+
+EXPLAINs the hot date-filtered statements with sequential scans
+disabled and checks that the day predicate is an index condition: the
+scan of each day-filtered table must carry meals.meal_date /
+daily_summaries.date_record in its Index Cond (or the Recheck Cond of a
+bitmap heap scan). With seqscan off, a predicate no index can serve —
+DATE(meal_time) / EXTRACT() / ::date on the column side — still plans an
+Index Scan on a user_id-leading index, but with the day as a Filter, so
+"no Seq Scan" alone would not catch it.
+
+Skipped by default; run with `pytest -m integration`.
+"""
+from datetime import date
+
+import pytest
+
+from ai_models import user_context
+from app.routers import insights, meals, notifications
+
+pytestmark = pytest.mark.integration
+
+GUARDED = {"meals", "detail_items", "daily_summaries"}
+DAY = date(2026, 3, 2)
+MEALS_DAY = {("meals", "meal_date")}
+SUMMARY_DAY = {("daily_summaries", "date_record")}
+
+# (label, sql, params builder taking the user id, (table, day column) pairs
+# whose day predicate must be an index condition)
+STATEMENTS = [
+    ("summary_macros", meals._SUMMARY_MACROS_SQL, lambda u: (u, DAY), MEALS_DAY),
+    ("summary_menus", meals._SUMMARY_MENUS_SQL, lambda u: (u, DAY), MEALS_DAY),
+    ("summary_total", meals._SUMMARY_TOTAL_SQL, lambda u: (u, DAY), SUMMARY_DAY),
+    ("meal_detail", meals._MEAL_DETAIL_SQL, lambda u: (u, DAY, "lunch"), MEALS_DAY),
+    ("daily_logs_range", meals._RANGE_SQL,
+     lambda u: {"user_id": u, "start": date(2026, 3, 1), "end": date(2026, 4, 1)},
+     MEALS_DAY | SUMMARY_DAY),
+    ("daily_log_items", meals._DAILY_LOG_ITEMS_SQL, lambda u: (u, DAY), MEALS_DAY),
+    ("clear_meal_type", meals._CLEAR_MEAL_TYPE_SQL, lambda u: (u, DAY, "lunch"), MEALS_DAY),
+    ("user_context", user_context._SNAPSHOT_SQL,
+     lambda u: {"user_id": u, "today": DAY, "history_days": 30, "weight_logs": 30,
+                "recent_items": 200},
+     SUMMARY_DAY),
+    ("macro_balance", insights._MACRO_BALANCE_SQL, lambda u: (u,), SUMMARY_DAY),
+    ("calorie_trend", insights._CALORIE_TREND_SQL, lambda u: (u, u, 30), SUMMARY_DAY),
+    ("unread_count", notifications._UNREAD_COUNT_SQL, lambda u: (u,), set()),
+]
+
+
+@pytest.fixture(autouse=True)
+def _require_v28(live_db):
+    cur = live_db.cursor()
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'cleangoal' AND table_name = 'meals' AND column_name = 'meal_date'
+    """)
+    if not cur.fetchone():
+        pytest.skip("migrations/v28_meal_date_column.sql not applied")
+
+
+def _nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _seq_scans(plan):
+    return [n["Relation Name"] for n in _nodes(plan)
+            if n.get("Node Type") == "Seq Scan" and n.get("Relation Name") in GUARDED]
+
+
+def _index_conds(plan, table):
+    """Index / recheck conditions of the scans that read `table`."""
+    return [n.get("Index Cond") or n.get("Recheck Cond") or "" for n in _nodes(plan)
+            if n.get("Relation Name") == table]
+
+
+@pytest.mark.parametrize("label,sql,params,day_columns", STATEMENTS,
+                         ids=[s[0] for s in STATEMENTS])
+def test_day_filters_use_indexes(live_db, test_user_id, test_unit_id, label, sql, params,
+                                 day_columns):
+    cur = live_db.cursor()
+    cur.execute(
+        "INSERT INTO meals (user_id, meal_type, meal_time, total_amount) "
+        "VALUES (%s, 'lunch', %s, 0) RETURNING meal_id",
+        (test_user_id, f"{DAY} 12:00"))
+    cur.execute(
+        "INSERT INTO detail_items (meal_id, food_name, unit_id, amount, cal_per_unit) "
+        "VALUES (%s, 'x', %s, 1, 300)", (cur.fetchone()[0], test_unit_id))
+    cur.execute("ANALYZE meals; ANALYZE detail_items; ANALYZE daily_summaries")
+    cur.execute("SET LOCAL enable_seqscan = off")
+
+    cur.execute("EXPLAIN (FORMAT JSON) " + sql, params(test_user_id))
+    plan = cur.fetchone()[0][0]["Plan"]
+    assert not _seq_scans(plan), f"{label}: sequential scan in plan {plan}"
+    for table, column in day_columns:
+        conds = _index_conds(plan, table)
+        assert conds, f"{label}: {table} not in plan {plan}"
+        assert any(column in c for c in conds), \
+            f"{label}: {table}.{column} is not an index condition in {conds}"
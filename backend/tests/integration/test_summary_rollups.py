@@ -0,0 +1,117 @@
+"""
+Weekly/monthly rollups (migrations/v33) vs a fresh aggregate.
+
+Runs seeded random sequences of meal and item writes spanning a week and
+a month boundary for a throwaway user. After every step it asserts that
+the trigger-maintained weekly_summaries / monthly_summaries match the
+aggregate over daily_summaries, which the backfill job reports as drift.
+Also checks that the backfill job repairs drift injected behind the
+triggers' back.
+
+Skipped by default; run with `pytest -m integration`.
+"""
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from scripts.backfill_summary_rollups import find_drift, rebuild
+
+pytestmark = pytest.mark.integration
+
+# Sunday 2026-05-31 → Tuesday 2026-06-02: two ISO weeks, two months.
+DAYS = [date(2026, 5, 31) + timedelta(days=i) for i in range(3)]
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+
+
+@pytest.fixture(autouse=True)
+def _require_v33(live_db):
+    cur = live_db.cursor()
+    cur.execute("SELECT to_regprocedure('cleangoal.fn_apply_summary_rollup_delta()') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        pytest.skip("migrations/v33_summary_rollups.sql not applied")
+
+
+def _new_meal(cur, uid, rng):
+    ts = datetime.combine(rng.choice(DAYS), datetime.min.time()).replace(hour=12)
+    cur.execute(
+        "INSERT INTO meals (user_id, meal_type, meal_time, total_amount) "
+        "VALUES (%s, %s, %s, 0) RETURNING meal_id",
+        (uid, rng.choice(MEAL_TYPES), ts),
+    )
+    return cur.fetchone()[0]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_random_sequences_keep_rollups_exact(live_db, test_user_id, test_unit_id, seed):
+    rng = random.Random(seed)
+    cur = live_db.cursor()
+    uid = test_user_id
+    meals = [_new_meal(cur, uid, rng) for _ in range(3)]
+
+    for step in range(40):
+        cur.execute("SELECT item_id FROM detail_items di JOIN meals m USING (meal_id) "
+                    "WHERE m.user_id = %s", (uid,))
+        items = [r[0] for r in cur.fetchall()]
+        op = rng.choice(["insert", "insert", "update", "delete", "new_meal",
+                         "move_meal", "delete_meal"])
+
+        if op == "insert" or not items:
+            rows = [(rng.choice(meals), f"item-{step}-{i}", test_unit_id,
+                     round(rng.uniform(0.5, 3), 2), round(rng.uniform(10, 600), 2),
+                     round(rng.uniform(0, 40), 2))
+                    for i in range(rng.randint(1, 4))]
+            cur.executemany(
+                "INSERT INTO detail_items (meal_id, food_name, unit_id, amount, cal_per_unit, "
+                "protein_per_unit) VALUES (%s, %s, %s, %s, %s, %s)", rows)
+        elif op == "update":
+            cur.execute("UPDATE detail_items SET amount = %s WHERE item_id = %s",
+                        (round(rng.uniform(0.5, 3), 2), rng.choice(items)))
+        elif op == "delete":
+            cur.execute("DELETE FROM detail_items WHERE item_id = %s", (rng.choice(items),))
+        elif op == "new_meal":
+            meals.append(_new_meal(cur, uid, rng))
+        elif op == "move_meal":
+            ts = datetime.combine(rng.choice(DAYS), datetime.min.time()).replace(hour=12)
+            cur.execute("UPDATE meals SET meal_time = %s WHERE meal_id = %s",
+                        (ts, rng.choice(meals)))
+        elif op == "delete_meal" and len(meals) > 1:
+            victim = meals.pop(rng.randrange(len(meals)))
+            cur.execute("DELETE FROM meals WHERE meal_id = %s", (victim,))
+
+        assert find_drift(cur, uid) == [], f"step {seed}/{step}/{op}"
+
+
+def test_deleting_every_day_drops_the_rollups(live_db, test_user_id, test_unit_id):
+    cur = live_db.cursor()
+    uid = test_user_id
+    meal_id = _new_meal(cur, uid, random.Random(0))
+    cur.execute(
+        "INSERT INTO detail_items (meal_id, food_name, unit_id, amount, cal_per_unit) "
+        "VALUES (%s, 'x', %s, 1, 300)", (meal_id, test_unit_id))
+    cur.execute("SELECT COUNT(*) FROM weekly_summaries WHERE user_id = %s", (uid,))
+    assert cur.fetchone()[0] == 1
+
+    cur.execute("DELETE FROM daily_summaries WHERE user_id = %s", (uid,))
+    cur.execute("SELECT COUNT(*) FROM weekly_summaries WHERE user_id = %s", (uid,))
+    assert cur.fetchone()[0] == 0
+    cur.execute("SELECT COUNT(*) FROM monthly_summaries WHERE user_id = %s", (uid,))
+    assert cur.fetchone()[0] == 0
+
+
+def test_backfill_repairs_injected_drift(live_db, test_user_id, test_unit_id):
+    cur = live_db.cursor()
+    uid = test_user_id
+    meal_id = _new_meal(cur, uid, random.Random(0))
+    cur.execute(
+        "INSERT INTO detail_items (meal_id, food_name, unit_id, amount, cal_per_unit) "
+        "VALUES (%s, 'x', %s, 1, 300)", (meal_id, test_unit_id))
+    assert find_drift(cur, uid) == []
+
+    cur.execute("UPDATE weekly_summaries SET total_calories = total_calories + 50 WHERE user_id = %s",
+                (uid,))
+    cur.execute("DELETE FROM monthly_summaries WHERE user_id = %s", (uid,))
+    assert {r[0] for r in find_drift(cur, uid)} == {"week", "month"}
+
+    rebuild(cur, [uid])
+    assert find_drift(cur, uid) == []
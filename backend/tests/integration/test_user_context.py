@@ -0,0 +1,126 @@
+"""
+Single-query user context snapshot (ai_models/user_context.py).
+
+Seeds a year of history for a throwaway user — three meals of three items
+a day, weight logs, an allergy — and checks the snapshot's insights view
+against the aggregate /insights/{id} used to run, plus the profile and
+intake views the agents read.
+
+Skipped by default; run with `pytest -m integration`. The benchmark needs
+pytest-benchmark (requirements-dev.txt).
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import pytest
+from psycopg2.extras import RealDictCursor, execute_values
+
+from ai_models.user_context import WEIGHT_LOGS, build_user_context
+
+pytestmark = pytest.mark.integration
+
+_LEGACY_OVERVIEW_SQL = """
+    WITH recent_daily AS (
+        SELECT ds.date_record, ds.total_calories_intake AS calories,
+               COALESCE(SUM(di.amount * di.protein_per_unit), 0) AS protein,
+               COALESCE(SUM(di.amount * di.carbs_per_unit), 0) AS carbs,
+               COALESCE(SUM(di.amount * di.fat_per_unit), 0) AS fat,
+               u.target_calories, u.current_streak
+        FROM daily_summaries ds
+        LEFT JOIN meals m ON m.user_id = ds.user_id AND m.meal_date = ds.date_record
+        LEFT JOIN detail_items di ON di.meal_id = m.meal_id
+        CROSS JOIN (SELECT target_calories, current_streak FROM users WHERE user_id = %s) u
+        WHERE ds.user_id = %s AND ds.date_record >= CURRENT_DATE - INTERVAL '30 days'
+        GROUP BY ds.date_record, ds.total_calories_intake, u.target_calories, u.current_streak
+    ),
+    goal_flags AS (
+        SELECT *, ABS(calories - target_calories) AS cal_diff,
+               CASE WHEN target_calories > 0
+                         AND ABS(calories - target_calories) <= target_calories * 0.1
+                    THEN 1 ELSE 0 END AS on_target
+        FROM recent_daily
+    )
+    SELECT COUNT(*) AS total_days_logged,
+           ROUND(AVG(calories)::numeric, 0) AS avg_calories,
+           SUM(on_target) AS days_on_target,
+           ROUND(AVG(protein)::numeric, 1) AS avg_protein,
+           ROUND(AVG(carbs)::numeric, 1) AS avg_carbs,
+           ROUND(AVG(fat)::numeric, 1) AS avg_fat,
+           ROUND(MIN(cal_diff)::numeric, 0) AS best_day_diff,
+           MAX(current_streak) AS current_streak
+    FROM goal_flags
+"""
+
+
+@pytest.fixture
+def year_of_history(live_db, test_user_id, test_unit_id):
+    cur = live_db.cursor()
+    today = date.today()
+    for day_offset in range(365):
+        day = today - timedelta(days=day_offset)
+        meal_ids = execute_values(cur, """
+            INSERT INTO meals (user_id, meal_type, meal_time, total_amount) VALUES %s
+            RETURNING meal_id
+        """, [(test_user_id, kind, datetime.combine(day, time(hour)), 0)
+              for kind, hour in (("breakfast", 8), ("lunch", 12), ("dinner", 19))], fetch=True)
+        execute_values(cur, """
+            INSERT INTO detail_items (meal_id, food_name, unit_id, amount, cal_per_unit,
+                                      protein_per_unit, carbs_per_unit, fat_per_unit)
+            VALUES %s
+        """, [(mid, f"อาหาร{i}", test_unit_id, 1 + (day_offset % 3) * 0.5,
+               150 + 10 * i, 8, 20, 5)
+              for (mid,) in meal_ids for i in range(3)])
+    # Whether or not the v26 triggers maintain it, make daily_summaries exact.
+    cur.execute("""
+        INSERT INTO daily_summaries (user_id, date_record, total_calories_intake,
+                                     total_protein, total_carbs, total_fat)
+        SELECT m.user_id, m.meal_date, SUM(di.amount * di.cal_per_unit),
+               SUM(di.amount * di.protein_per_unit), SUM(di.amount * di.carbs_per_unit),
+               SUM(di.amount * di.fat_per_unit)
+        FROM meals m JOIN detail_items di ON di.meal_id = m.meal_id
+        WHERE m.user_id = %s
+        GROUP BY m.user_id, m.meal_date
+        ON CONFLICT (user_id, date_record) DO UPDATE
+           SET total_calories_intake = EXCLUDED.total_calories_intake
+    """, (test_user_id,))
+    execute_values(cur, "INSERT INTO weight_logs (user_id, weight_kg, recorded_date) VALUES %s",
+                   [(test_user_id, 65 - i * 0.1, today - timedelta(days=7 * i)) for i in range(52)])
+    cur.execute("""
+        INSERT INTO user_allergy_preferences (user_id, flag_id)
+        SELECT %s, flag_id FROM allergy_flags ORDER BY flag_id LIMIT 1
+    """, (test_user_id,))
+    live_db.commit()
+    return test_user_id
+
+
+def test_overview_matches_legacy_aggregate(live_db, year_of_history):
+    uid = year_of_history
+    cur = live_db.cursor(cursor_factory=RealDictCursor)
+    cur.execute(_LEGACY_OVERVIEW_SQL, (uid, uid))
+    legacy = cur.fetchone()
+
+    overview = build_user_context(uid, conn=live_db).insights_overview()
+
+    assert overview["total_days_logged"] == legacy["total_days_logged"]
+    assert overview["avg_calories"] == int(legacy["avg_calories"])
+    assert overview["days_on_target"] == legacy["days_on_target"]
+    for key in ("avg_protein", "avg_carbs", "avg_fat"):
+        assert Decimal(str(overview[key])) == legacy[key], key
+    assert overview["best_day_diff"] == int(legacy["best_day_diff"])
+
+
+def test_agent_views_come_from_the_same_row(live_db, year_of_history):
+    snap = build_user_context(year_of_history, conn=live_db)
+    agent = snap.as_agent_context()
+    assert agent["profile"]["target_calories"] == 2000
+    assert agent["today_intake"]["total_calories_intake"] > 0
+    assert len(agent["weight_logs"]) == WEIGHT_LOGS
+    assert len(agent["allergies"]) <= 1
+    assert len(snap.as_coach_context()["daily_summaries"]) == 7
+
+
+def test_snapshot_build_benchmark(live_db, year_of_history, request):
+    pytest.importorskip("pytest_benchmark")
+    benchmark = request.getfixturevalue("benchmark")
+    snap = benchmark(build_user_context, year_of_history, conn=live_db)
+    assert snap is not None
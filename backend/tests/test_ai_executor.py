@@ -0,0 +1,122 @@
+"""Shared AI executor: admission control, budgets, cancellation, route mapping."""
+import threading
+import time
+
+import pytest
+
+import ai_models.llm_provider as llm_provider
+from app.services.ai_executor import AIExecutor, AIOverloaded, AITimeout, parse_budgets
+
+
+@pytest.fixture
+def executor():
+    return AIExecutor(max_workers=1, max_queue=1, budgets={"meals.estimate": 1}, retry_after=7)
+
+
+def _blocker():
+    release = threading.Event()
+    started = threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    return work, started, release
+
+
+def test_parse_budgets_skips_junk():
+    assert parse_budgets(" chat.coach=3, meals.estimate = 2 ,bad, x=y, =4") == {
+        "chat.coach": 3, "meals.estimate": 2,
+    }
+
+
+def test_full_pool_rejects_fast_with_503(executor):
+    work, started, release = _blocker()
+    running = executor.submit("chat.multi", work)
+    started.wait(1)
+    queued = executor.submit("chat.multi", lambda: "queued")
+    t0 = time.monotonic()
+    with pytest.raises(AIOverloaded) as exc:
+        executor.submit("chat.coach", lambda: "nope")
+    assert time.monotonic() - t0 < 0.1
+    assert exc.value.reason == "queue_full" and exc.value.status_code == 503
+    release.set()
+    assert running.result(1) == "done" and queued.result(1) == "queued"
+    stats = executor.stats()
+    assert stats["rejected_queue_full"] == 1 and stats["completed"] == 2
+    assert stats["wait_ms_max"] is not None
+
+
+def test_endpoint_budget_leaves_room_for_chat(executor):
+    executor.max_workers = 2
+    work, started, release = _blocker()
+    executor.submit("meals.estimate", work)
+    started.wait(1)
+    with pytest.raises(AIOverloaded) as exc:
+        executor.submit("meals.estimate", lambda: "second")
+    assert exc.value.status_code == 429 and exc.value.retry_after == 7
+    assert executor.run("chat.multi", lambda: "chat ok", timeout=1) == "chat ok"
+    release.set()
+    assert executor.stats()["rejected_by_endpoint"] == {"meals.estimate": 1}
+
+
+def test_timeout_drops_queued_job_before_it_runs(executor):
+    work, started, release = _blocker()
+    executor.submit("chat.multi", work)
+    started.wait(1)
+    ran = []
+    with pytest.raises(AITimeout):
+        executor.run("chat.coach", lambda: ran.append(1), timeout=0.05)
+    stats = executor.stats()
+    assert stats["queue_depth"] == 0 and stats["cancelled_queued"] == 1
+    assert stats["inflight"] == {"chat.multi": 1}
+    release.set()
+    time.sleep(0.05)
+    assert ran == []
+
+
+def test_timeout_stops_running_generation(executor, monkeypatch):
+    closed = threading.Event()
+    produced = []
+
+    def slow_stream(system, user, model_name=None, temperature=0.7):
+        try:
+            for i in range(100):
+                produced.append(i)
+                time.sleep(0.01)
+                yield "x"
+        finally:
+            closed.set()  # the upstream request is dropped
+
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    monkeypatch.setitem(llm_provider._STREAM_PROVIDERS, "ollama", slow_stream)
+    with pytest.raises(AITimeout):
+        executor.run("chat.coach", llm_provider.generate, "sys", "user",
+                     cache_ttl=0, timeout=0.05)
+    assert closed.wait(1)
+    assert len(produced) < 100
+    # The worker is free again straight away.
+    assert executor.run("chat.coach", lambda: "next", timeout=1) == "next"
+
+
+def test_generate_outside_executor_uses_blocking_provider(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    monkeypatch.setitem(llm_provider._PROVIDERS, "ollama", lambda *a: "blocking")
+    assert llm_provider.generate("s", "u", cache_ttl=0) == "blocking"
+
+
+def test_route_maps_saturation_to_503_with_retry_after(app_client, monkeypatch):
+    import app.routers.chat as chat
+
+    full = AIExecutor(max_workers=1, max_queue=0, retry_after=9)
+    work, started, release = _blocker()
+    full.submit("chat.multi", work)
+    started.wait(1)
+    monkeypatch.setattr(chat, "get_executor", lambda: full)
+    try:
+        r = app_client.post("/api/chat/multi", json={"user_id": 42, "message": "กินอะไรดี"})
+    finally:
+        release.set()
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "9"
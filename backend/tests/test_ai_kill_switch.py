@@ -37,3 +37,10 @@ def test_chat_multi_503_when_disabled(app_client):
     with _disable_ai():
         r = app_client.post("/api/chat/multi", json={"user_id": 42, "message": "hi"})
     assert r.status_code == 503
+
+
+def test_stream_routes_503_when_disabled(app_client):
+    with _disable_ai():
+        for path in ("/api/chat/coach/stream", "/api/chat/multi/stream"):
+            r = app_client.post(path, json={"user_id": 42, "message": "hi"})
+            assert r.status_code == 503, path
@@ -1,3 +1,4 @@
+import pytest
 import ai_models.multi_agent_system as mas
 
 
@@ -8,7 +9,7 @@ def test_llm_extracts_unknown_food_when_dictionary_misses(monkeypatch):
     monkeypatch.setattr(
         mas,
         "llm_generate",
-        lambda system, user: '{"items":[{"name":"โรตีชีสภูเขาไฟ","quantity":1}]}',
+        lambda system, user, **kw: '{"items":[{"name":"โรตีชีสภูเขาไฟ","quantity":1}]}',
     )
 
     result = agent._extract_foods("กินโรตีชีสภูเขาไฟ 1 จาน")
@@ -25,12 +26,12 @@ def test_unknown_food_estimate_queues_temp_food(monkeypatch):
     monkeypatch.setattr(
         mas,
         "llm_generate",
-        lambda system, user: '{"calories":420,"protein":12,"carbs":55,"fat":16}',
+        lambda system, user, **kw: '{"calories":420,"protein":12,"carbs":55,"fat":16}',
     )
     monkeypatch.setattr(
         agent,
-        "_auto_add_temp_food",
-        lambda name, nutrition, user_id=None: queued.append((name, nutrition, user_id)),
+        "_auto_add_temp_foods",
+        lambda estimates, user_id=None: queued.extend((e["name"], e, user_id) for e in estimates),
     )
 
     result = agent._estimate_food_llm("โรตีชีสภูเขาไฟ", user_id=123)
@@ -39,3 +40,114 @@ def test_unknown_food_estimate_queues_temp_food(monkeypatch):
     assert result["calories"] == 420
     assert queued[0][0] == "โรตีชีสภูเขาไฟ"
     assert queued[0][2] == 123
+
+
+class _ResolveConn:
+    """Fake connection answering _RESOLVE_FOODS_SQL from a name -> row map."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.queries = []
+
+    def cursor(self, cursor_factory=None):
+        return self
+
+    def execute(self, sql, params=None):
+        self.queries.append(params)
+        self._rows = [
+            {"query": n, "matched_regional_name": None, **self.catalog.get(n, {"food_id": None})}
+            for n in params["names"]
+        ]
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+def test_analyze_foods_batches_lookup_and_estimates(monkeypatch):
+    agent = mas.NutritionAnalysisAgent()
+    conn = _ResolveConn({
+        "ข้าวผัด": {"food_id": 1, "food_name": "ข้าวผัด", "calories": 500,
+                    "protein": 12, "carbs": 70, "fat": 15},
+    })
+    monkeypatch.setattr(mas, "get_db_connection", lambda: conn)
+    monkeypatch.setattr(mas, "llm_is_configured", lambda: True)
+    prompts = []
+
+    def fake_llm(system, user, **kw):
+        prompts.append(user)
+        return ('[{"name":"โรตีชีสภูเขาไฟ","calories":420,"protein":12,"carbs":55,"fat":16},'
+                '{"name":"ชาไทยปั่น","calories":300,"protein":3,"carbs":50,"fat":9}]')
+
+    monkeypatch.setattr(mas, "llm_generate", fake_llm)
+    queued = []
+    monkeypatch.setattr(agent, "_auto_add_temp_foods",
+                        lambda estimates, user_id=None: queued.append([e["name"] for e in estimates]))
+
+    info = agent._analyze_foods(
+        [{"name": "ข้าวผัด", "quantity": 2.0}, {"name": "โรตีชีสภูเขาไฟ"},
+         {"name": "ชาไทยปั่น"}, {"name": "ข้าวผัด", "quantity": 1.0}],
+        [], user_id=7,
+    )
+
+    assert conn.queries == [{"names": ["ข้าวผัด", "โรตีชีสภูเขาไฟ", "ชาไทยปั่น"]}]
+    assert len(prompts) == 1
+    assert queued == [["โรตีชีสภูเขาไฟ", "ชาไทยปั่น"]]
+    assert [i["source"] for i in info["items"]] == ["db", "llm_estimate", "llm_estimate", "db"]
+    assert info["total"]["calories"] == 500 * 2 + 420 + 300 + 500
+
+
+def test_batch_estimate_falls_back_to_position_when_names_drift(monkeypatch):
+    agent = mas.NutritionAnalysisAgent()
+    monkeypatch.setattr(mas, "llm_is_configured", lambda: True)
+    monkeypatch.setattr(
+        mas, "llm_generate",
+        lambda s, u, **kw: '[{"name":"ข้าวซอยไก่ (1 ชาม)","calories":600},{"name":"แกงฮังเล","calories":450}]',
+    )
+    monkeypatch.setattr(agent, "_auto_add_temp_foods", lambda estimates, user_id=None: None)
+
+    result = agent._estimate_foods_llm(["ข้าวซอยไก่", "แกงฮังเล"])
+
+    assert result["ข้าวซอยไก่"]["calories"] == 600
+    assert result["แกงฮังเล"]["calories"] == 450
+
+
+@pytest.mark.parametrize("answer,expected", [
+    # reordered: the drifted ข้าวซอย entry sits in แกงฮังเล's slot
+    ('[{"name":"แกงฮังเล","calories":450},{"name":"ข้าวซอยไก่ (1 ชาม)","calories":600}]',
+     {"แกงฮังเล": 450}),
+    # short: ข้าวซอยไก่ was dropped, so slot 0 now holds the แกงฮังเล estimate
+    ('[{"name":"แกงฮังเลหมู","calories":450}]', {}),
+])
+def test_batch_estimate_never_guesses_position_when_list_is_not_intact(monkeypatch, answer, expected):
+    agent = mas.NutritionAnalysisAgent()
+    monkeypatch.setattr(mas, "llm_is_configured", lambda: True)
+    monkeypatch.setattr(mas, "llm_generate", lambda s, u, **kw: answer)
+    queued = []
+    monkeypatch.setattr(agent, "_auto_add_temp_foods",
+                        lambda estimates, user_id=None: queued.extend(e["name"] for e in estimates))
+
+    result = agent._estimate_foods_llm(["ข้าวซอยไก่", "แกงฮังเล"], user_id=7)
+
+    assert {n: e["calories"] for n, e in result.items()} == expected
+    assert queued == list(expected)
+
+
+def test_unmatched_batch_names_cost_no_extra_llm_calls(monkeypatch):
+    agent = mas.NutritionAnalysisAgent()
+    monkeypatch.setattr(mas, "llm_is_configured", lambda: True)
+    monkeypatch.setattr(agent, "_lookup_foods_db", lambda names: {})
+    monkeypatch.setattr(agent, "_auto_add_temp_foods", lambda estimates, user_id=None: None)
+    prompts = []
+
+    def fake_llm(system, user, **kw):
+        prompts.append(user)
+        return '[{"name":"แกงฮังเล","calories":450}]'
+
+    monkeypatch.setattr(mas, "llm_generate", fake_llm)
+    info = agent._analyze_foods([{"name": "แกงฮังเล"}, {"name": "ข้าวซอยไก่"}], [], user_id=7)
+
+    assert len(prompts) == 1
+    assert [(i["name"], i["calories"]) for i in info["items"]] == [("แกงฮังเล", 450)]
@@ -0,0 +1,91 @@
+"""Async /async/* twins: ownership guard + same response shape as the sync routes."""
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+import pytest
+
+
+class _FakeAsyncCursor:
+    def __init__(self, rows):
+        self._rows = rows
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self):
+        return self._rows
+
+
+class _FakeAsyncConn:
+    """Returns canned rows per SQL substring, in call order."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.executed = []
+
+    async def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        for i, (needle, rows) in enumerate(self.script):
+            if needle in sql:
+                self.script.pop(i)
+                return _FakeAsyncCursor(rows)
+        return _FakeAsyncCursor([])
+
+
+def _patch_conn(conn):
+    @asynccontextmanager
+    async def fake():
+        yield conn
+    return patch("app.routers.async_api.async_db_connection", fake)
+
+
+@pytest.mark.parametrize("method,path", [
+    ("GET", "/async/daily_summary/99?date_record=2026-04-19"),
+    ("GET", "/async/notifications/99/unread_count"),
+])
+def test_async_endpoints_block_cross_user_access(app_client, method, path):
+    r = app_client.request(method, path)
+    assert r.status_code == 403
+
+
+def test_async_unread_count(app_client):
+    conn = _FakeAsyncConn([("COUNT(*)", [{"count": 3}])])
+    with _patch_conn(conn):
+        r = app_client.get("/async/notifications/42/unread_count")
+    assert r.status_code == 200
+    assert r.json() == {"unread_count": 3}
+
+
+def test_async_daily_summary_matches_sync_shape(app_client):
+    conn = _FakeAsyncConn([
+        ("FROM users", [{"user_id": 42, "target_calories": 1800}]),
+        ("SELECT total_calories_intake", [{"total_calories_intake": 500}]),
+        ("SUM(di.amount", [{"total_cal": 650, "total_protein": 30,
+                            "total_carbs": 80, "total_fat": 20}]),
+        ("STRING_AGG", [{"meal_type": "breakfast", "menu_names": "ข้าวผัด"}]),
+    ])
+    with _patch_conn(conn):
+        r = app_client.get("/async/daily_summary/42?date_record=2026-04-19")
+    assert r.status_code == 200
+    assert r.json() == {
+        "total_calories_intake": 650, "total_protein": 30.0,
+        "total_carbs": 80.0, "total_fat": 20.0, "target_calories": 1800,
+        "meals": {"breakfast": "ข้าวผัด"},
+    }
+
+
+def test_async_food_search_empty_query_skips_db(app_client):
+    r = app_client.get("/async/foods/search?q=%20")
+    assert r.status_code == 200
+    assert r.json() == []
+
+
+def test_async_db_error_returns_500(app_client):
+    @asynccontextmanager
+    async def broken():
+        raise RuntimeError("DATABASE_URL or DIRECT_DATABASE_URL not set")
+        yield  # pragma: no cover
+
+    with patch("app.routers.async_api.async_db_connection", broken):
+        r = app_client.get("/async/notifications/42/unread_count")
+    assert r.status_code == 500
@@ -0,0 +1,99 @@
+"""Shared JWT decode: verified-claims cache, exp handling, quiet logging."""
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import jwt
+
+import auth.dependencies as deps
+
+
+def make_token(user_id=42, role_id=2, ttl=3600, **extra):
+    now = int(time.time())
+    claims = {"sub": f"cg-user-{user_id}", "email": f"u{user_id}@example.com",
+              "role": "authenticated", "iat": now, "exp": now + ttl,
+              "app_metadata": {"user_id": user_id, "role_id": role_id}, **extra}
+    return jwt.encode(claims, deps._JWT_SECRET, algorithm=deps._JWT_ALGO)
+
+
+def _creds(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = deps._TokenCache(max_entries=2, ttl=300)
+    monkeypatch.setattr(deps, "_token_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+    real = deps.jwt.decode
+
+    def counting(token, *a, **kw):
+        calls.append(token)
+        return real(token, *a, **kw)
+
+    monkeypatch.setattr(deps.jwt, "decode", counting)
+    return calls
+
+
+def test_repeat_requests_verify_the_signature_once(cache, decode_calls):
+    token = make_token()
+    for _ in range(3):
+        user = asyncio.run(deps.get_current_user(_creds(token)))
+    assert user == {"sub": "cg-user-42", "email": "u42@example.com", "user_id": 42, "role": "authenticated"}
+    assert len(decode_calls) == 1
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_all_three_dependencies_share_the_cache(cache, decode_calls):
+    token = make_token(user_id=1, role_id=1)
+    asyncio.run(deps.get_current_user(_creds(token)))
+    admin = asyncio.run(deps.get_current_admin(_creds(token)))
+    optional = asyncio.run(deps.get_optional_user(_creds(token)))
+    assert admin["role_id"] == 1 and optional["user_id"] == 1
+    assert len(decode_calls) == 1
+    assert asyncio.run(deps.get_optional_user(None)) is None
+
+
+def test_cached_entry_is_dropped_at_exp(cache, decode_calls):
+    token = make_token(ttl=1)
+    asyncio.run(deps.get_current_user(_creds(token)))
+    assert cache.get(deps.hashlib.sha256(token.encode()).digest()) is not None
+    time.sleep(2.1)  # jose still accepts a token during its exp second
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(deps.get_current_user(_creds(token)))
+    assert e.value.status_code == 401
+    assert cache.stats()["expired"] == 1 and cache.stats()["rejected"] == 1
+
+
+def test_bad_tokens_are_not_cached_and_admin_still_checks_role(cache):
+    bad = make_token()[:-2] + "xx"
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            asyncio.run(deps.get_current_user(_creds(bad)))
+    assert cache.stats()["entries"] == 0 and cache.stats()["rejected"] == 2
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(deps.get_current_admin(_creds(make_token(role_id=2))))
+    assert e.value.status_code == 403
+
+
+def test_lru_bound(cache):
+    tokens = [make_token(user_id=i) for i in range(3)]
+    for t in tokens:
+        asyncio.run(deps.get_current_user(_creds(t)))
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+
+def test_hot_path_writes_nothing_to_stdout(cache, capsys):
+    token = make_token()
+    asyncio.run(deps.get_current_user(_creds(token)))
+    asyncio.run(deps.get_current_user(_creds(token)))
+    with pytest.raises(HTTPException):
+        asyncio.run(deps.get_current_user(None))
+    assert capsys.readouterr().out == ""
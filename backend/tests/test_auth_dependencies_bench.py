@@ -0,0 +1,54 @@
+"""pytest-benchmark suite for per-request auth dependency overhead.
+
+get_current_user as it was (HS256 verify + two prints to stdout on every
+request) against the shared decode with the verified-claims cache, cold
+(cache disabled) and warm. Skipped unless pytest-benchmark is installed:
+
+    pip install -r requirements-dev.txt
+    pytest tests/test_auth_dependencies_bench.py
+"""
+import asyncio
+import contextlib
+import io
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import auth.dependencies as deps  # noqa: E402
+from tests.test_auth_dependencies import _creds, make_token  # noqa: E402
+
+TOKEN = make_token()
+
+
+def legacy_get_current_user(token: str) -> dict:
+    """The pre-cache dependency body, prints included."""
+    print(f"AUTH: token received len={len(token)} prefix={token[:20]}")
+    payload = deps.jwt.decode(token, deps._JWT_SECRET, algorithms=[deps._JWT_ALGO])
+    print(f"AUTH: verified sub={payload.get('sub')} email={payload.get('email')}")
+    return {"sub": payload.get("sub"), "email": payload.get("email"),
+            "user_id": deps._get_user_id_from_payload(payload),
+            "role": payload.get("role", "authenticated")}
+
+
+def _drive(dep, creds):
+    coro = dep(creds)
+    try:
+        coro.send(None)  # no awaits inside: completes on the first step
+    except StopIteration as done:
+        return done.value
+
+
+@pytest.mark.benchmark(group="auth-dependency")
+def test_bench_legacy(benchmark):
+    with contextlib.redirect_stdout(io.StringIO()):  # kinder than a terminal
+        benchmark(legacy_get_current_user, TOKEN)
+
+
+@pytest.mark.benchmark(group="auth-dependency")
+@pytest.mark.parametrize("size", [0, 4096], ids=["cold", "cached"])
+def test_bench_current(benchmark, monkeypatch, size):
+    monkeypatch.setattr(deps, "_token_cache", deps._TokenCache(max_entries=size))
+    creds = _creds(TOKEN)
+    assert asyncio.run(deps.get_current_user(creds))["user_id"] == 42
+    benchmark(_drive, deps.get_current_user, creds)
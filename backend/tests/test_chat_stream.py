@@ -0,0 +1,90 @@
+"""Streaming chat: <think> stripping, SSE relay and its timeouts."""
+import json
+import time
+
+import pytest
+
+import app.services.chat_stream as cs
+from ai_models.llm_provider import strip_think
+
+
+def _events(body):
+    out = []
+    for block in "".join(body).strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        out.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return out
+
+
+def _text(events):
+    return "".join(d["text"] for e, d in events if e == "token")
+
+
+@pytest.mark.parametrize("chunks, expected", [
+    (["<think>คิดก่อน</think>\n\nตอบ", "เลย"], "ตอบเลย"),
+    (["<thi", "nk>abc</th", "ink>", "  สวัส", "ดี"], "สวัสดี"),
+    (["ก่อน <", "think>x</think> หลัง"], "ก่อน หลัง"),
+    (["a < b", " <t", "able>"], "a < b <table>"),
+    (["ไม่มี think"], "ไม่มี think"),
+])
+def test_strip_think_handles_split_tags(chunks, expected):
+    assert "".join(strip_think(chunks)) == expected
+
+
+def test_stream_relays_visible_text_and_reports_ttft():
+    cs._stats.reset()
+    events = _events(cs.stream_chat(lambda: iter(["<think>..", ".</think>ข้าว", "ผัด"]), where="t"))
+    assert _text(events) == "ข้าวผัด"
+    kind, done = events[-1]
+    assert kind == "done"
+    assert done["chars"] == len("ข้าวผัด")
+    assert done["first_chunk_ms"] <= done["ttft_ms"] <= done["total_ms"]
+    stats = cs.chat_stream_stats()
+    assert stats["completed"] == 1 and stats["ttft_ms_avg"] is not None
+
+
+def test_first_token_timeout(monkeypatch):
+    monkeypatch.setattr(cs, "FIRST_TOKEN_SEC", 0.05)
+
+    def slow():
+        time.sleep(0.3)
+        yield "late"
+
+    events = _events(cs.stream_chat(slow, where="t"))
+    assert events == [("error", {"detail": cs._TIMEOUT_DETAIL, "reason": "first_token_timeout"})]
+
+
+def test_idle_gap_timeout_keeps_what_was_sent(monkeypatch):
+    monkeypatch.setattr(cs, "IDLE_SEC", 0.05)
+
+    def stalls():
+        yield "ส่วนแรก"
+        time.sleep(0.3)
+        yield "ไม่ทัน"
+
+    events = _events(cs.stream_chat(stalls, where="t"))
+    assert _text(events) == "ส่วนแรก"
+    assert events[-1][1]["reason"] == "idle_timeout"
+
+
+def test_provider_error_becomes_error_event():
+    def boom():
+        yield "ok "
+        raise RuntimeError("ollama down")
+
+    events = _events(cs.stream_chat(boom, where="t"))
+    assert _text(events) == "ok "
+    assert events[-1] == ("error", {"detail": "AI Error: ollama down", "reason": "error"})
+
+
+def test_multi_stream_route_emits_sse(app_client, monkeypatch):
+    import app.routers.chat as chat
+
+    monkeypatch.setattr(chat._multi_agent, "run_stream",
+                        lambda user_id, msg, lat=None, lng=None: iter(["<think>x</think>", "กินได้ครับ"]))
+    r = app_client.post("/api/chat/multi/stream", json={"user_id": 42, "message": "กินอะไรดี"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _events([r.text])
+    assert _text(events) == "กินได้ครับ"
+    assert events[-1][0] == "done"
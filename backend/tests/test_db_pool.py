@@ -0,0 +1,160 @@
+"""ConnectionPool behaviour against fake psycopg2 connections (no Postgres needed)."""
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions as _ext
+
+from database import ConnectionPool, PoolTimeout
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise RuntimeError("server closed the connection unexpectedly")
+        self.conn.executed.append(sql)
+        self.conn.status = _ext.TRANSACTION_STATUS_INTRANS
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+
+class _FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = False
+        self.broken = False
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+        self.status = _ext.TRANSACTION_STATUS_IDLE
+
+    def cursor(self, *a, **kw):
+        return _FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.status = _ext.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = _ext.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+def _pool(**kw):
+    made = []
+
+    def connect():
+        c = _FakeConn()
+        made.append(c)
+        return c
+
+    kw.setdefault("timeout", 0.2)
+    return ConnectionPool(connect, **kw), made
+
+
+def test_reuses_physical_connection_and_sets_search_path_once():
+    pool, made = _pool(max_size=2)
+    for _ in range(5):
+        conn = pool.getconn()
+        conn.cursor().execute("SELECT 1")
+        conn.commit()
+        conn.close()
+    assert len(made) == 1
+    assert made[0].executed.count("SET search_path TO cleangoal, public") == 1
+    assert pool.stats()["checkouts"] == 5
+
+
+def test_release_rolls_back_open_transaction_and_resets_autocommit():
+    pool, made = _pool()
+    conn = pool.getconn()
+    conn.autocommit = True
+    conn.cursor().execute("INSERT ...")
+    conn.close()
+    assert made[0].rollbacks == 1
+    assert made[0].autocommit is False
+    conn.close()  # double close is harmless
+
+
+def test_with_block_commits_on_success_like_psycopg2():
+    pool, made = _pool()
+    with pool.getconn() as conn:
+        setup = made[0].commits  # search_path on connect
+        conn.cursor().execute("INSERT ...")
+    assert (made[0].commits - setup, made[0].rollbacks) == (1, 0)
+    assert conn.closed and pool.stats()["idle"] == 1
+
+
+def test_with_block_rolls_back_on_error_and_still_releases():
+    pool, made = _pool()
+    with pytest.raises(ValueError):
+        with pool.getconn() as conn:
+            setup = made[0].commits
+            conn.cursor().execute("INSERT ...")
+            raise ValueError("boom")
+    assert (made[0].commits - setup, made[0].rollbacks) == (0, 1)
+    assert conn.closed and pool.stats()["idle"] == 1
+
+
+def test_overflow_connections_are_closed_on_release():
+    pool, made = _pool(max_size=1, max_overflow=1)
+    a = pool.getconn()
+    b = pool.getconn()
+    assert pool.stats()["overflow"] == 1
+    b.close()
+    a.close()
+    assert made[1].closed
+    assert not made[0].closed
+    assert pool.stats()["size"] == 1
+
+
+def test_exhausted_pool_times_out():
+    pool, _ = _pool(max_size=1, max_overflow=0, timeout=0.05)
+    held = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    stats = pool.stats()
+    assert stats["waits"] == 1 and stats["timeouts"] == 1
+    held.close()
+
+
+def test_waiter_is_woken_by_release():
+    pool, _ = _pool(max_size=1, max_overflow=0, timeout=2)
+    held = pool.getconn()
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.getconn()))
+    t.start()
+    time.sleep(0.05)
+    held.close()
+    t.join(1)
+    assert got and pool.stats()["waits"] == 1
+
+
+def test_broken_idle_connection_is_replaced_on_checkout():
+    pool, made = _pool(ping_after=0)
+    pool.getconn().close()
+    made[0].broken = True
+    conn = pool.getconn()
+    assert len(made) == 2
+    assert made[0].closed
+    conn.close()
+
+
+def test_expired_connection_is_recycled():
+    pool, made = _pool(max_lifetime=0.01)
+    pool.getconn().close()
+    time.sleep(0.02)
+    pool.getconn().close()
+    assert len(made) == 2 and made[0].closed
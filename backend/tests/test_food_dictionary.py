@@ -0,0 +1,101 @@
+"""Process-wide, versioned food dictionary (ai_models/food_dictionary.py)."""
+import pytest
+
+import ai_models.food_dictionary as fd
+from ai_models.food_extraction import FoodDictionary, extract_foods
+
+
+class _Conn:
+    """Fake psycopg2 connection serving the version probe and name list."""
+
+    def __init__(self, version, names):
+        self.version, self.names = version, names
+        self.sql = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.sql.append(sql)
+        if "catalog_versions" in sql and self.version is None:
+            raise RuntimeError('relation "catalog_versions" does not exist')
+
+    def fetchone(self):
+        return (self.version,)
+
+    def fetchall(self):
+        return [(n,) for n in self.names]
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    @property
+    def name_loads(self):
+        return sum("UNION" in s for s in self.sql)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(fd, "_current", None)
+    monkeypatch.setattr(fd, "_checked_at", 0.0)
+    conn = _Conn(1, ["ข้าวซอย", "ข้าวปุ้น"])
+    monkeypatch.setattr(fd, "get_db_connection", lambda: conn)
+    return conn
+
+
+def test_snapshot_merges_fallback_and_drops_blanks():
+    d = FoodDictionary(["ข้าวซอยไก่", " ", None], version=7, with_trie=False)
+    assert "ข้าวซอยไก่" in d.names and "ส้มตำ" in d.names
+    assert "" not in d.names
+    assert d.version == 7
+
+
+def test_built_once_and_reused_between_checks(service):
+    first = fd.get_food_dictionary()
+    assert "ข้าวซอย" in first.names
+    assert fd.get_food_dictionary() is first
+    assert service.name_loads == 1
+
+
+def test_same_version_skips_rebuild(service):
+    first = fd.get_food_dictionary()
+    fd.invalidate_food_dictionary()
+    assert fd.get_food_dictionary() is first
+    assert service.name_loads == 1
+
+
+def test_version_bump_rebuilds(service):
+    first = fd.get_food_dictionary()
+    service.version, service.names = 2, ["ข้าวซอย", "แกงฮังเล"]
+    fd.invalidate_food_dictionary()
+    second = fd.get_food_dictionary()
+    assert second is not first
+    assert second.version == 2 and "แกงฮังเล" in second.names
+
+
+def test_without_counter_falls_back_to_max_age(service, monkeypatch):
+    service.version = None
+    first = fd.get_food_dictionary()
+    fd.invalidate_food_dictionary()
+    assert fd.get_food_dictionary() is first
+    monkeypatch.setattr(fd, "MAX_AGE_SECONDS", -1)
+    fd.invalidate_food_dictionary()
+    assert fd.get_food_dictionary() is not first
+
+
+def test_db_unavailable_serves_fallback_then_recovers(service, monkeypatch):
+    monkeypatch.setattr(fd, "get_db_connection", lambda: None)
+    offline = fd.get_food_dictionary()
+    assert "ส้มตำ" in offline.names and "ข้าวซอย" not in offline.names
+    monkeypatch.setattr(fd, "get_db_connection", lambda: service)
+    fd.invalidate_food_dictionary()
+    assert "ข้าวซอย" in fd.get_food_dictionary().names
+
+
+def test_extract_foods_uses_snapshot(service):
+    result = extract_foods("เที่ยงนี้กินข้าวซอย 1 ชาม", dictionary=fd.get_food_dictionary())
+    assert result[0]["name"] == "ข้าวซอย"
+    assert result[0]["quantity"] == 1.0
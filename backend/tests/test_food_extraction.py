@@ -6,6 +6,7 @@ path still recognises common Thai dishes.
 """
 import pytest
 
+from ai_models import food_extraction
 from ai_models.food_extraction import extract_foods
 
 
@@ -59,3 +60,12 @@ def test_limit_respected():
 def test_no_match_for_non_food_text(non_food):
     result = extract_foods(non_food, db_food_names=["ข้าวผัด"])
     assert result == [] or all(r["source"] == "regex" and r["name"] for r in result)
+
+
+def test_ad_hoc_name_lists_compile_once_per_set():
+    food_extraction._compiled.cache_clear()
+    extract_foods("กินข้าวผัด", db_food_names=["ข้าวผัด", "ต้มยำกุ้ง"])
+    extract_foods("กินต้มยำกุ้ง", db_food_names=["ต้มยำกุ้ง", "ข้าวผัด"])
+    extract_foods("กินผัดไทย", db_food_names=["ผัดไทย"])
+    info = food_extraction._compiled.cache_info()
+    assert (info.hits, info.misses) == (1, 2)
@@ -0,0 +1,129 @@
+"""In-process food search index (app/services/food_index.py)."""
+from unittest.mock import MagicMock, patch
+
+from app.services.food_index import FoodIndex, load_food_index
+
+FOODS = [
+    {"food_id": 1, "food_name": "ขนมจีนน้ำยา", "calories": 400},
+    {"food_id": 2, "food_name": "ข้าวผัดกุ้ง", "calories": 550},
+    {"food_id": 3, "food_name": "Pad Thai", "calories": 600},
+    {"food_id": 4, "food_name": "ข้าวมันไก่", "calories": 650},
+    {"food_id": 5, "food_name": "ไก่ย่าง", "calories": 300},
+]
+ALIASES = [
+    {"food_id": 1, "region": "northeastern", "name_th": "ข้าวปุ้น", "is_primary": True},
+    {"food_id": 1, "region": "northern", "name_th": "ขนมเส้น", "is_primary": True},
+    {"food_id": 4, "region": "northern", "name_th": "ข้าวมันไก่เมือง", "is_primary": False},
+]
+
+
+def _index():
+    idx = FoodIndex(ttl_seconds=300)
+    idx.build(FOODS, ALIASES)
+    return idx
+
+
+def test_infix_and_case_insensitive_match():
+    idx = _index()
+    assert [r["food_id"] for r in idx.search("thai")] == [3]
+    assert [r["food_id"] for r in idx.search("กุ้ง")] == [2]
+
+
+def test_alias_hits_canonical_food_with_regional_display_name():
+    rows = _index().search("ข้าวปุ้น", region="northeastern")
+    assert len(rows) == 1
+    row = rows[0]
+    assert row["food_id"] == 1
+    assert row["food_name"] == "ขนมจีนน้ำยา"
+    assert row["display_name"] == row["regional_name"] == "ข้าวปุ้น"
+    assert row["match_user_region"] == 1
+
+
+def test_user_region_alias_ranks_first_then_prefix_then_name():
+    idx = _index()
+    # "ข้าว" prefixes foods 2 and 4 and food 1's Isan alias; by name 1 < 2 < 4.
+    assert [r["food_id"] for r in idx.search("ข้าว")] == [1, 2, 4]
+    # Food 4 also has a matching northern alias.
+    rows = idx.search("ข้าว", region="northern")
+    assert [r["food_id"] for r in rows] == [4, 1, 2]
+    assert [r["match_user_region"] for r in rows] == [1, 0, 0]
+    # Display name is the region's primary alias, not whichever alias matched.
+    assert rows[0]["display_name"] == "ข้าวมันไก่"
+    assert rows[1]["display_name"] == "ขนมเส้น"
+    # Prefix beats infix: "ไก่ย่าง" before "ข้าวมันไก่".
+    assert [r["food_id"] for r in idx.search("ไก่")] == [5, 4]
+
+
+def test_limit_and_no_match():
+    idx = _index()
+    assert len(idx.search("ข", limit=2)) == 2
+    assert idx.search("sushi") == []
+    assert idx.search("   ") == []
+
+
+def test_refresh_and_remove_update_postings():
+    idx = _index()
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchone.return_value = {"food_id": 3, "food_name": "Pad See Ew", "calories": 620}
+    cur.fetchall.return_value = []
+    idx.refresh_food(conn, 3)
+    assert idx.search("thai") == []
+    assert [r["food_id"] for r in idx.search("see ew")] == [3]
+
+    idx.remove_food(1)
+    assert idx.search("ข้าวปุ้น", region="northeastern") == []
+    assert len(idx) == 4
+
+
+def test_search_route_uses_index_without_db(app_client):
+    with patch("app.routers.foods.food_index", _index()), \
+         patch("app.routers.foods.get_db_connection") as get_conn:
+        r = app_client.get("/foods/search?q=pad")
+    assert r.status_code == 200
+    assert [row["food_id"] for row in r.json()] == [3]
+    get_conn.assert_not_called()
+
+
+def test_user_search_reads_region_from_snapshot_not_db(app_client):
+    snapshot = MagicMock(profile={"region": "northeastern"})
+    with patch("app.routers.foods.food_index", _index()), \
+         patch("app.routers.foods.get_user_context", return_value=snapshot) as get_ctx, \
+         patch("app.routers.foods.get_db_connection") as get_conn:
+        r = app_client.get("/foods/search?q=ข้าวปุ้น&user_id=42")
+    assert r.status_code == 200
+    assert [row["match_user_region"] for row in r.json()] == [1]
+    get_ctx.assert_called_once_with(42)
+    get_conn.assert_not_called()
+
+
+def test_search_route_falls_back_to_sql_until_loaded(app_client):
+    conn = MagicMock()
+    conn.cursor.return_value.fetchall.return_value = []
+    with patch("app.routers.foods.food_index", FoodIndex()), \
+         patch("app.routers.foods.get_db_connection", return_value=conn):
+        r = app_client.get("/foods/search?q=pad")
+    assert r.status_code == 200
+    sql, params = conn.cursor.return_value.execute.call_args.args
+    assert "similarity(" in sql
+    assert params == {"q": "pad", "pattern": "%pad%", "region": None, "limit": 20}
+
+
+def test_db_backend_never_loads_index(monkeypatch):
+    monkeypatch.setenv("FOOD_SEARCH_BACKEND", "db")
+    with patch("database.get_db_connection") as get_conn:
+        assert load_food_index() is False
+    get_conn.assert_not_called()
+
+
+def test_admin_similar_foods_ranks_by_trigram_similarity(app_client):
+    conn = MagicMock()
+    conn.cursor.return_value.fetchall.return_value = []
+    with patch("app.routers.admin.get_db_connection", return_value=conn):
+        r = app_client.get("/admin/foods/similar?name=ข้าวผัดกระเพา หมู")
+    assert r.status_code == 200
+    sql, params = conn.cursor.return_value.execute.call_args.args
+    assert "food_name %% %(name)s" in sql
+    assert "ORDER BY similarity(food_name, %(name)s) DESC" in sql
+    assert params == {"name": "ข้าวผัดกระเพา หมู", "pattern": "%ข้าวผัดกระเพา หมู%",
+                      "first_word": "%ข้าวผัดกระเพา%"}
@@ -0,0 +1,97 @@
+"""Aho-Corasick food matcher (ai_models/food_matcher.py) — parity with the
+greedy startswith scan it replaced."""
+import random
+import re
+from typing import Optional
+
+from ai_models.food_extraction import FoodDictionary, extract_foods
+from ai_models.food_matcher import FoodMatcher
+
+# Frozen copy of the pre-matcher implementation, kept as the reference.
+_LEGACY_QUANTITY_RE = re.compile(
+    r"(\d+(?:\.\d+)?|ครึ่ง|หนึ่ง|สอง|สาม|สี่|ห้า)\s*(จาน|ถ้วย|ชาม|ชิ้น|แก้ว|คำ|ช้อน)"
+)
+_LEGACY_THAI_NUM = {"ครึ่ง": 0.5, "หนึ่ง": 1, "สอง": 2, "สาม": 3, "สี่": 4, "ห้า": 5}
+
+
+def _longest_first(names) -> tuple:
+    """The candidate order the legacy scan walked (was FoodDictionary.by_length)."""
+    return tuple(sorted(names, key=len, reverse=True))
+
+
+def _legacy_scan(text: str, ordered) -> list[str]:
+    found, i = [], 0
+    while i < len(text):
+        hit = next((t for t in ordered if text.startswith(t, i)), None)
+        if hit:
+            found.append(hit)
+            i += len(hit)
+        else:
+            i += 1
+    return found
+
+
+def _legacy_quantity(text: str, food_name: str) -> Optional[float]:
+    idx = text.find(food_name)
+    if idx < 0:
+        return None
+    m = _LEGACY_QUANTITY_RE.search(text[idx: idx + len(food_name) + 20])
+    if not m:
+        return None
+    val = m.group(1)
+    return float(_LEGACY_THAI_NUM[val]) if val in _LEGACY_THAI_NUM else float(val)
+
+
+SENTENCES = [
+    "วันนี้กินข้าวผัดกะเพรากับต้มยำกุ้ง 2 ถ้วย",
+    "เช้ากินโจ๊ก 1 ถ้วย เที่ยงข้าวมันไก่ครึ่งจาน เย็นส้มตำกับลาบ",
+    "ก๋วยเตี๋ยวเรือสองชาม แล้วก็ผัดซีอิ๊วอีก 1 จาน",
+    "ข้าวผัด 2 จาน ข้าวผัดกะเพรา 1 จาน ข้าวผัด",
+    "มื้อดึกหมูกะทะ ต้มยำต้มยำกุ้ง แกงเขียวหวานสามถ้วย",
+    "ไม่ได้กินอะไรเลย",
+    "",
+]
+
+
+def _parity(names, text):
+    d = FoodDictionary(names, with_trie=False)
+    scan = d.matcher.scan(text)
+    expected = _legacy_scan(text, _longest_first(d.names))
+    assert scan.names == expected
+    for name in set(expected) | set(d.names):
+        assert scan.quantity(name) == _legacy_quantity(text, name), name
+
+
+def test_parity_on_realistic_sentences():
+    for text in SENTENCES:
+        _parity(["ข้าวซอย", "ข้าวผัดกุ้ง"], text)
+
+
+def test_parity_on_random_overlapping_dictionaries():
+    rng = random.Random(1234)
+    alphabet = "กขคab"
+    for _ in range(300):
+        names = {"".join(rng.choices(alphabet, k=rng.randint(1, 4))) for _ in range(rng.randint(1, 12))}
+        text = "".join(rng.choices(alphabet + " 2จาน", k=rng.randint(0, 60)))
+        _parity(names, text)
+
+
+def test_longest_match_wins_and_consumes_text():
+    m = FoodMatcher(["ข้าวผัด", "ข้าวผัดกะเพรา", "กะเพรา", "ผัด"])
+    assert m.scan("ข้าวผัดกะเพราไก่").names == ["ข้าวผัดกะเพรา"]
+    assert m.scan("ข้าวผัดไก่ ผัด").names == ["ข้าวผัด", "ผัด"]
+    assert len(m) == 4
+
+
+def test_quantity_comes_from_first_mention_even_inside_a_longer_match():
+    scan = FoodMatcher(["ต้มยำ", "ต้มยำกุ้ง"]).scan("ต้มยำกุ้ง 2 ถ้วย แล้วต้มยำอีก")
+    assert scan.names == ["ต้มยำกุ้ง", "ต้มยำ"]
+    assert scan.quantity("ต้มยำ") == 2.0
+    assert scan.quantity("ผัดไทย") is None
+
+
+def test_extract_foods_regex_path_keeps_quantities():
+    d = FoodDictionary(["ข้าวซอย"], with_trie=False)
+    result = extract_foods("ข้าวซอยครึ่งชาม กับส้มตำ 2 จาน", dictionary=d)
+    got = {r["name"]: r["quantity"] for r in result}
+    assert got == {"ข้าวซอย": 0.5, "ส้มตำ": 2.0}
@@ -0,0 +1,82 @@
+"""pytest-benchmark suite for meal-text food matching.
+
+Compares FoodMatcher against the greedy startswith scan it replaced on
+realistic Thai meal sentences, with the fallback dictionary and with a
+10k-name catalog. Skipped unless pytest-benchmark is installed:
+
+    pip install -r requirements-dev.txt
+    pytest tests/test_food_matcher_bench.py --benchmark-group-by=param:catalog
+"""
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from ai_models.food_extraction import FoodDictionary  # noqa: E402
+from tests.test_food_matcher import (  # noqa: E402
+    SENTENCES, _legacy_quantity, _legacy_scan, _longest_first,
+)
+
+_DISHES = ["ข้าวผัด", "ต้มยำ", "แกงเขียวหวาน", "ก๋วยเตี๋ยว", "ผัดกะเพรา", "ยำ", "ลาบ", "ข้าวมัน"]
+_MEATS = ["", "หมู", "ไก่", "กุ้ง", "เนื้อ", "ปลาหมึก", "ทะเล", "หมูกรอบ"]
+_STYLES = ["", "พิเศษ", "ไข่ดาว", "ไม่เผ็ด", "ใส่ไข่", "จานใหญ่", "น้ำข้น", "แห้ง"]
+
+
+def _catalog(size: int) -> list[str]:
+    names = [d + m + s for d in _DISHES for m in _MEATS for s in _STYLES]
+    i = 0
+    while len(names) < size:
+        names.append(f"{_DISHES[i % len(_DISHES)]}{_MEATS[i % len(_MEATS)]}สูตร{i}")
+        i += 1
+    return names[:size]
+
+
+def _long_message(length: int = 2000) -> str:
+    rng = random.Random(7)
+    parts, total = [], 0
+    while total < length:
+        s = rng.choice(SENTENCES) or "หิวมาก"
+        parts.append(s)
+        total += len(s) + 1
+    return " ".join(parts)[:length]
+
+
+CATALOGS = {"fallback": [], "10k": _catalog(10_000)}
+MESSAGES = {"sentence": SENTENCES[1], "2000chars": _long_message()}
+
+
+@pytest.fixture(scope="module", params=sorted(CATALOGS))
+def catalog(request):
+    d = FoodDictionary(CATALOGS[request.param], with_trie=False)
+    # The legacy scan's ordering is built once, like the old by_length was.
+    return d, _longest_first(d.names)
+
+
+def _run_legacy(ordered, text):
+    found = _legacy_scan(text, ordered)
+    return [(n, _legacy_quantity(text, n)) for n in dict.fromkeys(found)]
+
+
+def _run_matcher(d, text):
+    scan = d.matcher.scan(text)
+    return [(n, scan.quantity(n)) for n in dict.fromkeys(scan.names)]
+
+
+@pytest.mark.parametrize("message", sorted(MESSAGES))
+def test_bench_matcher(benchmark, catalog, message):
+    d, ordered = catalog
+    text = MESSAGES[message]
+    assert benchmark(_run_matcher, d, text) == _run_legacy(ordered, text)
+
+
+@pytest.mark.parametrize("message", sorted(MESSAGES))
+def test_bench_legacy_scan(benchmark, catalog, message):
+    _, ordered = catalog
+    benchmark.pedantic(_run_legacy, args=(ordered, MESSAGES[message]), rounds=3, iterations=1)
+
+
+def test_bench_build_10k(benchmark):
+    names = CATALOGS["10k"]
+    d = benchmark(FoodDictionary, names, with_trie=False)
+    assert len(d.matcher) == len(d.names)
@@ -0,0 +1,71 @@
+"""Insights reads from daily_summaries and the weekly/monthly rollups, not raw items."""
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.routers import insights
+
+
+def _conn(rows=None, one=None):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchall.return_value = rows or []
+    cur.fetchone.return_value = one
+    return conn, cur
+
+
+@pytest.mark.parametrize("sql", [insights._MACRO_BALANCE_SQL, insights._CALORIE_TREND_SQL,
+                                 *insights._PERIOD_SUMMARIES_SQL.values()])
+def test_insights_sql_never_touches_raw_items(sql):
+    assert "detail_items" not in sql and "meals" not in sql
+    assert "CROSS JOIN" not in sql
+
+
+def test_macro_balance_averages_exactly_seven_days():
+    assert "::date - 6" in insights._MACRO_BALANCE_SQL
+
+
+@pytest.mark.parametrize("sql", [insights._MACRO_BALANCE_SQL, insights._CALORIE_TREND_SQL])
+def test_insights_windows_end_on_the_bangkok_date(sql):
+    assert "CURRENT_DATE" not in sql
+    assert "(NOW() AT TIME ZONE 'Asia/Bangkok')::date" in sql
+
+
+def test_monthly_summaries_oldest_first_with_daily_averages(app_client):
+    rows = [  # newest first, as the query returns them
+        {"start_date": date(2026, 6, 1), "days_logged_count": 2, "avg_daily_calories": 1950,
+         "total_calories": Decimal("3900.4"), "total_protein": Decimal("181"),
+         "total_carbs": Decimal("400"), "total_fat": Decimal("99")},
+        {"start_date": date(2026, 5, 1), "days_logged_count": 31, "avg_daily_calories": 2100,
+         "total_calories": Decimal("65100"), "total_protein": Decimal("3100"),
+         "total_carbs": Decimal("7750"), "total_fat": Decimal("2170")},
+    ]
+    conn, cur = _conn(rows)
+    with patch("app.routers.insights.get_db_connection", return_value=conn):
+        r = app_client.get("/insights/42/summaries?period=month&limit=500")
+    assert r.status_code == 200
+    sql, params = cur.execute.call_args.args
+    assert "monthly_summaries" in sql and params == (42, insights.MAX_PERIODS)
+    body = r.json()
+    assert [p["start_date"] for p in body] == ["2026-05-01", "2026-06-01"]
+    assert body[1] == {"start_date": "2026-06-01", "days_logged": 2, "avg_calories": 1950,
+                       "avg_protein": 90.5, "avg_carbs": 200.0, "avg_fat": 49.5,
+                       "total_calories": 3900}
+
+
+def test_summaries_rejects_unknown_period(app_client):
+    conn, cur = _conn()
+    with patch("app.routers.insights.get_db_connection", return_value=conn):
+        r = app_client.get("/insights/42/summaries?period=year")
+    assert r.status_code == 400
+    cur.execute.assert_not_called()
+
+
+def test_macro_balance_without_logged_days_returns_zeros(app_client):
+    conn, _ = _conn(one=None)
+    with patch("app.routers.insights.get_db_connection", return_value=conn):
+        r = app_client.get("/insights/42/macro_balance")
+    assert r.status_code == 200
+    assert r.json()["daily_breakdown"] == [] and r.json()["avg_calories"] == 0
@@ -0,0 +1,81 @@
+"""LLM response cache (ai_models/llm_cache.py) in front of llm_provider.generate()."""
+import pytest
+
+import ai_models.llm_cache as llm_cache
+import ai_models.llm_provider as llm_provider
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Route the ollama provider to a counter and give each test a fresh cache."""
+    seen = []
+
+    def fake(system, user, model_name=None, temperature=0.7):
+        seen.append((system, user, temperature))
+        return f"reply {len(seen)}"
+
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    monkeypatch.setenv("OLLAMA_MODEL", "m1")
+    monkeypatch.setitem(llm_provider._PROVIDERS, "ollama", fake)
+    monkeypatch.setattr(llm_cache, "_backend", llm_cache.MemoryLRUCache(max_bytes=1024))
+    llm_cache.reset_llm_cache()
+    yield seen
+    llm_cache.reset_llm_cache()
+
+
+def test_repeat_prompt_is_served_from_cache(calls):
+    first = llm_provider.generate("sys", "ประมาณโภชนาการของ ข้าวผัด 1 จาน", temperature=0)
+    again = llm_provider.generate(" sys", "ประมาณโภชนาการของ  ข้าวผัด 1 จาน\n", temperature=0)
+    assert first == again == "reply 1"
+    assert len(calls) == 1 and calls[0][2] == 0
+    stats = llm_cache.llm_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 1, 1)
+
+
+def test_key_includes_model_and_temperature(calls, monkeypatch):
+    llm_provider.generate("sys", "u", temperature=0)
+    llm_provider.generate("sys", "u")
+    monkeypatch.setenv("OLLAMA_MODEL", "m2")
+    llm_provider.generate("sys", "u", temperature=0)
+    assert len(calls) == 3
+
+
+def test_local_key_names_adapter_but_load_paths_stay_split(monkeypatch):
+    monkeypatch.setenv("LOCAL_MODEL_PATH", "/models/base")
+    monkeypatch.setenv("LOCAL_ADAPTER_PATH", "/models/lora")
+    assert llm_provider._local_paths() == ("/models/base", "/models/lora")
+    assert llm_provider._local_paths("/models/other") == ("/models/other", "/models/lora")
+    assert llm_provider._model_for("local") == "/models/base|/models/lora"
+    assert llm_provider._model_for("local", "/models/other") == "/models/other|/models/lora"
+
+
+def test_opt_out_and_rejected_responses_are_not_stored(calls):
+    llm_provider.generate("coach", "u", cache_ttl=0)
+    llm_provider.generate("coach", "u", cache_ttl=0)
+    llm_provider.generate("json", "u", cache_if=llm_cache.is_json_response)
+    llm_provider.generate("json", "u", cache_if=llm_cache.is_json_response)
+    assert len(calls) == 4
+    assert llm_cache.llm_cache_stats()["stores"] == 0
+
+
+def test_lru_evicts_by_bytes_and_expires_by_ttl(monkeypatch):
+    cache = llm_cache.MemoryLRUCache(max_bytes=30)
+    cache.set("a", "x" * 12, ttl=60, gen_seconds=1.0)
+    cache.set("b", "ข" * 4, ttl=60, gen_seconds=1.0)   # 12 bytes of UTF-8
+    cache.get("a")                                       # a is now most recent
+    cache.set("c", "y" * 12, ttl=60, gen_seconds=1.0)
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+    assert cache.stats()["evictions"] == 1
+
+    clock = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "monotonic", lambda: clock[0])
+    cache.set("d", "z", ttl=5, gen_seconds=0.5)
+    clock[0] += 6
+    assert cache.get("d") is None
+
+
+def test_json_response_check():
+    assert llm_cache.is_json_response('```json\n{"calories": 1}\n```')
+    assert llm_cache.is_json_response('[{"name":"ส้มตำ"}]')
+    assert not llm_cache.is_json_response("ขออภัย ไม่ทราบครับ")
+    assert not llm_cache.is_json_response('{"calories": ')
@@ -44,3 +44,40 @@ def test_ollama_is_default_provider_without_deepseek_key(monkeypatch):
     monkeypatch.setenv("OLLAMA_MODEL", "deepseek-r1:1.5b")
 
     assert llm_provider.is_configured() is True
+
+
+class _FakeStream:
+    def __init__(self, lines):
+        self._lines = lines
+        self.closed = False
+
+    def raise_for_status(self):
+        return None
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+    def close(self):
+        self.closed = True
+
+
+def test_ollama_stream_yields_ndjson_deltas(monkeypatch):
+    import json as _json
+    resp = _FakeStream([
+        _json.dumps({"message": {"content": "<think>"}, "done": False}),
+        "",
+        _json.dumps({"message": {"content": "ตอบ"}, "done": False}),
+        _json.dumps({"message": {"content": ""}, "done": True}),
+    ])
+    calls = []
+
+    def fake_post(url, json, timeout, stream):
+        calls.append(json)
+        return resp
+
+    monkeypatch.setenv("LLM_PROVIDER", "ollama")
+    monkeypatch.setattr(llm_provider.requests, "post", fake_post)
+
+    assert list(llm_provider.generate_stream("s", "u")) == ["<think>", "ตอบ"]
+    assert calls[0]["stream"] is True
+    assert resp.closed
@@ -0,0 +1,161 @@
+"""Batching engine for LLM_PROVIDER=local: scheduling, futures, streaming, stats."""
+import threading
+import time
+
+import pytest
+
+import ai_models.llm_provider as llm
+from ai_models.llm_provider import GenerationCancelled, cancel_scope
+from ai_models.local_engine import LocalBatchEngine, LocalRequest, plan_batches
+
+SYSTEM = "คุณเป็นโค้ชโภชนาการ"
+
+
+class FakeBackend:
+    """Word-level 'model': the prefix is the system prompt, one id per word."""
+
+    def __init__(self, delay=0.0, gate=None):
+        self.delay, self.gate = delay, gate
+        self.batches = []
+
+    def encode(self, system, user):
+        return (len(system),), [len(w) for w in user.split()], False
+
+    def run(self, batch):
+        if self.gate is not None:
+            self.gate.wait(2)
+        self.batches.append([r.user for r in batch])
+        results = []
+        for step in range(3):
+            time.sleep(self.delay)
+            for r in batch:
+                r.publish(" ".join([r.user.upper()] * (step + 1)))
+        for r in batch:
+            results.append((" ".join([r.user.upper()] * 3), 3))
+        return results
+
+
+def _req(user, temperature=0.0, prefix=(1,)):
+    return LocalRequest(SYSTEM, user, temperature, prefix, [0] * len(user.split()))
+
+
+def test_plan_groups_by_sampling_and_prefix_and_caps_padding():
+    short = [_req("a b"), _req("c d"), _req("e f g")]
+    long_ = _req(" ".join("x" * 20))
+    sampled = _req("h i", temperature=0.7)
+    other_prompt = _req("j k", prefix=(2,))
+    batches = plan_batches(short + [long_, sampled, other_prompt], max_batch=8, max_pad=0.3)
+    users = [[r.user for r in b] for b in batches]
+    assert ["a b", "c d", "e f g"] in users       # similar lengths share a batch
+    assert [long_.user] in users                  # would pad the others ~85%
+    assert ["h i"] in users and ["j k"] in users  # different settings / system prompt
+
+
+def test_plan_respects_max_batch():
+    batches = plan_batches([_req("a b") for _ in range(5)], max_batch=2)
+    assert [len(b) for b in batches] == [2, 2, 1]
+
+
+def test_concurrent_requests_share_a_batch_and_resolve_their_own_futures():
+    gate = threading.Event()
+    engine = LocalBatchEngine(FakeBackend(gate=gate), max_batch=8, wait_ms=50)
+    results = {}
+
+    def ask(word):
+        results[word] = engine.generate(SYSTEM, word, 0.0)
+
+    threads = [threading.Thread(target=ask, args=(w,)) for w in ("ข้าว", "ไก่", "หมู")]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join(2)
+    assert results == {w: " ".join([w.upper()] * 3) for w in ("ข้าว", "ไก่", "หมู")}
+    stats = engine.stats()
+    assert stats["batches"] == 1 and stats["batch_size_hist"] == {"3": 1}
+    assert stats["tokens"] == 9 and stats["tokens_per_sec"] > 0
+    assert stats["queue_ms_max"] >= 50
+
+
+def test_stream_yields_row_deltas():
+    engine = LocalBatchEngine(FakeBackend(), wait_ms=0)
+    assert "".join(engine.stream(SYSTEM, "ok", 0.0)) == "OK OK OK"
+
+
+def test_cancelled_caller_stops_waiting_and_queued_row_is_dropped():
+    gate = threading.Event()
+    backend = FakeBackend(gate=gate)
+    engine = LocalBatchEngine(backend, wait_ms=0)
+    first = engine.submit(SYSTEM, "busy", 0.0)  # occupies the worker
+    time.sleep(0.05)
+    with cancel_scope(lambda: True), pytest.raises(GenerationCancelled):
+        engine.generate(SYSTEM, "late", 0.0)
+    gate.set()
+    assert first.future.result(2) == "BUSY BUSY BUSY"
+    deadline = time.monotonic() + 2
+    while engine.stats()["cancelled"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine.stats()["cancelled"] == 1
+    assert backend.batches == [["busy"]]
+
+
+def test_backend_failure_reaches_every_caller_in_the_batch():
+    class Broken(FakeBackend):
+        def run(self, batch):
+            raise RuntimeError("CUDA out of memory")
+
+    engine = LocalBatchEngine(Broken(), wait_ms=0)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        engine.generate(SYSTEM, "x", 0.0)
+    assert engine.stats()["failed"] == 1
+
+
+def test_provider_routes_local_through_engine(monkeypatch):
+    import ai_models.local_engine as le
+
+    engine = LocalBatchEngine(FakeBackend(), wait_ms=0)
+    monkeypatch.setenv("LLM_PROVIDER", "local")
+    monkeypatch.setenv("LOCAL_ENGINE", "batch")
+    monkeypatch.setattr(le, "get_engine", lambda model_name=None: engine)
+    assert llm.generate(SYSTEM, "hi", cache_ttl=0) == "HI HI HI"
+    with cancel_scope(lambda: False):  # the streaming path
+        assert llm.generate(SYSTEM, "yo", cache_ttl=0) == "YO YO YO"
+
+
+def test_tiny_hf_model_batched_matches_direct_greedy(monkeypatch):
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from ai_models.local_engine import HFBackend
+
+    monkeypatch.setenv("LOCAL_MAX_NEW_TOKENS", "8")
+    monkeypatch.setenv("LOCAL_REPETITION_PEN", "1.0")
+    try:
+        tokenizer, model = llm._local_load("hf-internal-testing/tiny-random-gpt2")
+    except Exception as e:  # offline
+        pytest.skip(f"tiny model unavailable: {e}")
+    backend = HFBackend(tokenizer, model, prefix_min_tokens=1)
+    engine = LocalBatchEngine(backend, wait_ms=100)
+    system = "You are a nutrition coach. " * 4
+    users = ["rice", "grilled chicken salad", "pad thai with shrimp and egg"]
+
+    direct = []
+    for user in users:
+        prefix, suffix, _ = backend.encode(system, user)
+        ids = torch.tensor([list(prefix) + suffix])
+        out = model.generate(input_ids=ids, attention_mask=torch.ones_like(ids),
+                             **llm._local_sampling(tokenizer, 0.0))
+        gen = out[0, ids.shape[1]:].tolist()
+        if tokenizer.eos_token_id in gen:
+            gen = gen[:gen.index(tokenizer.eos_token_id)]
+        direct.append(tokenizer.decode(gen, skip_special_tokens=True))
+
+    results = [None] * len(users)
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(
+        i, engine.generate(system, users[i], 0.0))) for i in range(len(users))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(60)
+    assert results == direct
+    assert engine.stats()["prefix_cache_misses"] >= 1
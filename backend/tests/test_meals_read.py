@@ -0,0 +1,86 @@
+"""Day-filtered meal reads: index-friendly range parameters."""
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+@pytest.mark.parametrize("month,year,start,end", [
+    (4, 2026, date(2026, 4, 1), date(2026, 5, 1)),
+    (12, 2026, date(2026, 12, 1), date(2027, 1, 1)),
+])
+def test_calendar_queries_half_open_month_range(app_client, month, year, start, end):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchall.return_value = []
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        r = app_client.get(f"/daily_logs/42/calendar?month={month}&year={year}")
+    assert r.status_code == 200
+    sql, params = cur.execute.call_args.args
+    assert "EXTRACT" not in sql
+    assert params == {"user_id": 42, "start": start, "end": end}
+
+
+def test_calendar_invalid_month_returns_empty(app_client):
+    conn = MagicMock()
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        r = app_client.get("/daily_logs/42/calendar?month=13&year=2026")
+    assert r.status_code == 200
+    assert r.json() == []
+    conn.cursor.return_value.execute.assert_not_called()
+
+
+def _day(d, calories=None, protein=None, water_ml=None, weight_kg=None, lunch=None):
+    return {"day": d, "calories": calories, "protein": protein, "carbs": None, "fat": None,
+            "water_ml": water_ml, "weight_kg": weight_kg,
+            "breakfast": None, "lunch": lunch, "dinner": None, "snack": None}
+
+
+def _range_conn(rows):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchall.return_value = rows
+    return conn, cur
+
+
+def test_range_is_one_query_in_parallel_arrays(app_client):
+    rows = [_day(date(2026, 4, 1), 1850, Decimal("92.46"), 1500, Decimal("70.25"), "ข้าวมันไก่"),
+            _day(date(2026, 4, 2))]
+    conn, cur = _range_conn(rows)
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        r = app_client.get("/daily_logs/42/range?from=2026-04-01&to=2026-04-02")
+    assert r.status_code == 200
+    assert cur.execute.call_count == 1
+    assert cur.execute.call_args.args[1] == {"user_id": 42, "start": date(2026, 4, 1),
+                                             "end": date(2026, 4, 3)}
+    body = r.json()
+    assert body["dates"] == ["2026-04-01", "2026-04-02"]
+    assert body["calories"] == [1850, None] and body["protein"] == [92.5, None]
+    assert body["water_ml"] == [1500, None] and body["weight_kg"] == [70.25, None]
+    assert body["menus"]["lunch"] == ["ข้าวมันไก่", None]
+    assert set(body["menus"]) == {"breakfast", "lunch", "dinner", "snack"}
+
+
+@pytest.mark.parametrize("qs", ["from=2026-04-02&to=2026-04-01",
+                                "from=2026-01-01&to=2026-12-31"])
+def test_range_rejects_inverted_or_oversized_windows(app_client, qs):
+    conn, cur = _range_conn([])
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        r = app_client.get(f"/daily_logs/42/range?{qs}")
+    assert r.status_code == 400
+    cur.execute.assert_not_called()
+
+
+def test_calendar_and_weekly_are_views_over_the_range(app_client):
+    monday = date(2026, 3, 2)
+    rows = [_day(monday + timedelta(days=i)) for i in range(7)]
+    rows[2] = _day(monday + timedelta(days=2), 2100, Decimal("80"))
+    conn, _ = _range_conn(rows)
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        cal = app_client.get("/daily_logs/42/calendar?month=3&year=2026").json()
+        week = app_client.get("/daily_logs/42/weekly?week_start=2026-03-02").json()
+    assert cal == [{"date": "2026-03-04", "calories": 2100}]
+    assert len(week) == 7 and week[0] == {"date": "2026-03-02", "calories": 0,
+                                          "protein": 0, "carbs": 0, "fat": 0}
+    assert week[2]["calories"] == 2100 and week[2]["protein"] == 80.0
@@ -0,0 +1,77 @@
+"""POST /meals write path: meal and items in one statement, best-effort calorie nudge."""
+from unittest.mock import MagicMock, patch
+
+
+def _meal_body(n_items):
+    return {
+        "date": "2026-04-19",
+        "meal_type": "lunch",
+        "items": [
+            {"food_id": i + 1, "food_name": f"food-{i}", "amount": 1.5,
+             "cal_per_unit": 100, "protein_per_unit": 5,
+             "carbs_per_unit": 10, "fat_per_unit": 2}
+            for i in range(n_items)
+        ],
+    }
+
+
+def test_add_meal_inserts_meal_and_items_in_one_statement(app_client):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    cur.fetchone.return_value = None
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        r = app_client.post("/meals/42", json=_meal_body(6))
+    assert r.status_code == 200
+
+    inserts = [c for c in cur.execute.call_args_list if "INSERT INTO detail_items" in c.args[0]]
+    assert len(inserts) == 1
+    sql, params = inserts[0].args
+    assert "INSERT INTO meals" in sql
+    assert params["user_id"] == 42
+    assert params["total_amount"] == 6 * 150
+    assert params["food_ids"] == [1, 2, 3, 4, 5, 6]
+    assert params["food_names"][0] == "food-0"
+    cols = ("food_ids", "food_names", "amounts", "unit_ids", "cals", "proteins", "carbs", "fats")
+    assert all(len(params[c]) == 6 for c in cols)
+
+
+def test_add_meal_commits_once_with_nudge_for_the_logged_day(app_client):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        r = app_client.post("/meals/42", json=_meal_body(1))
+    assert r.status_code == 200
+    statements = [c.args[0] for c in cur.execute.call_args_list]
+    assert "INSERT INTO notifications" not in statements[0]
+    assert statements[1] == "SAVEPOINT calorie_nudge"
+    nudge_sql, params = cur.execute.call_args_list[2].args
+    assert "ON CONFLICT (user_id, type, notified_on)" in nudge_sql
+    assert "CURRENT_DATE" not in nudge_sql
+    assert str(params["log_date"]) == "2026-04-19"
+    assert conn.commit.call_count == 1
+
+
+def test_failed_nudge_keeps_the_meal(app_client):
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+
+    def execute(sql, params=None):
+        if "INSERT INTO notifications" in sql:
+            raise RuntimeError('column "notified_on" does not exist')
+
+    cur.execute.side_effect = execute
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        r = app_client.post("/meals/42", json=_meal_body(2))
+    assert r.status_code == 200
+    assert cur.execute.call_args.args[0] == "ROLLBACK TO SAVEPOINT calorie_nudge"
+    conn.commit.assert_called_once()
+    conn.rollback.assert_not_called()
+
+
+def test_add_meal_rolls_back_on_db_error(app_client):
+    conn = MagicMock()
+    conn.cursor.return_value.execute.side_effect = RuntimeError("boom")
+    with patch("app.routers.meals.get_db_connection", return_value=conn):
+        r = app_client.post("/meals/42", json=_meal_body(2))
+    assert r.status_code == 500
+    conn.rollback.assert_called_once()
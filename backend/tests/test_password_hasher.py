@@ -0,0 +1,129 @@
+"""Password hashing pool: async API, admission cap, rehash-on-login, /login wiring."""
+import asyncio
+import threading
+from datetime import date
+
+import pytest
+
+import app.core.security as security
+from app.core.security import HashingOverloaded, PasswordHasher, build_context
+
+PASSWORD = "correct horse"
+# Cost 4 keeps the tests fast, and is below the configured 12, so it needs an update.
+OLD_HASH = build_context(bcrypt_rounds=4).hash(PASSWORD)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_hash_and_verify_round_trip_with_rehash_of_old_cost():
+    hasher = PasswordHasher("thread", workers=2)
+    ok, new_hash = _run(hasher.verify(PASSWORD, OLD_HASH))
+    assert ok and new_hash and new_hash.startswith("$2b$12$")
+    assert _run(hasher.verify(PASSWORD, new_hash)) == (True, None)
+    assert _run(hasher.verify("wrong", OLD_HASH)) == (False, None)
+    stats = hasher.stats()
+    assert stats["verified"] == 3 and stats["rehashed"] == 1 and stats["mismatches"] == 1
+    assert stats["hash_ms_avg"] > 0 and stats["in_flight"] == 0
+    hasher.shutdown()
+
+
+@pytest.mark.parametrize("stored", [None, "", "0f" * 32])
+def test_unknown_or_missing_hash_is_a_mismatch_not_an_error(stored):
+    assert _run(PasswordHasher("inline").verify(PASSWORD, stored)) == (False, None)
+
+
+def test_full_pool_rejects_instead_of_queueing():
+    hasher = PasswordHasher("thread", workers=1, max_queue=1)
+    gate = threading.Event()
+
+    def slow():
+        gate.wait(2)
+        return "h", 1.0
+
+    async def storm():
+        first = asyncio.ensure_future(hasher._run(slow))
+        second = asyncio.ensure_future(hasher._run(slow))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HashingOverloaded):
+            await hasher._run(slow)
+        gate.set()
+        return await asyncio.gather(first, second)
+
+    assert _run(storm()) == [("h", 1.0), ("h", 1.0)]
+    assert hasher.stats()["rejected"] == 1 and hasher.stats()["wait_ms_max"] > 0
+    hasher.shutdown()
+
+
+def test_process_pool_hashes_in_worker_processes():
+    hasher = PasswordHasher("process", workers=1)
+    try:
+        hasher.warm()
+        hashed = _run(hasher.hash(PASSWORD))
+        assert security.verify_password(PASSWORD, hashed)
+        assert _run(hasher.verify(PASSWORD, hashed)) == (True, None)
+    finally:
+        hasher.shutdown()
+
+
+def test_argon2_without_the_library_falls_back_to_bcrypt():
+    try:
+        import argon2  # noqa: F401
+        pytest.skip("argon2-cffi installed")
+    except ImportError:
+        pass
+    ctx = build_context("argon2,bcrypt")
+    assert ctx.default_scheme() == "bcrypt"
+
+
+# ── /login ──────────────────────────────────────────────────────────────────
+def _user(password_hash=OLD_HASH, verified=True):
+    return {"user_id": 42, "email": "a@example.com", "username": "a", "role_id": 2,
+            "password_hash": password_hash, "is_email_verified": verified,
+            "last_login_date": date.today(), "total_login_days": 3, "current_streak": 2}
+
+
+@pytest.fixture
+def login_db(monkeypatch, app_client):
+    import app.routers.auth as auth
+    from unittest.mock import MagicMock
+
+    conn = MagicMock()
+    cur = conn.cursor.return_value
+    monkeypatch.setattr(auth, "get_db_connection", lambda: conn)
+    hasher = PasswordHasher("thread", workers=1)
+    monkeypatch.setattr(auth, "get_hasher", lambda: hasher)
+    yield app_client, cur
+    hasher.shutdown()
+
+
+def test_login_rehashes_an_old_hash_in_the_same_transaction(login_db):
+    client, cur = login_db
+    cur.fetchone.return_value = _user()
+    r = client.post("/login", json={"email": "A@example.com", "password": PASSWORD})
+    assert r.status_code == 200 and r.json()["user_id"] == 42
+    updates = [c.args for c in cur.execute.call_args_list if "SET password_hash" in c.args[0]]
+    assert len(updates) == 1 and updates[0][1][0].startswith("$2b$12$")
+
+
+def test_login_wrong_password_and_social_account_are_401(login_db):
+    client, cur = login_db
+    cur.fetchone.return_value = _user()
+    assert client.post("/login", json={"email": "a@example.com", "password": "nope"}).status_code == 401
+    cur.fetchone.return_value = _user(password_hash="ab" * 32)
+    assert client.post("/login", json={"email": "a@example.com", "password": PASSWORD}).status_code == 401
+
+
+def test_login_answers_503_with_retry_after_when_pool_is_full(login_db, monkeypatch):
+    import app.routers.auth as auth
+
+    class Full:
+        async def verify(self, password, stored):
+            raise HashingOverloaded(retry_after=3)
+
+    client, cur = login_db
+    cur.fetchone.return_value = _user()
+    monkeypatch.setattr(auth, "get_hasher", lambda: Full())
+    r = client.post("/login", json={"email": "a@example.com", "password": PASSWORD})
+    assert r.status_code == 503 and r.headers["Retry-After"] == "3"
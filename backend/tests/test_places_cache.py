@@ -0,0 +1,131 @@
+"""Geohash-bucketed restaurant cache with coalescing and stale-while-revalidate."""
+import threading
+import time
+
+import pytest
+
+from ai_models.llm_provider import cancel_scope
+from ai_models.places_cache import RestaurantCache, geohash_cell
+
+
+class FakePlaces:
+    """Local stand-in for the Places API: counts calls, can block or fail."""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+        self.fail = False
+        self.version = 0
+
+    def __call__(self, lat, lng, radius_m):
+        self.calls.append((lat, lng, radius_m))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return [{"name": f"ร้าน v{self.version}", "vicinity": "", "rating": 4.5,
+                 "open_now": True, "price_level": 1}]
+
+
+def _cache(client, **kw):
+    kw.setdefault("ttl", 60)
+    kw.setdefault("stale", 600)
+    kw.setdefault("error_ttl", 30)
+    kw.setdefault("timeout", 2)
+    return RestaurantCache(client, **kw)
+
+
+def _wait_for(pred, seconds=1.0):
+    end = time.monotonic() + seconds
+    while not pred() and time.monotonic() < end:
+        time.sleep(0.01)
+    assert pred()
+
+
+def test_geohash_matches_reference_and_centre_is_inside_cell():
+    assert geohash_cell(57.64911, 10.40744, 11)[0] == "u4pruydqqvj"
+    cell, lat, lng = geohash_cell(13.7563, 100.5018, 6)
+    assert geohash_cell(lat, lng, 6)[0] == cell
+    assert abs(lat - 13.7563) < 0.006 and abs(lng - 100.5018) < 0.006
+
+
+def test_users_in_one_cell_share_a_single_upstream_call():
+    fake = FakePlaces()
+    cache = _cache(fake)
+    first = cache.lookup(13.75630, 100.50180)
+    second = cache.lookup(13.75640, 100.50190)  # a few metres away
+    assert first == second and len(fake.calls) == 1
+    assert cache.stats()["hits"] == 1
+    cache.lookup(18.7883, 98.9853)  # another city
+    assert len(fake.calls) == 2
+
+
+def test_concurrent_misses_are_coalesced():
+    fake = FakePlaces(delay=0.2)
+    cache = _cache(fake)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.lookup(13.7563, 100.5018)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(fake.calls) == 1
+    assert len(results) == 8 and all(r and r[0]["name"] == "ร้าน v0" for r in results)
+    assert cache.stats()["coalesced"] == 7
+
+
+def test_stale_entry_is_served_at_once_and_refreshed_in_background():
+    fake = FakePlaces()
+    cache = _cache(fake, ttl=0.05)
+    cache.lookup(13.7563, 100.5018)
+    time.sleep(0.06)
+    fake.version, fake.delay = 1, 0.3
+    t0 = time.monotonic()
+    assert cache.lookup(13.7563, 100.5018)[0]["name"] == "ร้าน v0"
+    assert time.monotonic() - t0 < 0.1
+    _wait_for(lambda: len(fake.calls) == 2 and not cache._inflight)
+    assert cache.lookup(13.7563, 100.5018)[0]["name"] == "ร้าน v1"
+    assert cache.stats()["stale_hits"] == 1 and cache.stats()["refreshes"] == 1
+
+
+def test_failed_refresh_keeps_the_stale_list():
+    fake = FakePlaces()
+    cache = _cache(fake, ttl=0.05)
+    cache.lookup(13.7563, 100.5018)
+    time.sleep(0.06)
+    fake.fail = True
+    assert cache.lookup(13.7563, 100.5018)[0]["name"] == "ร้าน v0"
+    _wait_for(lambda: not cache._inflight)
+    assert cache.lookup(13.7563, 100.5018)[0]["name"] == "ร้าน v0"
+    assert cache.stats()["upstream_errors"] >= 1
+
+
+def test_outage_without_stale_data_is_negative_cached():
+    fake = FakePlaces()
+    fake.fail = True
+    cache = _cache(fake)
+    assert cache.lookup(13.7563, 100.5018) == []
+    assert cache.lookup(13.7563, 100.5018) == []
+    assert len(fake.calls) == 1
+
+
+@pytest.mark.parametrize("cancelled", [False, True])
+def test_slow_miss_gives_up_but_result_lands_for_the_next_user(cancelled):
+    fake = FakePlaces(delay=0.3)
+    cache = _cache(fake, timeout=0.05 if not cancelled else 5)
+    t0 = time.monotonic()
+    with cancel_scope(lambda: cancelled):
+        assert cache.lookup(13.7563, 100.5018) == []
+    assert time.monotonic() - t0 < 0.25
+    _wait_for(lambda: not cache._inflight)
+    assert cache.lookup(13.7563, 100.5018)[0]["name"] == "ร้าน v0"
+    assert cache.stats()["wait_timeouts"] == 1
+
+
+def test_lru_bound_on_cells():
+    fake = FakePlaces()
+    cache = _cache(fake, max_cells=2)
+    for lat in (10.0, 11.0, 12.0):
+        cache.lookup(lat, 100.0)
+    cache.lookup(10.0, 100.0)
+    assert len(fake.calls) == 4 and cache.stats()["cells"] == 2
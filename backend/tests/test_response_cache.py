@@ -0,0 +1,188 @@
+"""Home-screen response cache: read-through, write invalidation, ETag/304, backends."""
+import pytest
+
+import app.services.response_cache as rc
+from ai_models.user_context import invalidate_user_context
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, monkeypatch):
+    if request.param == "memory":
+        cache = rc.MemoryResponseCache(max_bytes=1024)
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        cache = rc.RedisResponseCache(fakeredis.FakeRedis())
+    monkeypatch.setattr(rc, "_backend", cache)
+    rc.reset_response_cache()
+    return cache
+
+
+@pytest.fixture
+def unread(monkeypatch, app_client, backend):
+    """/notifications/42/unread_count with a counting fake query."""
+    import app.routers.notifications as notifications
+
+    calls = []
+
+    def load(user_id):
+        calls.append(user_id)
+        return {"unread_count": 3}
+
+    monkeypatch.setattr(notifications, "_load_unread_count", load)
+    return app_client, calls
+
+
+def test_second_read_is_served_from_the_cache(unread):
+    client, calls = unread
+    first = client.get("/notifications/42/unread_count")
+    second = client.get("/notifications/42/unread_count")
+    assert first.json() == second.json() == {"unread_count": 3}
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    assert calls == [42]
+    stats = rc.response_cache_stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+    assert stats["by_endpoint"]["unread_count"] == {"hits": 1, "misses": 1}
+
+
+def test_if_none_match_answers_304_without_a_body(unread):
+    client, _ = unread
+    etag = client.get("/notifications/42/unread_count").headers["ETag"]
+    r = client.get("/notifications/42/unread_count", headers={"If-None-Match": f'"x", W/{etag}'})
+    assert r.status_code == 304 and r.content == b"" and r.headers["ETag"] == etag
+    assert client.get("/notifications/42/unread_count",
+                      headers={"If-None-Match": '"stale"'}).status_code == 200
+    stats = rc.response_cache_stats()
+    assert stats["not_modified"] == 1 and stats["bytes_saved"] == len(b'{"unread_count":3}')
+
+
+def test_writes_bump_the_generation(unread, mock_db, monkeypatch):
+    import app.routers.notifications as notifications
+
+    monkeypatch.setattr(notifications, "get_db_connection", lambda: mock_db[0])
+    client, calls = unread
+    client.get("/notifications/42/unread_count")
+    client.put("/notifications/42/read_all")  # bump_user directly
+    client.get("/notifications/42/unread_count")
+    invalidate_user_context(42)  # meal / weight / profile writes, via the listener
+    client.get("/notifications/42/unread_count")
+    client.get("/notifications/42/unread_count")
+    assert calls == [42, 42, 42]
+    assert rc.response_cache_stats()["bumps"] == 2
+
+
+def test_other_users_and_params_are_separate_entries(backend):
+    from starlette.requests import Request
+
+    req = Request({"type": "http", "headers": []})
+    loads = []
+
+    def compute(tag):
+        return lambda: loads.append(tag) or {"tag": tag}
+
+    rc.cached_json(req, "water_logs", 1, {"date": "2026-10-18"}, compute("a"))
+    rc.cached_json(req, "water_logs", 1, {"date": "2026-10-17"}, compute("b"))
+    rc.cached_json(req, "water_logs", 2, {"date": "2026-10-18"}, compute("c"))
+    rc.bump_user(2)
+    body = rc.cached_json(req, "water_logs", 1, {"date": "2026-10-18"}, compute("x")).body
+    assert loads == ["a", "b", "c"] and body == b'{"tag":"a"}'
+
+
+def test_value_computed_across_a_write_is_not_stored(backend):
+    from starlette.requests import Request
+
+    req = Request({"type": "http", "headers": []})
+
+    def racing():
+        rc.bump_user(7)  # a meal was logged while the summary was computed
+        return {"total": 1}
+
+    rc.cached_json(req, "daily_summary", 7, {}, racing)
+    assert rc.response_cache_stats()["stale_skipped"] == 1
+    assert rc.response_cache_stats()["stores"] == 0
+
+
+def test_memory_backend_is_bounded_by_bytes():
+    cache = rc.MemoryResponseCache(max_bytes=10)
+    cache.set("a", b"12345", '"a"', 60)
+    cache.set("b", b"12345", '"b"', 60)
+    cache.get("a")
+    cache.set("c", b"123", '"c"', 60)
+    assert cache.get("b") is None and cache.get("a") == (b"12345", '"a"')
+    assert cache.stats()["bytes"] == 8 and cache.stats()["evictions"] == 1
+
+
+def test_memory_generations_are_bounded_and_take_entries_with_them():
+    cache = rc.MemoryResponseCache(max_bytes=1024, max_users=2)
+    cache.set("unread_count:1:{}:0", b"one", '"1"', 60)
+    cache.bump(1)
+    assert cache.get("unread_count:1:{}:0") is None  # stale entries go at once
+    cache.set("unread_count:1:{}:1", b"one", '"1"', 60)
+    cache.bump(2)
+    cache.bump(3)  # evicts user 1's generation
+    assert cache.generation(1) == 0 and cache.stats()["users_tracked"] == 2
+    assert cache.get("unread_count:1:{}:1") is None and cache.stats()["entries"] == 0
+
+
+def test_goal_progress_cache_hit_opens_no_connection(app_client, monkeypatch):
+    from unittest.mock import MagicMock
+
+    import app.routers.weight as weight
+
+    monkeypatch.setattr(rc, "_backend", rc.MemoryResponseCache())
+    rc.reset_response_cache()
+    conns = []
+    monkeypatch.setattr(weight, "get_db_connection", lambda: conns.append(1) or MagicMock())
+    checks = []
+    monkeypatch.setattr(weight, "_check_1700_calorie_warning",
+                        lambda user_id, conn: checks.append(user_id) or False)
+    first = app_client.get("/users/42/goal_progress")
+    again = app_client.get("/users/42/goal_progress")
+    assert first.status_code == again.status_code == 200
+    assert len(conns) == 1 and checks == [42]
+
+
+def test_backend_errors_fall_through_to_the_db(monkeypatch):
+    from starlette.requests import Request
+
+    class Down:
+        def generation(self, user_id):
+            raise ConnectionError("redis down")
+
+        def bump(self, user_id):
+            raise ConnectionError("redis down")
+
+        def clear(self):
+            pass
+
+        def stats(self):
+            return {"backend": "redis"}
+
+    monkeypatch.setattr(rc, "_backend", Down())
+    rc.reset_response_cache()
+    r = rc.cached_json(Request({"type": "http", "headers": []}), "insights", 1, {}, lambda: {"ok": True})
+    rc.bump_user(1)
+    assert r.status_code == 200 and r.body == b'{"ok":true}'
+    assert rc.response_cache_stats()["errors"] == 2
+
+
+def test_redis_without_the_package_disables_the_cache(monkeypatch):
+    try:
+        import redis  # noqa: F401
+        pytest.skip("redis installed")
+    except ImportError:
+        pass
+    monkeypatch.setenv("RESPONSE_CACHE_BACKEND", "redis")
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    assert isinstance(rc._build_backend(), rc.NullResponseCache)
+
+
+def test_default_is_off_without_a_shared_backend(monkeypatch):
+    monkeypatch.delenv("RESPONSE_CACHE_BACKEND", raising=False)
+    monkeypatch.delenv("RESPONSE_CACHE_REDIS_URL", raising=False)
+    assert isinstance(rc._build_backend(), rc.NullResponseCache)
+    monkeypatch.setenv("RESPONSE_CACHE_BACKEND", "redis")
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    assert isinstance(rc._build_backend(), rc.NullResponseCache)
+    monkeypatch.setenv("RESPONSE_CACHE_BACKEND", "memory")
+    assert isinstance(rc._build_backend(), rc.MemoryResponseCache)
@@ -0,0 +1,97 @@
+"""StageGraph runner and the concurrent NutritionMultiAgent pipeline."""
+import threading
+import time
+
+import pytest
+
+import ai_models.multi_agent_system as mas
+from ai_models.llm_provider import current_cancel_check
+from ai_models.stage_graph import StageGraph
+
+
+def _sleepy(value, seconds=0.2):
+    def fn(*deps):
+        time.sleep(seconds)
+        return (value, *deps) if deps else value
+    return fn
+
+
+def test_independent_stages_overlap_and_deps_are_passed():
+    graph = StageGraph()
+    graph.add("a", _sleepy("A"))
+    graph.add("b", _sleepy("B"))
+    graph.add("c", lambda a, b: a + b, after=("a", "b"))
+    t0 = time.monotonic()
+    results, timings = graph.run()
+    assert time.monotonic() - t0 < 0.35
+    assert results["c"] == "AB"
+    assert {t["status"] for t in timings.values()} == {"ok"}
+    assert timings["a"]["ms"] >= 150
+
+
+def test_optional_stage_past_deadline_falls_back_and_is_cancelled():
+    saw_cancel = threading.Event()
+
+    def slow():
+        check = current_cancel_check()
+        for _ in range(100):
+            if check():
+                saw_cancel.set()
+                return "late"
+            time.sleep(0.01)
+        return "late"
+
+    graph = StageGraph()
+    graph.add("slow", slow, deadline=0.05, optional=True, fallback=[])
+    graph.add("fast", lambda: "ok")
+    results, timings = graph.run()
+    assert results == {"slow": [], "fast": "ok"}
+    assert timings["slow"]["status"] == "timeout"
+    assert saw_cancel.wait(1)
+
+
+def test_optional_error_uses_fallback_but_required_error_propagates():
+    def boom():
+        raise RuntimeError("places down")
+
+    graph = StageGraph()
+    graph.add("places", boom, optional=True, fallback=[])
+    results, timings = graph.run()
+    assert results["places"] == [] and timings["places"]["status"] == "error"
+
+    graph = StageGraph()
+    graph.add("profile", boom)
+    graph.add("after", lambda p: p, after=("profile",))
+    with pytest.raises(RuntimeError, match="places down"):
+        graph.run()
+
+
+def test_multi_agent_runs_agent1_places_and_foods_concurrently(monkeypatch):
+    agent = mas.NutritionMultiAgent()
+    ctx = {"profile": {"current_weight_kg": 60, "target_calories": 1800},
+           "allergies": ["กุ้ง"], "today_intake": {}, "weight_logs": [], "recent_foods": []}
+    foods = ({"items": [{"name": "ต้มยำกุ้ง", "calories": 300}], "total": {"calories": 300},
+              "allergy_warnings": []}, ["ต้มยำกุ้ง"])
+    monkeypatch.setattr(agent.data_agent, "fetch", lambda uid: _sleepy(ctx)())
+    monkeypatch.setattr(agent.analysis_agent, "resolve_foods", lambda msg, uid: _sleepy(foods)())
+    monkeypatch.setattr(agent.data_agent, "fetch_nearby_restaurants", lambda lat, lng: _sleepy(["x"], 1.0)())
+    monkeypatch.setattr(mas, "_RESTAURANTS_DEADLINE_SEC", 0.1)
+    monkeypatch.setattr(agent.composer, "compose", lambda state: state)
+
+    timings = {}
+    t0 = time.monotonic()
+    state = agent.run(42, "กินต้มยำกุ้งไปแล้ว", lat=13.7, lng=100.5, timings=timings)
+    assert time.monotonic() - t0 < 0.45  # slowest branch, not the sum
+    assert state["nearby_restaurants"] == []  # composed without them
+    assert timings["restaurants"]["status"] == "timeout"
+    assert set(timings) == {"context", "restaurants", "foods", "analysis", "compose"}
+    food_info = state["analysis"]["food_info"]
+    assert food_info["total"] == {"calories": 300}
+    assert food_info["allergy_warnings"] == ["⚠️ ต้มยำกุ้ง อาจมีส่วนผสมที่คุณแพ้"]
+
+
+def test_multi_agent_missing_profile_is_an_early_reply(monkeypatch):
+    agent = mas.NutritionMultiAgent()
+    monkeypatch.setattr(agent.data_agent, "fetch", lambda uid: None)
+    monkeypatch.setattr(agent.analysis_agent, "resolve_foods", lambda msg, uid: None)
+    assert "ไม่พบข้อมูลโปรไฟล์" in agent.run(7, "กินอะไรดี")
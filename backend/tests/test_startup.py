@@ -0,0 +1,60 @@
+"""Cold-start budget: lazy AI imports, deferred agents, background warm-up."""
+import threading
+
+from app.services import warmup
+from app.services.warmup import Lazy
+from scripts.import_time_report import HEAVY, measure
+
+
+def test_import_main_leaves_heavy_ai_libraries_unloaded():
+    rows, heavy = measure("main")
+    assert heavy == [], f"imported eagerly: {heavy} (see app/services/warmup.py)"
+    assert any(name.strip() == "main" for name, _, _ in rows)
+    assert set(HEAVY) >= {"pandas", "sklearn", "pythainlp", "torch"}
+
+
+def test_lazy_builds_once_under_concurrency():
+    built = []
+    gate = threading.Event()
+
+    def factory():
+        gate.wait(1)
+        built.append(1)
+        return {"ok": True}
+
+    lazy = Lazy("thing", factory)
+    assert not lazy.ready
+    threads = [threading.Thread(target=lazy.get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join(2)
+    assert built == [1] and lazy.ready and lazy.get() == {"ok": True}
+    assert lazy.keys() is not None  # attribute access goes to the instance
+
+
+def test_warmup_runs_steps_in_order_and_survives_failures(monkeypatch):
+    monkeypatch.setattr(warmup, "_steps", [])
+    ran = []
+    warmup.register_warmup("a", lambda: ran.append("a"))
+    warmup.register_warmup("boom", lambda: 1 / 0)
+    warmup.register_warmup("b", lambda: ran.append("b"))
+    stats = warmup.run_warmup()
+    assert ran == ["a", "b"]
+    assert stats["state"] == "done"
+    assert stats["steps"]["boom"]["ok"] is False
+    assert stats["steps"]["b"]["ok"] is True
+
+
+def test_chat_agents_are_not_built_at_import():
+    import app.routers.chat as chat
+
+    names = warmup.warmup_stats()["registered"]
+    assert {"chat.coach", "chat.multi", "meals.estimate"} <= set(names)
+    assert isinstance(chat.coach_agent, Lazy)
+
+
+def test_startup_warmup_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("STARTUP_WARMUP", "0")
+    assert warmup.start_warmup() is False
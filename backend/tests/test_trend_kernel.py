@@ -0,0 +1,146 @@
+"""NumPy trend kernels and the coach analyzers built on them."""
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from ai_models.food_analyzer import FoodAnalyzer
+from ai_models.trend_kernel import days_since_first, ewma, least_squares, pad_series, theil_sen
+from ai_models.weight_trend_model import WeightTrendAnalyzer
+
+
+def _logs(days, weights, start=date(2026, 1, 1)):
+    return [{"date": (start + timedelta(days=d)).isoformat(), "weight": w} for d, w in zip(days, weights)]
+
+
+def random_cases(count=400, seed=1):
+    """Weight-log series like the coach sees: 3–30 unordered weigh-ins over two months."""
+    rng = random.Random(seed)
+    cases = {}
+    for i in range(count):
+        days = rng.sample(range(60), rng.randint(3, 30))
+        base, slope = rng.uniform(50, 110), rng.choice([0.0, 0.0005, rng.uniform(-0.2, 0.2)])
+        weights = [round(base + slope * d + rng.gauss(0, 0.4), 1) for d in days]
+        cases[i] = (_logs(days, weights), rng.uniform(50, 110))
+    return cases
+
+
+def legacy_trend(weight_logs, target_weight):
+    """The pandas/sklearn analyze_trend this replaced, verbatim."""
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+
+    return _legacy_verdict(pd, LinearRegression(), weight_logs, target_weight)
+
+
+def _legacy_verdict(pd, model, weight_logs, target_weight):
+    if not weight_logs or len(weight_logs) < 3:
+        return {"status": "insufficient_data"}
+    df = pd.DataFrame(weight_logs)
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values('date')
+    df['days_passed'] = (df['date'] - df['date'].min()).dt.days
+    model.fit(df[['days_passed']], df['weight'])
+    slope, intercept = model.coef_[0], model.intercept_
+    current_weight = df['weight'].iloc[-1]
+    if abs(slope) < 0.001:
+        return {"status": "stagnant", "slope": round(float(slope), 4)}
+    if (target_weight < current_weight and slope < 0) or (target_weight > current_weight and slope > 0):
+        days = max(0, int((target_weight - intercept) / slope - df['days_passed'].iloc[-1]))
+        return {"status": "on_track", "days_estimated": days, "slope": round(float(slope), 4)}
+    return {"status": "off_track", "slope": round(float(slope), 4)}
+
+
+def _comparable(result):
+    return {k: v for k, v in result.items() if k in ("status", "slope", "days_estimated")}
+
+
+def test_least_squares_recovers_a_line_and_handles_no_spread():
+    x = np.arange(10.0)
+    slope, intercept = least_squares(x, 70 - 0.1 * x)
+    assert slope == pytest.approx(-0.1) and intercept == pytest.approx(70)
+    assert least_squares([3.0, 3.0, 3.0], [70.0, 71.0, 72.0]) == (0.0, 71.0)
+
+
+def test_theil_sen_ignores_a_mistyped_weigh_in():
+    x = np.arange(8.0)
+    y = 80 - 0.2 * x
+    y[5] = 8.0  # "80" typed as "8"
+    robust, _ = theil_sen(x, y)
+    ols, _ = least_squares(x, y)
+    assert robust == pytest.approx(-0.2)
+    assert ols < -2
+
+
+def test_batch_rows_match_single_series():
+    cases = [(np.arange(n, dtype=float), np.linspace(70, 68, n) + np.sin(np.arange(n))) for n in (3, 7, 30)]
+    x, y = pad_series(cases)
+    assert np.isnan(x[0, 3:]).all()
+    for fit in (least_squares, theil_sen):
+        slopes, intercepts = fit(x, y)
+        for i, (xi, yi) in enumerate(cases):
+            assert (slopes[i], intercepts[i]) == pytest.approx(fit(xi, yi))
+    smoothed = ewma(x, y, 7)
+    for i, (xi, yi) in enumerate(cases):
+        assert smoothed[i, :len(xi)] == pytest.approx(ewma(xi, yi, 7))
+
+
+def test_ewma_matches_pandas_time_weighted_mean():
+    pd = pytest.importorskip("pandas")
+    x = np.array([0.0, 1, 3, 4, 10, 11, 25])
+    y = np.array([70.0, 71, 69.5, 70.2, 68, 68.4, 67.1])
+    times = pd.Timestamp("2026-01-01") + pd.to_timedelta(x, unit="D")
+    expected = pd.Series(y).ewm(halflife=pd.Timedelta(days=7), times=times).mean().to_numpy()
+    assert ewma(x, y, 7) == pytest.approx(expected, rel=1e-12)
+
+
+def test_days_since_first_accepts_strings_dates_and_datetimes():
+    got = days_since_first(["2026-01-03", date(2026, 1, 1), "2026-01-02T23:59:00"])
+    assert got.tolist() == [2.0, 0.0, 1.0]
+
+
+def test_analyze_trend_matches_legacy_pandas_sklearn():
+    pytest.importorskip("pandas")
+    pytest.importorskip("sklearn")
+    analyzer = WeightTrendAnalyzer(method="ols")
+    for logs, target in random_cases().values():
+        assert _comparable(analyzer.analyze_trend(logs, target)) == legacy_trend(logs, target)
+
+
+def test_analyze_many_matches_per_user_calls():
+    cases = random_cases(200, seed=2)
+    cases["new_user"] = (_logs([0, 1], [70.0, 69.8]), 65.0)
+    cases["skipped_weight"] = (_logs([0, 1, 2], [70.0, None, 69.8]), 65.0)
+    for method in ("ols", "theil_sen"):
+        analyzer = WeightTrendAnalyzer(method=method)
+        many = analyzer.analyze_many(cases)
+        assert many == {k: analyzer.analyze_trend(*v) for k, v in cases.items()}
+    assert many["new_user"]["status"] == "insufficient_data"
+    assert many["skipped_weight"]["status"] == "insufficient_data"
+
+
+def test_robust_mode_keeps_a_losing_user_on_track_after_one_bad_reading():
+    weights = [80 - 0.15 * d for d in range(14)]
+    weights[-1] = 95.0  # last weigh-in mistyped
+    logs = _logs(range(14), weights)
+    assert WeightTrendAnalyzer(method="ols").analyze_trend(logs, 75.0)["status"] == "off_track"
+    result = WeightTrendAnalyzer(method="theil_sen").analyze_trend(logs, 75.0)
+    assert result["status"] == "on_track" and result["slope"] == pytest.approx(-0.15)
+
+
+def test_nutrition_gap_and_frequent_foods_match_pandas():
+    pd = pytest.importorskip("pandas")
+    logs = [{"date": f"2026-01-0{i}", "calories": 1800 + 37.3 * i, "protein": 90 + i,
+             "carbs": 210.5, "fat": 55 - i} for i in range(1, 8)]
+    logs.append({"date": "2026-01-08", "calories": None, "protein": 120, "carbs": 200, "fat": 60})
+    target = {"target_calories": 2000, "target_protein": 150, "target_carbs": 200, "target_fat": 60}
+    result = FoodAnalyzer().analyze_nutrition_gap(target, logs)
+    df = pd.DataFrame(logs)
+    assert result["average_intake"] == {k: round(df[k].mean(), 2) for k in ("calories", "protein", "carbs", "fat")}
+
+    names = "ข้าวผัด ต้มยำ ข้าวผัด ส้มตำ ต้มยำ ไก่ย่าง ลาบ ลาบ ส้มตำ".split()
+    items = [{"food_name": n} for n in names]
+    freq = pd.DataFrame(items)["food_name"].value_counts().head(5).reset_index()
+    freq.columns = ["food_name", "count"]
+    assert FoodAnalyzer().find_frequent_foods(items) == freq.to_dict("records")
@@ -0,0 +1,67 @@
+"""pytest-benchmark suite for the coach's weight-trend analysis.
+
+Per-call latency of the NumPy analyzer against the pandas/sklearn version
+it replaced on a 30-log series, and a 1,000-user nightly batch
+(analyze_many) against calling analyze_trend in a loop. Peak traced memory
+of one call is attached to each result as extra_info["peak_kib"]. Skipped
+unless pytest-benchmark is installed:
+
+    pip install -r requirements-dev.txt
+    pytest tests/test_trend_kernel_bench.py --benchmark-group-by=group
+"""
+import tracemalloc
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from ai_models.weight_trend_model import WeightTrendAnalyzer  # noqa: E402
+from tests.test_trend_kernel import legacy_trend, random_cases  # noqa: E402
+
+SERIES = max(random_cases(50).values(), key=lambda case: len(case[0]))
+USERS = random_cases(1000, seed=3)
+
+
+def _peak_kib(fn, *args):
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.benchmark(group="trend-single")
+def test_bench_single_legacy(benchmark):
+    pytest.importorskip("pandas")
+    pytest.importorskip("sklearn")
+    legacy_trend(*SERIES)  # first call pays the imports
+    benchmark.extra_info["peak_kib"] = _peak_kib(legacy_trend, *SERIES)
+    benchmark(legacy_trend, *SERIES)
+
+
+@pytest.mark.benchmark(group="trend-single")
+@pytest.mark.parametrize("method", ["ols", "theil_sen"])
+def test_bench_single_numpy(benchmark, method):
+    analyzer = WeightTrendAnalyzer(method=method)
+    benchmark.extra_info["peak_kib"] = _peak_kib(analyzer.analyze_trend, *SERIES)
+    benchmark(analyzer.analyze_trend, *SERIES)
+
+
+@pytest.mark.benchmark(group="trend-1000-users")
+def test_bench_loop(benchmark):
+    analyzer = WeightTrendAnalyzer(method="ols")
+
+    def loop():
+        return {k: analyzer.analyze_trend(*v) for k, v in USERS.items()}
+
+    benchmark.extra_info["peak_kib"] = _peak_kib(loop)
+    benchmark.pedantic(loop, rounds=5)
+
+
+@pytest.mark.benchmark(group="trend-1000-users")
+@pytest.mark.parametrize("method", ["ols", "theil_sen"])
+def test_bench_analyze_many(benchmark, method):
+    analyzer = WeightTrendAnalyzer(method=method)
+    benchmark.extra_info["peak_kib"] = _peak_kib(analyzer.analyze_many, USERS)
+    benchmark.pedantic(analyzer.analyze_many, args=(USERS,), rounds=5)
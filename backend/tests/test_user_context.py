@@ -0,0 +1,151 @@
+"""UserContextSnapshot views, per-user cache and invalidation."""
+import threading
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+
+import ai_models.user_context as uc
+
+TODAY = date(2026, 3, 2)
+
+
+def _row(**over):
+    row = {
+        "username": "somying", "gender": "female", "birth_date": date(1995, 5, 1),
+        "height_cm": 160, "current_weight_kg": 60, "goal_type": "lose_weight",
+        "target_weight_kg": 55, "target_calories": 2000, "target_protein": 100,
+        "target_carbs": 200, "target_fat": 60, "activity_level": "lightly_active",
+        "current_streak": 4, "total_login_days": 9,
+        "allergies": ["กุ้ง"],
+        "days": [
+            {"date_record": "2026-03-02", "calories": 1900, "protein": 80, "carbs": 210, "fat": 55},
+            {"date_record": "2026-03-01", "calories": 2500, "protein": 60, "carbs": 300, "fat": 90},
+            {"date_record": "2026-02-27", "calories": None, "protein": 0, "carbs": 0, "fat": 0},
+        ],
+        "weight_logs": [{"date": "2026-03-02", "weight": 60}, {"date": "2026-02-25", "weight": 61}],
+        "recent_items": [
+            {"food_name": "ข้าวผัด", "amount": 1, "cal_per_unit": 500, "protein_per_unit": 15,
+             "carbs_per_unit": 70, "fat_per_unit": 15, "created_at": "2026-03-02T12:00:00"},
+            {"food_name": "ข้าวผัด", "amount": 2, "cal_per_unit": 500, "protein_per_unit": 15,
+             "carbs_per_unit": 70, "fat_per_unit": 15, "created_at": "2026-03-01T12:00:00"},
+        ],
+    }
+    row.update(over)
+    return row
+
+
+def test_agent_and_coach_views():
+    snap = uc.UserContextSnapshot(42, TODAY, _row())
+    agent = snap.as_agent_context()
+    assert agent["profile"]["username"] == "somying" and "days" not in agent["profile"]
+    assert agent["today_intake"] == {"total_calories_intake": 1900, "total_protein": 80,
+                                     "total_carbs": 210, "total_fat": 55}
+    assert [f["food_name"] for f in agent["recent_foods"]] == ["ข้าวผัด"]  # distinct
+
+    coach = snap.as_coach_context()
+    assert coach["daily_summaries"][0] == {"date": "2026-03-02", "calories": 1900}
+    assert [f["amount"] for f in coach["recent_foods"]] == [1, 2]  # every item
+    assert coach["allergies"] == ["กุ้ง"]
+
+
+def test_today_intake_is_zero_without_a_summary_row():
+    snap = uc.UserContextSnapshot(42, date(2026, 3, 3), _row())
+    assert snap.today_intake["total_calories_intake"] == 0
+
+
+def test_insights_overview_matches_old_aggregate():
+    overview = uc.UserContextSnapshot(42, TODAY, _row()).insights_overview()
+    assert overview == {
+        "total_days_logged": 3,        # COUNT(*) includes the NULL-calorie day
+        "avg_calories": 2200,          # AVG skips it
+        "days_on_target": 1,           # |1900 - 2000| <= 10%
+        "avg_protein": 46.7, "avg_carbs": 170.0, "avg_fat": 48.3,
+        "best_day_diff": 100,
+        "current_streak": 4,
+    }
+    empty = uc.UserContextSnapshot(42, TODAY, _row(days=[])).insights_overview()
+    assert empty == uc.UserContextSnapshot.EMPTY_OVERVIEW
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    calls = []
+
+    def fake_build(user_id, conn=None, today=None):
+        calls.append(user_id)
+        return uc.UserContextSnapshot(user_id, today, _row())
+
+    monkeypatch.setattr(uc, "build_user_context", fake_build)
+    monkeypatch.setattr(uc, "_cache", uc._SnapshotCache(ttl=60, max_entries=2))
+    return calls
+
+
+def test_cache_hits_until_invalidated(builds):
+    assert uc.get_user_context(1) is uc.get_user_context(1)
+    assert builds == [1]
+    uc.invalidate_user_context(1)
+    uc.get_user_context(1)
+    assert builds == [1, 1]
+    stats = uc.user_context_stats()
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+
+def test_lru_bound(builds):
+    for uid in (1, 2, 3):
+        uc.get_user_context(uid)
+    uc.get_user_context(1)
+    assert builds == [1, 2, 3, 1]
+
+
+def test_generations_are_bounded(builds):
+    for uid in range(10):
+        uc.invalidate_user_context(uid)
+    assert list(uc._cache._generation) == [8, 9]
+
+
+def test_build_racing_a_write_is_not_cached(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_build(user_id, conn=None, today=None):
+        started.set()
+        release.wait(1)
+        return uc.UserContextSnapshot(user_id, today, _row())
+
+    monkeypatch.setattr(uc, "build_user_context", slow_build)
+    monkeypatch.setattr(uc, "_cache", uc._SnapshotCache())
+    t = threading.Thread(target=uc.get_user_context, args=(7,))
+    t.start()
+    started.wait(1)
+    uc.invalidate_user_context(7)  # a meal was logged mid-build
+    release.set()
+    t.join()
+    assert uc.user_context_stats()["entries"] == 0
+
+
+def test_insights_route_reads_the_snapshot(app_client, monkeypatch):
+    import app.routers.insights as insights
+
+    monkeypatch.setattr(insights, "get_user_context",
+                        lambda uid: uc.UserContextSnapshot(uid, TODAY, _row()))
+    r = app_client.get("/insights/42")
+    assert r.status_code == 200
+    assert r.json()["avg_calories"] == 2200
+
+    monkeypatch.setattr(insights, "get_user_context", lambda uid: None)
+    assert app_client.get("/insights/42").json()["total_days_logged"] == 0
+
+
+def test_meal_write_invalidates(app_client, monkeypatch):
+    import app.routers.meals as meals
+
+    seen = []
+    conn = MagicMock()
+    conn.cursor.return_value.fetchone.return_value = None
+    monkeypatch.setattr(meals, "invalidate_user_context", seen.append)
+    monkeypatch.setattr(meals, "get_db_connection", lambda: conn)
+    r = app_client.post("/meals/42", json={"date": "2026-03-02", "meal_type": "lunch", "items": [
+        {"food_id": 1, "food_name": "ข้าวผัด", "amount": 1, "cal_per_unit": 500,
+         "protein_per_unit": 15, "carbs_per_unit": 70, "fat_per_unit": 15}]})
+    assert r.status_code == 200
+    assert seen == [42]